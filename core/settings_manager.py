@@ -27,7 +27,10 @@ class SettingsManager:
             'auto_sync': True,
             'sync_interval': 300000,  # 5 นาที
             'show_notifications': True,
-            'theme': 'default'
+            'theme': 'default',
+            'console_max_lines': 5000,    # scrollback ของช่อง Response (0 = ไม่จำกัด)
+            'console_spill_file': '',     # path ไฟล์เก็บ Response ทั้งหมด ('' = ปิด)
+            'metrics_enabled': False      # เก็บ metrics (ดู/export ได้จากปุ่ม 📈 Metrics)
         }
     
     def load_settings(self):
@@ -405,4 +405,59 @@ def safe_get_attr(obj, attr_name, default="-"):
     Returns:
         ค่าของ attribute หรือค่าเริ่มต้น
     """
-    return getattr(obj, attr_name, default) if hasattr(obj, attr_name) else default
\ No newline at end of file
+    return getattr(obj, attr_name, default) if hasattr(obj, attr_name) else default
+
+_CMT_HEADER_RE = re.compile(r'\+CMT:\s*"([^"]*)","[^"]*","([^"]+)"')
+
+
+def decode_sms_body(body):
+    """ถอดรหัสเนื้อความ SMS (บรรทัดถัดจาก +CMT) ทั้งแบบ UCS2 hex และข้อความปกติ
+    
+    Args:
+        body (str): บรรทัดเนื้อความดิบจากโมเด็ม
+        
+    Returns:
+        str: ข้อความที่อ่านได้ (ตัด \\x00 ท้ายสตริงกรณีถอดจาก UCS2)
+    """
+    try:
+        s = (body or "").strip().strip('"').replace(" ", "")
+        
+        # เดาว่าเป็น HEX ไหม (ตัวอักษร 0-9A-F ทั้งหมด และความยาวต้องเป็นเลขคู่)
+        if re.fullmatch(r'[0-9A-Fa-f]+', s) and len(s) % 2 == 0:
+            try:
+                return decode_ucs2_to_text(s).split("\x00", 1)[0]
+            except Exception:
+                # เผื่อ utility ล้มเหลว ใช้วิธีมาตรฐาน (UTF-16BE)
+                try:
+                    return bytes.fromhex(s).decode('utf-16-be', errors='ignore').split("\x00", 1)[0]
+                except Exception:
+                    pass
+        
+        # ไม่ใช่ hex → ถือเป็นข้อความปกติ
+        return s
+    except Exception:
+        return body or ""
+
+
+def parse_cmt_sms(combined_line):
+    """แยก SMS จากบรรทัด '+CMT: header|body' ที่ SerialMonitorThread ส่งมา
+    
+    Args:
+        combined_line (str): เช่น '+CMT: "002B0036...","","25/09/05,15:43:55+28"|0E2A0E27...'
+        
+    Returns:
+        tuple | None: (เบอร์ผู้ส่งรูปแบบไทย, ข้อความ, วันเวลาจากโมเด็ม) หรือ None ถ้ารูปแบบไม่ตรง
+    """
+    if not combined_line or "|" not in combined_line:
+        return None
+    header, body = combined_line.split("|", 1)
+    m = _CMT_HEADER_RE.match(header.strip())
+    if not m:
+        return None
+    
+    sender_raw = m.group(1)         # เช่น "+6665..." หรือ UCS2 hex
+    try:
+        sender = decode_ucs2_phone_number(sender_raw) if sender_raw else "Unknown"
+    except Exception:
+        sender = sender_raw.replace("+66", "0") if sender_raw.startswith("+66") else sender_raw
+    return sender, decode_sms_body(body), m.group(2)
@@ -1,9 +1,26 @@
+import argparse
 import sys
-from PyQt5.QtWidgets import QApplication
-from windows.sim_info_window import SimInfoWindow
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="SimBox")
+    parser.add_argument("--headless", action="store_true",
+                        help="รันแบบ daemon ไม่มีหน้าต่าง (serial / SMS / log / recovery / ตารางส่ง)")
+    parser.add_argument("--config", default="headless.json", help="ไฟล์ตั้งค่าของโหมด --headless")
+    return parser.parse_known_args(argv)
+
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    args, qt_args = parse_args(sys.argv[1:])
+    if args.headless:
+        # ไม่ import QtWidgets / windows เลย → ใช้หน่วยความจำน้อย รันบนเครื่องไม่มีจอได้
+        from services.headless import run
+        sys.exit(run(args.config))
+
+    from PyQt5.QtWidgets import QApplication
+    from windows.sim_info_window import SimInfoWindow
+
+    app = QApplication([sys.argv[0]] + qt_args)
     window = SimInfoWindow()
     window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    sys.exit(app.exec_())
@@ -272,6 +272,10 @@ class SMSManager:
     def __init__(self, parent=None):
         self.parent = parent
     
+    def _modem_port(self):
+        """พอร์ตของ serial thread หน้าหลัก → log ผูกกับซิมในพอร์ตนั้น"""
+        return getattr(getattr(self.parent, 'serial_thread', None), 'port', None)
+    
     def prepare_sms_sending(self, phone_number, message):
         """เตรียมการส่ง SMS"""
         if not getattr(self.parent, 'serial_thread', None):
@@ -298,7 +302,7 @@ class SMSManager:
             # DEMO: ไม่ส่งจริง แต่บันทึกลง DB เหมือนส่งสำเร็จ
             if DEMO_MODE:
                 from services.sms_log import log_sms_sent  # import ตรงนี้กัน circular import
-                log_sms_sent(phone_number, message, "ส่งสำเร็จ (DEMO)")
+                log_sms_sent(phone_number, message, "ส่งสำเร็จ (DEMO)", port=self._modem_port())
                 if hasattr(self.parent, 'update_at_result_display'):
                     self.parent.update_at_result_display("[DEMO] ไม่ได้ส่งจริง แต่บันทึก DB แล้ว")
                 if hasattr(self.parent, 'loading_widget'):
@@ -352,7 +356,7 @@ class SMSManager:
 
             # บันทึก log ที่ล้มเหลว
             from services.sms_log import log_sms_sent
-            log_sms_sent(phone_number, message, status=f"ล้มเหลว: {e}")
+            log_sms_sent(phone_number, message, status=f"ล้มเหลว: {e}", port=self._modem_port())
 
             if hasattr(self.parent, 'loading_widget'):
                 self.parent.loading_widget.complete_sending_error(str(e))
@@ -388,4 +392,4 @@ class SMSManager:
             QTimer.singleShot(100, lambda: self.parent.loading_widget.complete_sending_error("ไม่มีซิมในระบบ"))
         
         from services.sms_log import log_sms_sent
-        log_sms_sent(phone_number, message, status="ล้มเหลว: ไม่มีซิมในระบบ")
\ No newline at end of file
+        log_sms_sent(phone_number, message, status="ล้มเหลว: ไม่มีซิมในระบบ", port=self._modem_port())
\ No newline at end of file
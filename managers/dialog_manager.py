@@ -79,6 +79,76 @@ class DialogManager:
         except Exception as e:
             self.show_error_message("SMS Log Error", f"Failed to open SMS log dialog: {e}")
 
+    def show_sms_log_for_phone(self, phone):
+        """เปิดหน้าต่างสนทนาของเบอร์นี้ (รายการ conversation + ประวัติแบบ thread)"""
+        try:
+            from widgets.sms_thread_dialog import SmsThreadDialog
+            dlg = SmsThreadDialog(phone=phone, parent=self.parent)
+
+            if hasattr(self.parent, 'prefill_sms_to_send'):
+                dlg.send_sms_requested.connect(self.parent.prefill_sms_to_send)
+
+            dlg.setModal(False)
+            dlg.setWindowFlags(Qt.Window | Qt.WindowMinimizeButtonHint |
+                            Qt.WindowMaximizeButtonHint | Qt.WindowCloseButtonHint)
+            dlg.show()
+
+            self.open_dialogs.append(dlg)
+            dlg.finished.connect(lambda *_: self.cleanup_dialog(dlg))
+
+        except Exception as e:
+            self.show_error_message("SMS Log Error", f"Failed to open SMS conversation: {e}")
+
+    def show_traffic_dashboard(self):
+        """เปิดแดชบอร์ดสถิติการส่ง/รับ SMS"""
+        try:
+            from widgets.traffic_dashboard import TrafficDashboardDialog
+            dlg = TrafficDashboardDialog(parent=self.parent)
+            dlg.setModal(False)
+            dlg.setWindowFlags(Qt.Window | Qt.WindowMinimizeButtonHint |
+                            Qt.WindowMaximizeButtonHint | Qt.WindowCloseButtonHint)
+            dlg.show()
+
+            self.open_dialogs.append(dlg)
+            dlg.finished.connect(lambda *_: self.cleanup_dialog(dlg))
+
+        except Exception as e:
+            self.show_error_message("Analytics Error", f"Failed to open SMS analytics: {e}")
+
+    def show_metrics_panel(self):
+        """เปิด debug panel ของ metrics (latency / คิว / ปริมาณ)"""
+        try:
+            from widgets.metrics_panel import MetricsPanelDialog
+            dlg = MetricsPanelDialog(settings_manager=getattr(self.parent, 'settings_manager', None),
+                                     parent=self.parent)
+            dlg.setModal(False)
+            dlg.setWindowFlags(Qt.Window | Qt.WindowMinimizeButtonHint |
+                            Qt.WindowMaximizeButtonHint | Qt.WindowCloseButtonHint)
+            dlg.show()
+
+            self.open_dialogs.append(dlg)
+            dlg.finished.connect(lambda *_: self.cleanup_dialog(dlg))
+
+        except Exception as e:
+            self.show_error_message("Metrics Error", f"Failed to open metrics panel: {e}")
+
+    def show_modem_dashboard(self, serial_thread=None, baudrate=115200):
+        """เปิดแดชบอร์ดสัญญาณทุกโมเด็ม (พอร์ตของหน้าหลักวัดผ่าน serial_thread เดิม)"""
+        try:
+            from widgets.modem_dashboard import ModemDashboardDialog
+            dlg = ModemDashboardDialog(serial_thread=serial_thread, baudrate=baudrate, parent=self.parent)
+            dlg.setModal(False)
+            dlg.setWindowFlags(Qt.Window | Qt.WindowMinimizeButtonHint |
+                            Qt.WindowMaximizeButtonHint | Qt.WindowCloseButtonHint)
+            dlg.show()
+
+            self.open_dialogs.append(dlg)
+            dlg.finished.connect(lambda *_: self.cleanup_dialog(dlg))
+            return dlg
+
+        except Exception as e:
+            self.show_error_message("Dashboard Error", f"Failed to open modem dashboard: {e}")
+
     def show_sms_realtime_monitor(self, port, baudrate, serial_thread=None):
         """เปิดหน้าต่าง SMS Real-time Monitor
         
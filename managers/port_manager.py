@@ -6,7 +6,8 @@
 import serial
 import time
 from core.utility_functions import list_serial_ports
-from services.sim_model import load_sim_data
+from services.sim_model import load_sim_data, PortQueries
+from services.signal_urc import creg_registered
 from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer
 from services.serial_service import SerialMonitorThread
 from PyQt5.QtWidgets import QMessageBox
@@ -61,23 +62,22 @@ class PortManager:
 
         if port_ok:
             try:
-                # หยุด serial thread เดิมถ้ามี
-                if hasattr(self.parent, 'serial_thread') and self.parent.serial_thread and self.parent.serial_thread.isRunning():
+                # serial thread ถือพอร์ตนี้อยู่แล้ว → อ่านผ่านการเชื่อมต่อนั้น (ไม่ต้องหยุด monitor)
+                live_thread = self.live_serial_thread(port)
+                
+                # หยุด serial thread เดิมถ้าเป็นพอร์ตอื่น
+                if live_thread is None and hasattr(self.parent, 'serial_thread') and self.parent.serial_thread and self.parent.serial_thread.isRunning():
                     self.parent.serial_thread.stop()
                     self.parent.serial_thread.wait()
                     if hasattr(self.parent, 'update_at_result_display'):
                         self.parent.update_at_result_display("[REFRESH] Stopped previous serial connection")
 
-                # โหลดข้อมูล SIM ใหม่
+                # โหลดข้อมูล SIM ใหม่ (ทุกค่ารวมสัญญาณใน session เดียว)
                 if hasattr(self.parent, 'update_at_result_display'):
-                    self.parent.update_at_result_display("[REFRESH] Loading SIM information...")
+                    via = "live connection" if live_thread else "direct port"
+                    self.parent.update_at_result_display(f"[REFRESH] Loading SIM information ({via})...")
                 
-                sims = load_sim_data(port, baudrate)
-
-                # อัพเดท signal strength
-                for sim in sims:
-                    sig = self.query_signal_strength(port, baudrate)
-                    sim.signal = sig
+                sims = load_sim_data(port, baudrate, live_thread)
 
                 # แสดงผลลัพธ์
                 if sims and sims[0].imsi != "-":
@@ -103,38 +103,34 @@ class PortManager:
                 self.parent.update_at_result_display("[REFRESH] ❌ No valid port selected")
             return []
     
+    def live_serial_thread(self, port):
+        """serial thread ของหน้าหลักที่กำลังเปิดพอร์ตนี้อยู่ หรือ None"""
+        thread = getattr(self.parent, 'serial_thread', None)
+        if thread is not None and thread.isRunning() and getattr(thread, 'port', None) == port:
+            return thread
+        return None
+    
     def query_signal_strength(self, port, baudrate):
         """ส่ง AT+CSQ แล้วคืนค่าเป็นข้อความพร้อม Unicode Signal Bars"""
         try:
-            ser = serial.Serial(port, baudrate, timeout=3)
-            time.sleep(0.1)
-            
-            # ตรวจสอบสถานะ SIM ก่อนอ่านสัญญาณ
-            ser.write(b'AT+CPIN?\r\n')
-            time.sleep(0.3)
-            cpin_response = ser.read(200).decode(errors='ignore')
-            
-            # ถ้า SIM ไม่พร้อมให้คืนค่า No Signal
-            if "CPIN: READY" not in cpin_response:
-                ser.close()
-                return '▁▁▁▁ No SIM'
-            
-            # ตรวจสอบการลงทะเบียน Network
-            ser.write(b'AT+CREG?\r\n')
-            time.sleep(0.3)
-            creg_response = ser.read(200).decode(errors='ignore')
-            
-            # ถ้าไม่ได้ลงทะเบียนเครือข่าย
-            if "+CREG: 0,1" not in creg_response and "+CREG: 0,5" not in creg_response:
-                ser.close()
-                return '▁▁▁▁ No Network'
-            
-            # อ่านค่าสัญญาณ
-            ser.write(b'AT+CSQ\r\n')
-            time.sleep(0.2)
-            
-            raw = ser.read(200).decode(errors='ignore')
-            ser.close()
+            # คำถามที่เพิ่งถามจากที่อื่น (load_sim_data / หน้าต่างสัญญาณ) ตอบจาก query cache
+            with PortQueries(port, baudrate) as q:
+                # ตรวจสอบสถานะ SIM ก่อนอ่านสัญญาณ
+                cpin_response = q.ask("AT+CPIN?")
+                
+                # ถ้า SIM ไม่พร้อมให้คืนค่า No Signal
+                if "CPIN: READY" not in cpin_response:
+                    return '▁▁▁▁ No SIM'
+                
+                # ตรวจสอบการลงทะเบียน Network
+                creg_response = q.ask("AT+CREG?")
+                
+                # ถ้าไม่ได้ลงทะเบียนเครือข่าย
+                if not creg_registered(creg_response):
+                    return '▁▁▁▁ No Network'
+                
+                # อ่านค่าสัญญาณ
+                raw = q.ask("AT+CSQ")
             
             import re
             m = re.search(r'\+CSQ:\s*(\d+),', raw)
@@ -2,10 +2,10 @@
 # 🧠 Smart Command Manager สำหรับจัดการ AT Commands อย่างชาญฉลาด + กรองข้อมูล Signal Quality
 
 import time
-import queue
 from enum import Enum
-from PyQt5.QtCore import QTimer
-from collections import deque
+
+from services.command_scheduler import CommandScheduler
+from services.response_classifier import SIGNAL_ROUTE_PREFIXES, classify
 
 class CommandPriority(Enum):
     """🔧 ระดับความสำคัญของคำสั่ง"""
@@ -28,20 +28,28 @@ class SmartCommandManager:
     🧠 จัดการคำสั่ง AT อย่างชาญฉลาด
     ✅ ใช้ Response ในหน้าหลักได้ปกติ
     ✅ ส่ง AT command ได้ปกติ
-    ✅ ไม่ชนกันระหว่าง modules
+    ✅ ไม่ชนกันระหว่าง modules — ทุกคำสั่งผ่าน CommandScheduler (heapq + aging) ส่งทีละคำสั่ง
     ✅ ซ่อนข้อมูล Signal Quality จาก Response area
+    ใช้ scheduler ตัวเดียวกับ SerialMonitorThread (ถ้ามี) → คิวเดียวต่อโมเด็มกับ send_command ทุกทาง
     """
     
+    USER_DISPLAY_HOLD = 2.0  # วินาทีหลังคำสั่งผู้ใช้เสร็จที่ยังแสดงทุก response
+    
     def __init__(self, serial_thread):
         self.serial_thread = serial_thread
-        self.command_queue = deque()
-        self.is_processing = False
+        # serial thread มีคิวของตัวเองแล้ว → ใช้ตัวเดียวกัน (ไม่ห่อซ้ำ); ไม่มีก็สร้างเองแล้วเขียนผ่าน send_command เดิม
+        # (คิวที่สร้างเอง: AT+CSQ / AT+CREG? ... ที่ซ้ำกันรวมกับคำถามจากส่วนอื่นของพอร์ตเดียวกันผ่าน query_cache)
+        shared = getattr(serial_thread, 'scheduler', None)
+        self._owns_scheduler = shared is None
+        self.scheduler = shared if shared is not None else CommandScheduler(
+            self._transmit, port=getattr(serial_thread, 'port', '') or '',
+            send_raw=getattr(serial_thread, 'send_raw', None))
         self.last_command_time = 0
-        self.min_interval = 0.1  # วินาที
         
         # 🔧 ติดตาม module ที่ใช้งาน
         self.active_modules = set()
-        self.user_command_active = False
+        self._user_active_until = 0.0
+        self._user_pending = 0
         self.signal_quality_active = False
         self.sms_sending_active = False
         
@@ -56,16 +64,7 @@ class SmartCommandManager:
             'AT+CIMI', 'AT+CCID', 'AT+CNUM', 'AT+QCSQ',
             'AT+QENG', 'AT+QNWINFO'
         }
-        self.signal_quality_responses = {
-            '+CSQ:', '+CESQ:', '+COPS:', '+CREG:', 
-            '+CIMI:', '+CCID:', '+CNUM:', '+QCSQ:',
-            '+QENG:', '+QNWINFO:'
-        }
-        
-        # Timer สำหรับประมวลผล queue
-        self.process_timer = QTimer()
-        self.process_timer.timeout.connect(self._process_queue)
-        self.process_timer.start(50)  # ทุก 50ms
+        self.signal_quality_responses = SIGNAL_ROUTE_PREFIXES   # ตารางรวมใน response_classifier
         
         # Hook เข้า serial thread เดิม
         self._hook_serial_thread()
@@ -80,10 +79,30 @@ class SmartCommandManager:
             # แทนที่ด้วย smart version
             self.serial_thread.send_command_smart = self.smart_send_command
             
+            # ทุกบรรทัดที่อ่านได้ → scheduler (รู้ว่าคำสั่งที่ส่งอยู่จบเมื่อไร → ปล่อยคำสั่งถัดไป)
+            # scheduler ของ serial thread เองได้บรรทัดจาก process_received_line อยู่แล้ว
+            if self._owns_scheduler and hasattr(self.serial_thread, 'add_line_listener'):
+                self.serial_thread.add_line_listener(self.scheduler.feed_line)
+            
             # เชื่อมต่อ response processing
             if hasattr(self.serial_thread, 'at_response_signal'):
                 self.serial_thread.at_response_signal.connect(self.smart_process_response)
     
+    def shutdown(self):
+        """🛑 ทิ้งคิวและถอด listener ออกจาก serial thread (คิวที่ใช้ร่วมกับ serial thread → ทิ้งเฉพาะคำสั่งของ manager นี้)"""
+        if not self._owns_scheduler:
+            for source in CommandSource:
+                self.scheduler.clear(source.value)
+            return
+        self.scheduler.clear()
+        if self.serial_thread and hasattr(self.serial_thread, 'remove_line_listener'):
+            self.serial_thread.remove_line_listener(self.scheduler.feed_line)
+    
+    @property
+    def user_command_active(self) -> bool:
+        """มีคำสั่งผู้ใช้รอ/กำลังส่ง หรือเพิ่งเสร็จไม่เกิน USER_DISPLAY_HOLD วินาที"""
+        return self._user_pending > 0 or time.time() < self._user_active_until
+    
     def register_module(self, module_name: str):
         """📝 ลงทะเบียน module ที่ใช้งาน"""
         self.active_modules.add(module_name)
@@ -103,30 +122,42 @@ class SmartCommandManager:
             self.sms_sending_active = False
     
     def smart_send_command(self, command: str, source: CommandSource = CommandSource.USER_MAIN, 
-                          priority: CommandPriority = CommandPriority.CRITICAL, silent: bool = False):
+                          priority: CommandPriority = CommandPriority.CRITICAL, silent: bool = False,
+                          on_done=None, payload: bytes = None):
         """
-        🧠 ส่งคำสั่ง AT อย่างชาญฉลาด
+        🧠 ส่งคำสั่ง AT อย่างชาญฉลาด — เข้าคิวเสมอ (ไม่มีทางลัด) แล้วส่งทีละคำสั่ง
         
         Args:
             command: คำสั่ง AT
             source: แหล่งที่มาของคำสั่ง  
-            priority: ระดับความสำคัญ
+            priority: ระดับความสำคัญ (ต่ำกว่า = ก่อน; คำสั่งที่รอนานจะค่อย ๆ ขยับขึ้นเอง)
             silent: ไม่แสดง [SENT] และบาง response ใน UI
+            on_done: callback(ScheduledCommand) เมื่อได้คำตอบครบ / หมดเวลา (เรียกจาก serial thread)
+            payload: ข้อมูลที่เขียนต่อหลัง prompt '>' (AT+CMGS)
+        
+        Returns:
+            True ถ้าเข้าคิวได้
         """
+        if not self.serial_thread:
+            return False
         
         # 🆕 ตรวจสอบว่าเป็น Signal Quality command หรือไม่
         if self._is_signal_quality_command(command):
             source = CommandSource.SIGNAL_QUALITY
             priority = CommandPriority.LOW
             silent = True
-            self.signal_quality_commands.add(command.upper().strip())
         
-        # 🔧 ตรวจสอบว่าควรส่งทันทีหรือใส่ queue
-        if self._should_send_immediately(source, priority):
-            return self._execute_command_now(command, source, silent)
-        else:
-            self._add_to_queue(command, source, priority, silent)
-            return True
+        if source == CommandSource.USER_MAIN:
+            self._user_pending += 1
+        
+        def finished(item):
+            self._on_command_done(item)
+            if on_done:
+                on_done(item)
+        
+        self._track(command, source, silent)
+        self.scheduler.submit(command, source.value, priority.value, silent, on_done=finished, payload=payload)
+        return True
     
     def _is_signal_quality_command(self, command: str) -> bool:
         """🔍 ตรวจสอบว่าเป็นคำสั่งจาก Signal Quality Checker หรือไม่"""
@@ -139,109 +170,33 @@ class SmartCommandManager:
         
         return False
     
-    def _should_send_immediately(self, source: CommandSource, priority: CommandPriority) -> bool:
-        """🤔 ตัดสินใจว่าควรส่งทันทีหรือไม่"""
-        
-        current_time = time.time()
-        
-        # ✅ User commands จากหน้าหลักส่งทันที
-        if source == CommandSource.USER_MAIN:
-            self.user_command_active = True
-            return True
-        
-        # ✅ SMS sending มี priority สูง
-        if source == CommandSource.SMS_SEND and priority <= CommandPriority.HIGH:
-            return True
-        
-        # ✅ Signal Quality commands ส่งได้เสมอแต่เป็น background
+    def _track(self, command: str, source: CommandSource, silent: bool):
+        """📝 จำคำสั่งที่ต้องซ่อน response จาก UI หลัก"""
+        key = command.upper().strip()
         if source == CommandSource.SIGNAL_QUALITY:
-            return True
-        
-        # ✅ ถ้าไม่มีคำสั่งในคิว และผ่านเวลาขั้นต่ำแล้ว
-        if (len(self.command_queue) == 0 and 
-            current_time - self.last_command_time >= self.min_interval):
-            return True
-        
-        # ✅ ถ้าไม่มี user command กำลังรอ และเป็นคำสั่งสำคัญ
-        if not self.user_command_active and priority <= CommandPriority.MEDIUM:
-            return True
-        
-        return False
+            self.signal_quality_commands.add(key)
+        if silent:
+            self.silent_commands.add(key)
     
-    def _execute_command_now(self, command: str, source: CommandSource, silent: bool) -> bool:
-        """⚡ ส่งคำสั่งทันที"""
+    def _transmit(self, command: str) -> bool:
+        """⚡ scheduler ของ manager เอง (serial thread ไม่มีคิว) เรียกเมื่อถึงคิว → เขียนผ่าน method เดิม"""
         try:
-            # 🔧 จัดการ silent mode
-            if silent or source == CommandSource.SIGNAL_QUALITY:
-                self.silent_commands.add(command.upper().strip())
-            
-            # ✅ ส่งคำสั่งผ่าน method เดิม
             success = self.original_send_command(command)
-            
             if success:
                 self.last_command_time = time.time()
-                
-                # รีเซ็ต user command flag หลังส่งเสร็จ
-                if source == CommandSource.USER_MAIN:
-                    QTimer.singleShot(2000, self._reset_user_command_flag)
-            
             return success
             
         except Exception as e:
             print(f"Error executing command: {e}")
             return False
     
-    def _add_to_queue(self, command: str, source: CommandSource, priority: CommandPriority, silent: bool):
-        """📥 เพิ่มคำสั่งเข้า queue"""
-        command_info = {
-            'command': command,
-            'source': source,
-            'priority': priority,
-            'silent': silent,
-            'timestamp': time.time()
-        }
-        
-        # เรียงตามความสำคัญ
-        inserted = False
-        for i, existing in enumerate(self.command_queue):
-            if priority.value < existing['priority'].value:
-                self.command_queue.insert(i, command_info)
-                inserted = True
-                break
-        
-        if not inserted:
-            self.command_queue.append(command_info)
-    
-    def _process_queue(self):
-        """⚙️ ประมวลผล command queue"""
-        if not self.command_queue or self.is_processing:
-            return
-        
-        current_time = time.time()
-        
-        # ตรวจสอบว่าพร้อมส่งคำสั่งหรือไม่
-        if current_time - self.last_command_time < self.min_interval:
-            return
-        
-        # ดึงคำสั่งที่มีความสำคัญสูงสุด
-        command_info = self.command_queue.popleft()
-        
-        # ตรวจสอบอีกครั้งว่าควรส่งหรือไม่
-        if self._should_send_immediately(command_info['source'], command_info['priority']):
-            self.is_processing = True
-            success = self._execute_command_now(
-                command_info['command'], 
-                command_info['source'], 
-                command_info['silent']
-            )
-            self.is_processing = False
-            
-            if not success:
-                # ถ้าส่งไม่สำเร็จ ใส่กลับเข้าคิว
-                self.command_queue.appendleft(command_info)
-        else:
-            # ใส่กลับเข้าคิว
-            self.command_queue.appendleft(command_info)
+    def _on_command_done(self, item):
+        """✅ คำสั่งได้คำตอบครบ / หมดเวลา"""
+        if item.source == CommandSource.USER_MAIN.value:
+            self._user_pending = max(0, self._user_pending - 1)
+            self._user_active_until = time.time() + self.USER_DISPLAY_HOLD
+        if item.timed_out:
+            print(f"[SCHEDULER] Timeout: {item.command} ({item.timeout:.0f}s)")
     
     def smart_process_response(self, line: str):
         """🔍 ประมวลผลข้อมูลที่ได้รับอย่างชาญฉลาด - กรอง Signal Quality responses"""
@@ -262,15 +217,12 @@ class SmartCommandManager:
     
     def _is_signal_quality_response(self, line: str) -> bool:
         """🔍 ตรวจสอบว่าเป็น response จาก Signal Quality หรือไม่"""
-        line_upper = line.strip().upper()
-        
-        # ตรวจสอบ response patterns
-        for pattern in self.signal_quality_responses:
-            if line_upper.startswith(pattern):
-                return True
+        tag = classify(line)
+        if tag.signal_route:
+            return True
         
         # ตรวจสอบ OK/ERROR หลัง Signal Quality commands
-        if line_upper in ['OK', 'ERROR'] and self.signal_quality_commands:
+        if tag.is_ok_or_error and self.signal_quality_commands:
             # ล้าง signal quality commands เมื่อได้ OK/ERROR
             self.signal_quality_commands.clear()
             return True
@@ -292,18 +244,13 @@ class SmartCommandManager:
         if self.user_command_active:
             return False
         
-        # ตรวจสอบ pattern จาก background commands (ไม่ใช่ Signal Quality)
-        silent_patterns = [
-            r'\+COPS:\s*\d+,\d+,"[^"]*"', # Operator selection (non-Signal Quality)
-        ]
-        
-        import re
-        for pattern in silent_patterns:
-            if re.search(pattern, line):
-                return True
+        # Operator selection จาก background commands (ไม่ใช่ Signal Quality)
+        tag = classify(line)
+        if tag.cops_selected:
+            return True
         
         # ตรวจสอบ OK/ERROR หลัง silent commands (ไม่ใช่ Signal Quality)
-        if line.strip().upper() in ['OK', 'ERROR'] and self.silent_commands and not self.signal_quality_commands:
+        if tag.is_ok_or_error and self.silent_commands and not self.signal_quality_commands:
             self.silent_commands.clear()
             return True
         
@@ -329,10 +276,6 @@ class SmartCommandManager:
             except Exception as e:
                 print(f"Error notifying Signal Quality: {e}")
     
-    def _reset_user_command_flag(self):
-        """🔄 รีเซ็ต user command flag"""
-        self.user_command_active = False
-    
     def register_signal_quality_window(self, window):
         """📶 ลงทะเบียน Signal Quality Window"""
         self.signal_quality_window = window
@@ -347,10 +290,13 @@ class SmartCommandManager:
         """📊 ดูสถานะปัจจุบัน"""
         return {
             'active_modules': list(self.active_modules),
-            'queue_size': len(self.command_queue),
+            'queue_size': len(self.scheduler),
+            'in_flight': self.scheduler.in_flight.command if self.scheduler.in_flight else None,
             'user_command_active': self.user_command_active,
             'signal_quality_active': self.signal_quality_active,
             'sms_sending_active': self.sms_sending_active,
             'signal_quality_commands': len(self.signal_quality_commands),
-            'last_command_time': self.last_command_time
+            'last_command_time': self.last_command_time,
+            'latency': self.scheduler.latency_stats(),
+            'coalesced': self.scheduler.coalesced
         }
\ No newline at end of file
@@ -11,7 +11,8 @@ import re
 from datetime import datetime
 from PyQt5.QtWidgets import QMessageBox
 from PyQt5.QtCore import QTimer
-from core.utility_functions import decode_ucs2_to_text, encode_text_to_ucs2, get_timestamp_formatted
+from core.utility_functions import (decode_ucs2_to_text, encode_text_to_ucs2, get_timestamp_formatted,
+                                    decode_sms_body, parse_cmt_sms)
 from services.sms_log import list_logs
 from services.utility_functions import dedupe_event
 
@@ -180,11 +181,15 @@ class SMSHandler:
         if hasattr(self.parent, 'update_at_command_display'):
             self.parent.update_at_command_display(command)
     
+    def _modem_port(self):
+        """พอร์ตของ serial thread หน้าหลัก → log ผูกกับซิมในพอร์ตนั้น"""
+        return getattr(getattr(self.parent, 'serial_thread', None), 'port', None)
+
     def _save_sms_success_log(self, phone_number, message):
         """บันทึก SMS ที่ส่งสำเร็จ"""
         try:
             from services.sms_log import log_sms_sent
-            log_sms_sent(phone_number, message, "ส่งสำเร็จ")
+            log_sms_sent(phone_number, message, "ส่งสำเร็จ", port=self._modem_port())
             
             if hasattr(self.parent, 'update_at_result_display'):
                 self.parent.update_at_result_display("[Log Saved] ✅ SMS sent recorded successfully.")
@@ -259,7 +264,7 @@ class SMSHandler:
         try:
             from services.sms_log import log_sms_sent
             status = f"ส่งไม่สำเร็จ: {error_msg}"
-            log_sms_sent(phone_number, message, status)
+            log_sms_sent(phone_number, message, status, port=self._modem_port())
             
             if hasattr(self.parent, 'update_at_result_display'):
                 self.parent.update_at_result_display("[Log Saved] ❌ SMS error recorded in log.")
@@ -312,26 +317,10 @@ class SMSHandler:
 
     def _process_cmt_2line_sms(self, combined_line):
         """ประมวลผล SMS รูปแบบ +CMT: header|body (แสดงผลแบบสั้นบรรทัดเดียว)"""
-        # แยก header และ body
-        header, body = combined_line.split("|", 1)
-
-        import re
-        m = re.match(r'\+CMT:\s*"([^"]*)","[^"]*","([^"]+)"', header)
-        if not m:
+        parsed = parse_cmt_sms(combined_line)
+        if not parsed:
             return
-
-        sender_raw = m.group(1)         # เช่น "+6665..."
-        datetime_str = m.group(2)       # เช่น "25/09/05,15:43:55+28"
-
-        # ทำเลขให้เป็น 0xxxx…
-        try:
-            from core.utility_functions import decode_ucs2_phone_number
-            sender = decode_ucs2_phone_number(sender_raw) if sender_raw else "Unknown"
-        except Exception:
-            sender = sender_raw.replace("+66", "0") if sender_raw.startswith("+66") else sender_raw
-
-        # ถอดรหัสตัวข้อความ (รองรับ UCS2 และข้อความปกติ)
-        message = self._decode_message_safely(body)
+        sender, message, datetime_str = parsed
 
         # กันซ้ำ
         key = (datetime_str, sender, message)
@@ -352,36 +341,8 @@ class SMSHandler:
         self._save_sms_to_inbox_log(sender, message, datetime_str)
 
     def _decode_message_safely(self, body: str) -> str:
-        """
-        รับ body ของบรรทัด CMT (มักเป็น UCS2 hex) แล้วพยายามถอดรหัสเป็นข้อความไทย/อังกฤษอย่างปลอดภัย
-        - รองรับทั้งกรณีเป็น hex UCS2 และกรณีเป็นข้อความ ASCII ปกติ
-        - ตัด \x00 ท้ายสตริงกรณีถอดจาก UCS2
-        """
-        try:
-            s = (body or "").strip().strip('"').replace(" ", "")
-            
-            # เดาว่าเป็น HEX ไหม (ตัวอักษร 0-9A-F ทั้งหมด และความยาวต้องเป็นเลขคู่)
-            import re as _re
-            is_hex = bool(_re.fullmatch(r'[0-9A-Fa-f]+', s)) and (len(s) % 2 == 0)
-
-            if is_hex:
-                # ลองใช้ utility function ที่ปรับปรุงแล้ว
-                try:
-                    from core.utility_functions import decode_ucs2_to_text
-                    text = decode_ucs2_to_text(s)
-                    return text.split("\x00", 1)[0]
-                except Exception:
-                    # เผื่อ utility ล้มเหลว ใช้วิธีมาตรฐาน (UTF-16BE)
-                    try:
-                        return bytes.fromhex(s).decode('utf-16-be', errors='ignore').split("\x00", 1)[0]
-                    except Exception:
-                        pass
-
-            # ไม่ใช่ hex → ถือเป็นข้อความปกติ
-            return s
-        except Exception:
-            # ถ้าเกิดปัญหา ให้คืนค่าดิบเพื่อไม่ให้หลุดการทำงาน
-            return body or ""
+        """ถอดรหัส body ของบรรทัด CMT (UCS2 hex หรือข้อความปกติ) — ดู core.utility_functions.decode_sms_body"""
+        return decode_sms_body(body)
         
     def test_sms_logging(self):
         """ทดสอบการบันทึก SMS log"""
@@ -487,7 +448,7 @@ class SMSHandler:
     def _save_sms_to_inbox_log(self, sender, message, datetime_str):
         try:
             from services.sms_log import log_sms_inbox
-            success = log_sms_inbox(sender, message, "รับเข้า (real-time)")
+            success = log_sms_inbox(sender, message, "รับเข้า (real-time)", port=self._modem_port())
             if success:
                 return True
             else:
@@ -501,7 +462,7 @@ class SMSHandler:
         """บันทึก SMS แบบ fallback → เขียน DB (ไม่ใช้ CSV)"""
         try:
             from services.sms_log import log_sms_inbox
-            log_sms_inbox(sender, message, "รับเข้า (fallback)")
+            log_sms_inbox(sender, message, "รับเข้า (fallback)", port=self._modem_port())
             return True
         except Exception as e:
             if hasattr(self.parent, 'update_at_result_display'):
@@ -0,0 +1,266 @@
+# services/analysis_scheduler.py
+"""
+ตัวจัดคิวงานวิเคราะห์ SIM แบบขนาน (ใช้กับ SIMAnalysisThread ใน windows/at_command_helper.py) — ไม่มี Qt
+- Stage          : งานย่อย 1 อย่าง (ชื่อ, ฟังก์ชัน, TTL ของผล, stage ที่ต้องเสร็จก่อน)
+- StageCache     : ผลของแต่ละ (พอร์ต, stage) พร้อมเวลา → รันซ้ำแล้วทำเฉพาะ stage ที่หมดอายุ
+- CancelToken    : ยกเลิกได้ละเอียด — stage ที่ยังไม่เริ่มถูกข้าม, stage ที่รอ (token.sleep) ออกทันที
+- AnalysisScheduler.run_port : stage ที่ไม่พึ่งกันรันพร้อมกัน (คำสั่ง AT ของพอร์ตเดียวกันสลับกันผ่าน
+                               lock ของ helper → เช่น ระหว่างที่ stability test รอ 2 วินาที stage อื่นได้ใช้สาย)
+- AnalysisScheduler.run_many : หลายพอร์ตใน worker pool
+"""
+from __future__ import annotations
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import threading
+import time
+
+MAX_PORT_WORKERS = 4        # พอร์ตที่วิเคราะห์พร้อมกัน
+MAX_STAGE_WORKERS = 3       # stage ที่รันพร้อมกันต่อพอร์ต
+
+STATE_CACHED = "cached"
+STATE_RUNNING = "running"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+STATE_SKIPPED = "skipped"   # ถูกยกเลิก / stage ที่ต้องใช้ล้มเหลว
+
+
+class AnalysisCancelled(Exception):
+    pass
+
+
+class CancelToken:
+    """ธงยกเลิกที่ส่งต่อให้ทุก stage (ใช้ sleep ของ token แทน time.sleep)"""
+
+    def __init__(self, parent: Optional["CancelToken"] = None):
+        self._event = threading.Event()
+        self._parent = parent
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set() or (self._parent is not None and self._parent.cancelled)
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    def check(self) -> None:
+        if self.cancelled:
+            raise AnalysisCancelled()
+
+    def sleep(self, seconds: float) -> bool:
+        """รอ seconds วินาที → False ถ้าถูกยกเลิกระหว่างรอ"""
+        deadline = time.monotonic() + seconds
+        while not self.cancelled:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                return True
+            self._event.wait(min(left, 0.1))
+        return False
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    run: Callable[[Any, Dict[str, Any], CancelToken], Any]   # (helper, ผลของ stage ก่อนหน้า, token) → ผล
+    ttl: float = 60.0                                         # วินาทีที่ผลยังใช้ได้ (0 = ไม่ cache)
+    depends: Tuple[str, ...] = ()
+    label: str = ""
+
+
+class StageCache:
+    """ผลของ (port, stage) + เวลาที่ได้ (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Dict[Tuple[str, str], Tuple[float, Any]] = {}
+
+    def get(self, port: str, stage: Stage, now: Optional[float] = None) -> Tuple[bool, Any, float]:
+        """(ยังใช้ได้ไหม, ผล, อายุวินาที)"""
+        now = time.time() if now is None else now
+        with self._lock:
+            hit = self._data.get((port, stage.name))
+        if hit is None or stage.ttl <= 0:
+            return False, None, 0.0
+        age = now - hit[0]
+        return age < stage.ttl, hit[1], age
+
+    def put(self, port: str, stage: str, result: Any) -> None:
+        with self._lock:
+            self._data[(port, stage)] = (time.time(), result)
+
+    def invalidate(self, port: Optional[str] = None, stage: Optional[str] = None) -> None:
+        with self._lock:
+            for key in list(self._data):
+                if (port is None or key[0] == port) and (stage is None or key[1] == stage):
+                    del self._data[key]
+
+
+_default_cache = StageCache()
+
+
+def default_cache() -> StageCache:
+    """cache ที่ใช้ร่วมกันทั้งโปรแกรม (เปิดหน้าต่างวิเคราะห์ใหม่ยังได้ผลเดิมที่ยังไม่หมดอายุ)"""
+    return _default_cache
+
+
+ProgressFn = Callable[[str, str, str, int, int], None]   # (port, stage, state, เสร็จแล้ว, ทั้งหมด)
+
+
+class AnalysisScheduler:
+
+    def __init__(self, stages: Sequence[Stage], cache: Optional[StageCache] = None,
+                 max_ports: int = MAX_PORT_WORKERS, max_stage_workers: int = MAX_STAGE_WORKERS):
+        self.stages = list(stages)
+        self._by_name = {s.name: s for s in self.stages}
+        self.cache = cache if cache is not None else default_cache()
+        self.max_ports = max_ports
+        self.max_stage_workers = max_stage_workers
+
+    def run_port(self, port: str, helper: Any, token: CancelToken, enabled: Optional[Iterable[str]] = None,
+                 progress: Optional[ProgressFn] = None, force: bool = False) -> Dict[str, Any]:
+        """
+        รันทุก stage ที่เปิดของพอร์ตนี้ → {stage: ผล} + '_stages': {stage: (state, อายุ/เวลาที่ใช้)}
+        stage ที่ผลใน cache ยังไม่หมดอายุไม่ถูกรันซ้ำ (force=True → รันใหม่ทั้งหมด)
+        """
+        wanted = [s for s in self.stages if enabled is None or s.name in set(enabled)]
+        results: Dict[str, Any] = {}
+        states: Dict[str, Tuple[str, float]] = {}
+        total = len(wanted)
+        lock = threading.Lock()
+
+        def report(stage: Stage, state: str, value: float = 0.0):
+            with lock:
+                states[stage.name] = (state, value)
+                done = sum(1 for st, _ in states.values() if st != STATE_RUNNING)
+            if progress:
+                try:
+                    progress(port, stage.name, state, done, total)
+                except Exception as e:
+                    print(f"Analysis progress error: {e}")
+
+        pending: List[Stage] = []
+        for stage in wanted:
+            fresh, value, age = (False, None, 0.0) if force else self.cache.get(port, stage)
+            if fresh:
+                results[stage.name] = value
+                report(stage, STATE_CACHED, age)
+            else:
+                pending.append(stage)
+
+        def execute(stage: Stage):
+            token.check()
+            started = time.monotonic()
+            report(stage, STATE_RUNNING)
+            with lock:
+                inputs = dict(results)
+            value = stage.run(helper, inputs, token)
+            token.check()      # ผลของ stage ที่ถูกยกเลิกกลางทางไม่ถูก cache
+            return value, time.monotonic() - started
+
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_stage_workers,
+                                thread_name_prefix=f"analysis-{port}") as pool:
+            while pending or running:
+                # stage ที่ dependency เสร็จ (หรือได้จาก cache) แล้ว → ส่งเข้า pool
+                for stage in list(pending):
+                    deps = [d for d in stage.depends if d in self._by_name and any(s.name == d for s in wanted)]
+                    if token.cancelled or any(states.get(d, ("",))[0] in (STATE_FAILED, STATE_SKIPPED) for d in deps):
+                        pending.remove(stage)
+                        report(stage, STATE_SKIPPED)
+                    elif all(d in results for d in deps):
+                        pending.remove(stage)
+                        running[pool.submit(execute, stage)] = stage
+                if not running:
+                    break
+                finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    stage = running.pop(fut)
+                    try:
+                        value, elapsed = fut.result()
+                    except AnalysisCancelled:
+                        report(stage, STATE_SKIPPED)
+                        continue
+                    except Exception as e:
+                        print(f"Analysis stage {stage.name} failed on {port}: {e}")
+                        results[stage.name] = {'error': str(e)}
+                        report(stage, STATE_FAILED)
+                        continue
+                    with lock:
+                        results[stage.name] = value
+                    if not (isinstance(value, dict) and 'error' in value):
+                        self.cache.put(port, stage.name, value)
+                    report(stage, STATE_DONE, elapsed)
+        results['_stages'] = states
+        return results
+
+    def run_many(self, ports: Sequence[str], open_helper: Callable[[str], Any],
+                 close_helper: Callable[[Any], None], token: CancelToken,
+                 enabled: Optional[Iterable[str]] = None, progress: Optional[ProgressFn] = None,
+                 on_port_done: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                 force: bool = False) -> Dict[str, Dict[str, Any]]:
+        """หลายพอร์ตพร้อมกัน (ไม่เกิน max_ports) — open_helper คืน None = เชื่อมต่อไม่ได้"""
+        out: Dict[str, Dict[str, Any]] = {}
+
+        def one(port: str):
+            if token.cancelled:
+                return port, {'error': 'cancelled'}
+            helper = open_helper(port)
+            if helper is None:
+                return port, {'error': f'Failed to connect to {port}'}
+            try:
+                return port, self.run_port(port, helper, CancelToken(token), enabled, progress, force)
+            finally:
+                close_helper(helper)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_ports, len(ports)))) as pool:
+            for fut in [pool.submit(one, p) for p in ports]:
+                port, result = fut.result()
+                out[port] = result
+                if on_port_done:
+                    on_port_done(port, result)
+        return out
+
+
+# ==================== ตรวจการทำงาน ====================
+def self_check() -> None:
+    """stage ขนาน / TTL cache / dependency / ยกเลิกกลางทาง (ใช้ stage จำลองที่รอด้วย token.sleep)"""
+    calls: List[str] = []
+
+    def slow(name, seconds):
+        def fn(helper, results, token):
+            calls.append(name)
+            token.sleep(seconds)
+            return {'value': name}
+        return fn
+
+    stages = [
+        Stage("a", slow("a", 0.3), ttl=60),
+        Stage("b", slow("b", 0.3), ttl=60),
+        Stage("c", slow("c", 0.3), ttl=0, depends=("a",)),
+    ]
+    sched = AnalysisScheduler(stages, cache=StageCache())
+    t = time.monotonic()
+    res = sched.run_port("P1", None, CancelToken())
+    elapsed = time.monotonic() - t
+    assert {k for k in res if k != '_stages'} == {"a", "b", "c"}
+    assert 0.55 < elapsed < 0.9, elapsed                     # a|b พร้อมกัน แล้ว c
+    calls.clear()
+    res = sched.run_port("P1", None, CancelToken())
+    assert calls == ["c"], calls                              # a, b มาจาก cache
+    assert res['_stages']["a"][0] == STATE_CACHED
+    token = CancelToken()
+    threading.Timer(0.1, token.cancel).start()
+    t = time.monotonic()
+    res = sched.run_port("P2", None, token)
+    assert time.monotonic() - t < 0.3
+    assert all(state == STATE_SKIPPED for state, _ in res['_stages'].values()), res['_stages']
+    assert sched.cache.get("P2", stages[0])[0] is False       # ผลที่ถูกยกเลิกไม่ถูก cache
+    t = time.monotonic()
+    many = sched.run_many([f"P{i}" for i in range(3, 7)], lambda p: object(), lambda h: None,
+                          CancelToken())
+    assert len(many) == 4 and time.monotonic() - t < 0.9      # 4 พอร์ตพร้อมกัน
+    print("self-check OK")
+
+
+if __name__ == "__main__":
+    self_check()
@@ -0,0 +1,200 @@
+# services/at_transport.py
+"""
+ส่งคำสั่ง AT แล้วอ่าน "จนกว่าจะเจอ final result code" (OK / ERROR / +CME ERROR ...) แทนการ sleep ตายตัว
+- read_until_final   : ใช้กับพอร์ตที่เปิดเอง (serial.Serial) — กลับทันทีที่คำตอบครบ, ไม่เกิน deadline
+- MonitorTransaction : ใช้พอร์ตที่ SerialMonitorThread เปิดค้างไว้อยู่แล้ว (transaction mode)
+                       → ไม่ต้องเปิดพอร์ตซ้ำ (เปิดซ้ำบน Windows ไม่ได้ / แย่งข้อมูลกัน)
+                       serial thread ที่มี scheduler (CommandScheduler) → เข้าคิวแล้วรับเฉพาะคำตอบของคำสั่งตัวเอง
+ไม่มี Qt ในโมดูลนี้ (serial thread เรียก listener จาก thread ของมันเอง)
+"""
+from __future__ import annotations
+from typing import List, Optional
+import re
+import threading
+import time
+
+from .metrics import AT_LATENCY, clock, command_name
+
+DEFAULT_TIMEOUT = 5.0
+QUEUE_GRACE = 10.0      # เวลารอคิวของ scheduler ที่บวกเพิ่มจาก timeout ของคำสั่ง
+
+# คำสั่งที่โมเด็มใช้เวลานานกว่าปกติ (prefix → วินาที)
+LONG_COMMANDS = {
+    "AT+COPS=?": 180.0,
+    "AT+CPING": 15.0,
+    "AT+QPING": 15.0,
+    "AT+CMGS": 60.0,
+    "AT+CFUN": 15.0,
+}
+
+_FINAL_RE = re.compile(
+    r'^(OK|ERROR|\+CME ERROR:.*|\+CMS ERROR:.*|NO CARRIER|BUSY|NO ANSWER|NO DIALTONE)$', re.I)
+
+
+def is_final_result(line: str) -> bool:
+    """บรรทัดนี้ปิดท้ายคำตอบของคำสั่งหรือยัง"""
+    return bool(_FINAL_RE.match((line or "").strip()))
+
+
+def command_timeout(command: str, default: float = DEFAULT_TIMEOUT) -> float:
+    up = (command or "").strip().upper()
+    for prefix, seconds in LONG_COMMANDS.items():
+        if up.startswith(prefix):
+            return max(default, seconds)
+    return default
+
+
+_thread_locks_guard = threading.Lock()
+
+
+def _thread_lock(serial_thread) -> threading.Lock:
+    """lock เดียวต่อ serial thread (เก็บไว้บน thread เอง) → ทุก MonitorTransaction ของพอร์ตเดียวกันต่อคิวกัน"""
+    if serial_thread is None:
+        return threading.Lock()
+    lock = getattr(serial_thread, "_transaction_lock", None)
+    if lock is None:
+        with _thread_locks_guard:
+            lock = getattr(serial_thread, "_transaction_lock", None)
+            if lock is None:
+                lock = threading.Lock()
+                serial_thread._transaction_lock = lock
+    return lock
+
+
+def read_until_final(ser, timeout: float = DEFAULT_TIMEOUT) -> str:
+    """
+    อ่านจาก serial.Serial จนเจอ final result code หรือครบ timeout → ข้อความทั้งหมดที่อ่านได้
+    (ser.timeout ควรสั้น เช่น 0.05 เพื่อให้ตรวจ deadline ได้ถี่)
+    """
+    deadline = time.monotonic() + timeout
+    text = ""
+    while time.monotonic() < deadline:
+        chunk = ser.read(ser.in_waiting or 1)
+        if not chunk:
+            continue
+        text += chunk.decode("utf-8", errors="ignore")
+        # ตรวจเฉพาะบรรทัดที่จบแล้ว (บรรทัดสุดท้ายอาจยังมาไม่ครบ)
+        lines = text.replace("\r", "\n").split("\n")
+        if any(is_final_result(l) for l in lines[:-1]):
+            break
+    return text
+
+
+class MonitorTransaction:
+    """
+    ส่งคำสั่งผ่าน SerialMonitorThread ที่ถือพอร์ตอยู่ แล้วเก็บทุกบรรทัดจนเจอ final result code
+    ทีละคำสั่งต่อ serial thread (lock ใช้ร่วมกันทุก instance ของ thread เดียวกัน)
+    — serial thread ต้องมี add_line_listener / remove_line_listener
+    """
+
+    def __init__(self, serial_thread, source: str = "SIGNAL_QUALITY"):
+        self.serial_thread = serial_thread
+        self.source = source
+        self._lock = _thread_lock(serial_thread)
+
+    @property
+    def available(self) -> bool:
+        t = self.serial_thread
+        return bool(t is not None and t.isRunning() and getattr(t, "serial_conn", None) is not None)
+
+    def send(self, command: str, timeout: Optional[float] = None) -> str:
+        """คำตอบทั้งหมด (คั่นด้วย \\n) หรือ 'ERROR: ...' ถ้าส่งไม่ได้ — หมดเวลาแล้วคืนเท่าที่ได้"""
+        if not self.available:
+            return "ERROR: Not connected"
+        timeout = command_timeout(command) if timeout is None else timeout
+        lines: List[str] = []
+        done = threading.Event()
+        started = clock()
+
+        def listener(line: str) -> None:
+            lines.append(line)
+            if is_final_result(line):
+                done.set()
+
+        with self._lock:
+            t = self.serial_thread
+            if getattr(t, "scheduler", None) is not None:
+                response = self._send_queued(t, command, timeout)
+                if started:
+                    AT_LATENCY.observe_since(started, "transaction", command_name(command))
+                return response
+            t.add_line_listener(listener)
+            try:
+                if hasattr(t, "set_command_source"):
+                    t.set_command_source(self.source)
+                if not t.send_command(command):
+                    return "ERROR: Failed to send command"
+                done.wait(timeout)
+            finally:
+                t.remove_line_listener(listener)
+        if started:
+            AT_LATENCY.observe_since(started, "transaction", command_name(command))
+        return "\n".join(lines)
+
+    def send_with_prompt(self, command: str, payload: bytes, prompt_timeout: float = 2.0,
+                         timeout: Optional[float] = None) -> str:
+        """
+        คำสั่งที่รอ '>' ก่อนส่งข้อมูลต่อ (AT+CMGS): ส่ง command → รอ '>' → เขียน payload → เก็บจนเจอ final
+        ไม่เห็น '>' ภายใน prompt_timeout ก็เขียน payload ต่อ (บางโมเด็มส่ง '> ' โดยไม่ขึ้นบรรทัดใหม่)
+        serial thread ที่มี scheduler → scheduler เขียน payload เองเมื่อเห็น '>'
+        """
+        if not self.available:
+            return "ERROR: Not connected"
+        timeout = command_timeout(command) if timeout is None else timeout
+        lines: List[str] = []
+        prompt = threading.Event()
+        done = threading.Event()
+
+        def listener(line: str) -> None:
+            lines.append(line)
+            if line.lstrip().startswith(">"):
+                prompt.set()
+            elif is_final_result(line):
+                prompt.set()
+                done.set()
+
+        with self._lock:
+            t = self.serial_thread
+            if getattr(t, "scheduler", None) is not None:
+                return self._send_queued(t, command, timeout, payload)
+            t.add_line_listener(listener)
+            try:
+                if hasattr(t, "set_command_source"):
+                    t.set_command_source(self.source)
+                if not t.send_command(command):
+                    return "ERROR: Failed to send command"
+                prompt.wait(prompt_timeout)
+                if done.is_set():           # ERROR แทน '>' (เช่น +CMS ERROR)
+                    return "\n".join(lines)
+                if not t.send_raw(payload):
+                    return "ERROR: Failed to send payload"
+                done.wait(timeout)
+            finally:
+                t.remove_line_listener(listener)
+        return "\n".join(lines)
+
+    def _send_queued(self, t, command: str, timeout: float, payload: Optional[bytes] = None) -> str:
+        """เข้าคิว scheduler ของ serial thread → คำตอบของคำสั่งนี้เท่านั้น (URC / คำสั่งอื่นไม่ปน)"""
+        finished = []
+        done = threading.Event()
+
+        def on_done(item) -> None:
+            finished.append(item)
+            done.set()
+
+        if hasattr(t, "set_command_source"):
+            t.set_command_source(self.source)
+        if not t.send_command(command, on_done=on_done, timeout=timeout, payload=payload):
+            return "ERROR: Failed to send command"
+        done.wait(timeout + QUEUE_GRACE)
+        return finished[0].response if finished else ""
+
+
+def transaction_for(serial_thread, port: str) -> Optional[MonitorTransaction]:
+    """MonitorTransaction ถ้า serial_thread กำลังถือพอร์ตนี้อยู่ ไม่งั้น None (ให้เปิดพอร์ตเอง)"""
+    if serial_thread is None or getattr(serial_thread, "port", None) != port:
+        return None
+    if not hasattr(serial_thread, "add_line_listener"):
+        return None
+    tx = MonitorTransaction(serial_thread)
+    return tx if tx.available else None
@@ -0,0 +1,249 @@
+# services/cell_info.py
+"""
+แปลงรายงานเซลล์จากโมเด็มเป็นโครงสร้างเดียวกัน (CellInfo)
+- Quectel AT+QENG="servingcell" / "neighbourcell"  (LTE, NR5G-SA, WCDMA, GSM)
+- Quectel AT+QNWINFO                                 (ชนิดเครือข่าย / band / channel)
+- SIMCom  AT+CENG?                                   (GSM serving + neighbour)
+ค่าที่ไม่มี/อ่านไม่ได้ = None  (ไม่ใช้ -999 เพื่อไม่ให้ปนกับค่าจริงตอนคำนวณ)
+"""
+from __future__ import annotations
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Iterable, List, Optional
+import re
+
+RAT_GSM = "GSM"
+RAT_WCDMA = "WCDMA"
+RAT_LTE = "LTE"
+RAT_NR = "NR5G"
+
+
+@dataclass
+class CellInfo:
+    rat: str = ""
+    serving: bool = False
+    state: str = ""                 # NOCONN / CONNECT / LIMSRV / SEARCH (เฉพาะ serving)
+    mcc: str = ""
+    mnc: str = ""
+    tac: str = ""                   # LTE/NR = TAC, GSM/WCDMA = LAC (hex)
+    cell_id: str = ""               # hex
+    earfcn: Optional[int] = None    # EARFCN / UARFCN / ARFCN ตาม RAT
+    pci: Optional[int] = None       # PCI (LTE/NR), PSC (WCDMA), BSIC (GSM)
+    band: str = ""
+    rsrp: Optional[int] = None      # LTE/NR (dBm); WCDMA = RSCP
+    rsrq: Optional[int] = None      # LTE/NR (dB);  WCDMA = Ec/No
+    sinr: Optional[float] = None    # dB
+    rssi: Optional[int] = None      # dBm (GSM = RxLev แปลงแล้ว)
+
+    @property
+    def key(self) -> str:
+        """คีย์ของเซลล์สำหรับ index ประวัติ: ใช้ MCC-MNC/TAC/CellID ถ้ามี ไม่งั้น ช่องความถี่/PCI"""
+        if self.cell_id:
+            return f"{self.rat}:{self.mcc}-{self.mnc}:{self.tac}:{self.cell_id}"
+        return f"{self.rat}:ch{self.earfcn if self.earfcn is not None else '?'}:pci{self.pci if self.pci is not None else '?'}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = asdict(self)
+        d["key"] = self.key
+        return d
+
+
+# ==================== helpers ====================
+def _fields(payload: str) -> List[str]:
+    """'a,"b",c' → ['a', 'b', 'c'] (ตัดช่องว่าง / เครื่องหมายคำพูด)"""
+    return [f.strip().strip('"').strip() for f in payload.split(",")]
+
+
+def _int(value: Any, missing: Iterable[str] = ("-", "")) -> Optional[int]:
+    s = str(value).strip()
+    if s in missing:
+        return None
+    try:
+        return int(s)
+    except ValueError:
+        try:
+            return int(float(s))
+        except ValueError:
+            return None
+
+
+def _hex(value: Any) -> str:
+    s = str(value or "").strip().upper()
+    return "" if s in ("-", "FFFF", "FFFFFFF", "FFFFFFFF") else s.lstrip("0") or ("0" if s else "")
+
+
+def _at(fields: List[str], i: int) -> str:
+    return fields[i] if i < len(fields) else ""
+
+
+def _qeng_sinr(raw: Any) -> Optional[float]:
+    """SINR ของ QENG LTE รายงานเป็น 0..250 (หน่วย 1/5 dB เริ่มที่ -20 dB); ค่าติดลบ = dB อยู่แล้ว"""
+    v = _int(raw)
+    if v is None or v == 255:
+        return None
+    if 0 <= v <= 250:
+        return round(v / 5.0 - 20.0, 1)
+    return float(v)
+
+
+def _rxlev_dbm(rxlev: Any) -> Optional[int]:
+    """GSM RxLev 0..63 → dBm"""
+    v = _int(rxlev)
+    return None if v is None or not 0 <= v <= 63 else v - 110
+
+
+# ==================== QENG ====================
+_QENG_RE = re.compile(r'^\+QENG:\s*(.*)$', re.I)
+
+
+def parse_qeng_line(line: str) -> Optional[CellInfo]:
+    m = _QENG_RE.match((line or "").strip())
+    if not m:
+        return None
+    f = _fields(m.group(1))
+    kind = f[0].lower()
+    if kind == "servingcell":
+        return _qeng_serving(f)
+    if kind.startswith("neighbourcell"):
+        return _qeng_neighbour(f)
+    if kind == "lte":
+        # EN-DC: บรรทัด "servingcell",<state> แล้วตามด้วย "LTE",<is_tdd>,... (field เดียวกับ serving LTE)
+        return _qeng_serving(["servingcell", ""] + f)
+    return None
+
+
+def _qeng_serving(f: List[str]) -> Optional[CellInfo]:
+    # "servingcell",<state>,<rat>,...  (SEARCH / LIMSRV อาจไม่มี field ต่อ)
+    state, rat = _at(f, 1), _at(f, 2).upper()
+    cell = CellInfo(serving=True, state=state)
+    if rat == RAT_LTE:
+        # "LTE",<is_tdd>,<mcc>,<mnc>,<cellid>,<pcid>,<earfcn>,<band>,<ul_bw>,<dl_bw>,<tac>,<rsrp>,<rsrq>,<rssi>,<sinr>,...
+        cell.rat = RAT_LTE
+        cell.mcc, cell.mnc = _at(f, 4), _at(f, 5)
+        cell.cell_id, cell.pci, cell.earfcn = _hex(_at(f, 6)), _int(_at(f, 7)), _int(_at(f, 8))
+        cell.band = _at(f, 9)
+        cell.tac = _hex(_at(f, 12))
+        cell.rsrp, cell.rsrq, cell.rssi = _int(_at(f, 13)), _int(_at(f, 14)), _int(_at(f, 15))
+        cell.sinr = _qeng_sinr(_at(f, 16))
+    elif rat.startswith(RAT_NR):
+        # "NR5G-SA",<duplex>,<mcc>,<mnc>,<cellid>,<pcid>,<tac>,<arfcn>,<band>,<dl_bw>,<rsrp>,<rsrq>,<sinr>,...
+        cell.rat = RAT_NR
+        cell.mcc, cell.mnc = _at(f, 4), _at(f, 5)
+        cell.cell_id, cell.pci, cell.tac = _hex(_at(f, 6)), _int(_at(f, 7)), _hex(_at(f, 8))
+        cell.earfcn, cell.band = _int(_at(f, 9)), _at(f, 10)
+        cell.rsrp, cell.rsrq = _int(_at(f, 12)), _int(_at(f, 13))
+        sinr = _int(_at(f, 14))
+        cell.sinr = float(sinr) if sinr is not None else None
+    elif rat == RAT_WCDMA:
+        # "WCDMA",<mcc>,<mnc>,<lac>,<cellid>,<uarfcn>,<psc>,<rac>,<rscp>,<ecio>,...
+        cell.rat = RAT_WCDMA
+        cell.mcc, cell.mnc = _at(f, 3), _at(f, 4)
+        cell.tac, cell.cell_id = _hex(_at(f, 5)), _hex(_at(f, 6))
+        cell.earfcn, cell.pci = _int(_at(f, 7)), _int(_at(f, 8))
+        cell.rsrp, cell.rsrq = _int(_at(f, 10)), _int(_at(f, 11))
+    elif rat == RAT_GSM:
+        # "GSM",<mcc>,<mnc>,<lac>,<cellid>,<bsic>,<arfcn>,<band>,<rxlev>,...
+        cell.rat = RAT_GSM
+        cell.mcc, cell.mnc = _at(f, 3), _at(f, 4)
+        cell.tac, cell.cell_id = _hex(_at(f, 5)), _hex(_at(f, 6))
+        cell.pci, cell.earfcn, cell.band = _int(_at(f, 7)), _int(_at(f, 8)), _at(f, 9)
+        cell.rssi = _rxlev_dbm(_at(f, 10))
+    elif not rat:
+        return cell if state else None
+    else:
+        cell.rat = rat
+    return cell
+
+
+def _qeng_neighbour(f: List[str]) -> Optional[CellInfo]:
+    rat = _at(f, 1).upper()
+    cell = CellInfo(rat=rat)
+    if rat == RAT_LTE:
+        # "neighbourcell intra|inter","LTE",<earfcn>,<pcid>,<rsrq>,<rsrp>,<rssi>,<sinr>,...
+        cell.earfcn, cell.pci = _int(_at(f, 2)), _int(_at(f, 3))
+        cell.rsrq, cell.rsrp, cell.rssi = _int(_at(f, 4)), _int(_at(f, 5)), _int(_at(f, 6))
+        cell.sinr = _qeng_sinr(_at(f, 7))
+    elif rat == RAT_WCDMA:
+        # "neighbourcell","WCDMA",<uarfcn>,<resel_prio>,<thresh_h>,<thresh_l>,<psc>,<rscp>,<ecno>,...
+        cell.earfcn, cell.pci = _int(_at(f, 2)), _int(_at(f, 6))
+        cell.rsrp, cell.rsrq = _int(_at(f, 7)), _int(_at(f, 8))
+    elif rat == RAT_GSM:
+        # "neighbourcell","GSM",<mcc>,<mnc>,<lac>,<cellid>,<bsic>,<arfcn>,<rxlev>,...
+        cell.mcc, cell.mnc = _at(f, 2), _at(f, 3)
+        cell.tac, cell.cell_id = _hex(_at(f, 4)), _hex(_at(f, 5))
+        cell.pci, cell.earfcn = _int(_at(f, 6)), _int(_at(f, 7))
+        cell.rssi = _rxlev_dbm(_at(f, 8))
+    else:
+        return None
+    return cell
+
+
+# ==================== QNWINFO ====================
+def parse_qnwinfo(line: str) -> Dict[str, Any]:
+    """+QNWINFO: "FDD LTE","52003","LTE BAND 3",1850 → {act, mcc, mnc, band, channel}"""
+    m = re.match(r'^\+QNWINFO:\s*(.*)$', (line or "").strip(), re.I)
+    if not m:
+        return {}
+    f = _fields(m.group(1))
+    oper = _at(f, 1)
+    return {
+        "act": _at(f, 0),
+        "mcc": oper[:3] if oper.isdigit() else "",
+        "mnc": oper[3:] if oper.isdigit() else "",
+        "band": _at(f, 2),
+        "channel": _int(_at(f, 3)),
+    }
+
+
+# ==================== SIMCom CENG ====================
+_CENG_RE = re.compile(r'^\+CENG:\s*(\d+)\s*,\s*"([^"]*)"', re.I)
+
+
+def parse_ceng_line(line: str) -> Optional[CellInfo]:
+    """
+    +CENG: 0,"<arfcn>,<rxl>,<rxq>,<mcc>,<mnc>,<bsic>,<cellid>,<rla>,<txp>,<lac>,<ta>"   (serving)
+    +CENG: n,"<arfcn>,<rxl>,<bsic>,<cellid>,<mcc>,<mnc>,<lac>"                          (neighbour)
+    """
+    m = _CENG_RE.match((line or "").strip())
+    if not m:
+        return None
+    idx, f = int(m.group(1)), _fields(m.group(2))
+    cell = CellInfo(rat=RAT_GSM, serving=idx == 0)
+    cell.earfcn, cell.rssi = _int(_at(f, 0)), _rxlev_dbm(_at(f, 1))
+    if cell.serving:
+        cell.mcc, cell.mnc = _at(f, 3), _at(f, 4)
+        cell.pci, cell.cell_id, cell.tac = _int(_at(f, 5)), _hex(_at(f, 6)), _hex(_at(f, 9))
+    else:
+        cell.pci, cell.cell_id = _int(_at(f, 2)), _hex(_at(f, 3))
+        cell.mcc, cell.mnc, cell.tac = _at(f, 4), _at(f, 5), _hex(_at(f, 6))
+    return cell
+
+
+# ==================== รวม ====================
+def parse_cell_report(lines: Iterable[str]) -> List[CellInfo]:
+    """ทุกบรรทัด +QENG / +CENG ใน response → [CellInfo] (serving ก่อน neighbour ตามลำดับที่ได้)"""
+    cells: List[CellInfo] = []
+    state = ""
+    for line in lines:
+        s = (line or "").strip()
+        up = s.upper()
+        cell = None
+        if up.startswith("+QENG:"):
+            cell = parse_qeng_line(s)
+        elif up.startswith("+CENG:"):
+            cell = parse_ceng_line(s)
+        if cell is None:
+            continue
+        if cell.serving and not cell.rat:
+            state = cell.state          # "servingcell",<state> บรรทัดเดี่ยว (EN-DC)
+            continue
+        if cell.serving and not cell.state:
+            cell.state = state
+        cells.append(cell)
+    return cells
+
+
+def serving_cell(cells: Iterable[CellInfo]) -> Optional[CellInfo]:
+    for c in cells:
+        if c.serving and (c.cell_id or c.pci is not None):
+            return c
+    return None
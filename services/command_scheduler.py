@@ -0,0 +1,470 @@
+# services/command_scheduler.py
+"""
+คิวคำสั่ง AT ต่อโมเด็ม — ไม่มี Qt
+- SerialMonitorThread (services/serial_service.py) มี scheduler ของตัวเอง 1 ตัวต่อพอร์ต:
+  send_command ทุกทาง (หน้าหลัก / SMS / Signal Quality / headless / กู้ซิม) เข้าคิวนี้
+  managers/smart_command_manager.py ใช้ตัวเดียวกันถ้า serial thread มีอยู่แล้ว
+- heapq: key = เวลาเข้าคิว + priority × AGING_STEP → คำสั่งสำคัญน้อยที่รอนานพอจะขึ้นมาก่อนเอง (ไม่อดตาย)
+  เช่น AGING_STEP = 2 วินาที: LOW (3) ที่รอมาแล้ว 6 วินาทีเท่ากับ CRITICAL (0) ที่เพิ่งเข้าคิว
+- ส่งได้ทีละคำสั่ง (single in-flight) — คำสั่งถัดไปออกเมื่อคำสั่งก่อนหน้าได้ final result code หรือหมดเวลา
+- ไม่มี polling: ปลุกเมื่อ submit / คำสั่งเสร็จ / หมดเวลา (threading.Timer)
+- URC (+CMTI / +CREG / +QIND / RING ...) ที่แทรกมาระหว่างคำสั่งไม่ถูกนับเป็นคำตอบของคำสั่งที่ส่งอยู่
+- prompt '>' (AT+CMGS) → เขียน payload ต่อผ่าน send_raw; ไม่มี payload → ผู้เรียกเขียนข้อความเอง
+  (wait_prompt) ส่วนคำสั่งนี้ยังถือคิวไว้จนได้ final result / หมดเวลา
+- เก็บ latency ต่อ source: เวลารอคิว (wait) / เวลาที่โมเด็มใช้ตอบ (service) — ส่งเข้า services/metrics ด้วยถ้าเปิดอยู่
+- คำถามอ่านอย่างเดียวที่ซ้ำกัน (services/query_cache) → รอคำตอบเดียวกัน / ใช้คำตอบที่ยังไม่หมดอายุ
+ตรวจการทำงาน + benchmark: python -m services.command_scheduler
+"""
+from __future__ import annotations
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional
+import heapq
+import itertools
+import re
+import threading
+import time
+
+from . import metrics
+from .at_transport import command_timeout, is_final_result
+from .query_cache import QueryCoalescer, default_coalescer, normalize
+
+AGING_STEP = 2.0            # วินาทีที่เทียบเท่า priority 1 ระดับ
+MIN_INTERVAL = 0.05         # เว้นระหว่างคำสั่ง (วินาที) หลังได้คำตอบ
+LATENCY_HISTORY = 200       # จำนวนคำสั่งล่าสุดต่อ source ที่ใช้คิดสถิติ
+
+# prefix ที่โมเด็มส่งเองได้ทุกเมื่อ (ไม่ใช่คำตอบ เว้นแต่คำสั่งที่ส่งอยู่ถามเรื่องนั้นเอง เช่น AT+CREG?)
+URC_PREFIXES = frozenset({
+    "+CMTI", "+CMT", "+CDSI", "+CDS", "+CBM", "+CREG", "+CGREG", "+CEREG", "+QIND", "+CIEV",
+    "+CRING", "+CLIP", "+CUSD", "+CPIN", "+QUSIM", "+CFUN",
+})
+URC_WORDS = frozenset({"RING", "RDY", "CALL READY", "SMS READY", "NORMAL POWER DOWN", "POWERED DOWN"})
+_URC_WITH_BODY = ("+CMT", "+CDS", "+CBM")     # บรรทัดถัดไปเป็น PDU / ข้อความ → ข้ามด้วย
+_PREFIX_RE = re.compile(r'^([+#$^%][A-Z0-9]+):')
+
+
+def urc_prefix(line: str, command: str = "") -> str:
+    """prefix ของ URC ('RING', '+CMTI' ...) หรือ '' ถ้าบรรทัดนี้เป็นคำตอบของ command ได้"""
+    up = (line or "").strip().upper()
+    if up in URC_WORDS:
+        return up
+    m = _PREFIX_RE.match(up)
+    if not m or m.group(1) not in URC_PREFIXES:
+        return ""
+    return "" if metrics.command_name(command)[2:] == m.group(1) else m.group(1)
+
+
+@dataclass
+class ScheduledCommand:
+    command: str
+    source: str
+    priority: int
+    silent: bool = False
+    timeout: float = 5.0
+    enqueued_at: float = field(default_factory=time.monotonic)
+    sent_at: float = 0.0
+    done_at: float = 0.0
+    lines: List[str] = field(default_factory=list)
+    timed_out: bool = False
+    cached: bool = False        # ตอบจาก query cache โดยไม่ได้ส่งจริง
+    payload: Optional[bytes] = None     # ข้อมูลที่เขียนต่อหลัง prompt '>' (AT+CMGS)
+    prompted: bool = False
+    callbacks: List[Callable[["ScheduledCommand"], None]] = field(default_factory=list)
+
+    @property
+    def response(self) -> str:
+        return "\n".join(self.lines)
+
+    @property
+    def ok(self) -> bool:
+        return not self.timed_out and any(l.strip().upper() == "OK" for l in self.lines)
+
+
+class CommandScheduler:
+    """
+    send(command) → bool คือฟังก์ชันที่เขียนลงพอร์ตจริง (เช่น SerialMonitorThread._write_command)
+    send_raw(bytes) → bool ใช้เขียน payload หลัง prompt '>' (เช่น SerialMonitorThread._write_raw)
+    ทุกบรรทัดที่อ่านได้ต้องส่งเข้า feed_line (line listener ของ serial thread)
+    """
+
+    def __init__(self, send: Callable[[str], bool], aging_step: float = AGING_STEP,
+                 min_interval: float = MIN_INTERVAL, port: str = "",
+                 coalescer: Optional[QueryCoalescer] = None,
+                 send_raw: Optional[Callable[[bytes], bool]] = None):
+        self._send = send
+        self._send_raw = send_raw
+        self._skip_body = False
+        self.urcs = 0
+        self.port = port
+        self.coalescer = coalescer if coalescer is not None else default_coalescer()
+        self._by_key: Dict[str, ScheduledCommand] = {}     # คำถามที่รวมได้ที่ยังรอ/กำลังส่ง
+        self.coalesced = 0
+        self.aging_step = aging_step
+        self.min_interval = min_interval
+        self._lock = threading.RLock()
+        self._changed = threading.Condition(self._lock)     # ปลุก wait_prompt
+        self._heap: List[tuple] = []
+        self._seq = itertools.count()
+        self._in_flight: Optional[ScheduledCommand] = None
+        self._deadline: Optional[threading.Timer] = None
+        self._wake: Optional[threading.Timer] = None
+        self._last_done = 0.0
+        self._wait: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=LATENCY_HISTORY))
+        self._service: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=LATENCY_HISTORY))
+        self._counts: Dict[str, int] = defaultdict(int)
+        self._timeouts: Dict[str, int] = defaultdict(int)
+
+    # ---------- คิว ----------
+    def submit(self, command: str, source: str = "background", priority: int = 3, silent: bool = False,
+               on_done: Optional[Callable[[ScheduledCommand], None]] = None,
+               timeout: Optional[float] = None, payload: Optional[bytes] = None) -> ScheduledCommand:
+        coalescable = self.coalescer.coalescable(command)
+        if not coalescable:
+            self.coalescer.note_command(self.port, command)
+        else:
+            cached = self.coalescer.get(self.port, command)
+            if cached is not None:
+                item = ScheduledCommand(command, source, int(priority), silent, 0.0,
+                                        lines=cached.split("\n"), cached=True)
+                item.sent_at = item.done_at = item.enqueued_at
+                self.coalesced += 1
+                if on_done:
+                    on_done(item)
+                return item
+        with self._lock:
+            item = self._by_key.get(normalize(command)) if coalescable else None
+            if item is not None:
+                # คำถามเดียวกันรออยู่แล้ว → ขอคำตอบด้วย; ถ้าสำคัญกว่าก็ดันคิวขึ้น (entry ซ้ำถูกข้ามตอน pop)
+                self.coalesced += 1
+                if on_done:
+                    item.callbacks.append(on_done)
+                if not item.sent_at and int(priority) < item.priority:
+                    item.priority = int(priority)
+                    heapq.heappush(self._heap, (time.monotonic() + item.priority * self.aging_step,
+                                                next(self._seq), item))
+                return item
+            item = ScheduledCommand(command, source, int(priority), silent,
+                                    command_timeout(command) if timeout is None else timeout,
+                                    payload=payload)
+            if on_done:
+                item.callbacks.append(on_done)
+            if coalescable:
+                self._by_key[normalize(command)] = item
+            key = item.enqueued_at + item.priority * self.aging_step
+            heapq.heappush(self._heap, (key, next(self._seq), item))
+            if metrics.enabled():
+                metrics.COMMAND_QUEUE_DEPTH.set(len(self), self.port)
+        self._pump()
+        return item
+
+    def clear(self, source: Optional[str] = None) -> int:
+        """ทิ้งคำสั่งที่ยังไม่ได้ส่ง (เฉพาะ source นี้ถ้าระบุ) → จำนวนที่ทิ้ง"""
+        with self._lock:
+            keep = [e for e in self._heap if source is not None and e[2].source != source]
+            dropped = {id(e[2]) for e in self._heap} - {id(e[2]) for e in keep}
+            for key, item in list(self._by_key.items()):
+                if id(item) in dropped:
+                    del self._by_key[key]
+            heapq.heapify(keep)
+            self._heap = keep
+            self._changed.notify_all()
+        return len(dropped)
+
+    def wait_prompt(self, timeout: float) -> bool:
+        """
+        รอจนคำสั่งที่ส่งอยู่ได้ prompt '>' (ให้ผู้เรียกเขียนข้อความต่อเองได้)
+        → True ทันทีถ้าไม่มีคำสั่งค้างเลย / False ถ้าหมดเวลาก่อน
+        """
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                item = self._in_flight
+                if item is None and not len(self):
+                    return True
+                if item is not None and item.prompted:
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._changed.wait(remaining)
+
+    @property
+    def in_flight(self) -> Optional[ScheduledCommand]:
+        return self._in_flight
+
+    def __len__(self) -> int:
+        return len({id(e[2]) for e in self._heap if not e[2].sent_at})
+
+    # ---------- ส่ง / รับ ----------
+    def _pump(self) -> None:
+        with self._lock:
+            while self._heap and self._heap[0][2].sent_at:
+                heapq.heappop(self._heap)       # entry ซ้ำของคำถามที่ถูกดันคิว / ส่งไปแล้ว
+            if self._in_flight is not None or not self._heap:
+                return
+            gap = self.min_interval - (time.monotonic() - self._last_done)
+            if gap > 0:
+                if self._wake is None:
+                    self._wake = threading.Timer(gap, self._on_wake)
+                    self._wake.daemon = True
+                    self._wake.start()
+                return
+            _, _, item = heapq.heappop(self._heap)
+            item.sent_at = time.monotonic()
+            if metrics.enabled():
+                metrics.COMMAND_QUEUE_DEPTH.set(len(self), self.port)
+            self._in_flight = item
+            self._changed.notify_all()
+            self._deadline = threading.Timer(item.timeout, self._on_timeout, args=(item,))
+            self._deadline.daemon = True
+            self._deadline.start()
+        try:
+            sent = self._send(item.command)
+        except Exception as e:
+            print(f"Command scheduler send error: {e}")
+            sent = False
+        if not sent:
+            item.lines.append("ERROR")
+            self._finish(item)
+
+    def _on_wake(self) -> None:
+        with self._lock:
+            self._wake = None
+        self._pump()
+
+    def _on_timeout(self, item: ScheduledCommand) -> None:
+        item.timed_out = True
+        self._finish(item)
+
+    def feed_line(self, line: str) -> None:
+        """บรรทัดจากพอร์ต → เก็บเป็นคำตอบของคำสั่งที่ส่งอยู่ (final result code = เสร็จ, URC ถูกข้าม)"""
+        line = (line or "").strip()
+        if not line:
+            return
+        with self._lock:
+            if self._skip_body:
+                self._skip_body = False
+                return
+            item = self._in_flight
+            urc = urc_prefix(line, item.command if item is not None else "")
+            if urc:
+                self.urcs += 1
+                self._skip_body = urc in _URC_WITH_BODY
+                return
+            if item is None:
+                return
+            item.lines.append(line)
+            prompt = line.startswith(">") and not item.prompted
+            if prompt:
+                item.prompted = True
+                self._changed.notify_all()
+        if prompt:
+            self._on_prompt(item)
+        elif is_final_result(line):
+            self._finish(item)
+
+    def _on_prompt(self, item: ScheduledCommand) -> None:
+        """โมเด็มรอข้อมูล ('>') → เขียน payload; ไม่มี payload → ผู้เรียกเขียนเอง (send_raw หลัง wait_prompt)"""
+        if item.payload is None:
+            return
+        try:
+            sent = self._send_raw is not None and self._send_raw(item.payload)
+        except Exception as e:
+            print(f"Command scheduler send_raw error: {e}")
+            sent = False
+        if not sent:
+            item.lines.append("ERROR")
+            self._finish(item)
+
+    def _finish(self, item: ScheduledCommand) -> None:
+        with self._lock:
+            if self._in_flight is not item:
+                return          # จบไปแล้ว (timeout ชนกับ final result)
+            self._in_flight = None
+            if self._by_key.get(normalize(item.command)) is item:
+                del self._by_key[normalize(item.command)]
+            callbacks = list(item.callbacks)
+            if self._deadline is not None:
+                self._deadline.cancel()
+                self._deadline = None
+            item.done_at = self._last_done = time.monotonic()
+            self._changed.notify_all()
+            self._counts[item.source] += 1
+            self._wait[item.source].append(item.sent_at - item.enqueued_at)
+            self._service[item.source].append(item.done_at - item.sent_at)
+            if item.timed_out:
+                self._timeouts[item.source] += 1
+        if metrics.enabled():
+            metrics.COMMAND_QUEUE_WAIT.observe(item.sent_at - item.enqueued_at, item.source)
+            metrics.AT_LATENCY.observe(item.done_at - item.sent_at, "scheduler", metrics.command_name(item.command))
+            if item.timed_out:
+                metrics.COMMAND_TIMEOUTS.inc(item.source)
+        if not item.timed_out:
+            self.coalescer.record(self.port, item.command, item.response)
+        for callback in callbacks:
+            try:
+                callback(item)
+            except Exception as e:
+                print(f"Command callback error ({item.command}): {e}")
+        self._pump()
+
+    # ---------- สถิติ ----------
+    def latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """{source: {count, timeouts, avg/p95 wait_ms, avg/p95 service_ms}} จากคำสั่งล่าสุด"""
+        def pct(values, p):
+            if not values:
+                return 0.0
+            ordered = sorted(values)
+            return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))]
+
+        out = {}
+        with self._lock:
+            for source in self._counts:
+                wait, service = list(self._wait[source]), list(self._service[source])
+                out[source] = {
+                    'count': self._counts[source],
+                    'timeouts': self._timeouts[source],
+                    'avg_wait_ms': sum(wait) / len(wait) * 1000 if wait else 0.0,
+                    'p95_wait_ms': pct(wait, 95) * 1000,
+                    'avg_service_ms': sum(service) / len(service) * 1000 if service else 0.0,
+                    'p95_service_ms': pct(service, 95) * 1000,
+                }
+        return out
+
+
+# ==================== ตรวจการทำงาน + BENCHMARK ====================
+class _FakeModem:
+    """ตอบ OK หลัง delay วินาที (thread แยก) และจับว่ามีคำสั่งค้างพร้อมกันเกิน 1 หรือไม่"""
+
+    def __init__(self, delay: float = 0.002):
+        self.delay = delay
+        self.scheduler: Optional[CommandScheduler] = None
+        self.pending = 0
+        self.max_pending = 0
+        self.order: List[str] = []
+        self._lock = threading.Lock()
+
+    def send(self, command: str) -> bool:
+        with self._lock:
+            self.pending += 1
+            self.max_pending = max(self.max_pending, self.pending)
+            self.order.append(command)
+        threading.Timer(self.delay, self._reply).start()
+        return True
+
+    def _reply(self) -> None:
+        with self._lock:
+            self.pending -= 1
+        self.scheduler.feed_line("+CSQ: 20,99")
+        self.scheduler.feed_line("OK")
+
+
+def self_check() -> None:
+    modem = _FakeModem()
+    sched = CommandScheduler(modem.send, aging_step=0.05, min_interval=0.0, coalescer=QueryCoalescer())
+    modem.scheduler = sched
+    done = threading.Event()
+    total = 300
+    finished = []
+
+    def on_done(item):
+        finished.append(item)
+        if len(finished) == total:
+            done.set()
+
+    # LOW เข้าคิวหลังคำสั่งที่ค้างอยู่ แล้ว CRITICAL ทยอยเข้ามาเรื่อย ๆ → LOW ต้องได้ออกก่อนจบ (aging)
+    sched.submit("AT#first", "user_main", 0, on_done=on_done)
+    sched.submit("AT+CSQ#low", "signal_quality", 3, on_done=on_done)
+    for i in range(total - 2):
+        sched.submit(f"AT#user{i}", "user_main", 0, on_done=on_done)
+        time.sleep(0.002)
+    assert done.wait(10), len(finished)
+    assert modem.max_pending == 1, modem.max_pending
+    low_at = modem.order.index("AT+CSQ#low")
+    assert 1 <= low_at < total - 1, low_at
+    assert all(item.ok and item.response.endswith("OK") for item in finished)
+    stats = sched.latency_stats()
+    assert stats["user_main"]["count"] == total - 1 and stats["signal_quality"]["count"] == 1
+
+    # AT+CSQ ซ้ำ 5 ครั้งระหว่างรอคิว → ส่งจริงครั้งเดียว, ถามอีกทันที → ตอบจาก cache
+    modem = _FakeModem(delay=0.02)
+    sched = CommandScheduler(modem.send, min_interval=0.0, port="COM1", coalescer=QueryCoalescer())
+    modem.scheduler = sched
+    answers = []
+    sched.submit("AT+CMGF=1", "sms_send", 1)
+    for _ in range(5):
+        sched.submit("AT+CSQ", "signal_quality", 3, on_done=answers.append)
+    time.sleep(0.2)
+    cached = sched.submit("at+csq", "background", 3, on_done=answers.append)
+    assert modem.order == ["AT+CMGF=1", "AT+CSQ"], modem.order
+    assert len(answers) == 6 and cached.cached and answers[-1].response == answers[0].response
+    assert sched.coalesced == 5 and len(sched) == 0
+
+    # หมดเวลา → คำสั่งถัดไปยังออกได้
+    silent = CommandScheduler(lambda c: True, min_interval=0.0, coalescer=QueryCoalescer())
+    got = []
+    silent.submit("AT+HANG", timeout=0.05, on_done=got.append)
+    silent.submit("AT", timeout=0.05, on_done=got.append)
+    time.sleep(0.3)
+    assert [g.timed_out for g in got] == [True, True], got
+
+    # URC แทรกระหว่างคำสั่ง → ไม่ปนในคำตอบ; AT+CMGS รอ '>' แล้วเขียน payload
+    raw = []
+    sched = CommandScheduler(lambda c: True, min_interval=0.0, coalescer=QueryCoalescer(),
+                             send_raw=lambda data: raw.append(data) or True)
+    got = []
+    sched.submit("AT+CSQ", on_done=got.append)
+    for line in ("+CMTI: \"SM\",3", "+CMT: \"+66800000000\",,\"24/01/01,00:00:00+28\"", "hello",
+                 "+CREG: 1,\"1A2B\",\"01C3D4E5\"", "RING", "+CSQ: 20,99", "OK"):
+        sched.feed_line(line)
+    sched.submit("AT+CMGS=12", payload=b"PDU\x1a", on_done=got.append)
+    for line in ("> ", "+CMGS: 7", "OK"):
+        sched.feed_line(line)
+    assert got[0].response == "+CSQ: 20,99\nOK" and sched.urcs == 4, (got[0].lines, sched.urcs)
+    assert raw == [b"PDU\x1a"] and got[1].ok and "+CMGS: 7" in got[1].lines, (raw, got[1].lines)
+
+    # AT+CMGS ไม่มี payload → ผู้เรียกรอ prompt แล้วเขียนเอง; คำสั่งถัดไปรอจน +CMGS/OK
+    sent = []
+    sched = CommandScheduler(lambda c: sent.append(c) or True, min_interval=0.0, coalescer=QueryCoalescer(),
+                             send_raw=lambda data: raw.append(data) or True)
+    sched.submit("AT+CMGS=12")
+    sched.submit("AT+CSQ")
+    assert not sched.wait_prompt(0.05)
+    threading.Timer(0.02, sched.feed_line, args=("> ",)).start()
+    assert sched.wait_prompt(1.0) and raw == [b"PDU\x1a"] and sent == ["AT+CMGS=12"], (raw, sent)
+    for line in ("+CMGS: 8", "OK"):
+        sched.feed_line(line)
+    assert sent == ["AT+CMGS=12", "AT+CSQ"], sent
+    print(f"self-check OK (LOW served at position {low_at} of {total}, never >1 in flight)")
+
+
+def benchmark(queued: int = 20_000) -> None:
+    """เวลาเข้าคิวแบบ heap เทียบกับการไล่หาตำแหน่งใน deque แบบเดิม (O(n) ต่อคำสั่ง)"""
+    import random
+
+    rnd = random.Random(3)
+    priorities = [rnd.randint(0, 3) for _ in range(queued)]
+
+    t = time.perf_counter()
+    heap: List[tuple] = []
+    now = time.monotonic()
+    for i, p in enumerate(priorities):
+        heapq.heappush(heap, (now + p * AGING_STEP, i, None))
+    heap_s = time.perf_counter() - t
+
+    t = time.perf_counter()
+    dq: deque = deque()
+    for p in priorities:
+        for i, existing in enumerate(dq):
+            if p < existing:
+                dq.insert(i, p)
+                break
+        else:
+            dq.append(p)
+    deque_s = time.perf_counter() - t
+    print(f"enqueue {queued:,}: heapq {heap_s * 1000:.1f} ms, deque scan {deque_s * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    self_check()
+    benchmark()
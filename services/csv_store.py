@@ -53,14 +53,16 @@ def _join_to_iso(date_str: str, time_str: str) -> str:
         return f"{date_str} {time_str}".strip()
     
 # ----------------------- Utilities -----------------------
+# คำใน status ที่ถือว่าส่งไม่สำเร็จ — ชุดเดียวใช้ทั้งแท็บ Fail, ลบเฉพาะ Fail, สถิติ (CSV และ SQLite)
+FAIL_KEYWORDS = (
+    "ล้มเหลว", "ไม่สำเร็จ", "ส่งไม่สำเร็จ", "ผิดพลาด", "ขัดข้อง",
+    "fail", "failed", "error", "timeout", "time out", "not sent",
+    "denied", "reject", "rejected", "cancel", "cancelled", "no route", "no service",
+    "no sim", "pin required", "no signal", "no network", "connection",
+)
+
 def looks_failed(status: str) -> bool:
     """บ่งชี้ว่าเป็นรายการส่งล้มเหลว (ใช้ตอนลบเฉพาะ Fail/แสดงสีแดง)"""
-    FAIL_KEYWORDS = [
-        "ล้มเหลว", "ส่งไม่สำเร็จ", "ผิดพลาด", "ขัดข้อง",
-        "fail", "failed", "error", "timeout", "time out",
-        "no route", "no service", "no sim", "no signal", "no network",
-        "denied", "reject",
-    ]
     s = (status or "").lower()
     return any(k in s for k in FAIL_KEYWORDS)
 
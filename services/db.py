@@ -2,6 +2,8 @@
 import sys
 from pathlib import Path
 import sqlite3
+from .phone_index import phone_key
+from .traffic_stats import hour_bucket, status_class
 
 def _app_dir():
     # โหมด .exe (PyInstaller) → โฟลเดอร์เดียวกับไฟล์ .exe
@@ -42,14 +44,163 @@ def init_db():
                 dt TEXT
             )
         """)
-        # มุมมองรวม
+        # index สำหรับอ่านแบบ keyset (dt, id) ทีละหน้า
+        c.execute("CREATE INDEX IF NOT EXISTS idx_sms_sent_dt_id ON sms_sent(dt, id)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_sms_inbox_dt_id ON sms_inbox(dt, id)")
+        # index เบอร์ (phone_norm = 0xxxxxxxxx, phone_rev = กลับด้าน → ค้นท้ายเบอร์)
+        _ensure_phone_index(conn, "sms_sent")
+        _ensure_phone_index(conn, "sms_inbox")
+        # ซิมที่ใช้ส่ง/รับ (สำหรับสถิติต่อ SIM)
+        _ensure_sim_columns(conn, "sms_sent")
+        _ensure_sim_columns(conn, "sms_inbox")
+        # มุมมองรวม (สร้างใหม่ทุกครั้ง เผื่อคอลัมน์เพิ่มจากเวอร์ชันก่อน)
+        c.execute("DROP VIEW IF EXISTS sms_logs")
         c.execute("""
-            CREATE VIEW IF NOT EXISTS sms_logs AS
-            SELECT id, dt, 'sent'  AS direction, phone, message, status, is_failed FROM sms_sent
+            CREATE VIEW sms_logs AS
+            SELECT id, dt, 'sent'  AS direction, phone, message, status, is_failed,
+                   phone_norm, phone_rev FROM sms_sent
             UNION ALL
-            SELECT id, dt, 'inbox' AS direction, phone, message, status, 0 AS is_failed FROM sms_inbox
+            SELECT id, dt, 'inbox' AS direction, phone, message, status, 0 AS is_failed,
+                   phone_norm, phone_rev FROM sms_inbox
+        """)
+        # สรุปต่อเบอร์ (conversation) → อัปเดตทุกครั้งที่ insert
+        has_conv = c.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='sms_conversations'"
+        ).fetchone()
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS sms_conversations (
+                phone_norm TEXT PRIMARY KEY,
+                phone TEXT,
+                last_dt TEXT,
+                last_message TEXT,
+                last_direction TEXT,
+                unread INTEGER DEFAULT 0,
+                sent_count INTEGER DEFAULT 0,      -- ส่งสำเร็จ
+                failed_count INTEGER DEFAULT 0,    -- ส่งไม่สำเร็จ
+                received_count INTEGER DEFAULT 0
+            )
+        """)
+        c.execute("""
+            CREATE INDEX IF NOT EXISTS idx_sms_conversations_last
+                ON sms_conversations(last_dt, phone_norm)
+        """)
+        if not has_conv:
+            rebuild_conversations(conn)
+        # สถิติรายชั่วโมง (ชั่วโมง × SIM × ผู้ให้บริการ × ทิศทาง × กลุ่มสถานะ)
+        has_traffic = c.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='sms_traffic_hourly'"
+        ).fetchone()
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS sms_traffic_hourly (
+                hour TEXT NOT NULL,            -- 'YYYY-MM-DD HH:00'
+                sim_iccid TEXT NOT NULL DEFAULT '',
+                carrier TEXT NOT NULL DEFAULT '',
+                direction TEXT NOT NULL,       -- sent | inbox
+                status_class TEXT NOT NULL,    -- ok | failed | received
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (hour, sim_iccid, carrier, direction, status_class)
+            ) WITHOUT ROWID
+        """)
+        if not has_traffic:
+            rebuild_traffic(conn)
+        # identity ของซิม (cache ของ AT+CIMI / AT+CNUM) → ดู services/sim_identity_cache.py
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS sim_identity (
+                iccid TEXT PRIMARY KEY,
+                imsi TEXT NOT NULL,
+                phone TEXT,
+                updated_ts INTEGER NOT NULL    -- epoch seconds
+            ) WITHOUT ROWID
         """)
         conn.commit()
 
+def rebuild_conversations(conn, phone_norms=None):
+    """
+    คำนวณ sms_conversations ใหม่จาก sms_sent/sms_inbox
+    - phone_norms=None → ทั้งหมด, ไม่งั้นเฉพาะเบอร์ที่ระบุ (เช่นหลังลบ)
+    - ค่า unread เดิมถูกเก็บไว้ (ไม่เกินจำนวนรับเข้าที่เหลือ)
+    """
+    where, args = "", []
+    if phone_norms is not None:
+        phone_norms = list(phone_norms)
+        if not phone_norms:
+            return
+        where = f"WHERE phone_norm IN ({','.join('?' for _ in phone_norms)})"
+        args = phone_norms
+
+    unread = dict(conn.execute(
+        f"SELECT phone_norm, unread FROM sms_conversations {where}", args
+    ).fetchall())
+    conn.execute(f"DELETE FROM sms_conversations {where}", args)
+    # MAX(dt) + คอลัมน์เปล่า → SQLite หยิบค่าจากแถวที่ dt มากที่สุด
+    conn.execute(f"""
+        INSERT INTO sms_conversations (phone_norm, phone, last_dt, last_message, last_direction,
+                                       unread, sent_count, failed_count, received_count)
+        SELECT phone_norm, phone, MAX(dt), message, direction, 0,
+               SUM(direction = 'sent' AND is_failed = 0),
+               SUM(direction = 'sent' AND is_failed = 1),
+               SUM(direction = 'inbox')
+          FROM sms_logs
+          {where}
+         GROUP BY phone_norm
+    """, args)
+    if unread:
+        conn.executemany(
+            "UPDATE sms_conversations SET unread = MIN(?, received_count) WHERE phone_norm = ?",
+            [(n, k) for k, n in unread.items() if n],
+        )
+
+def rebuild_traffic(conn):
+    """คำนวณ sms_traffic_hourly ใหม่ทั้งหมดจาก sms_sent/sms_inbox (GROUP BY ใน SQLite)"""
+    conn.create_function("hour_bucket", 1, hour_bucket, deterministic=True)
+    conn.create_function("status_class", 3, status_class, deterministic=True)
+    conn.execute("DELETE FROM sms_traffic_hourly")
+    # รวมตาม status ดิบก่อน (มีไม่กี่แบบ) แล้วค่อยจัดกลุ่มสถานะ → เรียก status_class น้อยครั้ง
+    conn.execute("""
+        INSERT INTO sms_traffic_hourly (hour, sim_iccid, carrier, direction, status_class, count)
+        SELECT hour, sim_iccid, carrier, direction, status_class(direction, status, is_failed) AS cls,
+               SUM(n)
+          FROM (
+                SELECT substr(dt, 1, 13) AS raw_hour, hour_bucket(MIN(dt)) AS hour,
+                       IFNULL(sim_iccid, '') AS sim_iccid, IFNULL(carrier, '') AS carrier,
+                       'sent' AS direction, status, is_failed, COUNT(*) AS n
+                  FROM sms_sent
+                 GROUP BY raw_hour, sim_iccid, carrier, status, is_failed
+                UNION ALL
+                SELECT substr(dt, 1, 13), hour_bucket(MIN(dt)), IFNULL(sim_iccid, ''), IFNULL(carrier, ''),
+                       'inbox', status, 0, COUNT(*)
+                  FROM sms_inbox
+                 GROUP BY substr(dt, 1, 13), IFNULL(sim_iccid, ''), IFNULL(carrier, ''), status
+               )
+         WHERE hour IS NOT NULL
+         GROUP BY hour, sim_iccid, carrier, direction, cls
+    """)
+
+def _ensure_sim_columns(conn, table):
+    cols = {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+    if "sim_iccid" not in cols:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN sim_iccid TEXT")
+    if "carrier" not in cols:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN carrier TEXT")
+
+def _ensure_phone_index(conn, table):
+    """เพิ่มคอลัมน์ phone_norm/phone_rev + index และเติมค่าให้แถวเก่า (ทำครั้งเดียว)"""
+    cols = {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+    if "phone_norm" not in cols:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN phone_norm TEXT")
+    if "phone_rev" not in cols:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN phone_rev TEXT")
+    # รวม dt ไว้ใน index → เรียงผลค้นหาตามเวลาได้โดยไม่ต้องอ่านตาราง
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_phone_norm ON {table}(phone_norm, dt)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_phone_rev ON {table}(phone_rev, dt)")
+
+    rows = conn.execute(f"SELECT id, phone FROM {table} WHERE phone_norm IS NULL").fetchall()
+    if rows:
+        keys = ((phone_key(r[1]), r[0]) for r in rows)
+        conn.executemany(
+            f"UPDATE {table} SET phone_norm = ?, phone_rev = ? WHERE id = ?",
+            ((k, k[::-1], rid) for k, rid in keys),
+        )
+
 # สร้างฐานข้อมูล/ตารางทันทีเมื่อ import
 init_db()
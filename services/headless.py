@@ -0,0 +1,601 @@
+# services/headless.py
+"""
+โหมด daemon ไม่มีหน้าต่าง สำหรับ SIM box บน rack server: python main.py --headless --config headless.json
+- ใช้ QCoreApplication (QtCore อย่างเดียว ไม่โหลด QtWidgets / QtGui) ขับ SerialMonitorThread ตัวเดิม
+  → การอ่านพอร์ต, +CMT 2 บรรทัด, +CPIN และคิวกู้ซิม (CFUN=0 → CFUN=1 → CPIN?) ชุดเดียวกับ GUI
+- ModemWorker    : 1 ตัวต่อโมเด็ม — ตั้งค่า SMS หลังต่อพอร์ตสำเร็จ, SMS เข้า → sms_log (DB),
+                   อ่าน ICCID/IMSI ตอนต่อพอร์ต / ซิมกลับมา READY → log ผูกกับซิมของพอร์ตนี้,
+                   ซิมหลุด → force_sim_recovery (มี cooldown), พอร์ตหลุด → ต่อใหม่แบบ backoff,
+                   ถาม AT+CPIN? เป็นระยะ (ไม่ตอบ 2 ครั้งติด → เปิดพอร์ตใหม่)
+- ScheduledSend  : ส่ง SMS ตามรอบ (every วินาที) หรือทุกวันตามเวลา (at "HH:MM") ผ่าน sms_sender
+- HeadlessDaemon : รวมทุกโมเด็ม + ตารางส่ง, คำสั่งที่บล็อก (ตั้งค่า / ส่ง SMS) ทำใน thread pool
+- "api_port"     : เปิด HTTP/JSON API บน localhost (services/local_api.py) ส่ง SMS / อ่าน log / รอ SMS เข้า
+- "metrics"      : เก็บ services/metrics → GET /metrics และ/หรือเขียน "metrics_file" ทุก metrics_interval วินาที
+benchmark หน่วยความจำ/CPU ต่อโมเด็มเทียบ GUI (Linux, โมเด็มจำลองบน pty):
+    python -m services.headless --benchmark [--modems 4] [--seconds 20]
+"""
+from __future__ import annotations
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import json
+import os
+import re
+import signal
+import sys
+import time
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from . import metrics
+from . import sim_identity_cache
+from .at_transport import MonitorTransaction
+from .serial_service import SerialMonitorThread
+from .sms_sender import SendResult, SmsBatcher, final_line, send_sms
+
+DEFAULT_CONFIG = "headless.json"
+TICK_MS = 1000                     # ตรวจตารางส่ง / health check / ให้ Python รับ SIGINT-SIGTERM
+
+# ตั้งค่ารับ SMS แบบเดียวกับ SimInfoWindow.setup_sms_notifications
+SMS_NOTIFY_SETUP = ('AT+CMGF=1', 'AT+CNMI=2,2,0,1,0', 'AT+CPMS="SM","SM","SM"')
+
+# บรรทัดสถานะจาก SerialMonitorThread ที่พิมพ์ออก log เสมอ (บรรทัดดิบจากโมเด็มพิมพ์เฉพาะ verbose)
+_STATUS_PREFIXES = ("[SETUP]", "[FATAL]", "[ERROR]", "[READ ERROR]", "[SEND ERROR]", "[RECOVERY")
+
+STATE_CONNECTING = "connecting"
+STATE_CONNECTED = "connected"
+STATE_RECOVERING = "recovering"
+STATE_DISCONNECTED = "disconnected"
+
+RECOVERY_TIMEOUT = 30.0            # recovery ไม่มีผลภายในกี่วินาที → กลับไปตรวจ health ตามปกติ
+_LOCKED_SIM = ("PIN_REQUIRED", "PUK_REQUIRED")   # กู้ด้วย CFUN ไม่ได้ ต้องใส่ PIN/PUK
+
+
+def _log(port: str, text: str) -> None:
+    print(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} [{port}] {text}", flush=True)
+
+
+# ==================== CONFIG ====================
+@dataclass
+class ModemConfig:
+    port: str
+    baudrate: int = 115200
+    sms_setup: bool = True
+
+
+@dataclass
+class ScheduledSend:
+    port: str
+    phone: str
+    message: str
+    every: float = 0.0          # วินาที (0 = ใช้ at)
+    at: str = ""                # "HH:MM" ทุกวัน
+    next_due: float = field(default=0.0, init=False)
+
+    def schedule_next(self, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        if self.every > 0:
+            self.next_due = now + self.every
+            return
+        hour, minute = (int(x) for x in self.at.split(":", 1))
+        today = datetime.fromtimestamp(now).replace(hour=hour, minute=minute, second=0, microsecond=0)
+        due = today if today.timestamp() > now else today + timedelta(days=1)
+        self.next_due = due.timestamp()
+
+
+@dataclass
+class HeadlessConfig:
+    modems: List[ModemConfig] = field(default_factory=list)
+    schedules: List[ScheduledSend] = field(default_factory=list)
+    recovery: bool = True
+    recovery_cooldown: float = 60.0     # วินาทีขั้นต่ำระหว่าง recovery ของพอร์ตเดียวกัน
+    health_interval: float = 120.0      # ถาม AT+CPIN? ทุกกี่วินาที (0 = ปิด)
+    reconnect_max_delay: float = 60.0
+    db_path: str = ""                   # '' = sim_logs.db ข้างตัวโปรแกรม (เหมือน GUI)
+    verbose: bool = False
+    api_port: int = 0                   # 0 = ไม่เปิด API ภายในเครื่อง
+    api_host: str = "127.0.0.1"
+    metrics: bool = False
+    metrics_file: str = ""              # '' = ไม่เขียนไฟล์ (ยังดูได้ทาง GET /metrics)
+    metrics_interval: float = 15.0
+
+    @classmethod
+    def load(cls, path: str) -> "HeadlessConfig":
+        """อ่าน JSON (ดูตัวอย่างใน README) — "modems": "auto" = ทุกพอร์ตที่ระบบเห็น"""
+        with open(path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        modems = raw.get("modems", "auto")
+        if modems == "auto":
+            from core.utility_functions import list_serial_ports
+            baud = int(raw.get("baudrate", 115200))
+            modems = [{"port": device, "baudrate": baud} for device, _ in list_serial_ports()]
+        cfg = cls(
+            modems=[ModemConfig(**m) for m in modems],
+            schedules=[ScheduledSend(**s) for s in raw.get("schedules", [])],
+        )
+        for s in cfg.schedules:
+            if s.every <= 0 and not s.at:
+                raise ValueError(f"schedule for {s.phone} needs 'every' or 'at'")
+            s.schedule_next()            # "at" ผิดรูปแบบ → error ตอนโหลด ไม่ใช่ตอนถึงเวลา
+        for key in ("recovery", "recovery_cooldown", "health_interval", "reconnect_max_delay",
+                    "db_path", "verbose", "api_port", "api_host", "metrics", "metrics_file",
+                    "metrics_interval"):
+            if key in raw:
+                setattr(cfg, key, type(getattr(cfg, key))(raw[key]))
+        return cfg
+
+
+# ==================== WORKER ต่อโมเด็ม ====================
+class ModemWorker(QObject):
+    restart_requested = pyqtSignal()     # จาก thread pool → เปิดพอร์ตใหม่ใน event loop
+
+    def __init__(self, config: ModemConfig, daemon: "HeadlessDaemon"):
+        super().__init__()
+        self.config = config
+        self.port = config.port
+        self.daemon = daemon
+        self.serial_thread: Optional[SerialMonitorThread] = None
+        self.transaction: Optional[MonitorTransaction] = None
+        self.state = STATE_DISCONNECTED
+        self.sim_state = ""
+        self.received = 0
+        self.sent = 0
+        self.failed = 0
+        self.recoveries = 0
+        self._last_recovery = 0.0
+        self._missed_health = 0
+        self._reconnect_delay = 1.0
+        self._seen_sms = deque(maxlen=200)      # กัน +CMT ซ้ำ (datetime, sender, message)
+        self.restart_requested.connect(self.restart)
+
+    # ---------- เชื่อมต่อ ----------
+    def start(self) -> None:
+        if not self.daemon.running:
+            return
+        self.state = STATE_CONNECTING
+        t = SerialMonitorThread(self.port, self.config.baudrate)
+        t.at_response_signal.connect(self._on_line)
+        t.new_sms_signal.connect(self._on_sms)
+        t.sim_failure_detected.connect(self._on_sim_failure)
+        t.cpin_status_signal.connect(self._on_cpin_status)
+        t.connected_signal.connect(self._on_connected)
+        t.disconnected_signal.connect(self._on_disconnected)
+        self.serial_thread = t
+        self.transaction = MonitorTransaction(t, source="BACKGROUND")
+        t.start()
+
+    def stop(self) -> None:
+        t, self.serial_thread = self.serial_thread, None
+        if t is not None:
+            try:
+                t.disconnected_signal.disconnect(self._on_disconnected)
+            except Exception:
+                pass
+            t.stop()
+        self.state = STATE_DISCONNECTED
+
+    def restart(self) -> None:
+        self.stop()
+        self.start()
+
+    def _on_connected(self, port, baudrate) -> None:
+        self.state = STATE_CONNECTED
+        self._reconnect_delay = 1.0
+        self._missed_health = 0
+        if self.config.sms_setup:
+            self.daemon.submit(self._setup_sms)
+        self.daemon.submit(self._identify_sim)
+
+    def _on_disconnected(self) -> None:
+        self.state = STATE_DISCONNECTED
+        if not self.daemon.running:
+            return
+        delay = self._reconnect_delay
+        self._reconnect_delay = min(delay * 2, self.daemon.config.reconnect_max_delay)
+        _log(self.port, f"disconnected → reconnect in {delay:.0f}s")
+        QTimer.singleShot(int(delay * 1000), self.start)
+
+    def _setup_sms(self) -> None:
+        for command in SMS_NOTIFY_SETUP:
+            result = final_line(self.transaction.send(command))
+            if result.upper() != "OK":
+                _log(self.port, f"[SMS SETUP ERROR] {command} → {result or 'no response'}")
+                return
+        _log(self.port, "[SMS SETUP] SMS notifications configured")
+
+    def _identify_sim(self) -> None:
+        """ICCID (+ ผู้ให้บริการจาก IMSI ถ้ายังไม่มีใน cache) → sim_identity_cache ของพอร์ตนี้"""
+        iccid = ""
+        for command in sim_identity_cache.ICCID_COMMANDS:
+            iccid = sim_identity_cache.parse_iccid(self.transaction.send(command, timeout=3.0))
+            if iccid:
+                break
+        if not iccid:
+            _log(self.port, "[SIM] ICCID not available — logs are not tagged with a SIM")
+            return
+        if sim_identity_cache.lookup(iccid, self.port) is None:
+            m = re.search(r'\b(\d{15})\b', self.transaction.send("AT+CIMI", timeout=3.0))
+            sim_identity_cache.note_carrier(self.port, sim_identity_cache.carrier_from_imsi(m.group(1) if m else ""))
+        _log(self.port, f"[SIM] ICCID {iccid}")
+
+    # ---------- ข้อมูลจากโมเด็ม ----------
+    def _on_line(self, line: str) -> None:
+        if self.daemon.config.verbose or line.startswith(_STATUS_PREFIXES):
+            _log(self.port, line)
+
+    def _on_sms(self, data: str) -> None:
+        """+CMT: header|body → บันทึกลง inbox (+CMTI = เก็บในซิม, CNMI=2,2 ส่งแบบ +CMT อยู่แล้ว)"""
+        from core.utility_functions import parse_cmt_sms
+        parsed = parse_cmt_sms(data)
+        if not parsed:
+            return
+        sender, message, datetime_str = parsed
+        key = (datetime_str, sender, message)
+        if key in self._seen_sms:
+            return
+        self._seen_sms.append(key)
+        self.received += 1
+        _log(self.port, f"[SMS INBOX] {datetime_str.split('+', 1)[0]} | {sender}: {message}")
+        try:
+            from .sms_log import log_sms_inbox     # lazy import (db สร้างไฟล์ตอน import)
+            log_sms_inbox(sender, message, "รับเข้า (real-time)", port=self.port)
+        except Exception as e:
+            print(f"Error saving SMS to inbox log: {e}")
+        if self.daemon.api is not None:
+            self.daemon.api.publish_sms(self.port, sender, message, datetime_str)
+
+    def _on_cpin_status(self, status: str) -> None:
+        if status == "READY" and self.sim_state not in ("", "READY"):
+            self.daemon.submit(self._identify_sim)      # ซิมใหม่ / ซิมกลับมา → ICCID อาจเปลี่ยน
+        self.sim_state = status
+        if self.state == STATE_RECOVERING and (status == "READY" or status in _LOCKED_SIM):
+            self.state = STATE_CONNECTED
+        if status in _LOCKED_SIM:
+            _log(self.port, f"[SIM] {status} — auto recovery disabled until PIN/PUK is entered")
+
+    def _on_sim_failure(self) -> None:
+        self.sim_state = "NOT INSERTED"
+        self.start_recovery("SIM failure detected")
+
+    def start_recovery(self, reason: str) -> bool:
+        """CFUN=0 → CFUN=1 → CPIN? ผ่านคิวของ SerialMonitorThread (เว้น recovery_cooldown)"""
+        t = self.serial_thread
+        if not self.daemon.config.recovery or t is None or getattr(t, "recovery_active", False):
+            return False
+        if self.sim_state in _LOCKED_SIM:
+            return False
+        now = time.monotonic()
+        if now - self._last_recovery < self.daemon.config.recovery_cooldown:
+            return False
+        self._last_recovery = now
+        self.recoveries += 1
+        self.state = STATE_RECOVERING
+        _log(self.port, f"[RECOVERY] {reason} → starting SIM recovery")
+        t.force_sim_recovery()
+        return True
+
+    # ---------- health check (thread pool) ----------
+    def health_check(self) -> None:
+        if self.state == STATE_RECOVERING and time.monotonic() - self._last_recovery > RECOVERY_TIMEOUT:
+            self.state = STATE_CONNECTED         # recovery เงียบไป → ตรวจใหม่ (รอบหน้าอาจกู้ซ้ำ)
+        if self.state != STATE_CONNECTED or self.transaction is None:
+            return
+        response = self.transaction.send("AT+CPIN?", timeout=5.0)
+        if not response.strip():
+            self._missed_health += 1
+            if self._missed_health >= 2:
+                _log(self.port, "modem not responding → reopening port")
+                self._missed_health = 0
+                self.restart_requested.emit()
+            return
+        self._missed_health = 0
+        if "+CPIN: READY" not in response.upper():
+            self.start_recovery(f"AT+CPIN? → {final_line(response) or response.strip()}")
+
+    # ---------- ส่ง SMS (thread pool) ----------
+    def send_sms(self, phone: str, message: str, setup: bool = True) -> SendResult:
+        if self.state != STATE_CONNECTED:
+            result = SendResult(False, phone, message, f"modem {self.state}")
+        else:
+            result = send_sms(self.transaction, phone, message, setup=setup)
+        if result.ok:
+            self.sent += 1
+        else:
+            self.failed += 1
+        _log(self.port, f"[SMS {'SENT' if result.ok else 'FAILED'}] {phone}: {result.detail} "
+                        f"({result.elapsed * 1000:.0f} ms)")
+        return result
+
+    def status(self) -> Dict[str, object]:
+        return {'port': self.port, 'baudrate': self.config.baudrate, 'state': self.state,
+                'sim': self.sim_state, 'received': self.received, 'sent': self.sent,
+                'failed': self.failed, 'recoveries': self.recoveries}
+
+
+# ==================== DAEMON ====================
+class HeadlessDaemon(QObject):
+
+    def __init__(self, config: HeadlessConfig):
+        super().__init__()
+        self.config = config
+        self.running = False
+        self.workers: Dict[str, ModemWorker] = {m.port: ModemWorker(m, self) for m in config.modems}
+        self.pool = ThreadPoolExecutor(max_workers=max(2, len(self.workers)),
+                                       thread_name_prefix="headless")
+        self.outbox = SmsBatcher(self.send_sms)          # ทุกการส่ง (ตารางส่ง / API) ผ่านคิวนี้
+        self.api = None
+        self._next_health = 0.0
+        self._next_metrics = 0.0
+        self._tick = QTimer(self)
+        self._tick.setInterval(TICK_MS)
+        self._tick.timeout.connect(self._on_tick)
+
+    def start(self) -> None:
+        if self.config.db_path:
+            _use_db(self.config.db_path)
+        self.running = True
+        now = time.time()
+        for s in self.config.schedules:
+            s.schedule_next(now)
+        self._next_health = time.monotonic() + self.config.health_interval
+        if self.config.metrics or self.config.metrics_file:
+            metrics.enable(True)
+        for worker in self.workers.values():
+            worker.start()
+        self._tick.start()
+        if self.config.api_port:
+            from .local_api import LocalApiServer
+            try:
+                self.api = LocalApiServer(self.outbox, self.status, self.config.api_host,
+                                          self.config.api_port, verbose=self.config.verbose).start()
+            except OSError as e:
+                print(f"Local API error: {e}")
+        _log("daemon", f"started: {len(self.workers)} modem(s), {len(self.config.schedules)} schedule(s)")
+
+    def stop(self) -> None:
+        self.running = False
+        self._tick.stop()
+        if self.api is not None:
+            self.api.stop()
+            self.api = None
+        self.outbox.shutdown()
+        for worker in self.workers.values():
+            worker.stop()
+        if self.config.metrics_file:
+            try:
+                metrics.write_textfile(self.config.metrics_file)
+            except OSError as e:
+                print(f"Metrics file error: {e}")
+        self.pool.shutdown(wait=False)
+        _log("daemon", "stopped")
+
+    def submit(self, fn, *args):
+        """งานที่บล็อก (รอคำตอบโมเด็ม) → thread pool, error พิมพ์ออก log"""
+        def guarded():
+            try:
+                return fn(*args)
+            except Exception as e:
+                print(f"Headless task error: {e}")
+        return self.pool.submit(guarded)
+
+    def send_sms(self, port: str, phone: str, message: str, setup: bool = True) -> SendResult:
+        """ส่งแบบบล็อก (เรียกจาก thread ของ outbox ไม่ใช่ event loop)"""
+        worker = self.workers.get(port)
+        if worker is None:
+            return SendResult(False, phone, message, f"unknown port {port}")
+        return worker.send_sms(phone, message, setup)
+
+    def status(self) -> List[Dict[str, object]]:
+        return [w.status() for w in self.workers.values()]
+
+    def _on_tick(self) -> None:
+        now = time.time()
+        for s in self.config.schedules:
+            if s.next_due and now >= s.next_due:
+                s.schedule_next(now)
+                self.outbox.submit(s.port, s.phone, s.message)
+        if self.config.health_interval > 0 and time.monotonic() >= self._next_health:
+            self._next_health = time.monotonic() + self.config.health_interval
+            for worker in self.workers.values():
+                self.submit(worker.health_check)
+        if metrics.enabled():
+            for port, worker in self.workers.items():
+                metrics.MODEM_UP.set(1 if worker.state == STATE_CONNECTED else 0, port)
+            if self.config.metrics_file and time.monotonic() >= self._next_metrics:
+                self._next_metrics = time.monotonic() + self.config.metrics_interval
+                self.submit(metrics.write_textfile, self.config.metrics_file)
+
+
+def _use_db(path: str) -> None:
+    """ให้ sms_log เขียนลง DB ที่กำหนด (CSV mirror อยู่ข้าง ๆ ชื่อเดียวกัน)"""
+    from pathlib import Path
+    from . import db as _db, sms_log_store as _store
+    _db.DB_PATH = Path(path)
+    _store._CSV_PATH = Path(path).with_suffix(".csv")
+    _db.init_db()
+
+
+def run(config_path: str = DEFAULT_CONFIG) -> int:
+    """entry point ของ main.py --headless → exit code"""
+    from PyQt5.QtCore import QCoreApplication
+
+    app = QCoreApplication([sys.argv[0]])
+    try:
+        config = HeadlessConfig.load(config_path)
+    except Exception as e:
+        print(f"Cannot load headless config {config_path}: {e}")
+        return 2
+    daemon = HeadlessDaemon(config)
+    signal.signal(signal.SIGINT, lambda *_: app.quit())
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, lambda *_: app.quit())
+    daemon.start()
+    code = app.exec_()
+    daemon.stop()
+    return code
+
+
+# ==================== BENCHMARK ====================
+class _PtyModem:
+    """โมเด็มจำลองบน pty (Linux): ตอบ OK / +CPIN: READY / CMGS และส่ง +CMT ทุก sms_every วินาที"""
+
+    def __init__(self, sms_every: float = 2.0):
+        import pty
+        import threading
+        self.master, self.slave = pty.openpty()
+        self.path = os.ttyname(self.slave)
+        self.sms_every = sms_every
+        self.running = True
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _write(self, text: str) -> None:
+        try:
+            os.write(self.master, text.encode())
+        except OSError:
+            self.running = False
+
+    def _serve(self) -> None:
+        import select
+        buf = b""
+        next_sms = time.monotonic() + self.sms_every
+        body = "ทดสอบ headless".encode("utf-16-be").hex().upper()
+        while self.running:
+            ready, _, _ = select.select([self.master], [], [], 0.1)
+            if ready:
+                try:
+                    buf += os.read(self.master, 1024)
+                except OSError:
+                    return
+                if b"\x1a" in buf:                      # จบเนื้อความ SMS
+                    buf = buf.split(b"\x1a", 1)[1]
+                    self._write("\r\n+CMGS: 7\r\n\r\nOK\r\n")
+                while b"\r" in buf:
+                    line, buf = buf.split(b"\r", 1)
+                    cmd = line.decode(errors="ignore").strip().upper()
+                    if not cmd:
+                        continue
+                    if cmd.startswith("AT+CMGS="):
+                        self._write("\r\n> ")
+                    elif cmd == "AT+CPIN?":
+                        self._write("\r\n+CPIN: READY\r\n\r\nOK\r\n")
+                    else:
+                        self._write("\r\nOK\r\n")
+            if time.monotonic() >= next_sms:
+                next_sms += self.sms_every
+                stamp = datetime.now().strftime("%y/%m/%d,%H:%M:%S") + "+28"
+                self._write(f'\r\n+CMT: "+66812345678","","{stamp}"\r\n{body}\r\n')
+
+    def close(self) -> None:
+        self.running = False
+        for fd in (self.master, self.slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+def _proc_usage(pid: int):
+    """(RSS kB, CPU ticks) ของ process จาก /proc"""
+    rss = 0
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                rss = int(line.split()[1])
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return rss, int(fields[11]) + int(fields[12])      # utime + stime
+
+
+def _measure(cmd, env, seconds: float, warmup: float):
+    """รัน process แล้ววัด RSS สูงสุด/เฉลี่ย และ CPU% ในช่วง seconds (หลัง warmup)"""
+    import subprocess
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.Popen(cmd, cwd=root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        time.sleep(warmup)
+        if proc.poll() is not None:
+            return None
+        hz = os.sysconf("SC_CLK_TCK")
+        _, cpu0 = _proc_usage(proc.pid)
+        t0 = time.monotonic()
+        samples = []
+        while time.monotonic() - t0 < seconds and proc.poll() is None:
+            samples.append(_proc_usage(proc.pid)[0])
+            time.sleep(0.5)
+        _, cpu1 = _proc_usage(proc.pid)
+        elapsed = time.monotonic() - t0
+        return max(samples) / 1024, sum(samples) / len(samples) / 1024, (cpu1 - cpu0) / hz / elapsed * 100
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(5)
+        except Exception:
+            proc.kill()
+
+
+def benchmark(modems: int = 4, seconds: float = 20.0, warmup: float = 5.0, gui: bool = True) -> None:
+    """
+    headless 0 โมเด็ม / N โมเด็ม (pty จำลอง, +CMT ทุก 2 วินาที, ส่ง SMS ตามตารางทุก 5 วินาที)
+    เทียบ GUI (QT_QPA_PLATFORM=offscreen — GUI คุมได้ครั้งละ 1 โมเด็ม = 1 process ต่อโมเด็ม)
+    """
+    import tempfile
+    if not sys.platform.startswith("linux"):
+        print("benchmark ต้องใช้ Linux (/proc + pty)")
+        return
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    main_py = os.path.join(root, "main.py")
+    fakes = [_PtyModem() for _ in range(modems)]
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in (0, modems):
+            cfg = {
+                "modems": [{"port": f.path, "baudrate": 115200} for f in fakes[:n]],
+                "schedules": [{"port": fakes[0].path, "phone": "0812345678", "message": "bench", "every": 5}]
+                if n else [],
+                "health_interval": 10,
+                "db_path": os.path.join(tmp, f"bench_{n}.db"),
+            }
+            path = os.path.join(tmp, f"headless_{n}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(cfg, f)
+            res = _measure([sys.executable, main_py, "--headless", "--config", path],
+                           dict(os.environ), seconds, warmup)
+            rows.append((f"headless, {n} modem(s)", n, res))
+        if gui:
+            env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+            rows.append(("GUI (SimInfoWindow, 1 modem max)", 1, _measure([sys.executable, main_py], env,
+                                                                           seconds, warmup)))
+    for f in fakes:
+        f.close()
+
+    print(f"{'process':<34}{'peak RSS':>10}{'avg RSS':>10}{'CPU %':>8}")
+    for name, _, res in rows:
+        if res is None:
+            print(f"{name:<34}{'(exited early)':>28}")
+            continue
+        peak, avg, cpu = res
+        print(f"{name:<34}{peak:>8.1f}MB{avg:>8.1f}MB{cpu:>7.2f}%")
+    base, full = rows[0][2], rows[1][2]
+    if base and full and modems:
+        print(f"headless per modem: +{(full[1] - base[1]) / modems:.2f} MB RSS, "
+              f"{(full[2] - base[2]) / modems:.2f}% CPU (base {base[1]:.1f} MB)")
+    if gui and rows[-1][2]:
+        print(f"GUI per modem (1 process each): {rows[-1][2][1]:.1f} MB RSS, {rows[-1][2][2]:.2f}% CPU")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="SimBox headless daemon benchmark")
+    parser.add_argument("--benchmark", action="store_true")
+    parser.add_argument("--modems", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--no-gui", action="store_true", help="ไม่วัด GUI")
+    parser.add_argument("--config", default=DEFAULT_CONFIG)
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark(args.modems, args.seconds, gui=not args.no_gui)
+    else:
+        sys.exit(run(args.config))
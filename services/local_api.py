@@ -0,0 +1,464 @@
+# services/local_api.py
+"""
+HTTP/JSON API ภายในเครื่อง (stdlib http.server) ให้ service อื่นบน host เดียวกันส่ง SMS / อ่าน log — ไม่มี Qt
+    POST /sms                 {"phone", "message", "port"?, "wait"?}  หรือ  {"messages": [{...}, ...]}
+    GET  /modems              สถานะทุกโมเด็ม
+    GET  /logs?since=&until=&direction=inbox|sent&phone=&limit=&offset=&order=
+    GET  /inbox?after=<id>&timeout=<s>   long-poll SMS เข้า (ได้ทันทีถ้ามี event หลัง after)
+    GET  /events              SSE stream ของ SMS เข้า (Last-Event-ID / ?after= ต่อจากเดิมได้)
+    GET  /metrics             Prometheus text format (services/metrics.py)
+- การส่งทั้งหมดผ่าน SmsBatcher (services/sms_sender.py) → คำขอที่มาพร้อมกันบนพอร์ตเดียวกันส่งเป็นชุด
+- bind 127.0.0.1 เป็นค่าเริ่มต้น (ไม่มีระบบ auth — อย่าเปิดออก network)
+- กันเว็บในเบราว์เซอร์ยิงเข้ามา: Host ต้องเป็น loopback / host ที่ bind (DNS rebinding)
+  และ POST ต้องเป็น Content-Type: application/json (form ข้ามเว็บส่งแบบนี้ไม่ได้ถ้าไม่ผ่าน CORS)
+self-check + benchmark requests/sec บน loopback: python -m services.local_api
+"""
+from __future__ import annotations
+from collections import deque
+from concurrent.futures import TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+import json
+import socket
+import threading
+import time
+
+from .sms_sender import SendResult, SmsBatcher
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BODY = 1 << 20              # 1 MB
+MAX_BATCH_REQUEST = 500         # ข้อความต่อ POST /sms
+SEND_WAIT = 120.0               # วินาทีที่ POST /sms (wait=true) รอผล
+LONG_POLL_MAX = 60.0
+SSE_KEEPALIVE = 15.0
+LOOPBACK_HOSTS = frozenset({"127.0.0.1", "localhost", "::1"})
+
+
+class EventFeed:
+    """event ล่าสุด (ring buffer) + id เพิ่มขึ้นเรื่อย ๆ ให้ long-poll / SSE รอของใหม่ได้"""
+
+    def __init__(self, capacity: int = 1000):
+        self._events: deque = deque(maxlen=capacity)
+        self._cond = threading.Condition()
+        self._last_id = 0
+        self.closed = False
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def publish(self, event: Dict[str, Any]) -> int:
+        with self._cond:
+            self._last_id += 1
+            self._events.append((self._last_id, dict(event, id=self._last_id)))
+            self._cond.notify_all()
+            return self._last_id
+
+    def since(self, after: int) -> List[Dict[str, Any]]:
+        with self._cond:
+            return [e for i, e in self._events if i > after]
+
+    def wait(self, after: int, timeout: float) -> List[Dict[str, Any]]:
+        """event ที่ id > after — ยังไม่มีก็รอได้ไม่เกิน timeout"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._last_id <= after and not self.closed:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return []
+                self._cond.wait(left)
+            return [e for i, e in self._events if i > after]
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class LocalApiServer:
+    """
+    outbox      : SmsBatcher ที่ใช้ส่ง (ของ HeadlessDaemon)
+    modems      : () → [{'port', 'state', ...}]  (พอร์ตแรกที่ state == 'connected' เป็นค่าเริ่มต้นของ POST /sms)
+    list_logs   : ฟังก์ชันแบบ sms_log.list_logs (None = ใช้ของจริง)
+    """
+
+    def __init__(self, outbox: SmsBatcher, modems: Callable[[], List[Dict[str, Any]]],
+                 host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 list_logs: Optional[Callable[..., List[Dict[str, Any]]]] = None, verbose: bool = False):
+        self.outbox = outbox
+        self.modems = modems
+        self.list_logs = list_logs
+        self.feed = EventFeed()
+        self.verbose = verbose
+        self.requests = 0
+        self.allowed_hosts = LOOPBACK_HOSTS | {host.lower()}
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.api = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._httpd.server_address[:2]
+
+    def start(self) -> "LocalApiServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="local-api", daemon=True)
+        self._thread.start()
+        print(f"Local API listening on http://{self.address[0]}:{self.address[1]}")
+        return self
+
+    def stop(self) -> None:
+        self.feed.close()
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def publish_sms(self, port: str, sender: str, message: str, received: str) -> int:
+        """เรียกเมื่อได้ SMS เข้า (จาก ModemWorker) → long-poll / SSE"""
+        return self.feed.publish({'type': 'sms', 'port': port, 'phone': sender,
+                                  'message': message, 'received': received})
+
+    # ---------- handlers (เรียกจาก thread ของ request) ----------
+    def default_port(self) -> str:
+        modems = self.modems()
+        for m in modems:
+            if m.get('state') == 'connected':
+                return m['port']
+        if len(modems) == 1:
+            return modems[0]['port']
+        raise ApiError(400, "'port' is required")
+
+    def post_sms(self, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        items = body.get("messages") if isinstance(body.get("messages"), list) else [body]
+        if not items or len(items) > MAX_BATCH_REQUEST:
+            raise ApiError(400, f"1-{MAX_BATCH_REQUEST} messages per request")
+        known = {m['port'] for m in self.modems()}
+        jobs = []
+        for item in items:
+            if not isinstance(item, dict) or not item.get("phone") or not item.get("message"):
+                raise ApiError(400, "each message needs 'phone' and 'message'")
+            port = item.get("port") or body.get("port") or self.default_port()
+            if port not in known:
+                raise ApiError(404, f"unknown port {port}")
+            jobs.append((port, str(item["phone"]), str(item["message"])))
+        futures = [self.outbox.submit(*job) for job in jobs]
+        if not body.get("wait", True):
+            return 202, {'queued': len(futures)}
+
+        deadline = time.monotonic() + SEND_WAIT
+        results = []
+        for (port, phone, message), fut in zip(jobs, futures):
+            try:
+                result: SendResult = fut.result(max(0.0, deadline - time.monotonic()))
+                results.append(dict(result.to_dict(), port=port))
+            except FutureTimeout:
+                results.append({'ok': False, 'port': port, 'phone': phone, 'message': message,
+                                'detail': 'still queued'})
+        return 200, {'results': results, 'ok': all(r['ok'] for r in results)}
+
+    def get_logs(self, q: Dict[str, str]) -> Dict[str, Any]:
+        list_logs = self.list_logs
+        if list_logs is None:
+            from .sms_log import list_logs     # lazy import (db สร้างไฟล์ตอน import)
+        direction = q.get("direction") or None
+        if direction not in (None, "inbox", "sent"):
+            raise ApiError(400, "direction must be inbox or sent")
+        try:
+            limit = min(int(q.get("limit", 100)), 5000)
+            offset = int(q.get("offset", 0))
+        except ValueError:
+            raise ApiError(400, "limit/offset must be integers")
+        if limit < 0 or offset < 0:
+            raise ApiError(400, "limit/offset must be >= 0")     # LIMIT -1 ของ SQLite = ไม่จำกัด
+        rows = list_logs(direction=direction, phone=q.get("phone") or None, keyword=q.get("keyword") or None,
+                         since=q.get("since") or None, until=q.get("until") or None,
+                         limit=limit, offset=offset, order=(q.get("order") or "DESC").upper())
+        return {'logs': rows, 'count': len(rows)}
+
+    def get_inbox(self, q: Dict[str, str]) -> Dict[str, Any]:
+        try:
+            after = int(q.get("after", 0))
+            timeout = min(float(q.get("timeout", 25)), LONG_POLL_MAX)
+        except ValueError:
+            raise ApiError(400, "after/timeout must be numbers")
+        events = self.feed.wait(after, timeout)
+        return {'events': events, 'last_id': events[-1]['id'] if events else max(after, 0)}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"          # keep-alive → client เดิมยิงต่อได้ไม่ต้องเปิด TCP ใหม่
+    server_version = "SimBoxAPI/1.0"
+
+    @property
+    def api(self) -> LocalApiServer:
+        return self.server.api
+
+    def setup(self):
+        super().setup()
+        # header กับ body ออกเป็น 2 ครั้ง → ไม่ปิด Nagle จะค้างรอ delayed ACK ~40 ms ทุก request
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, fmt, *args):
+        if self.api.verbose:
+            super().log_message(fmt, *args)
+
+    def _json(self, status: int, payload: Dict[str, Any]) -> None:
+        data = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _text(self, status: int, text: str, content_type: str) -> None:
+        data = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _metrics(self, q: Dict[str, str]) -> None:
+        from . import metrics
+        self._text(200, metrics.render(), "text/plain; version=0.0.4; charset=utf-8")
+
+    def _dispatch(self, routes: Dict[str, Callable[[Dict[str, str]], Any]]) -> None:
+        self.api.requests += 1
+        url = urlsplit(self.path)
+        q = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        handler = routes.get(url.path.rstrip("/") or "/")
+        try:
+            self._check_host()
+            if handler is None:
+                raise ApiError(404, f"no route {self.command} {url.path}")
+            result = handler(q)
+            if result is not None:
+                status, payload = result if isinstance(result, tuple) else (200, result)
+                self._json(status, payload)
+        except ApiError as e:
+            self._json(e.status, {'error': str(e)})
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        except Exception as e:
+            print(f"Local API error: {e}")
+            self._json(500, {'error': str(e)})
+
+    def do_GET(self):
+        self._dispatch({
+            "/modems": lambda q: {'modems': self.api.modems(), 'outbox': self.api.outbox.stats()},
+            "/logs": self.api.get_logs,
+            "/inbox": self.api.get_inbox,
+            "/events": self._events,
+            "/metrics": self._metrics,
+        })
+
+    def do_POST(self):
+        self._dispatch({"/sms": lambda q: self.api.post_sms(self._body())})
+
+    def _check_host(self) -> None:
+        """Host header ต้องเป็นชื่อของเครื่องนี้ (กัน DNS rebinding จากหน้าเว็บ)"""
+        host = (self.headers.get("Host") or "").strip().lower()
+        if host.startswith("["):
+            host = host[1:host.find("]")]
+        elif host.count(":") == 1:
+            host = host.rsplit(":", 1)[0]
+        if host not in self.api.allowed_hosts:
+            self.close_connection = True
+            raise ApiError(403, f"host not allowed: {host or '-'}")
+
+    def _body(self) -> Dict[str, Any]:
+        content_type = (self.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            self.close_connection = True                # ไม่รู้ว่า body ยาวเท่าไร → ใช้ connection ต่อไม่ได้
+            raise ApiError(400, "invalid Content-Length")
+        if content_type != "application/json":
+            self.close_connection = bool(length)      # body ที่ไม่อ่านค้างอยู่ในสาย → ใช้ connection ต่อไม่ได้
+            raise ApiError(415, "Content-Type must be application/json")
+        if length <= 0 or length > MAX_BODY:
+            self.close_connection = length > 0
+            raise ApiError(400 if length <= 0 else 413, "JSON body required (max 1 MB)")
+        try:
+            body = json.loads(self.rfile.read(length).decode("utf-8"))
+        except ValueError:
+            raise ApiError(400, "invalid JSON")
+        if not isinstance(body, dict):
+            raise ApiError(400, "JSON object expected")
+        return body
+
+    def _events(self, q: Dict[str, str]) -> None:
+        """SSE: ส่ง event ใหม่ทันทีที่มี, ': keepalive' ทุก SSE_KEEPALIVE วินาที จน client ปิดหรือ server หยุด"""
+        try:
+            after = int(self.headers.get("Last-Event-ID") or q.get("after", self.api.feed.last_id))
+        except ValueError:
+            raise ApiError(400, "after must be an integer")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        feed = self.api.feed
+        while not feed.closed:
+            events = feed.wait(after, SSE_KEEPALIVE)
+            if events:
+                chunk = "".join(f"id: {e['id']}\nevent: {e['type']}\ndata: {json.dumps(e, ensure_ascii=False)}\n\n"
+                                for e in events)
+                after = events[-1]['id']
+            else:
+                chunk = ": keepalive\n\n"
+            self.wfile.write(chunk.encode("utf-8"))
+            self.wfile.flush()
+
+
+# ==================== ตรวจการทำงาน / BENCHMARK (loopback) ====================
+def _fake_backend(setup_delay: float = 0.0, send_delay: float = 0.0, batch_max: int = 20):
+    """โมเด็มจำลอง 2 ตัว: ตั้งค่า text mode ใช้ setup_delay, ส่งแต่ละข้อความใช้ send_delay"""
+    setups = []
+
+    def send(port, phone, message, setup):
+        if setup:
+            setups.append(port)
+            time.sleep(setup_delay)
+        time.sleep(send_delay)
+        return SendResult(phone != "000", phone, message, "OK" if phone != "000" else "+CMS ERROR: 500")
+
+    modems = [{'port': 'SIM1', 'state': 'connected'}, {'port': 'SIM2', 'state': 'connected'}]
+    logs = [{'id': i, 'dt': f"2026-01-01 10:00:{i:02d}", 'direction': 'inbox', 'phone': '0812345678',
+             'message': f"m{i}", 'status': 'รับเข้า'} for i in range(10)]
+
+    def list_logs(direction=None, phone=None, keyword=None, since=None, until=None,
+                  limit=500, offset=0, order="DESC"):
+        rows = [r for r in logs if not since or r['dt'] >= since]
+        return rows[offset:offset + limit]
+
+    return SmsBatcher(send, batch_max), (lambda: modems), list_logs, setups
+
+
+def _request(conn, method: str, path: str, body: Optional[Dict[str, Any]] = None):
+    data = json.dumps(body).encode() if body is not None else None
+    headers = {"Content-Type": "application/json"} if data else {}
+    conn.request(method, path, body=data, headers=headers)
+    resp = conn.getresponse()
+    return resp.status, json.loads(resp.read() or b"{}")
+
+
+def self_check() -> None:
+    import http.client
+    outbox, modems, list_logs, setups = _fake_backend(setup_delay=0.05)
+    api = LocalApiServer(outbox, modems, port=0, list_logs=list_logs).start()
+    host, port = api.address
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    try:
+        status, out = _request(conn, "POST", "/sms", {"phone": "0812345678", "message": "hi"})
+        assert status == 200 and out['ok'] and out['results'][0]['port'] == 'SIM1', out
+        status, out = _request(conn, "POST", "/sms", {"port": "SIM2", "messages": [
+            {"phone": "081", "message": "a"}, {"phone": "000", "message": "b"}, {"phone": "082", "message": "c"}]})
+        assert status == 200 and [r['ok'] for r in out['results']] == [True, False, True], out
+        assert setups.count("SIM2") == 2, setups            # ชุดเดียว + ตั้งค่าใหม่หลังข้อความที่ล้มเหลว
+        assert _request(conn, "POST", "/sms", {"phone": "081"})[0] == 400
+        assert _request(conn, "POST", "/sms", {"port": "X", "phone": "1", "message": "m"})[0] == 404
+        assert _request(conn, "GET", "/nope")[0] == 404
+        conn.request("POST", "/sms", body=b'{"phone": "081", "message": "m"}',
+                     headers={"Content-Type": "text/plain"})
+        resp = conn.getresponse()
+        assert resp.status == 415, resp.status
+        resp.read()
+        conn.close()
+        conn.putrequest("POST", "/sms")
+        conn.putheader("Content-Type", "application/json")
+        conn.putheader("Content-Length", "abc")
+        conn.endheaders()
+        resp = conn.getresponse()
+        assert resp.status == 400, resp.status
+        resp.read()
+        conn.close()
+        conn.request("GET", "/modems", headers={"Host": "evil.example:8765"})
+        resp = conn.getresponse()
+        assert resp.status == 403, resp.status
+        resp.read()
+        conn.close()
+        assert _request(conn, "GET", "/modems")[0] == 200
+        status, out = _request(conn, "GET", "/modems")
+        assert status == 200 and len(out['modems']) == 2
+        status, out = _request(conn, "GET", "/logs?since=2026-01-01%2010:00:05&limit=3")
+        assert status == 200 and [r['id'] for r in out['logs']] == [5, 6, 7], out
+        assert _request(conn, "GET", "/logs?limit=-1")[0] == 400
+        assert _request(conn, "GET", "/logs?offset=-5")[0] == 400
+        conn.request("GET", "/metrics")
+        resp = conn.getresponse()
+        assert resp.status == 200 and b"# TYPE simbox_sms_send_seconds histogram" in resp.read()
+
+        # long-poll: ได้ event ที่ publish หลังเริ่มรอ
+        threading.Timer(0.2, api.publish_sms, args=("SIM1", "0899999999", "สวัสดี", "26/01/01,10:00:00")).start()
+        t = time.monotonic()
+        status, out = _request(conn, "GET", "/inbox?after=0&timeout=5")
+        assert status == 200 and out['events'][0]['message'] == "สวัสดี" and time.monotonic() - t < 2, out
+
+        # SSE: ต่อจาก id ล่าสุด แล้วได้ event ใหม่
+        sse = http.client.HTTPConnection(host, port, timeout=5)
+        sse.request("GET", f"/events?after={out['last_id']}")
+        resp = sse.getresponse()
+        assert resp.getheader("Content-Type").startswith("text/event-stream")
+        api.publish_sms("SIM2", "0811111111", "second", "26/01/01,10:00:01")
+        lines = []
+        while not lines or lines[-1] != "":
+            lines.append(resp.fp.readline().decode().rstrip("\n"))
+        assert lines[0] == f"id: {out['last_id'] + 1}" and '"second"' in lines[2], lines
+        sse.close()
+    finally:
+        conn.close()
+        api.stop()
+        outbox.shutdown()
+    print(f"self-check OK ({api.requests} requests, outbox {outbox.stats()})")
+
+
+def benchmark(clients: int = 8, seconds: float = 3.0) -> None:
+    """requests/sec บน loopback: GET /modems และ POST /sms (โมเด็มจำลอง: ตั้งค่า 30 ms, ส่ง 5 ms/ข้อความ)"""
+    import http.client
+
+    def hammer(method, path, body, api):
+        host, port = api.address
+        count = [0] * clients
+        stop = time.monotonic() + seconds
+
+        def client(i):
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            while time.monotonic() < stop:
+                status, _ = _request(conn, method, path, body)
+                assert status == 200, status
+                count[i] += 1
+            conn.close()
+
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+        t = time.monotonic()
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        return sum(count) / (time.monotonic() - t)
+
+    for label, batch_max in (("POST /sms unbatched", 1), ("POST /sms batched", 20)):
+        outbox, modems, list_logs, setups = _fake_backend(setup_delay=0.03, send_delay=0.005, batch_max=batch_max)
+        api = LocalApiServer(outbox, modems, port=0, list_logs=list_logs).start()
+        try:
+            if batch_max == 20:
+                print(f"{'GET /modems':<22}: {hammer('GET', '/modems', None, api):8.0f} req/s ({clients} clients)")
+            rps = hammer("POST", "/sms", {"port": "SIM1", "phone": "0812345678", "message": "bench"}, api)
+            print(f"{label:<22}: {rps:8.0f} req/s  outbox {outbox.stats()}")
+        finally:
+            api.stop()
+            outbox.shutdown()
+
+
+if __name__ == "__main__":
+    self_check()
+    benchmark()
@@ -0,0 +1,385 @@
+# services/metrics.py
+"""
+metrics ภายในโปรแกรม (counter / gauge / histogram แบบ bucket ตายตัว) + export เป็น Prometheus text format — ไม่มี Qt
+- ปิดอยู่เป็นค่าเริ่มต้น: ทุก inc/set/observe เช็ก flag ตัวเดียวแล้วกลับทันที (วัดได้ใน benchmark ด้านล่าง)
+  เปิดด้วย env SIMBOX_METRICS=1, settings 'metrics_enabled' (GUI), "metrics": true (headless) หรือ enable()
+- จับเวลา: start = clock() (คืน 0.0 ตอนปิด) … HIST.observe_since(start, *labels) → ตอนปิดไม่มีการอ่านนาฬิกาเลย
+- label ส่งแบบ positional ตามลำดับที่ประกาศ เช่น SERIAL_LINES.inc(port)
+- ประกาศ metric ของทั้งโปรแกรมไว้ที่นี่ที่เดียว (ชื่อ / bucket ไม่ซ้ำกัน, export ได้ครบแม้ยังเป็น 0)
+ดู: render() → text, write_textfile(path), GET /metrics ของ services/local_api.py, widgets/metrics_panel.py
+self-check + benchmark overhead: python -m services.metrics
+"""
+from __future__ import annotations
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import math
+import os
+import threading
+import time
+
+_ENABLED = os.getenv("SIMBOX_METRICS", "0") == "1"
+
+# วินาที: AT ปกติหลักสิบ ms, SMS / COPS=? หลายวินาที
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# งานในเครื่อง (เขียน DB / วาด UI): ต่ำกว่า 1 ms ถึงหลักร้อย ms
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+SIZE_BUCKETS = (1, 2, 5, 10, 20, 50)
+
+
+def enabled() -> bool:
+    return _ENABLED
+
+
+def enable(on: bool = True) -> None:
+    global _ENABLED
+    _ENABLED = bool(on)
+
+
+def clock() -> float:
+    """เวลาเริ่มสำหรับ observe_since (0.0 ตอนปิด → ไม่บันทึก)"""
+    return time.perf_counter() if _ENABLED else 0.0
+
+
+def command_name(command: str) -> str:
+    """'AT+CMGS="..."' → 'AT+CMGS' (label ไม่บานตามพารามิเตอร์)"""
+    up = (command or "").strip().upper()
+    for i, ch in enumerate(up):
+        if ch in "=?\" ":
+            return up[:i] or "AT"
+    return up[:24] or "AT"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), registry: "Registry" = None):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _check(self, key: tuple) -> None:
+        if len(key) != len(self.labels):
+            raise ValueError(f"{self.name}: expected labels {self.labels}, got {key}")
+
+    def _label_str(self, key: tuple, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = list(zip(self.labels, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def samples(self) -> Dict[tuple, object]:
+        with self._lock:
+            return dict(self._values)
+
+
+class Counter(_Metric):
+    """ค่าที่เพิ่มอย่างเดียว (ชื่อควรลงท้าย _total)"""
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        if not _ENABLED:
+            return
+        with self._lock:
+            value = self._values.get(labels)
+            if value is None:
+                self._check(labels)
+                value = 0
+            self._values[labels] = value + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{self._label_str(k)} {_format(v)}" for k, v in sorted(self.samples().items())]
+
+
+class Gauge(_Metric):
+    """ค่าปัจจุบัน — ตั้งเอง (set/inc/dec) หรือให้ fn คำนวณตอน export ({(label, ...): ค่า} หรือตัวเลข)"""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), registry: "Registry" = None,
+                 fn: Optional[Callable[[], object]] = None):
+        super().__init__(name, help, labels, registry)
+        self.fn = fn
+
+    def set(self, value: float, *labels) -> None:
+        if not _ENABLED:
+            return
+        with self._lock:
+            if labels not in self._values:
+                self._check(labels)
+            self._values[labels] = value
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        if not _ENABLED:
+            return
+        with self._lock:
+            if labels not in self._values:
+                self._check(labels)
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def samples(self) -> Dict[tuple, object]:
+        if self.fn is None:
+            return super().samples()
+        try:
+            value = self.fn()
+        except Exception as e:
+            print(f"Metrics gauge error ({self.name}): {e}")
+            return {}
+        return dict(value) if isinstance(value, dict) else {(): value}
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{self._label_str(k)} {_format(v)}" for k, v in sorted(self.samples().items())]
+
+
+class Histogram(_Metric):
+    """นับตาม bucket ตายตัว (ขอบบนรวม, เหมือน Prometheus 'le') + sum + count"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), registry: "Registry" = None,
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels) -> None:
+        if not _ENABLED:
+            return
+        i = bisect_left(self.buckets, value)      # ช่องแรกที่ value <= bound (ช่องสุดท้าย = +Inf)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                self._check(labels)
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def observe_since(self, start: float, *labels) -> None:
+        """start มาจาก clock() — 0.0 (ตอนปิด) ไม่บันทึก"""
+        if start and _ENABLED:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def samples(self) -> Dict[tuple, object]:
+        with self._lock:
+            return {k: (list(v[0]), v[1], v[2]) for k, v in self._values.items()}
+
+    def quantile(self, q: float, counts: List[int]) -> float:
+        """ประมาณ quantile จาก bucket (interpolate เชิงเส้นในช่อง เหมือน histogram_quantile)"""
+        total = sum(counts)
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for i, c in enumerate(counts):
+            if seen + c >= rank and c:
+                if i == len(self.buckets):
+                    return self.buckets[-1]          # เกิน bucket บนสุด
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / c
+            seen += c
+        return self.buckets[-1]
+
+    def render(self) -> List[str]:
+        out = []
+        for key, (counts, total, count) in sorted(self.samples().items()):
+            cumulative = 0
+            for bound, c in zip(self.buckets + (math.inf,), counts):
+                cumulative += c
+                out.append(f"{self.name}_bucket{self._label_str(key, (('le', _format(bound)),))} {cumulative}")
+            out.append(f"{self.name}_sum{self._label_str(key)} {_format(total)}")
+            out.append(f"{self.name}_count{self._label_str(key)} {count}")
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"duplicate metric {metric.name}")
+        self._metrics[metric.name] = metric
+
+    def metrics(self) -> List[_Metric]:
+        return list(self._metrics.values())
+
+    def reset(self) -> None:
+        for m in self._metrics.values():
+            m.reset()
+
+    def render(self) -> str:
+        """Prometheus text exposition format 0.0.4"""
+        lines = []
+        for m in self._metrics.values():
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> List[Dict[str, object]]:
+        """แถวสำหรับ debug panel: name, labels, kind, value (counter/gauge) หรือ count/avg/p50/p95 (histogram)"""
+        rows = []
+        for m in self._metrics.values():
+            for key, value in sorted(m.samples().items()):
+                row = {'name': m.name, 'kind': m.kind, 'labels': ", ".join(f"{k}={v}" for k, v in zip(m.labels, key))}
+                if isinstance(m, Histogram):
+                    counts, total, count = value
+                    row.update(count=count, avg=total / count if count else 0.0,
+                               p50=m.quantile(0.5, counts), p95=m.quantile(0.95, counts))
+                else:
+                    row['value'] = value
+                rows.append(row)
+        return rows
+
+    def write_textfile(self, path: str) -> None:
+        """เขียนแบบ atomic (tmp → replace) ให้ node_exporter textfile collector / สคริปต์อื่นอ่านได้ไม่เจอไฟล์ครึ่ง ๆ"""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+
+REGISTRY = Registry()
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+def snapshot() -> List[Dict[str, object]]:
+    return REGISTRY.snapshot()
+
+
+def write_textfile(path: str) -> None:
+    REGISTRY.write_textfile(path)
+
+
+def reset() -> None:
+    REGISTRY.reset()
+
+
+# ==================== METRIC ของโปรแกรม ====================
+# serial
+SERIAL_LINES = Counter("simbox_serial_lines_total", "Lines read from the modem port", ["port"])
+SERIAL_COMMANDS = Counter("simbox_serial_commands_total", "AT commands written to the modem port", ["port"])
+SERIAL_ERRORS = Counter("simbox_serial_errors_total", "Serial open/read/write errors", ["port", "kind"])
+AT_LATENCY = Histogram("simbox_at_command_seconds", "AT command round trip until final result code",
+                       ["path", "command"])
+COMMAND_QUEUE_WAIT = Histogram("simbox_command_queue_wait_seconds",
+                               "Time a command waited in the scheduler queue", ["source"])
+COMMAND_QUEUE_DEPTH = Gauge("simbox_command_queue_depth", "Commands queued in the scheduler", ["port"])
+COMMAND_TIMEOUTS = Counter("simbox_command_timeouts_total", "Scheduled commands without a final result",
+                           ["source"])
+SIGNAL_MEASURE = Histogram("simbox_signal_measure_seconds", "One signal quality measurement cycle")
+
+# sms
+SMS_SEND = Histogram("simbox_sms_send_seconds", "SMS send duration (setup + CMGS)", ["result"])
+SMS_RECEIVED = Counter("simbox_sms_received_total", "Incoming SMS notifications (+CMT / +CMTI)", ["port"])
+SMS_BATCH = Histogram("simbox_sms_batch_size", "Messages sent per outbox batch", buckets=SIZE_BUCKETS)
+SMS_OUTBOX = Gauge("simbox_sms_outbox_pending", "Messages waiting in the SMS outbox")   # fn ตั้งใน sms_sender
+MODEM_UP = Gauge("simbox_modem_up", "1 if the modem port is connected (headless daemon)", ["port"])
+
+# storage
+STORAGE_WRITE = Histogram("simbox_storage_write_seconds", "Log/measurement write time", ["table"],
+                          buckets=FAST_BUCKETS)
+
+# ui
+UI_REFRESH = Histogram("simbox_ui_refresh_seconds", "UI refresh/repaint time in the GUI thread", ["view"],
+                       buckets=FAST_BUCKETS)
+DISPLAY_LINES = Counter("simbox_display_lines_total", "Response lines routed by the display filter",
+                        ["pane", "shown"])
+
+
+# ==================== ตรวจการทำงาน / BENCHMARK ====================
+def self_check() -> None:
+    reg = Registry()
+    c = Counter("t_total", "test", ["port"], registry=reg)
+    g = Gauge("t_depth", "test", registry=reg)
+    h = Histogram("t_seconds", "test", ["op"], registry=reg, buckets=(0.1, 1.0))
+    Gauge("t_up", "test", ["port"], registry=reg, fn=lambda: {("COM3",): 1, ("COM4",): 0})
+    was = _ENABLED
+    try:
+        enable(False)
+        c.inc("COM3")
+        h.observe(0.5, "send")
+        assert c.samples() == {} and h.samples() == {} and clock() == 0.0
+        enable(True)
+        c.inc("COM3")
+        c.inc("COM3", amount=2)
+        g.set(4)
+        g.dec()
+        for v in (0.05, 0.1, 0.5, 3.0):
+            h.observe(v, "send")
+        h.observe_since(0.0, "send")                 # start จากตอนปิด → ไม่นับ
+        try:
+            c.inc()
+            raise AssertionError("label count not checked")
+        except ValueError:
+            pass
+        text = reg.render()
+        expected = [
+            '# TYPE t_total counter', 't_total{port="COM3"} 3', 't_depth 3',
+            't_seconds_bucket{op="send",le="0.1"} 2', 't_seconds_bucket{op="send",le="1"} 3',
+            't_seconds_bucket{op="send",le="+Inf"} 4', 't_seconds_count{op="send"} 4',
+            't_seconds_sum{op="send"} 3.65', 't_up{port="COM3"} 1', 't_up{port="COM4"} 0',
+        ]
+        for line in expected:
+            assert line in text.splitlines(), (line, text)
+        row = [r for r in reg.snapshot() if r['name'] == "t_seconds"][0]
+        assert row['count'] == 4 and abs(row['p50'] - 0.1) < 1e-9, row
+        assert command_name('AT+CMGS="0812"') == "AT+CMGS" and command_name("at+cops?") == "AT+COPS"
+        assert command_name("ATI") == "ATI"
+    finally:
+        enable(was)
+    print("self-check OK")
+
+
+def benchmark(n: int = 500_000) -> None:
+    """ns ต่อการเรียกตอนปิด/เปิด (เทียบกับ loop เปล่า)"""
+    reg = Registry()
+    c = Counter("b_total", "bench", ["port"], registry=reg)
+    h = Histogram("b_seconds", "bench", ["op"], registry=reg)
+    was = _ENABLED
+
+    def run(fn):
+        t = time.perf_counter()
+        for _ in range(n):
+            fn()
+        return (time.perf_counter() - t) / n * 1e9
+
+    def timed():
+        h.observe_since(clock(), "op")
+
+    try:
+        base = run(lambda: None)
+        for state in (False, True):
+            enable(state)
+            print(f"{'enabled' if state else 'disabled':<9}: counter.inc {run(lambda: c.inc('COM3')) - base:6.0f} ns"
+                  f" | clock+observe_since {run(timed) - base:6.0f} ns")
+    finally:
+        enable(was)
+
+
+if __name__ == "__main__":
+    self_check()
+    benchmark()
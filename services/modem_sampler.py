@@ -0,0 +1,459 @@
+# services/modem_sampler.py
+"""
+วัดสัญญาณหลายโมเด็มพร้อมกัน (ใช้กับ widgets/modem_dashboard.py) — ไม่มี Qt ในโมดูลนี้
+- StaggeredSchedule : เลื่อนเวลาวัดของแต่ละพอร์ตให้กระจายทั่วช่วง interval (ไม่ยิงพร้อมกันทั้ง rack)
+                      + คุมงบรวม commands/sec ทั้งระบบ (งบไม่พอ → ยืด interval ให้เอง)
+- SerialPortChannel : เปิดพอร์ตเองแล้วถาม AT+CSQ (อ่านจนเจอ OK / ERROR ไม่ sleep ตายตัว)
+- probe_channels    : ลองส่ง AT ทุกพอร์ตพร้อมกัน → เก็บเฉพาะพอร์ตที่ตอบ OK (พอร์ต diag / NMEA / BT ถูกปล่อยคืน)
+- ThreadChannel     : พอร์ตที่ SerialMonitorThread ของหน้าหลักถืออยู่ → ส่งผ่าน thread นั้น
+                      แล้วรอ +CSQ ที่ป้อนกลับมาทาง feed_line()
+- ModemSampler      : thread pool ทำงานตามตาราง → ผลลง ring buffer ที่ใช้ร่วมกัน (shared_buffer)
+                      และทยอยบันทึกลง signal_store เป็น batch
+รัน benchmark (โมเด็มจำลอง 64 ตัว × 1 วินาที): python -m services.modem_sampler
+"""
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import heapq
+import re
+import threading
+import time
+
+from .signal_buffer import SignalRingBuffer
+from .signal_urc import csq_to_dbm
+
+DEFAULT_INTERVAL = 1.0        # วินาทีต่อการวัด 1 ครั้งต่อโมเด็ม
+DEFAULT_BUDGET = 80.0         # AT commands/sec รวมทุกพอร์ต
+SPARK_CAPACITY = 900          # ≈ 15 นาทีที่ 1 วินาที
+MAX_WORKERS = 16              # I/O พร้อมกันสูงสุด (ที่เหลือรอคิว)
+COMMAND_TIMEOUT = 0.8         # รอคำตอบ AT+CSQ ต่อครั้ง (วินาที)
+PROBE_TIMEOUT = 0.3           # รอ OK จาก AT ตอน rescan (วินาที)
+REOPEN_BACKOFF = 5.0          # เปิดพอร์ตไม่ได้ → รอก่อนลองใหม่
+PERSIST_EVERY = 10.0          # บันทึกลง signal_store ทุกกี่วินาที
+
+STATUS_OK = "ok"
+STATUS_TIMEOUT = "timeout"
+STATUS_ERROR = "error"
+STATUS_IDLE = "idle"
+
+_CSQ_RE = re.compile(r'\+CSQ:\s*(\d+)\s*,\s*(\d+)')
+
+
+@dataclass
+class PortSample:
+    """ผลวัด 1 ครั้ง (field ชื่อเดียวกับ SignalMeasurement → ใช้กับ SignalRingBuffer / signal_store ได้เลย)"""
+    timestamp: str
+    rssi: int = -999
+    rsrp: int = -999
+    rsrq: int = -999
+    sinr: int = -999
+    ber: float = 99.0
+    signal_bars: int = 0
+    quality_score: float = 0.0
+
+
+def sample_from_csq(rssi_raw: int, ber_raw: int) -> PortSample:
+    """ค่า +CSQ → PortSample (สูตร bars / quality เดียวกับหน้าต่าง Signal Quality)"""
+    rssi = csq_to_dbm(rssi_raw)
+    ber = 99.0 if ber_raw == 99 else float(ber_raw)
+    s = PortSample(timestamp=datetime.now().strftime("%H:%M:%S"), rssi=rssi, ber=ber)
+    if rssi != -999:
+        s.signal_bars = sum(rssi >= t for t in (-110, -100, -90, -80, -70))
+        rssi_score = max(0, min(100, (rssi + 113) * 100 / 62))
+        ber_score = max(0, min(100, 100 - ber * 10)) if ber < 99 else 50
+        s.quality_score = rssi_score * 0.7 + ber_score * 0.3
+    return s
+
+
+# ==================== ring buffer ที่ใช้ร่วมกัน ====================
+_buffers_lock = threading.Lock()
+_buffers: Dict[str, SignalRingBuffer] = {}
+
+
+def shared_buffer(port: str, capacity: int = SPARK_CAPACITY) -> SignalRingBuffer:
+    """ring buffer ของพอร์ตนี้ (สร้างครั้งแรกที่ขอ) — เปิด dashboard ใหม่ยังเห็นประวัติเดิม"""
+    with _buffers_lock:
+        buf = _buffers.get(port)
+        if buf is None:
+            buf = _buffers[port] = SignalRingBuffer(capacity)
+        return buf
+
+
+# ==================== ตารางเวลา ====================
+class StaggeredSchedule:
+    """
+    คิวเวลาวัดของทุกพอร์ต (heap ตามเวลาถึงกำหนด)
+    พอร์ตที่ i จาก N เริ่มที่ offset i × interval / N → โหลดกระจายสม่ำเสมอ
+    """
+
+    def __init__(self, ports: Sequence[str] = (), interval: float = DEFAULT_INTERVAL,
+                 budget: float = DEFAULT_BUDGET):
+        self.interval = float(interval)
+        self.budget = float(budget)
+        self._heap: List[Tuple[float, int, str]] = []
+        self._seq = 0
+        self._tokens = 0.0
+        self._refill_ts = time.monotonic()
+        self.set_ports(ports)
+
+    @property
+    def effective_interval(self) -> float:
+        """interval จริง: ไม่ถี่กว่าที่งบ commands/sec รองรับ (1 คำสั่งต่อการวัด)"""
+        n = len(self._heap)
+        if n == 0 or self.budget <= 0:
+            return self.interval
+        return max(self.interval, n / self.budget)
+
+    @property
+    def ports(self) -> List[str]:
+        return [p for _, _, p in self._heap]
+
+    def set_ports(self, ports: Sequence[str], now: Optional[float] = None) -> None:
+        ports = list(dict.fromkeys(ports))
+        now = time.monotonic() if now is None else now
+        self._heap = []
+        n = len(ports)
+        step = (max(self.interval, n / self.budget) if self.budget > 0 and n else self.interval) / max(1, n)
+        for i, port in enumerate(ports):
+            self._push(now + i * step, port)
+
+    def set_rate(self, interval: float, budget: float, now: Optional[float] = None) -> None:
+        """เปลี่ยน interval / งบ → จัด offset ใหม่ทั้งหมด"""
+        self.interval = max(0.05, float(interval))
+        self.budget = max(0.0, float(budget))
+        self.set_ports(self.ports, now)
+
+    def _push(self, due: float, port: str) -> None:
+        self._seq += 1
+        heapq.heappush(self._heap, (due, self._seq, port))
+
+    def next_due(self) -> Optional[float]:
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: Optional[float] = None) -> List[str]:
+        """พอร์ตที่ถึงเวลาแล้ว (ไม่เกินงบ token ที่สะสมไว้) — เลื่อนรอบถัดไปให้เลย"""
+        now = time.monotonic() if now is None else now
+        if self.budget > 0:
+            # burst ได้ไม่เกิน 1/10 วินาทีของงบ → ช่วงที่ค้าง (เช่น GC / suspend) ไม่กลายเป็นพายุคำสั่ง
+            cap = max(1.0, self.budget / 10)
+            self._tokens = min(cap, self._tokens + (now - self._refill_ts) * self.budget)
+        self._refill_ts = now
+        period = self.effective_interval
+        out = []
+        while self._heap and self._heap[0][0] <= now:
+            if self.budget > 0 and self._tokens < 1:
+                break
+            due, _, port = heapq.heappop(self._heap)
+            self._tokens -= 1
+            nxt = due + period
+            if nxt <= now:
+                # ตามไม่ทัน → ข้ามรอบที่พลาด แต่รักษา phase เดิม (ไม่ให้ทุกพอร์ตมากองที่เวลาเดียวกัน)
+                nxt += ((now - nxt) // period + 1) * period
+            self._push(nxt, port)
+            out.append(port)
+        return out
+
+
+# ==================== ช่องทางสื่อสาร ====================
+class SerialPortChannel:
+    """พอร์ตที่ไม่มีใครเปิดอยู่ → เปิดเองค้างไว้ (เปิดครั้งเดียว ไม่ open/close ทุกรอบ)"""
+
+    def __init__(self, port: str, baudrate: int = 115200):
+        self.port = port
+        self.baudrate = baudrate
+        self._ser = None
+        self._retry_at = 0.0
+
+    def _open(self) -> bool:
+        if self._ser is not None:
+            return True
+        if time.monotonic() < self._retry_at:
+            return False
+        try:
+            import serial      # lazy import (benchmark รันได้โดยไม่มี pyserial)
+            self._ser = serial.Serial(self.port, self.baudrate, timeout=0.05, write_timeout=0.5)
+            return True
+        except Exception as e:
+            print(f"Error opening {self.port}: {e}")
+            self._retry_at = time.monotonic() + REOPEN_BACKOFF
+            return False
+
+    def probe(self, timeout: float = PROBE_TIMEOUT) -> bool:
+        """ส่ง AT สั้น ๆ → True ถ้าตอบ OK (เป็นพอร์ต AT จริง); ไม่ตอบ → ปิดพอร์ตคืนทันที"""
+        if not self._open():
+            return False
+        buf = ""
+        try:
+            self._ser.reset_input_buffer()
+            self._ser.write(b"AT\r\n")
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline and "OK" not in buf and "ERROR" not in buf:
+                chunk = self._ser.read(self._ser.in_waiting or 1)
+                if chunk:
+                    buf += chunk.decode(errors="ignore")
+        except Exception as e:
+            print(f"Error probing {self.port}: {e}")
+        if "OK" in buf:
+            return True
+        self.close()
+        return False
+
+    def query_csq(self, timeout: float = COMMAND_TIMEOUT) -> Optional[Tuple[int, int]]:
+        """(rssi_raw, ber_raw) หรือ None (หมดเวลา) — โยน exception ถ้าพอร์ตใช้ไม่ได้"""
+        if not self._open():
+            raise IOError(f"{self.port} not available")
+        try:
+            self._ser.reset_input_buffer()
+            self._ser.write(b"AT+CSQ\r\n")
+            deadline = time.monotonic() + timeout
+            buf = ""
+            while time.monotonic() < deadline:
+                chunk = self._ser.read(self._ser.in_waiting or 1)
+                if not chunk:
+                    continue
+                buf += chunk.decode(errors="ignore")
+                m = _CSQ_RE.search(buf)
+                if m:
+                    return int(m.group(1)), int(m.group(2))
+                if "ERROR" in buf:
+                    raise IOError(f"{self.port}: {buf.strip()}")
+            return None
+        except Exception:
+            self.close()
+            self._retry_at = time.monotonic() + REOPEN_BACKOFF
+            raise
+
+    def close(self) -> None:
+        try:
+            if self._ser is not None:
+                self._ser.close()
+        except Exception:
+            pass
+        self._ser = None
+
+
+def probe_channels(ports: Sequence[str], baudrate: int = 115200,
+                   timeout: float = PROBE_TIMEOUT) -> Dict[str, SerialPortChannel]:
+    """probe ทุกพอร์ตพร้อมกัน (ใช้เวลารวม ≈ timeout เดียว) → {port: channel ที่ตอบ OK}"""
+    ports = list(ports)
+    if not ports:
+        return {}
+    channels = [SerialPortChannel(port, baudrate) for port in ports]
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(channels)),
+                            thread_name_prefix="probe") as pool:
+        answered = list(pool.map(lambda ch: ch.probe(timeout), channels))
+    return {ch.port: ch for ch, ok in zip(channels, answered) if ok}
+
+
+class ThreadChannel:
+    """พอร์ตที่ SerialMonitorThread ถืออยู่ (เปิดซ้ำไม่ได้) → ฝากส่งแล้วรอ +CSQ จาก feed_line()"""
+
+    def __init__(self, port: str, send: Callable[[str], bool]):
+        self.port = port
+        self._send = send
+        self._event = threading.Event()
+        self._last: Optional[Tuple[int, int]] = None
+
+    def feed_line(self, line: str) -> None:
+        """ต่อกับ at_response_signal ของ serial thread (ทุกบรรทัด; ที่ไม่ใช่ +CSQ ถูกข้าม)"""
+        m = _CSQ_RE.search(line or "")
+        if m:
+            self._last = (int(m.group(1)), int(m.group(2)))
+            self._event.set()
+
+    def query_csq(self, timeout: float = COMMAND_TIMEOUT) -> Optional[Tuple[int, int]]:
+        self._event.clear()
+        if not self._send("AT+CSQ"):
+            raise IOError(f"{self.port}: send failed")
+        return self._last if self._event.wait(timeout) else None
+
+    def close(self) -> None:
+        pass
+
+
+@dataclass
+class PortStatus:
+    state: str = STATUS_IDLE
+    version: int = 0            # เพิ่มทุกครั้งที่มี sample ใหม่ → GUI วาดเฉพาะ tile ที่เปลี่ยน
+    samples: int = 0
+    failures: int = 0
+    last_error: str = ""
+
+
+# ==================== ตัววัดหลัก ====================
+class ModemSampler:
+    """
+    วัดทุกพอร์ตตาม StaggeredSchedule ด้วย thread pool
+    พอร์ตที่งานรอบก่อนยังไม่เสร็จ → ข้ามรอบนี้ (ไม่ต่อคิวซ้อน) และนับเป็น skipped
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, budget: float = DEFAULT_BUDGET,
+                 max_workers: int = MAX_WORKERS, persist: bool = True):
+        self.schedule = StaggeredSchedule((), interval, budget)
+        self.max_workers = max_workers
+        self.persist = persist
+        self.channels: Dict[str, object] = {}
+        self.status: Dict[str, PortStatus] = {}
+        self.sent = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._in_flight: set = set()
+        self._pending: Dict[str, List[tuple]] = {}
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    # ---------- ตั้งค่า ----------
+    def set_channels(self, channels: Dict[str, object]) -> None:
+        """แทนที่ชุดพอร์ตทั้งหมด (ช่องทางเดิมที่ไม่อยู่ในชุดใหม่ถูกปิด)"""
+        with self._lock:
+            for port, ch in self.channels.items():
+                if channels.get(port) is not ch:
+                    ch.close()
+            self.channels = dict(channels)
+            for port in self.channels:
+                self.status.setdefault(port, PortStatus())
+            self.schedule.set_ports(list(self.channels))
+        self._wake.set()
+
+    def set_rate(self, interval: float, budget: float) -> None:
+        with self._lock:
+            self.schedule.set_rate(interval, budget)
+        self._wake.set()
+
+    # ---------- loop ----------
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def run(self) -> None:
+        """loop หลัก (เรียกจาก worker thread) → คืนเมื่อ stop()"""
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="modem")
+        last_flush = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                with self._lock:
+                    due = self.schedule.pop_due(now)
+                    nxt = self.schedule.next_due()
+                for port in due:
+                    self._dispatch(port)
+                if self.persist and now - last_flush >= PERSIST_EVERY:
+                    self.flush()
+                    last_flush = now
+                wait = 0.25 if nxt is None else min(0.25, max(0.0, nxt - time.monotonic()))
+                self._wake.wait(wait)
+                self._wake.clear()
+        finally:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            if self.persist:
+                self.flush()
+            with self._lock:
+                for ch in self.channels.values():
+                    ch.close()
+
+    def _dispatch(self, port: str) -> None:
+        with self._lock:
+            ch = self.channels.get(port)
+            if ch is None:
+                return
+            if port in self._in_flight:
+                self.skipped += 1
+                return
+            self._in_flight.add(port)
+            self.sent += 1
+        self._executor.submit(self._sample, port, ch)
+
+    def _sample(self, port: str, channel) -> None:
+        try:
+            try:
+                csq = channel.query_csq()
+                err = "" if csq else "no response"
+            except Exception as e:
+                csq, err = None, str(e)
+            sample = sample_from_csq(*csq) if csq else None
+            if sample is not None:
+                shared_buffer(port).append(sample)
+            with self._lock:
+                st = self.status.setdefault(port, PortStatus())
+                if sample is not None:
+                    st.state, st.last_error = STATUS_OK, ""
+                    st.samples += 1
+                    st.version += 1
+                    if self.persist:
+                        self._pending.setdefault(port, []).append((sample, int(time.time())))
+                else:
+                    st.state = STATUS_TIMEOUT if err == "no response" else STATUS_ERROR
+                    st.last_error = err
+                    st.failures += 1
+                    st.version += 1
+        finally:
+            with self._lock:
+                self._in_flight.discard(port)
+
+    def flush(self) -> None:
+        """บันทึก sample ที่ค้างลง signal_store (1 transaction ต่อพอร์ต)"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            from .signal_store import append_measurements, series_key
+            for port, samples in pending.items():
+                append_measurements(series_key(None, port), samples)
+        except Exception as e:
+            print(f"Error saving dashboard samples: {e}")
+
+    def snapshot(self) -> Dict[str, PortStatus]:
+        with self._lock:
+            return {p: PortStatus(**vars(s)) for p, s in self.status.items()}
+
+
+# ==================== BENCHMARK ====================
+class _FakeChannel:
+    """โมเด็มจำลอง: ตอบช้า latency วินาที และจำว่าถูกถามเมื่อไร"""
+
+    def __init__(self, latency: float, log: List[float]):
+        self.latency = latency
+        self.log = log
+
+    def query_csq(self, timeout: float = COMMAND_TIMEOUT):
+        self.log.append(time.monotonic())
+        time.sleep(self.latency)
+        return 18, 99
+
+    def close(self) -> None:
+        pass
+
+
+def benchmark(modems: int = 64, interval: float = 1.0, budget: float = DEFAULT_BUDGET,
+              seconds: float = 5.0, latency: float = 0.06) -> None:
+    """rate ที่ทำได้จริง + ความสม่ำเสมอของโหลด (จำนวนคำสั่งต่อช่วง 100 ms)"""
+    log: List[float] = []
+    sampler = ModemSampler(interval, budget, persist=False)
+    sampler.set_channels({f"SIM{i:02d}": _FakeChannel(latency, log) for i in range(modems)})
+    worker = threading.Thread(target=sampler.run, daemon=True)
+    t0 = time.monotonic()
+    worker.start()
+    time.sleep(seconds)
+    sampler.stop()
+    worker.join()
+    steady = [t - t0 for t in log if 1.0 <= t - t0 < seconds]
+    slots = [0] * int((seconds - 1.0) * 10)
+    for t in steady:
+        slots[min(len(slots) - 1, int((t - 1.0) * 10))] += 1
+    per_port = min(st.samples for st in sampler.snapshot().values())
+    print(f"{modems} modems × {interval:.1f} s, budget {budget:.0f}/s, latency {latency * 1000:.0f} ms")
+    print(f"  effective interval : {sampler.schedule.effective_interval:.2f} s")
+    print(f"  achieved rate      : {len(steady) / (seconds - 1.0):.1f} cmd/s  (skipped {sampler.skipped})")
+    print(f"  per 100 ms         : min {min(slots)} / max {max(slots)} commands")
+    print(f"  samples per modem  : ≥ {per_port}")
+
+
+if __name__ == "__main__":
+    benchmark()
+    benchmark(budget=32)
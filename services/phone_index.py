@@ -0,0 +1,101 @@
+# services/phone_index.py
+"""
+index เบอร์โทรสำหรับค้นหา log
+- phone_key: เบอร์รูปแบบเดียว (0xxxxxxxxx) ใช้เป็นคีย์ใน SQLite/CSV และคีย์ conversation
+- phone_search_keys: แปลงคำค้น (+66 / 66 / 0 / ท้ายเบอร์) → prefix/suffix ที่ต้องหา
+- PhoneIndex: index ในหน่วยความจำ (ใช้กับโหมดอ่าน CSV)
+"""
+from __future__ import annotations
+from bisect import bisect_left
+from typing import Iterable, List, Optional, Set, Tuple
+import re
+
+_NON_DIGIT = re.compile(r"\D+")
+_PHONE_CHARS = re.compile(r"^[\d\s\-\+\(\)]+$")
+
+MIN_DIGITS = 3   # ค้นหาด้วย index เมื่อมีตัวเลขอย่างน้อย 3 หลัก
+
+
+def phone_key(phone) -> str:
+    """
+    เบอร์ → 0xxxxxxxxx (ตัวเลขล้วน)
+    ผู้ส่งที่ไม่ใช่เบอร์ (เช่น 'AIS') คืนชื่อเดิม → ใช้เป็นคีย์ conversation ได้
+    และไม่ชนกับช่วงค้นหาแบบตัวเลข
+    """
+    digits = _NON_DIGIT.sub("", str(phone or ""))
+    if not digits:
+        return str(phone or "").strip()
+    if digits.startswith("66") and len(digits) >= 11:
+        digits = "0" + digits[2:]
+    elif len(digits) == 9 and not digits.startswith("0"):
+        digits = "0" + digits
+    return digits
+
+
+def is_phone_query(query: str) -> bool:
+    """คำค้นเป็นเบอร์ (ตัวเลข/+/-/วรรค และมีตัวเลขพอ) หรือไม่"""
+    q = (query or "").strip()
+    if not q or not _PHONE_CHARS.match(q):
+        return False
+    return len(_NON_DIGIT.sub("", q)) >= MIN_DIGITS
+
+
+def phone_search_keys(query: str) -> Optional[Tuple[Set[str], Set[str]]]:
+    """
+    คืน (prefixes, suffixes) สำหรับค้นหาใน phone_key
+      '+66653988461' / '66653988461' → prefix '0653988461'
+      '0653'                          → prefix '0653' (และ suffix '0653')
+      '653988461' (9 หลัก)            → prefix '0653988461'
+      '8461'                          → suffix '8461' (และ prefix '8461')
+    คืน None ถ้าไม่ใช่คำค้นแบบเบอร์
+    """
+    if not is_phone_query(query):
+        return None
+    q = query.strip()
+    digits = _NON_DIGIT.sub("", q)
+    prefixes: Set[str] = set()
+    suffixes: Set[str] = {digits}
+
+    if q.startswith("+66") or (digits.startswith("66") and len(digits) >= 11):
+        # ระบุรหัสประเทศ = ต้นเบอร์แน่นอน → หาแบบ prefix อย่างเดียว
+        prefixes.add("0" + digits[2:])
+        suffixes = set()
+    elif digits.startswith("66"):
+        # '66xx' สั้น ๆ → อาจเป็น +66 ที่พิมพ์ไม่ครบ หรือเลขกลาง/ท้ายเบอร์
+        prefixes.update({digits, "0" + digits[2:]} if len(digits) > 2 else {digits})
+    elif digits.startswith("0"):
+        prefixes.add(digits)
+    elif len(digits) == 9:
+        prefixes.add("0" + digits)
+    else:
+        prefixes.add(digits)
+    return prefixes, suffixes
+
+
+def prefix_upper(prefix: str) -> str:
+    """ขอบบนของช่วง prefix (ใช้กับ range scan: key >= p AND key < upper)"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1) if prefix else "\uffff"
+
+
+class PhoneIndex:
+    """index prefix/suffix ของ phone_key บนลิสต์แถว (ตำแหน่งอ้างอิงตามลิสต์เดิม)"""
+
+    def __init__(self, phones: Iterable[str]):
+        keys = [(phone_key(p), i) for i, p in enumerate(phones)]
+        self._fwd = sorted(keys)
+        self._rev = sorted((k[::-1], i) for k, i in keys)
+
+    @staticmethod
+    def _range(arr, prefix) -> List[int]:
+        lo = bisect_left(arr, (prefix,))
+        hi = bisect_left(arr, (prefix_upper(prefix),))
+        return [i for _, i in arr[lo:hi]]
+
+    def lookup(self, prefixes: Iterable[str], suffixes: Iterable[str]) -> List[int]:
+        """คืนตำแหน่งแถวที่ตรง (เรียงตามลำดับเดิมของลิสต์)"""
+        hits: Set[int] = set()
+        for p in prefixes:
+            hits.update(self._range(self._fwd, p))
+        for s in suffixes:
+            hits.update(self._range(self._rev, s[::-1]))
+        return sorted(hits)
@@ -0,0 +1,202 @@
+# services/query_cache.py
+"""
+รวมคำถามซ้ำแบบอ่านอย่างเดียว (AT+CSQ / AT+CREG? / AT+CPIN? / AT+COPS? ...) ของพอร์ตเดียวกัน
+- คำสั่งเดียวกันกำลังรอคำตอบอยู่ → รอคำตอบเดียวกัน (single-flight) ไม่ส่งซ้ำ
+- เพิ่งได้คำตอบไม่เกิน TTL ของคำสั่งนั้น → ใช้คำตอบเดิมเลย ไม่ต้องถามโมเด็ม
+- คำสั่งที่เปลี่ยนสถานะโมเด็ม (AT+CFUN / AT+COPS= / AT+CPIN= ...) หรือ +CPIN เปลี่ยน → ล้างของพอร์ตนั้น
+ใช้ร่วมกันทั้ง CommandScheduler, หน้าต่าง Signal Quality และ sim_model / PortManager
+→ ลดเวลาที่ช่อง AT ถูกจองด้วยงานเบื้องหลัง ให้ SMS ได้ใช้ก่อน — ไม่มี Qt
+"""
+from __future__ import annotations
+from typing import Callable, Dict, Optional, Tuple
+import threading
+import time
+
+from .at_transport import is_final_result
+
+# คำสั่งที่รวมได้ → อายุคำตอบ (วินาที)
+READ_ONLY_TTL = {
+    "AT+CSQ": 2.0,
+    "AT+CESQ": 2.0,
+    "AT+CREG?": 5.0,
+    "AT+CGREG?": 5.0,
+    "AT+CEREG?": 5.0,
+    "AT+CPIN?": 5.0,
+    "AT+COPS?": 30.0,
+}
+
+# คำสั่งที่ทำให้คำตอบเดิมของพอร์ตใช้ไม่ได้
+MUTATING_PREFIXES = ("AT+CFUN", "AT+COPS=", "AT+CPIN=", "AT+CREG=", "AT+CGATT", "ATZ", "AT&F")
+
+
+def normalize(command: str) -> str:
+    return (command or "").strip().upper()
+
+
+def ttl_for(command: str) -> Optional[float]:
+    """TTL ของคำสั่งที่รวมได้ / None = ห้ามรวม"""
+    return READ_ONLY_TTL.get(normalize(command))
+
+
+def is_mutating(command: str) -> bool:
+    return normalize(command).startswith(MUTATING_PREFIXES)
+
+
+def is_success(response: str) -> bool:
+    """เก็บเฉพาะคำตอบที่จบด้วย OK (ERROR / หมดเวลา ไม่ cache)"""
+    lines = [l.strip() for l in (response or "").replace("\r", "\n").split("\n") if l.strip()]
+    return bool(lines) and lines[-1].upper() == "OK" and is_final_result(lines[-1])
+
+
+class _Pending:
+    __slots__ = ("event", "response", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.response: Optional[str] = None
+        self.waiters = 0
+
+
+class QueryCoalescer:
+    """คำตอบล่าสุด + คำถามที่กำลังรอ ต่อ (port, command)"""
+
+    def __init__(self, ttl: Optional[Dict[str, float]] = None):
+        self.ttl = dict(READ_ONLY_TTL if ttl is None else ttl)
+        self._lock = threading.Lock()
+        self._answers: Dict[Tuple[str, str], Tuple[float, str]] = {}
+        self._pending: Dict[Tuple[str, str], _Pending] = {}
+        self.hits = 0           # ตอบจาก cache
+        self.shared = 0         # รอคำตอบของคำถามที่กำลังวิ่งอยู่
+        self.misses = 0         # ถามโมเด็มจริง
+
+    def _key(self, port: str, command: str) -> Tuple[str, str]:
+        return (port or "", normalize(command))
+
+    def coalescable(self, command: str) -> bool:
+        return normalize(command) in self.ttl
+
+    def get(self, port: str, command: str) -> Optional[str]:
+        """คำตอบที่ยังไม่หมดอายุ หรือ None"""
+        key = self._key(port, command)
+        ttl = self.ttl.get(key[1])
+        if ttl is None:
+            return None
+        with self._lock:
+            hit = self._answers.get(key)
+            if hit is not None and time.monotonic() - hit[0] < ttl:
+                self.hits += 1
+                return hit[1]
+        return None
+
+    def record(self, port: str, command: str, response: str) -> None:
+        """เก็บคำตอบที่ได้มาจากทางไหนก็ได้ (เฉพาะคำสั่งที่รวมได้และตอบ OK)"""
+        key = self._key(port, command)
+        if key[1] in self.ttl and is_success(response):
+            with self._lock:
+                self._answers[key] = (time.monotonic(), response)
+
+    def invalidate(self, port: Optional[str] = None, command: Optional[str] = None) -> None:
+        cmd = normalize(command) if command else None
+        with self._lock:
+            for key in list(self._answers):
+                if (port is None or key[0] == port) and (cmd is None or key[1] == cmd):
+                    del self._answers[key]
+
+    def note_command(self, port: str, command: str) -> None:
+        """เรียกทุกครั้งที่ส่งคำสั่ง — คำสั่งที่เปลี่ยนสถานะ → ล้างคำตอบเดิมของพอร์ต"""
+        if is_mutating(command):
+            self.invalidate(port)
+
+    def query(self, port: str, command: str, fetch: Callable[[], str],
+              wait_timeout: float = 30.0) -> str:
+        """
+        คำตอบของ command บน port: จาก cache / รอคำถามเดียวกันที่วิ่งอยู่ / เรียก fetch() เอง
+        คำสั่งที่รวมไม่ได้ → fetch() ตรง ๆ
+        """
+        if not self.coalescable(command):
+            self.note_command(port, command)
+            return fetch()
+        cached = self.get(port, command)
+        if cached is not None:
+            return cached
+        key = self._key(port, command)
+        with self._lock:
+            pending = self._pending.get(key)
+            leader = pending is None
+            if leader:
+                pending = self._pending[key] = _Pending()
+                self.misses += 1
+            else:
+                pending.waiters += 1
+                self.shared += 1
+        if not leader:
+            pending.event.wait(wait_timeout)
+            return pending.response if pending.response is not None else "ERROR: No response"
+        try:
+            response = fetch()
+            pending.response = response
+            self.record(port, command, response)
+            return response
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+            pending.event.set()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'shared': self.shared, 'misses': self.misses,
+                    'cached': len(self._answers), 'pending': len(self._pending)}
+
+
+_default = QueryCoalescer()
+
+
+def default_coalescer() -> QueryCoalescer:
+    return _default
+
+
+def query(port: str, command: str, fetch: Callable[[], str]) -> str:
+    return _default.query(port, command, fetch)
+
+
+def record(port: str, command: str, response: str) -> None:
+    _default.record(port, command, response)
+
+
+def invalidate(port: Optional[str] = None, command: Optional[str] = None) -> None:
+    _default.invalidate(port, command)
+
+
+# ==================== ตรวจการทำงาน ====================
+def self_check() -> None:
+    calls = []
+
+    def slow_csq():
+        calls.append(1)
+        time.sleep(0.1)
+        return "+CSQ: 20,99\nOK"
+
+    qc = QueryCoalescer()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(qc.query("COM1", "at+csq ", slow_csq)))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1 and len(set(results)) == 1 and len(results) == 8, (calls, results)
+    assert qc.query("COM1", "AT+CSQ", slow_csq) == results[0] and len(calls) == 1     # TTL
+    assert qc.query("COM2", "AT+CSQ", slow_csq) and len(calls) == 2                    # คนละพอร์ต
+    qc.note_command("COM1", "AT+CFUN=1,1")
+    assert qc.get("COM1", "AT+CSQ") is None and qc.get("COM2", "AT+CSQ") is not None
+    qc.query("COM1", "AT+CPIN?", lambda: "ERROR")
+    assert qc.get("COM1", "AT+CPIN?") is None                                          # ERROR ไม่ cache
+    n = len(calls)
+    qc.query("COM1", "AT+CMGS=\"0812345678\"", lambda: calls.append(1) or "> ")
+    qc.query("COM1", "AT+CMGS=\"0812345678\"", lambda: calls.append(1) or "> ")
+    assert len(calls) == n + 2                                                         # ไม่รวมคำสั่งเขียน
+    print(f"self-check OK {qc.stats()}")
+
+
+if __name__ == "__main__":
+    self_check()
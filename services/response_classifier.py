@@ -0,0 +1,267 @@
+# services/response_classifier.py
+"""
+จำแนกบรรทัดที่อ่านจากโมเด็มครั้งเดียว ใช้ร่วมกันทุกชั้น — ไม่มี Qt
+เดิมแต่ละบรรทัดผ่าน SerialMonitorThread.process_received_line → SmartCommandManager →
+DisplayFilterManager → EnhancedDisplayFilterManager และทุกชั้น upper() แล้ว any(x in line ...) เอง
+ตอนนี้:
+- ตาราง prefix ทุกชั้นรวมเป็น regex alternation เดียว (compile ตอน import) + dict สำหรับบรรทัดที่ตรงทั้งบรรทัด
+- classify(line) → LineTag (frozen) บอกหมวด, prefix, ธงของแต่ละชั้น — สแกนบรรทัดรอบเดียว
+- บรรทัดซ้ำ ๆ (OK, +CSQ: 20,99 ...) ได้ LineTag เดิมจาก LRU → ชั้นถัดไปเรียกซ้ำแทบไม่มีค่าใช้จ่าย
+benchmark / ตรวจผลเทียบวิธีเดิม: python -m services.response_classifier
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, FrozenSet, Tuple
+import re
+
+# หมวดของบรรทัด
+SMS = "SMS"
+SIGNAL = "SIGNAL"               # สัญญาณ / เครือข่าย
+SIM_INFO = "SIM_INFO"           # ICCID / IMSI / เบอร์
+SIM_STATUS = "SIM_STATUS"       # +CPIN:
+MODULE_INFO = "MODULE_INFO"     # ผู้ผลิต / รุ่น / IMEI
+SIM_FAILURE = "SIM_FAILURE"
+FINAL = "FINAL"                 # OK / ERROR / +CME ERROR: / +CMS ERROR:
+ECHO = "ECHO"                   # echo ของคำสั่ง monitoring
+OTHER = "OTHER"
+
+# ปลายทางที่ EnhancedDisplayFilterManager ส่งต่อ
+ROUTE_MANUAL = "MANUAL"
+ROUTE_SMS = "SMS"
+ROUTE_SIGNAL = "SIGNAL_QUALITY"
+
+TOKENS: Dict[str, str] = {
+    '+CMTI:': SMS, '+CMT:': SMS, '+CMGR:': SMS, '+CMGL:': SMS,
+    '+CMGS:': SMS, '+CMSS:': SMS, '+CMS ERROR:': SMS,
+    '+CSQ:': SIGNAL, '+CESQ:': SIGNAL, '+COPS:': SIGNAL, '+CREG:': SIGNAL,
+    '+QCSQ:': SIGNAL, '+QENG:': SIGNAL, '+QNWINFO:': SIGNAL,
+    '+CIMI:': SIM_INFO, '+CCID:': SIM_INFO, '+QCCID:': SIM_INFO, '+CNUM:': SIM_INFO,
+    '+CPIN:': SIM_STATUS,
+    '+CGMI:': MODULE_INFO, '+CGMM:': MODULE_INFO, '+CGMR:': MODULE_INFO, '+CGSN:': MODULE_INFO,
+    '+CME ERROR:': FINAL,
+    'NO SIM': SIM_FAILURE, 'SIM NOT INSERTED': SIM_FAILURE, 'SIM FAILURE': SIM_FAILURE,
+}
+
+# บรรทัดที่ต้องตรงทั้งบรรทัด (หลัง strip + upper)
+WHOLE_LINES: Dict[str, str] = {
+    'OK': FINAL, 'ERROR': FINAL,
+    'AT+CSQ': ECHO, 'AT+CESQ': ECHO, 'AT+COPS?': ECHO, 'AT+CREG?': ECHO,
+}
+
+# ชุด prefix ของแต่ละชั้น (ใช้ทั้งใน LineTag และให้โค้ดเดิมอ้างถึง)
+SIGNAL_ROUTE_PREFIXES: FrozenSet[str] = frozenset(
+    t for t, c in TOKENS.items() if c in (SIGNAL, SIM_INFO))                      # SmartCommandManager
+BACKGROUND_PREFIXES: FrozenSet[str] = frozenset(
+    t for t, c in TOKENS.items() if c in (SIGNAL, SIM_INFO, SIM_STATUS, MODULE_INFO))  # DisplayFilterManager
+SMS_PREFIXES: FrozenSet[str] = frozenset(t for t, c in TOKENS.items() if c == SMS)
+
+# prefix ยาวก่อน: '+CMTI:' ต้องไม่ถูกตัดเป็น '+CMT' ฯลฯ
+_TOKEN_RE = re.compile("|".join(re.escape(t) for t in sorted(TOKENS, key=len, reverse=True)))
+_BARE_CSQ_RE = re.compile(r'^\d+,\d+$')           # คำตอบ CSQ แบบตัวเลขล้วน เช่น "14,99"
+_COPS_SELECTED_RE = re.compile(r'\+COPS:\s*\d+,\d+,"[^"]*"')
+
+
+@dataclass(frozen=True)
+class LineTag:
+    text: str                       # บรรทัดหลัง strip
+    upper: str
+    category: str                   # หมวดจาก prefix แรก / ทั้งบรรทัด
+    prefix: str = ""                # token แรกที่เจอ ('' ถ้าไม่มี)
+    at_start: bool = False          # prefix อยู่ต้นบรรทัด
+    tokens: FrozenSet[str] = frozenset()
+    categories: FrozenSet[str] = frozenset()
+    final: str = ""                 # 'OK' / 'ERROR' / 'CME' / 'CMS' / ''
+    bare_csq: bool = False
+
+    @property
+    def is_final(self) -> bool:
+        return bool(self.final)
+
+    @property
+    def is_ok_or_error(self) -> bool:
+        return self.final in ('OK', 'ERROR')
+
+    @property
+    def sms(self) -> bool:
+        return SMS in self.categories
+
+    @property
+    def sms_event(self) -> bool:
+        """บรรทัดขึ้นต้นด้วย prefix เหตุการณ์ SMS (ให้ผ่านไป SMS Monitor)"""
+        return self.at_start and self.category == SMS
+
+    @property
+    def signal(self) -> bool:
+        return SIGNAL in self.categories
+
+    @property
+    def sim_info(self) -> bool:
+        return SIM_INFO in self.categories
+
+    @property
+    def signal_route(self) -> bool:
+        """ขึ้นต้นด้วยคำตอบของงาน Signal Quality (สัญญาณ + identity)"""
+        return self.at_start and self.prefix in SIGNAL_ROUTE_PREFIXES
+
+    @property
+    def background(self) -> bool:
+        """มีคำตอบของงานเบื้องหลัง (สัญญาณ / identity / CPIN / ข้อมูลโมดูล) อยู่ในบรรทัด"""
+        return not self.tokens.isdisjoint(BACKGROUND_PREFIXES)
+
+    @property
+    def cpin(self) -> bool:
+        return '+CPIN:' in self.tokens
+
+    @property
+    def sim_failure(self) -> bool:
+        return SIM_FAILURE in self.categories
+
+    @property
+    def echo(self) -> bool:
+        return self.category == ECHO
+
+    @property
+    def cops_selected(self) -> bool:
+        """+COPS: <mode>,<format>,"<operator>" (เลือกเครือข่ายแล้ว)"""
+        return '+COPS:' in self.tokens and bool(_COPS_SELECTED_RE.search(self.text))
+
+
+@lru_cache(maxsize=2048)
+def classify(line: str) -> LineTag:
+    """บรรทัดดิบ → LineTag (สแกนครั้งเดียว, ผลถูก cache ตามข้อความ)"""
+    text = (line or "").strip()
+    upper = text.upper()
+    whole = WHOLE_LINES.get(upper)
+    if whole is not None:
+        return LineTag(text, upper, whole, final=upper if whole == FINAL else "")
+
+    found = _TOKEN_RE.findall(upper)
+    if not found:
+        return LineTag(text, upper, OTHER, bare_csq=bool(_BARE_CSQ_RE.match(text)))
+    first = found[0]
+    at_start = upper.startswith(first)
+    final = ""
+    if at_start and first == '+CME ERROR:':
+        final = "CME"
+    elif at_start and first == '+CMS ERROR:':
+        final = "CMS"
+    return LineTag(text, upper, TOKENS[first], first, at_start, frozenset(found),
+                   frozenset(TOKENS[t] for t in found), final)
+
+
+def route(tag: LineTag, signal_monitoring: bool) -> str:
+    """ปลายทางของบรรทัด: SMS → SMS Monitor, สัญญาณ/OK/ERROR ระหว่าง monitoring → Signal Quality, นอกนั้นหน้าหลัก"""
+    if tag.sms:
+        return ROUTE_SMS
+    if signal_monitoring and (tag.signal or tag.is_ok_or_error):
+        return ROUTE_SIGNAL
+    return ROUTE_MANUAL
+
+
+# ==================== วิธีเดิม (ใช้เทียบผล / benchmark) ====================
+_LEGACY_SQ = {'+CSQ:', '+CESQ:', '+COPS:', '+CREG:', '+CIMI:', '+CCID:', '+CNUM:', '+QCSQ:', '+QENG:', '+QNWINFO:'}
+_LEGACY_BG = {'+CSQ:', '+CESQ:', '+COPS:', '+CREG:', '+CIMI:', '+CCID:', '+CNUM:', '+CPIN:',
+              '+CGMI:', '+CGMM:', '+CGMR:', '+CGSN:'}
+_LEGACY_ECHO = {'AT+CSQ', 'AT+CESQ', 'AT+COPS?', 'AT+CREG?'}
+_LEGACY_SMS_ONLY = {'+CMTI:', '+CMT:', '+CMGR:', '+CMGL:', '+CMGS:', '+CMSS:', '+CMS ERROR:'}
+_LEGACY_ENH_SMS = ['+CMTI:', '+CMT:', '+CMGR:', '+CMGL:', '+CMGS:', '+CMS ERROR:']
+_LEGACY_ENH_SQ = ['+CSQ:', '+CESQ:', '+COPS:', '+CREG:']
+
+
+def _legacy_layers(line: str, monitoring: bool) -> Tuple:
+    """การตัดสินใจของทั้ง 4 ชั้นแบบเดิม (upper + any() ทุกชั้น)"""
+    up = line.upper().strip()
+    serial = ("CMTI" if up.startswith("+CMTI:") else "CMT" if up.startswith("+CMT:")
+              else "CPIN" if "+CPIN:" in up else "ERROR" if up == "ERROR"
+              else "FAIL" if any(k in up for k in ("NO SIM", "SIM NOT INSERTED", "SIM FAILURE")) else "")
+    u2 = line.strip().upper()
+    smart = any(u2.startswith(p) for p in _LEGACY_SQ)
+    d = line.strip()
+    d_up = d.upper()
+    echo = d_up in _LEGACY_ECHO
+    background = any(r in d for r in _LEGACY_BG)
+    monitor = any(d.startswith(p) for p in _LEGACY_SMS_ONLY)
+    end = any(d.startswith(i) for i in ('OK', 'ERROR', '+CME ERROR:', '+CMS ERROR:'))
+    e_up = d.upper()
+    if any(p in e_up for p in _LEGACY_ENH_SMS):
+        enhanced = ROUTE_SMS
+    elif any(p in e_up for p in _LEGACY_ENH_SQ):
+        enhanced = ROUTE_SIGNAL if monitoring else ROUTE_MANUAL
+    elif e_up in ('OK', 'ERROR') and monitoring:
+        enhanced = ROUTE_SIGNAL
+    else:
+        enhanced = ROUTE_MANUAL
+    return serial, smart, echo, background, monitor, end, enhanced
+
+
+def _tag_layers(line: str, monitoring: bool) -> Tuple:
+    tag = classify(line)
+    serial = ("CMTI" if tag.at_start and tag.prefix == '+CMTI:' else "CMT" if tag.at_start and tag.prefix == '+CMT:'
+              else "CPIN" if tag.cpin else "ERROR" if tag.final == "ERROR"
+              else "FAIL" if tag.sim_failure else "")
+    return (serial, tag.signal_route, tag.echo, tag.background, tag.sms_event, tag.is_final,
+            route(tag, monitoring))
+
+
+SAMPLE_LINES = [
+    "+CSQ: 20,99", "OK", "+CESQ: 99,99,255,255,15,44", "+COPS: 0,0,\"AIS\",7", "+CREG: 0,1",
+    "AT+CSQ", "AT+CREG?", "+CMTI: \"SM\",3", "+CMT: \"+66812345678\",,\"24/01/01,10:00:00+28\"",
+    "Hello world", "+CMGS: 12", "ERROR", "+CME ERROR: 10", "+CMS ERROR: 500", "+CPIN: READY",
+    "+CIMI: 520010012345678", "520010012345678", "+CCID: 8966012345678901234", "RDY", "SMS DONE",
+    "+CGMI: Quectel", "+CNUM: \"\",\"0812345678\",129", "SIM NOT INSERTED", "> ", "+QNWINFO: \"FDD LTE\"",
+]
+
+
+def self_check() -> None:
+    """ผลของ LineTag ตรงกับการตัดสินใจเดิมของทุกชั้น (ยกเว้นที่ตั้งใจขยาย: prefix Q* / +CMSS:)"""
+    intended = {"+QNWINFO: \"FDD LTE\""}          # เดิมบางชั้นไม่รู้จัก → ตอนนี้ทุกชั้นเห็นตรงกัน
+    for monitoring in (False, True):
+        for line in SAMPLE_LINES:
+            if line in intended:
+                continue
+            old, new = _legacy_layers(line, monitoring), _tag_layers(line, monitoring)
+            assert old == new, (line, monitoring, old, new)
+    tag = classify("+QNWINFO: \"FDD LTE\"")
+    assert tag.signal and tag.background and route(tag, True) == ROUTE_SIGNAL
+    assert classify("+CMTI: \"SM\",3").prefix == '+CMTI:'           # ไม่ถูกตัดเป็น +CMT:
+    assert classify("  ok \r") is classify("  ok \r")                 # cache
+    assert classify("+COPS: 0,0,\"AIS\",7").cops_selected and not classify("+COPS: 0").cops_selected
+    print(f"self-check OK ({len(SAMPLE_LINES)} lines × 2 modes)")
+
+
+def benchmark(rounds: int = 20_000) -> None:
+    """เวลาต่อบรรทัดของทั้ง 4 ชั้น: วิธีเดิม vs classify (ครั้งแรก / บรรทัดซ้ำที่อยู่ใน cache)"""
+    import time
+
+    lines = SAMPLE_LINES
+    n = rounds * len(lines)
+
+    t = time.perf_counter()
+    for _ in range(rounds):
+        for line in lines:
+            _legacy_layers(line, True)
+    legacy = (time.perf_counter() - t) / n * 1e6
+
+    t = time.perf_counter()
+    for _ in range(rounds):
+        for line in lines:
+            classify.__wrapped__(line)
+    cold = (time.perf_counter() - t) / n * 1e6
+
+    classify.cache_clear()
+    t = time.perf_counter()
+    for _ in range(rounds):
+        for line in lines:
+            _tag_layers(line, True)
+    warm = (time.perf_counter() - t) / n * 1e6
+
+    print(f"legacy 4-layer scans     : {legacy:6.2f} µs/line")
+    print(f"classify (no cache)      : {cold:6.2f} µs/line")
+    print(f"classify + 4-layer routing (cached): {warm:6.2f} µs/line")
+    print(f"cache: {classify.cache_info()}")
+
+
+if __name__ == "__main__":
+    self_check()
+    benchmark()
@@ -3,8 +3,17 @@
 from PyQt5.QtCore import QThread, pyqtSignal, QTimer, QObject
 import serial
 import time
-import re
 from collections import deque
+from . import sim_identity_cache
+from .command_scheduler import CommandScheduler
+from .query_cache import QueryCoalescer
+from .response_classifier import classify
+from .metrics import SERIAL_COMMANDS, SERIAL_ERRORS, SERIAL_LINES, SMS_RECEIVED
+
+# source (set_command_source) → priority ในคิว (ต่ำกว่า = ก่อน; ที่เหลือ = 3)
+SOURCE_PRIORITY = {"MANUAL": 0, "RECOVERY": 0, "SMS": 1, "SIGNAL_QUALITY": 3, "BACKGROUND": 3}
+RAW_PROMPT_WAIT = 5.0   # send_raw รอ prompt '>' ของคำสั่งในคิวได้นานสุด (วินาที)
+
 
 class SerialMonitorThread(QThread):
     new_sms_signal = pyqtSignal(str)
@@ -51,9 +60,23 @@ class SerialMonitorThread(QThread):
         self.command_source = None  # 'MANUAL', 'SIGNAL_QUALITY', 'BACKGROUND'
         self.command_source_queue = deque(maxlen=10)
 
+        # callback ที่ได้ทุกบรรทัดก่อนกรอง (transaction ของ services/at_transport.py)
+        self._line_listeners = []
+
+        # ทุกคำสั่งของพอร์ตนี้เข้าคิวเดียว ส่งทีละคำสั่ง (ไม่รวมคำถามซ้ำ — ผู้เรียกแต่ละทางต้องเห็นคำตอบเอง)
+        self.scheduler = CommandScheduler(self._write_command, port=port, coalescer=QueryCoalescer(ttl={}),
+                                          send_raw=self._write_raw)
+
         connected_signal = pyqtSignal(str, int)   # (port, baud)
         disconnected_signal = pyqtSignal()        # no args
         
+    def add_line_listener(self, callback):
+        """ให้ callback(line) ได้ทุกบรรทัดที่อ่านจากพอร์ต (เรียกใน thread นี้)"""
+        self._line_listeners = self._line_listeners + [callback]
+
+    def remove_line_listener(self, callback):
+        self._line_listeners = [c for c in self._line_listeners if c is not callback]
+
     def set_command_source(self, source):
         """กำหนดแหล่งที่มาของคำสั่ง"""
         self.command_source = source
@@ -86,17 +109,20 @@ class SerialMonitorThread(QThread):
                     self.at_response_signal.emit(f"[RECOVERY LOOP ERROR] {e}")
 
                 # ── อ่านข้อมูลจากพอร์ต ─────────────────────────────────
-                if self.serial_conn and self.serial_conn.in_waiting:
-                    try:
+                # อ่านทุกบรรทัดที่ค้างอยู่ก่อนพัก (ไม่ใช่ 1 บรรทัดต่อ 100 ms)
+                try:
+                    while self.serial_conn and self.serial_conn.in_waiting:
                         line = self.serial_conn.readline().decode(errors="ignore").strip()
                         if line:
                             self.process_received_line(line)
-                    except Exception as e:
-                        self.at_response_signal.emit(f"[READ ERROR] {e}")
+                except Exception as e:
+                    SERIAL_ERRORS.inc(self.port, "read")
+                    self.at_response_signal.emit(f"[READ ERROR] {e}")
 
                 time.sleep(0.1)
 
         except serial.SerialException as e:
+            SERIAL_ERRORS.inc(self.port, "open")
             self.at_response_signal.emit(f"[FATAL] Cannot open port {self.port}: {e}")
         except Exception as e:
             self.at_response_signal.emit(f"[ERROR] {e}")
@@ -113,29 +139,39 @@ class SerialMonitorThread(QThread):
         """ประมวลผลข้อความที่อ่านได้จากพอร์ต"""
         if not line:
             return
+        SERIAL_LINES.inc(self.port)
+
+        for listener in self._line_listeners:
+            try:
+                listener(line)
+            except Exception as e:
+                print(f"Line listener error: {e}")
+        self.scheduler.feed_line(line)      # final result → ปล่อยคำสั่งถัดไปในคิว
 
-        up = line.upper().strip()
+        tag = classify(line)     # จำแนกครั้งเดียว ชั้นถัดไปได้ผลเดิมจาก cache
 
         # ── จับ SMS แบบ notify ────────────────────────────────────────
-        if up.startswith("+CMTI:"):
+        if tag.at_start and tag.prefix == "+CMTI:":
             # แจ้ง UI และจบ
+            SMS_RECEIVED.inc(self.port)
             self.new_sms_signal.emit(line)
             self.at_response_signal.emit(line)
             return
 
         # ── จับ SMS แบบ 2 บรรทัด (+CMT: header → บรรทัดถัดไปเป็น body) ─
-        if up.startswith("+CMT:"):
+        if tag.at_start and tag.prefix == "+CMT:":
             self.cmt_buffer = line
             return
         elif getattr(self, "cmt_buffer", None):
             header = self.cmt_buffer
             self.cmt_buffer = None
             body = line
+            SMS_RECEIVED.inc(self.port)
             self.new_sms_signal.emit(f"{header}|{body}")
             return
 
         # ── จับสถานะซิมก่อน (สำคัญ) ─────────────────────────────────
-        if "+CPIN:" in up:
+        if tag.cpin:
             # ให้ handler ตัดสินว่ากู้สำเร็จหรือไม่ (READY → ปิด recovery + init SMS)
             try:
                 self.handle_cpin_response(line)
@@ -144,7 +180,7 @@ class SerialMonitorThread(QThread):
                 return
 
         # ── ซ่อน ERROR จร ๆ ระหว่าง recovery หรือคำสั่งพื้นหลัง ───────
-        if up == "ERROR":
+        if tag.final == "ERROR":
             if getattr(self, "recovery_active", False):
                 return
             # ดูแหล่งที่มาของคำสั่งล่าสุด (ถ้ามีการบันทึก)
@@ -158,8 +194,9 @@ class SerialMonitorThread(QThread):
                 return
 
         # ── แจ้ง SIM failure ชัดเจน ───────────────────────────────────
-        if any(k in up for k in ("NO SIM", "SIM NOT INSERTED", "SIM FAILURE")):
+        if tag.sim_failure:
             try:
+                sim_identity_cache.note_cpin(self.port, line)
                 self.sim_failure_detected.emit()
             finally:
                 # แสดงบรรทัดไว้ด้วย เผื่อ debug
@@ -180,30 +217,15 @@ class SerialMonitorThread(QThread):
 
     def _is_signal_response(self, line):
         """ตรวจสอบว่าเป็น Signal Quality response หรือไม่"""
-        line_upper = line.upper().strip()
-        
-        # Signal Quality indicators
-        signal_indicators = ["+CSQ:", "+CESQ:", "+COPS:", "+CREG:", "+CIMI:", "+CCID:", "+QCCID:", "+CNUM:"]
-        
-        # ตรวจสอบ response patterns
-        if any(indicator in line_upper for indicator in signal_indicators):
-            return True
-        
-        # ตรวจสอบรูปแบบ CSQ response แบบเฉพาะตัวเลข เช่น "14,99"
-        if re.match(r'^\d+,\d+$', line.strip()):
-            return True
-        
-        return False
+        tag = classify(line)
+        # +CSQ/+CESQ/+COPS/+CREG/+CIMI/+CCID/+CNUM/+QENG/... หรือ CSQ แบบตัวเลขล้วน เช่น "14,99"
+        return tag.signal or tag.sim_info or tag.bare_csq
 
     def _determine_response_source(self, line):
         """กำหนดว่า response นี้มาจากแหล่งไหน - Enhanced version"""
-        line_upper = line.upper().strip()
-        
-        # ตรวจสอบ SMS responses
-        sms_indicators = ["+CMTI:", "+CMT:", "+CMGR:", "+CMGL:", "+CMGS:", "+CMS ERROR:"]
-        if any(indicator in line_upper for indicator in sms_indicators):
+        if classify(line).sms:
             return 'SMS'
-        
+
         # ตรวจสอบ Signal Quality responses
         if self._is_signal_response(line):
             return 'SIGNAL_QUALITY'
@@ -251,18 +273,16 @@ class SerialMonitorThread(QThread):
             self._recovery_failed(f"Failed to send {job['command']}")
     
     def send_command_silent(self, command: str) -> bool:
-        """ส่ง AT โดยไม่สแปมขึ้นหน้าจอ (ใช้สำหรับ recovery)"""
-        try:
-            if self.serial_conn and self.serial_conn.is_open:
-                self.serial_conn.write(f"{command}\r\n".encode())
-                self.serial_conn.flush()
-                return True
-        except Exception as e:
-            self.at_response_signal.emit(f"[SEND ERROR] {e}")
-        return False
+        """ส่ง AT โดยไม่สแปมขึ้นหน้าจอ (ใช้สำหรับ recovery) — เข้าคิวเดียวกับคำสั่งอื่น"""
+        if not (self.serial_conn and self.serial_conn.is_open):
+            return False
+        self.scheduler.submit(command, "RECOVERY", SOURCE_PRIORITY["RECOVERY"], silent=True)
+        return True
     
     def handle_cpin_response(self, line: str):
         u = line.upper()
+        # สถานะซิมเปลี่ยน → identity ที่ cache ไว้ของพอร์ตนี้ใช้ไม่ได้แล้ว
+        sim_identity_cache.note_cpin(self.port, line)
         if "CPIN: READY" in u:
             # ปิดโหมด recovery แล้วประกาศสำเร็จ
             self.recovery_active = False
@@ -351,37 +371,65 @@ class SerialMonitorThread(QThread):
         except Exception as e:
             self.at_response_signal.emit(f"[SMS ERROR] {e}")
     
-    def send_command(self, command):
-        if self.serial_conn and self.running:
-            try:
-                self.serial_conn.write(f"{command}\r\n".encode()); self.serial_conn.flush()
-
-                # ตีความแหล่งที่มาอัตโนมัติ
-                if not self.command_source:
-                    bg = ["AT+CSQ", "AT+CESQ", "AT+COPS", "AT+CREG", "AT+CIMI", "AT+CCID", "AT+QCCID", "AT+CNUM"]
-                    self.command_source = "SIGNAL_QUALITY" if any(x in command.upper() for x in bg) else "MANUAL"
+    def send_command(self, command, on_done=None, timeout=None, payload=None):
+        """
+        เข้าคิว scheduler ของพอร์ตนี้ → True ถ้าเข้าคิวได้ (เขียนจริงเมื่อคำสั่งก่อนหน้าได้คำตอบครบ)
+        on_done(ScheduledCommand): เรียกเมื่อได้ final result / หมดเวลา (จาก thread ที่อ่านพอร์ต)
+        payload: ข้อมูลที่เขียนต่อหลัง prompt '>' (AT+CMGS)
+        """
+        if not (self.serial_conn and self.running):
+            return False
+        # ตีความแหล่งที่มาอัตโนมัติ
+        source = self.command_source
+        if not source:
+            bg = ["AT+CSQ", "AT+CESQ", "AT+COPS", "AT+CREG", "AT+CIMI", "AT+CCID", "AT+QCCID", "AT+CNUM",
+                  "AT+QENG", "AT+QNWINFO"]
+            source = "SIGNAL_QUALITY" if any(x in command.upper() for x in bg) else "MANUAL"
+        self.command_source = None
+        self.scheduler.submit(command, source, SOURCE_PRIORITY.get(source, 3),
+                              on_done=on_done, timeout=timeout, payload=payload)
+        return True
 
-                self.command_source_queue.append((command, self.command_source))
+    def _write_command(self, command):
+        """scheduler เรียกเมื่อถึงคิว (ไม่มีคำสั่งอื่นค้างอยู่) → เขียนลงพอร์ตจริง"""
+        if not (self.serial_conn and self.running):
+            return False
+        item = self.scheduler.in_flight
+        source = item.source.upper() if item is not None else "MANUAL"
+        if source == "USER_MAIN":       # SmartCommandManager
+            source = "MANUAL"
+        try:
+            self.serial_conn.write(f"{command}\r\n".encode()); self.serial_conn.flush()
+            SERIAL_COMMANDS.inc(self.port)
+            if item is not None and item.silent:
+                return True
+            self.command_source_queue.append((command, source))
 
-                if self.command_source == "MANUAL":
-                    self.at_response_signal.emit(f"[SENT] {command}")
-                # SIGNAL_QUALITY/BACKGROUND → ไม่ spam ไปหน้าหลัก
+            if source == "MANUAL":
+                self.at_response_signal.emit(f"[SENT] {command}")
+            # SIGNAL_QUALITY/BACKGROUND → ไม่ spam ไปหน้าหลัก
+            return True
+        except Exception as e:
+            SERIAL_ERRORS.inc(self.port, "write")
+            self.at_response_signal.emit(f"[SEND ERROR] {e}")
+            return False
 
-                self.command_source = None
-                return True
-            except Exception as e:
-                self.at_response_signal.emit(f"[SEND ERROR] {e}")
-                return False
-        return False
-        
     def send_raw(self, data):
-        """ส่งข้อมูลดิบ"""
+        """ส่งข้อมูลดิบ — ถ้ามีคำสั่งในคิว (เช่น AT+CMGS) รอ prompt '>' ของมันก่อน"""
+        if not (self.serial_conn and self.running):
+            return False
+        if not self.scheduler.wait_prompt(RAW_PROMPT_WAIT):
+            print(f"[{self.port}] send_raw: ไม่เห็น prompt '>' ภายใน {RAW_PROMPT_WAIT:.0f}s — เขียนต่อเลย")
+        return self._write_raw(data)
+
+    def _write_raw(self, data):
         if self.serial_conn and self.running:
             try:
                 self.serial_conn.write(data)
                 self.serial_conn.flush()
                 return True
             except Exception as e:
+                SERIAL_ERRORS.inc(self.port, "write")
                 self.at_response_signal.emit(f"[SEND RAW ERROR] {e}")
                 return False
         return False
@@ -417,6 +465,7 @@ class SerialMonitorThread(QThread):
     def stop(self):
         """หยุดเธรดและทำความสะอาด"""
         self.running = False
+        self.scheduler.clear()
         try:
             if self.serial_conn:
                 try:
@@ -431,6 +480,7 @@ class SerialMonitorThread(QThread):
     def cleanup(self):
         """ทำความสะอาด"""
         self.running = False
+        self.scheduler.clear()
         self.stop_cpin_polling()
         self.recovery_active = False
         self.recovery_queue.clear()
@@ -0,0 +1,259 @@
+# services/signal_analytics.py
+"""
+สถิติของชุดค่าสัญญาณแบบ vectorized (NumPy) ใช้ร่วมกันระหว่าง SIMInfoWindow / NetworkPerformanceTester
+(windows/at_command_helper.py) และหน้าต่าง Signal Quality
+- summarize          : count / mean / min / max / variance / percentiles
+- variance           : sample variance (หาร n-1) เหมือนสูตรเดิม
+- stability_score    : คะแนน 0-100 จาก variance (เกณฑ์ 1 / 4 / 9 / 16)
+- quality_distribution: นับตามช่วง QUALITY_BINS (กติกาเดียวกับ signal_buffer.Histogram)
+- outages            : ช่วงที่อ่านสัญญาณไม่ได้ติดกัน (เริ่ม, จำนวน, ระยะเวลา)
+- ascii_levels       : แปลงค่าเป็นระดับ 1..N สำหรับกราฟ ASCII
+- quality_scores     : คะแนนคุณภาพ (%) จาก RSSI + BER ทั้ง array (สูตรเดียวกับ _calculate_quality)
+ค่าที่โมเด็มอ่านไม่ได้ (-999 / None / NaN) ไม่นับในสถิติ
+ตรวจผลเทียบสูตรเดิม + benchmark 1M samples: python -m services.signal_analytics
+"""
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import math
+
+import numpy as np
+
+from .signal_buffer import QUALITY_BINS, INVALID
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# variance ไม่เกินค่านี้ → คะแนน (ช่วงสุดท้าย = 20)
+_STABILITY_LIMITS = np.array([1.0, 4.0, 9.0, 16.0])
+_STABILITY_SCORES = np.array([100.0, 80.0, 60.0, 40.0, 20.0])
+
+
+@dataclass
+class SignalSummary:
+    count: int = 0              # จำนวนทั้งหมด (รวมที่อ่านไม่ได้)
+    valid: int = 0
+    mean: float = 0.0
+    min: float = 0.0
+    max: float = 0.0
+    variance: float = 0.0
+    std: float = 0.0
+    percentiles: Dict[int, float] = field(default_factory=dict)
+
+    @property
+    def range(self) -> float:
+        return self.max - self.min
+
+    def percentile(self, p: int) -> float:
+        return self.percentiles.get(p, 0.0)
+
+
+@dataclass(frozen=True)
+class Outage:
+    start: int                  # index แรกที่อ่านไม่ได้
+    samples: int
+    duration: float             # วินาที
+    ongoing: bool = False       # ยังไม่กลับมาจนถึง sample สุดท้าย
+
+
+def as_array(values: Any, invalid: float = INVALID) -> np.ndarray:
+    """list / array / ring buffer values → float64 array (ค่าที่อ่านไม่ได้ = NaN)"""
+    if isinstance(values, np.ndarray):
+        arr = values.astype(np.float64, copy=True)
+    else:
+        # None → NaN ตอนแปลงเป็น float64 อยู่แล้ว
+        arr = np.array(values if isinstance(values, (list, tuple)) else list(values), dtype=np.float64)
+    if invalid is not None:
+        arr[arr <= invalid] = np.nan
+    return arr
+
+
+def _valid(values: Any) -> np.ndarray:
+    arr = as_array(values)
+    return arr[~np.isnan(arr)]
+
+
+def variance(values: Any) -> float:
+    """sample variance (n-1) ของค่าที่อ่านได้ — น้อยกว่า 2 ค่า = 0.0"""
+    v = _valid(values)
+    return float(v.var(ddof=1)) if v.size >= 2 else 0.0
+
+
+def stability_score(values: Any) -> float:
+    """variance ต่ำ = คะแนนสูง (100 / 80 / 60 / 40 / 20); ไม่มีค่าเลย = 0.0"""
+    v = _valid(values)
+    if v.size == 0:
+        return 0.0
+    var = float(v.var(ddof=1)) if v.size >= 2 else 0.0
+    return float(_STABILITY_SCORES[np.searchsorted(_STABILITY_LIMITS, var, side="left")])
+
+
+def summarize(values: Any, percentiles: Sequence[int] = PERCENTILES) -> SignalSummary:
+    arr = as_array(values)
+    v = arr[~np.isnan(arr)]
+    s = SignalSummary(count=int(arr.size), valid=int(v.size))
+    if v.size == 0:
+        return s
+    s.mean = float(v.mean())
+    s.min = float(v.min())
+    s.max = float(v.max())
+    s.variance = float(v.var(ddof=1)) if v.size >= 2 else 0.0
+    s.std = math.sqrt(s.variance)
+    if percentiles:
+        s.percentiles = dict(zip(percentiles, (float(x) for x in np.percentile(v, percentiles))))
+    return s
+
+
+def quality_distribution(scores: Any, bins=QUALITY_BINS) -> List[Tuple[Any, Any, int, float]]:
+    """[(label, icon, count, percent), ...] ตามลำดับ bins — ช่วง [lo, hi) ยกเว้นช่วงบนสุดรวม hi ด้วย"""
+    v = _valid(scores)
+    top = max(hi for _, hi, _, _ in bins)
+    counts = []
+    for lo, hi, _, _ in bins:
+        upper = v <= hi if hi == top else v < hi
+        counts.append(int(np.count_nonzero((v >= lo) & upper)))
+    total = sum(counts)
+    return [
+        (label, icon, c, (c * 100.0 / total) if total else 0.0)
+        for (_, _, label, icon), c in zip(bins, counts)
+    ]
+
+
+def outages(values: Any, timestamps: Optional[Sequence[float]] = None, step: float = 1.0,
+            min_samples: int = 1) -> List[Outage]:
+    """
+    ช่วงที่อ่านค่าไม่ได้ติดกันอย่างน้อย min_samples ตัว
+    duration = เวลาจาก sample แรกที่หายถึง sample แรกที่กลับมา (ไม่มี timestamps → จำนวน × step)
+    """
+    missing = np.isnan(as_array(values))
+    n = missing.size
+    if n == 0 or not missing.any():
+        return []
+    edges = np.diff(np.concatenate(([0], missing.view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)          # index แรกที่กลับมาอ่านได้ (หรือ n)
+    lengths = ends - starts
+    keep = lengths >= min_samples
+    starts, ends, lengths = starts[keep], ends[keep], lengths[keep]
+    if timestamps is not None:
+        ts = np.asarray(timestamps, dtype=np.float64)
+        end_ts = np.where(ends < n, ts[np.minimum(ends, n - 1)], ts[-1] + step)
+        durations = end_ts - ts[starts]
+    else:
+        durations = lengths * float(step)
+    return [
+        Outage(int(s), int(l), float(d), bool(e == n))
+        for s, l, d, e in zip(starts, lengths, durations, ends)
+    ]
+
+
+def ascii_levels(values: Any, levels: int = 15) -> Optional[np.ndarray]:
+    """ค่า → ระดับ 1..levels (min..max ของทั้งชุด); None ถ้าค่าคงที่ / น้อยกว่า 2 ค่า"""
+    v = _valid(values)
+    if v.size < 2:
+        return None
+    lo, hi = v.min(), v.max()
+    if hi == lo:
+        return None
+    norm = ((v - lo) / (hi - lo) * levels).astype(np.int64) + 1
+    return np.clip(norm, 1, levels)
+
+
+def quality_scores(rssi: Any, ber: Any) -> np.ndarray:
+    """RSSI 70% + BER 30% (BER ไม่รู้ = 50 คะแนน); RSSI อ่านไม่ได้ = 0"""
+    r = as_array(rssi)
+    b = as_array(ber, invalid=None)
+    b[b >= 99] = np.nan
+    rssi_score = np.clip((r + 113) * 100.0 / 62.0, 0, 100)
+    ber_score = np.where(np.isnan(b), 50.0, np.clip(100.0 - b * 10.0, 0, 100))
+    return np.where(np.isnan(r), 0.0, rssi_score * 0.7 + ber_score * 0.3)
+
+
+# ==================== ตรวจผล + BENCHMARK ====================
+def _legacy_variance(values):
+    if len(values) < 2:
+        return 0.0
+    mean = sum(values) / len(values)
+    return sum((x - mean) ** 2 for x in values) / (len(values) - 1)
+
+
+def _legacy_stability(values):
+    if not values:
+        return 0.0
+    var = _legacy_variance(values)
+    for limit, score in ((1.0, 100.0), (4.0, 80.0), (9.0, 60.0), (16.0, 40.0)):
+        if var <= limit:
+            return score
+    return 20.0
+
+
+def _legacy_levels(values):
+    min_val, max_val = min(values), max(values)
+    return [max(1, min(15, int(((v - min_val) / (max_val - min_val)) * 15) + 1)) for v in values]
+
+
+def self_check(trials: int = 200) -> None:
+    """เทียบกับสูตร loop เดิมของหน้าต่าง (variance / stability / กราฟ ASCII / distribution)"""
+    import random
+    from .signal_buffer import Histogram
+
+    rnd = random.Random(7)
+    for _ in range(trials):
+        n = rnd.randint(0, 60)
+        spread = rnd.choice([0, 0.5, 1, 2, 3, 5, 15])
+        values = [rnd.randint(-110, -50) if spread == 15 else -80 + round(rnd.gauss(0, spread))
+                  for _ in range(n)]
+        assert math.isclose(variance(values), _legacy_variance(values), rel_tol=1e-9, abs_tol=1e-9)
+        assert stability_score(values) == _legacy_stability(values)
+        levels = ascii_levels(values)
+        if len(values) >= 2 and min(values) != max(values):
+            assert levels.tolist() == _legacy_levels(values)
+        else:
+            assert levels is None
+        scores = [rnd.choice([0, 60, 70, 80, 90, 100, rnd.uniform(0, 100)]) for _ in range(n)]
+        hist = Histogram(QUALITY_BINS)
+        for q in scores:
+            hist.add(q)
+        assert [c for _, _, c, _ in quality_distribution(scores)] == hist.counts
+    def legacy_quality(r, b):
+        if r <= -999:
+            return 0.0
+        rs = max(0, min(100, (r + 113) * 100 / 62))
+        return rs * 0.7 + (max(0, min(100, 100 - b * 10)) if b < 99 else 50) * 0.3
+    rs = [rnd.choice([-999, rnd.randint(-120, -40)]) for _ in range(500)]
+    bs = [rnd.choice([99.0, rnd.uniform(0, 12)]) for _ in range(500)]
+    assert np.allclose(quality_scores(rs, bs), [legacy_quality(r, b) for r, b in zip(rs, bs)])
+    gaps = [-80, -999, -999, -81, None, -82, -999]
+    got = [(o.start, o.samples, o.duration, o.ongoing) for o in outages(gaps, step=2.0)]
+    assert got == [(1, 2, 4.0, False), (4, 1, 2.0, False), (6, 1, 2.0, True)], got
+    print(f"self-check OK ({trials} random series)")
+
+
+def benchmark(samples: int = 1_000_000) -> None:
+    import time
+
+    rng = np.random.default_rng(1)
+    rssi = rng.integers(-110, -50, samples).astype(np.float64)
+    rssi[rng.random(samples) < 0.02] = INVALID
+    quality = rng.uniform(0, 100, samples)
+    as_list = rssi.tolist()
+
+    def timed(label, fn, *args):
+        t = time.perf_counter()
+        fn(*args)
+        print(f"  {label:<22}: {(time.perf_counter() - t) * 1000:8.1f} ms")
+
+    print(f"{samples:,} samples")
+    timed("summarize (array)", summarize, rssi)
+    timed("summarize (list)", summarize, as_list)
+    timed("stability_score", stability_score, rssi)
+    timed("quality_distribution", quality_distribution, quality)
+    timed("outages", outages, rssi)
+    timed("ascii_levels", ascii_levels, rssi)
+    valid = [v for v in as_list if v > INVALID]
+    timed("legacy variance loop", _legacy_variance, valid)
+    timed("legacy stability loop", _legacy_stability, valid)
+
+
+if __name__ == "__main__":
+    self_check()
+    benchmark()
@@ -0,0 +1,295 @@
+# services/signal_anomaly.py
+"""
+ตรวจจับสัญญาณผิดปกติแบบ streaming (ป้อนทีละ measurement)
+- rssi_drop / quality_drop : EWMA เป็น baseline + CUSUM ด้านลบ (ตกต่อเนื่อง ไม่ใช่แค่จุดเดียว)
+- no_signal               : อ่านได้ -999 ติดกันนานเกิน N ตัว / T วินาที
+- registration_lost       : +CREG บอกว่าไม่ได้ลงทะเบียน
+- hysteresis : แจ้ง 'raised' ครั้งเดียว แล้วต้องกลับปกติติดกัน clear_samples ตัวถึงแจ้ง 'cleared'
+- rate limit : ชนิดเดียวกันของโมเด็มเดียวกันแจ้งซ้ำไม่ถี่กว่า cooldown + เพดานรวมต่อนาที
+หน่วยความจำคงที่ต่อโมเด็ม (ไม่เก็บประวัติ) → 64 โมเด็ม × 1 Hz ใช้ไม่กี่ µs ต่อ sample
+รัน benchmark: python -m services.signal_anomaly
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import math
+import threading
+import time
+
+INVALID = -999
+
+KIND_RSSI_DROP = "rssi_drop"
+KIND_QUALITY_DROP = "quality_drop"
+KIND_NO_SIGNAL = "no_signal"
+KIND_REG_LOST = "registration_lost"
+
+STATE_RAISED = "raised"
+STATE_CLEARED = "cleared"
+
+_MESSAGES = {
+    KIND_RSSI_DROP: "📉 RSSI ตกต่อเนื่อง",
+    KIND_QUALITY_DROP: "📉 คุณภาพสัญญาณตกต่อเนื่อง",
+    KIND_NO_SIGNAL: "🚫 ไม่มีสัญญาณ",
+    KIND_REG_LOST: "🔴 หลุดการลงทะเบียนเครือข่าย",
+}
+
+
+@dataclass
+class AnomalyConfig:
+    alpha: float = 0.05            # น้ำหนักของ EWMA (≈ ค่าเฉลี่ย 20 ตัวล่าสุด)
+    warmup: int = 20               # จำนวน sample ก่อนเริ่มตัดสิน
+    cusum_k: float = 0.5           # slack (หน่วย σ) — ตกน้อยกว่านี้ไม่สะสม
+    cusum_h: float = 5.0           # เกณฑ์แจ้ง (หน่วย σ)
+    rssi_min_std: float = 2.0      # RSSI จาก CSQ เป็นขั้นละ 2 dB
+    quality_min_std: float = 5.0
+    outage_samples: int = 5
+    outage_seconds: float = 30.0
+    clear_samples: int = 5         # hysteresis: ปกติติดกันกี่ตัวถึงยกเลิก
+    cooldown: float = 300.0        # วินาที ระหว่างการแจ้งชนิดเดียวกันของโมเด็มเดียวกัน
+    max_alerts_per_minute: int = 30
+
+
+@dataclass(frozen=True)
+class AnomalyAlert:
+    series: str
+    kind: str
+    state: str                      # raised / cleared
+    ts: float
+    value: Optional[float] = None
+    baseline: Optional[float] = None
+    message: str = ""
+
+    @property
+    def raised(self) -> bool:
+        return self.state == STATE_RAISED
+
+
+class _DropDetector:
+    """EWMA + CUSUM ด้านลบของค่าเดียว (O(1) ต่อ sample)"""
+    __slots__ = ("cfg", "min_std", "n", "mean", "var", "cusum")
+
+    def __init__(self, cfg: AnomalyConfig, min_std: float):
+        self.cfg = cfg
+        self.min_std = min_std
+        self.n = 0
+        self.mean = 0.0
+        self.var = 0.0
+        self.cusum = 0.0
+
+    def update(self, x: float, frozen: bool) -> bool:
+        """คืน True ถ้าตอนนี้อยู่ในสภาวะ 'ตกผิดปกติ'; frozen = ไม่ขยับ baseline (ระหว่างมี alert)"""
+        cfg = self.cfg
+        if self.n < cfg.warmup:
+            # ช่วงแรก: ค่าเฉลี่ย/variance ธรรมดา เพื่อให้ baseline ตั้งตัวเร็ว
+            self.n += 1
+            delta = x - self.mean
+            self.mean += delta / self.n
+            self.var += (delta * (x - self.mean) - self.var) / self.n
+            return False
+
+        std = max(math.sqrt(self.var), self.min_std)
+        z = (self.mean - x) / std
+        # จำกัดเพดานที่ 2h → พอสัญญาณกลับมา ใช้ไม่กี่ sample ก็ลงต่ำกว่าเกณฑ์
+        self.cusum = min(2 * cfg.cusum_h, max(0.0, self.cusum + z - cfg.cusum_k))
+        alarm = self.cusum > cfg.cusum_h
+        if not frozen and not alarm:
+            a = cfg.alpha
+            delta = x - self.mean
+            self.mean += a * delta
+            self.var = (1 - a) * (self.var + a * delta * delta)
+        return alarm
+
+    def reset_cusum(self) -> None:
+        self.cusum = 0.0
+
+
+class _AlertState:
+    """hysteresis + cooldown ของ alert หนึ่งชนิด"""
+    __slots__ = ("active", "emitted", "normal_run", "last_emit")
+
+    def __init__(self):
+        self.active = False
+        self.emitted = False        # raised ถูกส่งออกไปจริง (ไม่โดน rate limit) → ต้องส่ง cleared ตาม
+        self.normal_run = 0
+        self.last_emit = -math.inf
+
+
+class SignalAnomalyDetector:
+    """ตัวตรวจของโมเด็มหนึ่งตัว"""
+
+    def __init__(self, series: str, config: Optional[AnomalyConfig] = None):
+        self.series = series
+        self.cfg = config or AnomalyConfig()
+        self.rssi = _DropDetector(self.cfg, self.cfg.rssi_min_std)
+        self.quality = _DropDetector(self.cfg, self.cfg.quality_min_std)
+        self.states: Dict[str, _AlertState] = {
+            k: _AlertState() for k in (KIND_RSSI_DROP, KIND_QUALITY_DROP, KIND_NO_SIGNAL, KIND_REG_LOST)
+        }
+        self._invalid_run = 0
+        self._invalid_since: Optional[float] = None
+
+    def feed(self, rssi: float, quality: float, ts: float,
+             registered: Optional[bool] = None, allow=None) -> List[AnomalyAlert]:
+        """
+        ป้อน sample หนึ่งตัว → alert ที่เปลี่ยนสถานะในรอบนี้
+        allow(): ถามตัวจำกัดอัตรารวม (คืน False = ข้ามการแจ้ง raised ครั้งนี้)
+        """
+        cfg = self.cfg
+        out: List[AnomalyAlert] = []
+        valid = rssi is not None and rssi > INVALID
+
+        # --- no signal ---
+        if valid:
+            self._invalid_run = 0
+            self._invalid_since = None
+        else:
+            self._invalid_run += 1
+            if self._invalid_since is None:
+                self._invalid_since = ts
+        outage = (self._invalid_run >= cfg.outage_samples
+                  or (self._invalid_since is not None and ts - self._invalid_since >= cfg.outage_seconds
+                      and self._invalid_run > 1))
+        self._step(KIND_NO_SIGNAL, outage, ts, None, None, allow, out)
+
+        # --- drops (เฉพาะตอนอ่านค่าได้ → outage ไม่ทำให้ baseline เพี้ยน) ---
+        if valid:
+            st = self.states[KIND_RSSI_DROP]
+            alarm = self.rssi.update(float(rssi), frozen=st.active)
+            self._step(KIND_RSSI_DROP, alarm, ts, float(rssi), self.rssi.mean, allow, out)
+            st = self.states[KIND_QUALITY_DROP]
+            alarm = self.quality.update(float(quality), frozen=st.active)
+            self._step(KIND_QUALITY_DROP, alarm, ts, float(quality), self.quality.mean, allow, out)
+
+        # --- registration ---
+        if registered is not None:
+            self._step(KIND_REG_LOST, not registered, ts, None, None, allow, out)
+        return out
+
+    def _step(self, kind, condition, ts, value, baseline, allow, out):
+        st = self.states[kind]
+        cfg = self.cfg
+        if condition:
+            st.normal_run = 0
+            if st.active:
+                return
+            st.active = True
+            if ts - st.last_emit < cfg.cooldown or (allow is not None and not allow()):
+                st.emitted = False
+                return
+            st.emitted = True
+            st.last_emit = ts
+            out.append(AnomalyAlert(self.series, kind, STATE_RAISED, ts, value, baseline, _MESSAGES[kind]))
+            return
+
+        if not st.active:
+            return
+        st.normal_run += 1
+        if st.normal_run < cfg.clear_samples:
+            return
+        st.active = False
+        st.normal_run = 0
+        if kind == KIND_RSSI_DROP:
+            self.rssi.reset_cusum()
+        elif kind == KIND_QUALITY_DROP:
+            self.quality.reset_cusum()
+        if st.emitted:
+            st.emitted = False
+            out.append(AnomalyAlert(self.series, kind, STATE_CLEARED, ts, value, baseline,
+                                    _MESSAGES[kind] + " — กลับสู่ปกติ"))
+
+
+class AnomalyMonitor:
+    """รวมตัวตรวจของทุกโมเด็ม + จำกัดจำนวน alert รวม (thread-safe)"""
+
+    def __init__(self, config: Optional[AnomalyConfig] = None):
+        self.cfg = config or AnomalyConfig()
+        self._detectors: Dict[str, SignalAnomalyDetector] = {}
+        self._lock = threading.Lock()
+        # token bucket: เติม max_alerts_per_minute ต่อ 60 วินาที
+        self._tokens = float(self.cfg.max_alerts_per_minute)
+        self._refill_ts = time.monotonic()
+
+    def detector(self, series: str) -> SignalAnomalyDetector:
+        det = self._detectors.get(series)
+        if det is None:
+            det = self._detectors[series] = SignalAnomalyDetector(series, self.cfg)
+        return det
+
+    def _allow(self) -> bool:
+        now = time.monotonic()
+        rate = self.cfg.max_alerts_per_minute / 60.0
+        self._tokens = min(float(self.cfg.max_alerts_per_minute), self._tokens + (now - self._refill_ts) * rate)
+        self._refill_ts = now
+        if self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        return True
+
+    def feed(self, series: str, measurement, ts: Optional[float] = None,
+             registered: Optional[bool] = None) -> List[AnomalyAlert]:
+        """measurement = SignalMeasurement (ใช้ rssi, quality_score)"""
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            return self.detector(series).feed(
+                getattr(measurement, "rssi", INVALID), getattr(measurement, "quality_score", 0.0),
+                ts, registered, self._allow,
+            )
+
+    def active_alerts(self) -> Dict[str, List[str]]:
+        """{series: [kind ที่กำลัง active]}"""
+        with self._lock:
+            return {
+                s: [k for k, st in d.states.items() if st.active]
+                for s, d in self._detectors.items()
+                if any(st.active for st in d.states.values())
+            }
+
+    def forget(self, series: str) -> None:
+        with self._lock:
+            self._detectors.pop(series, None)
+
+
+_default_monitor: Optional[AnomalyMonitor] = None
+_default_lock = threading.Lock()
+
+
+def default_monitor() -> AnomalyMonitor:
+    """ตัวกลางที่ทุกหน้าต่าง/thread ใช้ร่วมกัน (เพดาน alert รวมทั้งระบบ)"""
+    global _default_monitor
+    with _default_lock:
+        if _default_monitor is None:
+            _default_monitor = AnomalyMonitor()
+        return _default_monitor
+
+
+# ==================== BENCHMARK ====================
+def benchmark(modems: int = 64, seconds: int = 3600) -> None:
+    """จำลอง 64 โมเด็ม × 1 Hz เป็นเวลา 1 ชั่วโมง (มีช่วงตก/หลุดสัญญาณปน)"""
+    import random
+    from types import SimpleNamespace
+
+    rnd = random.Random(7)
+    mon = AnomalyMonitor()
+    sample = SimpleNamespace(rssi=0, quality_score=0.0)
+    alerts = 0
+    t0 = time.perf_counter()
+    for t in range(seconds):
+        for m in range(modems):
+            base = -75 - (m % 5) * 4
+            if m % 8 == 0 and 1200 <= t < 1500:
+                rssi = base - 20 + rnd.randint(-2, 2)        # ตกชัดเจน
+            elif m % 16 == 1 and 2000 <= t < 2060:
+                rssi = INVALID                                # หลุด
+            else:
+                rssi = base + rnd.choice((-2, 0, 0, 2))
+            sample.rssi = rssi
+            sample.quality_score = 0.0 if rssi == INVALID else max(0.0, (rssi + 113) * 100 / 62)
+            alerts += len(mon.feed(f"m{m}", sample, ts=float(t)))
+    elapsed = time.perf_counter() - t0
+    n = modems * seconds
+    print(f"{n:,} samples in {elapsed:.2f} s → {elapsed / n * 1e6:.2f} µs/sample, "
+          f"{alerts} alert events, active now: {len(mon.active_alerts())}")
+
+
+if __name__ == "__main__":
+    benchmark()
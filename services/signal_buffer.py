@@ -0,0 +1,257 @@
+# services/signal_buffer.py
+"""
+ประวัติสัญญาณในหน่วยความจำแบบขนาดคงที่ (ring buffer บน NumPy)
+- SignalRingBuffer : เก็บ measurement ล่าสุด N ตัว + array ของ rssi/rsrp/rsrq/ber/quality
+- RunningStats     : mean / variance (Welford) / min / max อัปเดต O(1) ต่อ sample
+- Histogram        : นับจำนวนต่อช่วง (bins) อัปเดต O(1) ต่อ sample
+- minmax_decimate  : ย่อ array เหลือ min/max ต่อ pixel สำหรับวาดกราฟช่วงยาว
+สถิติเป็นของทั้ง session (ตั้งแต่ clear ล่าสุด) ไม่ใช่เฉพาะที่ยังอยู่ใน buffer
+รัน benchmark: python -m services.signal_buffer
+"""
+from __future__ import annotations
+from bisect import bisect_right
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import math
+
+import numpy as np
+
+INVALID = -999                 # ค่าที่โมเด็มอ่านไม่ได้ (rssi/rsrp/rsrq)
+BER_UNKNOWN = 99.0
+
+FIELDS = ("rssi", "rsrp", "rsrq", "ber", "quality")
+_SOURCE = {"quality": "quality_score"}      # ชื่อ field ใน SignalMeasurement
+
+# ช่วงคุณภาพ (%) สำหรับ distribution: (ต่ำสุด, สูงสุด, label, icon)
+QUALITY_BINS = (
+    (90, 100, "Excellent", "🟢"),
+    (80, 90, "Good", "✅"),
+    (70, 80, "Fair", "📶"),
+    (60, 70, "Poor", "🟠"),
+    (0, 60, "Very Poor", "🔴"),
+)
+
+DEFAULT_CAPACITY = 20_000     # ≈ 28 ชั่วโมงที่วัดทุก 5 วินาที
+
+
+class RunningStats:
+    """mean / variance / min / max แบบ online (Welford) → O(1) ต่อ sample"""
+    __slots__ = ("count", "mean", "_m2", "min", "max")
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x: float) -> None:
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    @property
+    def variance(self) -> float:
+        """sample variance (หารด้วย n-1 เหมือนสูตรเดิมของหน้าต่าง)"""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class Histogram:
+    """นับจำนวนต่อช่วง [lo, hi) โดยช่วงบนสุดรวมค่าสูงสุดด้วย"""
+    __slots__ = ("bins", "_edges", "_order", "counts", "total")
+
+    def __init__(self, bins: Sequence[Tuple[float, float, Any, Any]] = QUALITY_BINS):
+        self.bins = tuple(bins)
+        # เรียงตามขอบล่าง แล้วจำตำแหน่งเดิมไว้ (bins ของหน้าต่างเรียงจากสูง → ต่ำ)
+        self._order = sorted(range(len(self.bins)), key=lambda i: self.bins[i][0])
+        self._edges = [self.bins[i][0] for i in self._order]
+        self.counts = [0] * len(self.bins)
+        self.total = 0
+
+    def clear(self) -> None:
+        self.counts = [0] * len(self.bins)
+        self.total = 0
+
+    def add(self, x: float) -> None:
+        pos = bisect_right(self._edges, x) - 1
+        if pos < 0:
+            return
+        idx = self._order[pos]
+        hi = self.bins[idx][1]
+        top = pos == len(self._edges) - 1
+        if x > hi or (x == hi and not top):
+            return
+        self.counts[idx] += 1
+        self.total += 1
+
+
+class SignalRingBuffer:
+    """
+    เก็บ measurement ล่าสุดไม่เกิน capacity ตัว (เก่าสุดถูกทับ)
+    ใช้แทน list ได้: len(), [i], [-5:], for m in buf, append(), clear()
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = int(capacity)
+        self._data = np.full((self.capacity, len(FIELDS)), np.nan, dtype=np.float64)
+        self._items: List[Any] = [None] * self.capacity
+        self._start = 0          # ตำแหน่งของตัวเก่าสุด
+        self._len = 0
+        self.total = 0           # จำนวนที่เคย append ทั้งหมด (รวมที่ถูกทับไปแล้ว)
+        self.stats: Dict[str, RunningStats] = {f: RunningStats() for f in FIELDS}
+        self.quality_hist = Histogram(QUALITY_BINS)
+
+    # ---------- เขียน ----------
+    def append(self, m) -> None:
+        row = self._row(m)
+        pos = (self._start + self._len) % self.capacity
+        if self._len < self.capacity:
+            self._len += 1
+        else:
+            self._start = (self._start + 1) % self.capacity
+        self._data[pos] = row
+        self._items[pos] = m
+        self.total += 1
+
+        for f, v in zip(FIELDS, row):
+            if v == v:                       # ไม่ใช่ NaN
+                self.stats[f].add(v)
+        self.quality_hist.add(row[-1])
+
+    def drop_oldest(self, count: int = 1) -> int:
+        """เอาตัวเก่าสุดออก count ตัว (สถิติของ session ไม่เปลี่ยน) → คืนจำนวนที่เอาออกจริง"""
+        count = max(0, min(int(count), self._len))
+        for _ in range(count):
+            self._data[self._start] = np.nan
+            self._items[self._start] = None
+            self._start = (self._start + 1) % self.capacity
+        self._len -= count
+        return count
+
+    def clear(self) -> None:
+        self._data.fill(np.nan)
+        self._items = [None] * self.capacity
+        self._start = self._len = self.total = 0
+        for s in self.stats.values():
+            s.clear()
+        self.quality_hist.clear()
+
+    @staticmethod
+    def _row(m) -> List[float]:
+        row = []
+        for f in FIELDS:
+            v = getattr(m, _SOURCE.get(f, f), None)
+            if v is None or (f == "ber" and v >= BER_UNKNOWN) or (f != "ber" and f != "quality" and v <= INVALID):
+                row.append(math.nan)
+            else:
+                row.append(float(v))
+        return row
+
+    # ---------- อ่าน ----------
+    def __len__(self) -> int:
+        return self._len
+
+    def __bool__(self) -> bool:
+        return self._len > 0
+
+    def _physical(self, i: int) -> int:
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError("SignalRingBuffer index out of range")
+        return (self._start + i) % self.capacity
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self._items[(self._start + i) % self.capacity] for i in range(*key.indices(self._len))]
+        return self._items[self._physical(key)]
+
+    def __iter__(self) -> Iterator[Any]:
+        for i in range(self._len):
+            yield self._items[(self._start + i) % self.capacity]
+
+    def values(self, field: str, last: Optional[int] = None) -> np.ndarray:
+        """array ของ field (เก่า → ใหม่, NaN = อ่านไม่ได้) — copy เฉพาะตอนเรียก"""
+        n = self._len if last is None else min(int(last), self._len)
+        return self.window(field, self._len - n, self._len)
+
+    def window(self, field: str, start: int, stop: int) -> np.ndarray:
+        """array ของ field ช่วง [start, stop) ตามลำดับ logical (0 = เก่าสุด)"""
+        col = FIELDS.index(field)
+        start = max(0, min(int(start), self._len))
+        stop = max(start, min(int(stop), self._len))
+        first = (self._start + start) % self.capacity
+        end = first + (stop - start)
+        if end <= self.capacity:
+            return self._data[first:end, col].copy()
+        return np.concatenate((self._data[first:, col], self._data[:end - self.capacity, col]))
+
+    def distribution(self) -> List[Tuple[Any, Any, int, float]]:
+        """[(label, icon, count, percent), ...] ตามลำดับ QUALITY_BINS"""
+        total = self.quality_hist.total
+        return [
+            (label, icon, c, (c * 100.0 / total) if total else 0.0)
+            for (_, _, label, icon), c in zip(self.quality_hist.bins, self.quality_hist.counts)
+        ]
+
+
+def minmax_decimate(values: np.ndarray, columns: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    ย่อ array ให้เหลือ columns ช่อง (เช่น 1 ช่องต่อ 1 pixel) โดยเก็บ min / max ของแต่ละช่อง
+    → ยอดแหลม / จุดตกไม่หายเหมือนการสุ่มทุก k ตัว
+    คืน (col_min, col_max, has_invalid); ช่องที่อ่านไม่ได้ทั้งช่อง min = max = NaN
+    """
+    n = len(values)
+    columns = max(1, min(int(columns), n))
+    if n == 0:
+        empty = np.empty(0)
+        return empty, empty, np.empty(0, dtype=bool)
+    starts = (np.arange(columns, dtype=np.int64) * n) // columns
+    invalid = np.isnan(values)
+    has_invalid = np.logical_or.reduceat(invalid, starts)
+    if not invalid.any():
+        return np.minimum.reduceat(values, starts), np.maximum.reduceat(values, starts), has_invalid
+    # fmin / fmax ข้าม NaN (ได้ NaN เฉพาะช่องที่ไม่มีค่าเลย)
+    return np.fmin.reduceat(values, starts), np.fmax.reduceat(values, starts), has_invalid
+
+
+# ==================== BENCHMARK ====================
+def benchmark(samples: int = 1_000_000, capacity: int = DEFAULT_CAPACITY) -> None:
+    """เวลาเฉลี่ยต่อ sample ในแต่ละช่วง → ต้องคงที่ไม่โตตามจำนวนที่สะสม"""
+    import random, time
+    from types import SimpleNamespace
+
+    buf = SignalRingBuffer(capacity)
+    rnd = random.Random(1)
+    pool = [
+        SimpleNamespace(rssi=rnd.choice([INVALID, rnd.randint(-110, -50)]), rsrp=INVALID,
+                        rsrq=INVALID, ber=rnd.choice([BER_UNKNOWN, 0.5]),
+                        quality_score=rnd.uniform(0, 100))
+        for _ in range(4096)
+    ]
+    checkpoints = [10 ** k for k in range(3, 7) if 10 ** k <= samples] or [samples]
+    done, t_prev = 0, time.perf_counter()
+    for cp in checkpoints:
+        for i in range(done, cp):
+            buf.append(pool[i & 4095])
+            s = buf.stats["rssi"]
+            _ = (s.mean, s.min, s.max, s.variance)      # สิ่งที่หน้าต่างอ่านทุก sample
+        t_now = time.perf_counter()
+        per = (t_now - t_prev) / (cp - done) * 1e6
+        print(f"{cp:>9,} samples: {per:6.2f} µs/sample  (len={len(buf):,}, rssi mean={buf.stats['rssi'].mean:.2f})")
+        done, t_prev = cp, t_now
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,431 @@
+# services/signal_store.py
+"""
+เก็บประวัติคุณภาพสัญญาณแบบ time-series ลง SQLite (signal_history.db ข้าง ๆ ตัวโปรแกรม)
+- signal_raw    : ทุก measurement (series, ts วินาที) → ตัวเลขล้วน ไม่เก็บข้อความ
+- signal_rollup : สรุป 1 นาที / 1 ชั่วโมง (min / max / sum / n) อัปเดตตอน append
+- series = ICCID ของซิม (ถ้ารู้) ไม่งั้น 'port:COMx'
+- query_series / query_many เลือกความละเอียดเองตามช่วงเวลา → วาดกราฟ 1 สัปดาห์ × 64 โมเด็ม
+  ได้โดยไม่ต้องโหลด raw
+- cells / cell_obs / cell_reselections : สัญญาณแยกตามเซลล์ (index ด้วย cell_key) และเหตุการณ์
+  เปลี่ยน serving cell (ดู services/cell_info.py)
+- signal_alerts : alert จาก services/signal_anomaly.py (raised / cleared)
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+import sqlite3
+import sys
+import threading
+import time
+
+from .metrics import STORAGE_WRITE, clock
+
+RES_RAW = 0
+RES_MINUTE = 60
+RES_HOUR = 3600
+ROLLUP_RESOLUTIONS = (RES_MINUTE, RES_HOUR)
+
+# เก็บ raw / รายนาทีไว้นานเท่าไร (วัน) ก่อน prune (รายชั่วโมงเก็บตลอด)
+RAW_RETENTION_DAYS = 14
+MINUTE_RETENTION_DAYS = 120
+PRUNE_INTERVAL = 6 * 3600   # prune อัตโนมัติจาก append_measurements (ครั้งแรกหลังเปิดโปรแกรม แล้วทุก 6 ชม.)
+
+INVALID = -999      # ค่าที่โมเด็มอ่านไม่ได้ → เก็บเป็น NULL (ไม่นับใน min/max/avg)
+
+
+def _app_dir() -> Path:
+    if getattr(sys, "frozen", False):
+        return Path(sys.executable).resolve().parent
+    return Path(__file__).resolve().parents[1]
+
+SIGNAL_DB_PATH = _app_dir() / "signal_history.db"
+
+def _conn():
+    conn = sqlite3.connect(SIGNAL_DB_PATH, check_same_thread=False, timeout=10)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def init_signal_store() -> None:
+    with _conn() as conn:
+        # WAL → หน้าต่างกราฟอ่านได้ระหว่างที่ thread วัดสัญญาณกำลังเขียน
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS signal_raw (
+                series TEXT NOT NULL,
+                ts INTEGER NOT NULL,          -- epoch seconds
+                rssi INTEGER, rsrp INTEGER, rsrq INTEGER, sinr INTEGER,
+                ber REAL, quality REAL, bars INTEGER,
+                PRIMARY KEY (series, ts)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS signal_rollup (
+                series TEXT NOT NULL,
+                res INTEGER NOT NULL,         -- 60 | 3600
+                bucket INTEGER NOT NULL,      -- ts เริ่มต้นของช่วง
+                n INTEGER NOT NULL,
+                rssi_n INTEGER NOT NULL,      -- จำนวนที่ rssi อ่านได้
+                rssi_min INTEGER, rssi_max INTEGER, rssi_sum INTEGER,
+                quality_min REAL, quality_max REAL, quality_sum REAL,
+                PRIMARY KEY (series, res, bucket)
+            ) WITHOUT ROWID
+        """)
+        # ข้อมูลคงที่ของเซลล์ (1 แถวต่อเซลล์)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cells (
+                cell_key TEXT PRIMARY KEY,
+                rat TEXT, mcc TEXT, mnc TEXT, tac TEXT, cell_id TEXT,
+                earfcn INTEGER, pci INTEGER, band TEXT,
+                first_ts INTEGER, last_ts INTEGER
+            ) WITHOUT ROWID
+        """)
+        # ค่าที่วัดได้ต่อเซลล์ → "สัญญาณของเซลล์นี้ตามเวลา" อ่านตาม PK ได้ตรง ๆ
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cell_obs (
+                cell_key TEXT NOT NULL,
+                ts INTEGER NOT NULL,
+                series TEXT NOT NULL,
+                serving INTEGER NOT NULL,
+                rsrp INTEGER, rsrq INTEGER, sinr REAL, rssi INTEGER,
+                PRIMARY KEY (cell_key, ts, series)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cell_obs_series_ts ON cell_obs(series, ts)")
+        # serving cell เปลี่ยน (from_key NULL = เซลล์แรกที่เห็นของ series)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cell_reselections (
+                series TEXT NOT NULL,
+                ts INTEGER NOT NULL,
+                from_key TEXT,
+                to_key TEXT NOT NULL,
+                PRIMARY KEY (series, ts)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS signal_alerts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                series TEXT NOT NULL,
+                ts REAL NOT NULL,
+                kind TEXT NOT NULL,
+                state TEXT NOT NULL,          -- raised | cleared
+                value REAL, baseline REAL,
+                message TEXT
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_signal_alerts_ts ON signal_alerts(ts)")
+        conn.commit()
+
+
+def series_key(iccid: Optional[str] = None, port: Optional[str] = None) -> str:
+    iccid = (iccid or "").strip()
+    if iccid and iccid != "-":
+        return iccid
+    return f"port:{port or 'unknown'}"
+
+
+_UPSERT_ROLLUP = """
+    INSERT INTO signal_rollup (series, res, bucket, n, rssi_n, rssi_min, rssi_max, rssi_sum,
+                               quality_min, quality_max, quality_sum)
+    VALUES (?,?,?,1,?,?,?,?,?,?,?)
+    ON CONFLICT(series, res, bucket) DO UPDATE SET
+        n           = n + 1,
+        rssi_n      = rssi_n + excluded.rssi_n,
+        rssi_min    = MIN(IFNULL(rssi_min, excluded.rssi_min), IFNULL(excluded.rssi_min, rssi_min)),
+        rssi_max    = MAX(IFNULL(rssi_max, excluded.rssi_max), IFNULL(excluded.rssi_max, rssi_max)),
+        rssi_sum    = IFNULL(rssi_sum, 0) + IFNULL(excluded.rssi_sum, 0),
+        quality_min = MIN(quality_min, excluded.quality_min),
+        quality_max = MAX(quality_max, excluded.quality_max),
+        quality_sum = quality_sum + excluded.quality_sum
+"""
+
+
+def _num(value, cast, missing):
+    """ค่าที่อ่านไม่ได้ (-999 / BER 99) → NULL (SQLite ไม่เสียพื้นที่เก็บ)"""
+    return None if value is None or value == missing else cast(value)
+
+
+def _sample_row(m, ts: int) -> tuple:
+    return (
+        int(ts),
+        _num(getattr(m, "rssi", None), int, INVALID), _num(getattr(m, "rsrp", None), int, INVALID),
+        _num(getattr(m, "rsrq", None), int, INVALID), _num(getattr(m, "sinr", None), int, INVALID),
+        _num(getattr(m, "ber", None), float, 99.0), float(getattr(m, "quality_score", 0.0)),
+        int(getattr(m, "signal_bars", 0)),
+    )
+
+
+def append_measurements(series: str, samples: Iterable[tuple]) -> int:
+    """
+    เพิ่ม measurement หลายตัวใน transaction เดียว
+    samples: [(measurement, ts), ...]  (measurement = SignalMeasurement หรือ object ที่มี field เดียวกัน)
+    """
+    raw, rollups = [], []
+    for m, ts in samples:
+        row = _sample_row(m, ts)
+        raw.append((series,) + row)
+        rssi, quality = row[1], row[6]
+        ok = rssi is not None
+        for res in ROLLUP_RESOLUTIONS:
+            rollups.append((
+                series, res, row[0] - row[0] % res,
+                1 if ok else 0, rssi if ok else None, rssi if ok else None, rssi if ok else None,
+                quality, quality, quality,
+            ))
+    if not raw:
+        return 0
+    started = clock()
+    step = len(ROLLUP_RESOLUTIONS)
+    added = 0
+    with _conn() as conn:
+        for i, r in enumerate(raw):
+            # ts ซ้ำ (วัดถี่กว่า 1 วินาที) → ข้าม ไม่ให้ rollup นับซ้ำ
+            if conn.execute("INSERT OR IGNORE INTO signal_raw VALUES (?,?,?,?,?,?,?,?,?)", r).rowcount != 1:
+                continue
+            conn.executemany(_UPSERT_ROLLUP, rollups[i * step:(i + 1) * step])
+            added += 1
+        conn.commit()
+    STORAGE_WRITE.observe_since(started, "signal_raw")
+    maybe_prune()
+    return added
+
+
+def append_measurement(series: str, measurement, ts: Optional[float] = None) -> None:
+    append_measurements(series, [(measurement, int(ts if ts is not None else time.time()))])
+
+
+def pick_resolution(since: float, until: float, max_points: int = 1000) -> int:
+    """ความละเอียดที่หยาบที่สุดที่ยังได้จุดไม่เกิน max_points"""
+    span = max(1.0, float(until) - float(since))
+    for res in (RES_RAW, RES_MINUTE):
+        step = res or 5     # raw ≈ วัดทุก 5 วินาที
+        if span / step <= max_points:
+            return res
+    return RES_HOUR
+
+
+def query_series(series: str, since: float, until: Optional[float] = None,
+                 resolution: Optional[int] = None, max_points: int = 1000) -> List[Dict[str, Any]]:
+    """
+    คืนจุดของ series ในช่วง [since, until)
+    แต่ละจุด: ts, n, rssi_min, rssi_max, rssi_avg, quality_min, quality_max, quality_avg
+    (raw: min = max = avg = ค่าที่วัดได้)
+    """
+    return query_many([series], since, until, resolution, max_points).get(series, [])
+
+
+def query_many(series_list: Sequence[str], since: float, until: Optional[float] = None,
+               resolution: Optional[int] = None, max_points: int = 1000) -> Dict[str, List[Dict[str, Any]]]:
+    """เหมือน query_series แต่หลาย series ในการเปิด connection ครั้งเดียว"""
+    until = time.time() if until is None else until
+    res = pick_resolution(since, until, max_points) if resolution is None else int(resolution)
+    out: Dict[str, List[Dict[str, Any]]] = {s: [] for s in series_list}
+    with _conn() as conn:
+        for s in series_list:
+            if res == RES_RAW:
+                rows = conn.execute("""
+                    SELECT ts, 1 AS n, rssi AS rssi_min, rssi AS rssi_max, rssi AS rssi_avg,
+                           quality AS quality_min, quality AS quality_max, quality AS quality_avg
+                      FROM signal_raw
+                     WHERE series = ? AND ts >= ? AND ts < ?
+                     ORDER BY ts
+                """, [s, int(since), int(until)]).fetchall()
+            else:
+                rows = conn.execute("""
+                    SELECT bucket AS ts, n, rssi_min, rssi_max,
+                           CASE WHEN rssi_n > 0 THEN rssi_sum * 1.0 / rssi_n END AS rssi_avg,
+                           quality_min, quality_max, quality_sum / n AS quality_avg
+                      FROM signal_rollup
+                     WHERE series = ? AND res = ? AND bucket >= ? AND bucket < ?
+                     ORDER BY bucket
+                """, [s, res, int(since) - int(since) % res, int(until)]).fetchall()
+            out[s] = [{k: r[k] for k in r.keys()} for r in rows]
+    return out
+
+
+# ==================== CELLS ====================
+_serving_lock = threading.Lock()
+_serving_now: Dict[str, Optional[str]] = {}     # series → cell_key ของ serving ล่าสุด (cache ของ DB)
+
+_UPSERT_CELL = """
+    INSERT INTO cells (cell_key, rat, mcc, mnc, tac, cell_id, earfcn, pci, band, first_ts, last_ts)
+    VALUES (?,?,?,?,?,?,?,?,?,?,?)
+    ON CONFLICT(cell_key) DO UPDATE SET
+        last_ts = MAX(last_ts, excluded.last_ts),
+        band    = CASE WHEN excluded.band != '' THEN excluded.band ELSE band END
+"""
+
+
+def _current_serving(conn, series: str) -> Optional[str]:
+    if series not in _serving_now:
+        row = conn.execute(
+            "SELECT to_key FROM cell_reselections WHERE series = ? ORDER BY ts DESC LIMIT 1", [series]
+        ).fetchone()
+        _serving_now[series] = row[0] if row else None
+    return _serving_now[series]
+
+
+def append_cell_report(series: str, cells: Iterable, ts: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """
+    บันทึกรายงานเซลล์หนึ่งรอบ (cells = [CellInfo] จาก services.cell_info.parse_cell_report)
+    คืน {'series', 'ts', 'from_key', 'to_key'} ถ้า serving cell เปลี่ยนจากรอบก่อน ไม่งั้น None
+    """
+    ts = int(ts if ts is not None else time.time())
+    cells = [c for c in cells if c.rat]
+    if not cells:
+        return None
+    serving = next((c for c in cells if c.serving), None)
+    event = None
+    with _serving_lock, _conn() as conn:
+        conn.executemany(_UPSERT_CELL, [
+            (c.key, c.rat, c.mcc, c.mnc, c.tac, c.cell_id, c.earfcn, c.pci, c.band, ts, ts) for c in cells
+        ])
+        conn.executemany("INSERT OR REPLACE INTO cell_obs VALUES (?,?,?,?,?,?,?,?)", [
+            (c.key, ts, series, 1 if c.serving else 0, c.rsrp, c.rsrq, c.sinr, c.rssi) for c in cells
+        ])
+        if serving is not None:
+            prev = _current_serving(conn, series)
+            if prev != serving.key:
+                conn.execute("INSERT OR REPLACE INTO cell_reselections VALUES (?,?,?,?)",
+                             [series, ts, prev, serving.key])
+                _serving_now[series] = serving.key
+                if prev is not None:
+                    event = {"series": series, "ts": ts, "from_key": prev, "to_key": serving.key}
+        conn.commit()
+    return event
+
+
+def query_cell(cell_key: str, since: float, until: Optional[float] = None,
+               series: Optional[str] = None) -> List[Dict[str, Any]]:
+    """สัญญาณของเซลล์หนึ่งตามเวลา (ทุกโมเด็ม หรือเฉพาะ series)"""
+    until = time.time() if until is None else until
+    sql = """
+        SELECT ts, series, serving, rsrp, rsrq, sinr, rssi
+          FROM cell_obs
+         WHERE cell_key = ? AND ts >= ? AND ts < ?
+    """
+    args: List[Any] = [cell_key, int(since), int(until)]
+    if series is not None:
+        sql += " AND series = ?"
+        args.append(series)
+    with _conn() as conn:
+        rows = conn.execute(sql + " ORDER BY ts", args).fetchall()
+    return [{k: r[k] for k in r.keys()} for r in rows]
+
+
+def list_cells(series: Optional[str] = None, since: Optional[float] = None) -> List[Dict[str, Any]]:
+    """เซลล์ที่เคยเห็น (ของ series ถ้าระบุ) พร้อมช่วงเวลา และจำนวนครั้งที่เป็น serving"""
+    conds, args = [], []
+    if series is not None:
+        conds.append("o.series = ?"); args.append(series)
+    if since is not None:
+        conds.append("o.ts >= ?"); args.append(int(since))
+    where_sql = ("WHERE " + " AND ".join(conds)) if conds else ""
+    with _conn() as conn:
+        rows = conn.execute(f"""
+            SELECT c.*, COUNT(*) AS samples, SUM(o.serving) AS serving_samples,
+                   MIN(o.ts) AS seen_from, MAX(o.ts) AS seen_to
+              FROM cell_obs o JOIN cells c ON c.cell_key = o.cell_key
+              {where_sql}
+             GROUP BY o.cell_key
+             ORDER BY serving_samples DESC, samples DESC
+        """, args).fetchall()
+    return [{k: r[k] for k in r.keys()} for r in rows]
+
+
+def cell_reselections(series: Optional[str] = None, since: Optional[float] = None,
+                      until: Optional[float] = None) -> List[Dict[str, Any]]:
+    """เหตุการณ์เปลี่ยน serving cell (ไม่รวมเซลล์แรกของแต่ละ series)"""
+    conds, args = ["from_key IS NOT NULL"], []
+    if series is not None:
+        conds.append("series = ?"); args.append(series)
+    if since is not None:
+        conds.append("ts >= ?"); args.append(int(since))
+    if until is not None:
+        conds.append("ts < ?"); args.append(int(until))
+    with _conn() as conn:
+        rows = conn.execute(
+            f"SELECT * FROM cell_reselections WHERE {' AND '.join(conds)} ORDER BY ts", args
+        ).fetchall()
+    return [{k: r[k] for k in r.keys()} for r in rows]
+
+
+# ==================== ALERTS ====================
+def append_alerts(alerts: Iterable) -> None:
+    """alerts = [AnomalyAlert] (เกิดไม่บ่อย เพราะ detector จำกัดอัตราไว้แล้ว)"""
+    rows = [(a.series, float(a.ts), a.kind, a.state, a.value, a.baseline, a.message) for a in alerts]
+    if not rows:
+        return
+    with _conn() as conn:
+        conn.executemany(
+            "INSERT INTO signal_alerts (series, ts, kind, state, value, baseline, message) VALUES (?,?,?,?,?,?,?)",
+            rows,
+        )
+        conn.commit()
+
+
+def list_alerts(since: Optional[float] = None, series: Optional[str] = None,
+                limit: int = 500) -> List[Dict[str, Any]]:
+    """alert ล่าสุดก่อน"""
+    conds, args = [], []
+    if since is not None:
+        conds.append("ts >= ?"); args.append(float(since))
+    if series is not None:
+        conds.append("series = ?"); args.append(series)
+    where_sql = ("WHERE " + " AND ".join(conds)) if conds else ""
+    with _conn() as conn:
+        rows = conn.execute(
+            f"SELECT * FROM signal_alerts {where_sql} ORDER BY ts DESC LIMIT ?", args + [int(limit)]
+        ).fetchall()
+    return [{k: r[k] for k in r.keys()} for r in rows]
+
+
+def list_series() -> List[Dict[str, Any]]:
+    """series ทั้งหมด พร้อมช่วงเวลาที่มีข้อมูล (จาก rollup รายชั่วโมง → เร็ว)"""
+    with _conn() as conn:
+        rows = conn.execute("""
+            SELECT series, MIN(bucket) AS first_ts, MAX(bucket) + ? AS last_ts, SUM(n) AS samples
+              FROM signal_rollup
+             WHERE res = ?
+             GROUP BY series
+             ORDER BY series
+        """, [RES_HOUR, RES_HOUR]).fetchall()
+    return [{k: r[k] for k in r.keys()} for r in rows]
+
+
+def prune(raw_days: int = RAW_RETENTION_DAYS, minute_days: int = MINUTE_RETENTION_DAYS) -> None:
+    """ลบ raw / รายนาทีที่เก่ากว่ากำหนด (รายชั่วโมงเก็บไว้ทั้งหมด)"""
+    now = int(time.time())
+    with _conn() as conn:
+        conn.execute("DELETE FROM signal_raw WHERE ts < ?", [now - raw_days * 86400])
+        conn.execute("DELETE FROM cell_obs WHERE ts < ?", [now - raw_days * 86400])
+        conn.execute("DELETE FROM signal_rollup WHERE res = ? AND bucket < ?",
+                     [RES_MINUTE, now - minute_days * 86400])
+        conn.commit()
+
+
+_last_prune = 0.0
+_prune_lock = threading.Lock()
+
+
+def maybe_prune(now: Optional[float] = None) -> bool:
+    """
+    prune ถ้าครั้งล่าสุดนานกว่า PRUNE_INTERVAL → True ถ้าได้ลบ
+    เรียกใน thread ที่เขียนข้อมูล (ไม่ใช่ตอน import → เปิดโปรแกรมไม่ต้องรอ DELETE)
+    """
+    global _last_prune
+    now = time.monotonic() if now is None else now
+    with _prune_lock:
+        if _last_prune and now - _last_prune < PRUNE_INTERVAL:
+            return False
+        _last_prune = now
+    try:
+        prune()
+        return True
+    except Exception as e:
+        print(f"Signal store prune error: {e}")
+        return False
+
+
+# สร้างตารางทันทีเมื่อ import (เหมือน services/db.py)
+init_signal_store()
@@ -0,0 +1,137 @@
+# services/signal_urc.py
+"""
+แปลง URC (unsolicited result code) ที่โมเด็มส่งมาเองเมื่อสัญญาณ/การลงทะเบียนเปลี่ยน
+- Quectel   : AT+QINDCFG="csq",1   → +QIND: "csq",<rssi>,<ber>
+- มาตรฐาน   : AT+CIND=? + AT+CMER=3,0,0,1 → +CIEV: <ind>,<value>  (ind = ลำดับของ "signal"/"rssi")
+- ตำแหน่งเซลล์: AT+CREG=2              → +CREG: <stat>[,"<lac>","<ci>"[,<act>]]
+ใช้โดย EnhancedSignalQualityThread (push mode) — ไม่มี Qt ในโมดูลนี้
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+import re
+
+PUSH_QIND = "qind"      # +QIND: "csq"
+PUSH_CIEV = "ciev"      # +CIEV ของ indicator signal/rssi
+PUSH_NONE = ""
+
+# คำสั่งเปิด/ปิด URC ตามชนิด (ปิดตอนหยุด monitor → ไม่ให้ URC ไปปนกับส่วนอื่นของโปรแกรม)
+ENABLE_COMMANDS = {
+    PUSH_QIND: 'AT+QINDCFG="csq",1,0',
+    PUSH_CIEV: "AT+CMER=3,0,0,1",
+}
+DISABLE_COMMANDS = {
+    PUSH_QIND: 'AT+QINDCFG="csq",0,0',
+    PUSH_CIEV: "AT+CMER=0,0,0,0",
+}
+CREG_ENABLE = "AT+CREG=2"
+CREG_DISABLE = "AT+CREG=0"
+
+# สถานะการลงทะเบียน (3GPP TS 27.007 +CREG <stat>)
+REGISTERED_STATES = (1, 5)
+
+_QIND_RE = re.compile(r'^\+QIND:\s*"csq"\s*,\s*(\d+)\s*,\s*(\d+)', re.I)
+_CIEV_RE = re.compile(r'^\+CIEV:\s*(\d+)\s*,\s*(\d+)', re.I)
+# URC มีแค่ <stat>[,lac,ci[,act]] — ต่างจากคำตอบของ AT+CREG? ที่ขึ้นต้นด้วย <n>,<stat>
+_CREG_URC_RE = re.compile(
+    r'^\+CREG:\s*(\d+)\s*(?:,\s*"?([0-9A-Fa-f]+)"?\s*,\s*"?([0-9A-Fa-f]+)"?\s*(?:,\s*(\d+))?)?\s*$', re.I)
+# คำตอบของ AT+CREG? : <n>,<stat>[,lac,ci[,act]] — <n> เป็นอะไรก็ได้ (0 ปกติ, 2 ระหว่าง push mode)
+_CREG_QUERY_RE = re.compile(
+    r'^\+CREG:\s*(\d+)\s*,\s*(\d+)\s*(?:,\s*"?([0-9A-Fa-f]+)"?\s*,\s*"?([0-9A-Fa-f]+)"?\s*(?:,\s*(\d+))?)?\s*$',
+    re.I)
+_CIND_ITEM_RE = re.compile(r'\(\s*"([^"]+)"\s*,\s*\(\s*(\d+)\s*[-,]\s*(\d+)\s*\)\s*\)')
+
+SIGNAL_INDICATORS = ("signal", "rssi")
+
+
+@dataclass(frozen=True)
+class SignalUrc:
+    """สัญญาณเปลี่ยน: rssi_raw/ber_raw ตาม +CSQ (QIND) หรือ level 0..level_max (CIEV)"""
+    rssi_raw: Optional[int] = None
+    ber_raw: Optional[int] = None
+    level: Optional[int] = None
+    level_max: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class RegistrationUrc:
+    """การลงทะเบียน/เซลล์เปลี่ยน (+CREG URC ตอน AT+CREG=2)"""
+    stat: int
+    lac: str = ""
+    ci: str = ""
+    act: Optional[int] = None
+
+    @property
+    def registered(self) -> bool:
+        return self.stat in REGISTERED_STATES
+
+
+def parse_creg_response(response: str) -> Optional[RegistrationUrc]:
+    """คำตอบของ AT+CREG? (ทั้งก้อน) → RegistrationUrc จากบรรทัด +CREG: <n>,<stat> หรือ None ถ้าไม่มี"""
+    for line in (response or "").replace("\r", "\n").split("\n"):
+        m = _CREG_QUERY_RE.match(line.strip())
+        if m:
+            act = m.group(5)
+            return RegistrationUrc(
+                stat=int(m.group(2)), lac=(m.group(3) or "").upper(), ci=(m.group(4) or "").upper(),
+                act=int(act) if act is not None else None,
+            )
+    return None
+
+
+def creg_registered(response: str) -> bool:
+    """AT+CREG? ตอบว่าลงทะเบียนแล้ว (home / roaming) ไม่ว่า <n> เป็นค่าใด"""
+    reg = parse_creg_response(response)
+    return reg is not None and reg.registered
+
+
+def csq_to_dbm(rssi_raw: int) -> int:
+    """ค่า <rssi> ของ +CSQ (0..31, 99) → dBm (-999 = อ่านไม่ได้)"""
+    if rssi_raw == 0:
+        return -113
+    if rssi_raw == 31:
+        return -51
+    if 1 <= rssi_raw <= 30:
+        return -113 + rssi_raw * 2
+    return -999
+
+
+def parse_cind_support(lines: Iterable[str]) -> Dict[str, Tuple[int, int, int]]:
+    """คำตอบ AT+CIND=? → {ชื่อ indicator (ตัวเล็ก): (ลำดับเริ่ม 1, ต่ำสุด, สูงสุด)}"""
+    text = " ".join(l for l in lines if "+CIND:" in l.upper())
+    return {
+        name.lower(): (i, int(lo), int(hi))
+        for i, (name, lo, hi) in enumerate(_CIND_ITEM_RE.findall(text), 1)
+    }
+
+
+def signal_indicator(cind: Dict[str, Tuple[int, int, int]]) -> Optional[Tuple[int, int]]:
+    """(ลำดับ, ค่าสูงสุด) ของ indicator ที่บอกระดับสัญญาณ หรือ None ถ้าโมเด็มไม่มี"""
+    for name in SIGNAL_INDICATORS:
+        if name in cind:
+            index, _, hi = cind[name]
+            return index, hi
+    return None
+
+
+def parse_urc(line: str, ciev_index: Optional[int] = None, ciev_max: int = 5):
+    """บรรทัดเดียว → SignalUrc / RegistrationUrc หรือ None ถ้าไม่ใช่ URC ที่สนใจ"""
+    s = (line or "").strip()
+    if not s.startswith("+"):
+        return None
+    m = _QIND_RE.match(s)
+    if m:
+        return SignalUrc(rssi_raw=int(m.group(1)), ber_raw=int(m.group(2)))
+    m = _CIEV_RE.match(s)
+    if m:
+        if ciev_index is None or int(m.group(1)) != ciev_index:
+            return None
+        return SignalUrc(level=int(m.group(2)), level_max=ciev_max)
+    m = _CREG_URC_RE.match(s)
+    if m:
+        act = m.group(4)
+        return RegistrationUrc(
+            stat=int(m.group(1)), lac=(m.group(2) or "").upper(), ci=(m.group(3) or "").upper(),
+            act=int(act) if act is not None else None,
+        )
+    return None
@@ -0,0 +1,173 @@
+# services/sim_identity_cache.py
+"""
+cache identity ของซิม (IMSI / เบอร์โทร) โดยใช้ ICCID เป็น key — เก็บถาวรในตาราง sim_identity (sim_logs.db)
+- เปิดหน้าต่าง / refresh → ถามแค่ AT+CCID (หรือ AT+QCCID) ครั้งเดียว แล้วดูใน cache
+  ไม่ต้องยิง AT+CIMI / AT+CNUM ซ้ำทุกครั้ง
+- ICCID ที่อ่านได้ไม่ตรงกับที่จำไว้ของพอร์ต (ถอดเปลี่ยนซิม) → อ่านใหม่ทั้งหมด
+- สถานะ +CPIN ของพอร์ตเปลี่ยน (READY → NOT READY / SIM PIN ฯลฯ) → ลบ identity ของซิมในพอร์ตนั้น
+- sim_for_port(port) → (ICCID, ผู้ให้บริการ) ของซิมที่อยู่ในพอร์ตตอนนี้ → sms_log ผูกแต่ละแถวกับซิมที่ถูกต้อง
+ใช้ร่วมกันทั้ง sim_model.load_sim_data, SIMCardValidator และ EnhancedSignalQualityThread
+"""
+from __future__ import annotations
+from typing import Dict, Iterable, Optional, Tuple, Union
+import re
+import threading
+import time
+
+ICCID_COMMANDS = ("AT+CCID", "AT+QCCID")   # QCCID = Quectel ที่ไม่รู้จัก CCID
+MAX_AGE_DAYS = 30                         # เบอร์ใน CNUM เปลี่ยนได้ → อ่านใหม่เป็นระยะ
+
+_ICCID_RE = re.compile(r'(\d{18,22})')
+
+_lock = threading.Lock()
+_identities: Dict[str, Tuple[str, str, int]] = {}   # iccid → (imsi, phone, updated_ts) (cache ของ DB)
+_port_iccid: Dict[str, str] = {}                     # port → ICCID ล่าสุดที่เห็น
+_port_cpin: Dict[str, str] = {}                      # port → สถานะ +CPIN ล่าสุด
+_port_carrier: Dict[str, str] = {}                   # port → ผู้ให้บริการ (เมื่อยังไม่มี IMSI ครบใน cache)
+
+# IMSI prefix (MCC+MNC) → ผู้ให้บริการ
+CARRIER_PREFIXES = (("52001", "AIS"), ("52005", "DTAC"), ("52003", "TRUE"))
+
+
+def carrier_from_imsi(imsi: str) -> str:
+    """'52001...' → 'AIS' ฯลฯ / ไม่รู้จัก → 'Unknown'"""
+    for prefix, carrier in CARRIER_PREFIXES:
+        if (imsi or "").startswith(prefix):
+            return carrier
+    return "Unknown"
+
+
+def parse_iccid(response: Union[str, Iterable[str]]) -> str:
+    """คำตอบของ AT+CCID / AT+QCCID (ข้อความหรือรายการบรรทัด) → ICCID หรือ '' ถ้าไม่พบ"""
+    lines = response.splitlines() if isinstance(response, str) else response
+    for line in lines:
+        up = (line or "").upper()
+        if "ERROR" in up or up.startswith("AT"):
+            continue
+        m = _ICCID_RE.search(line)
+        if m:
+            return m.group(1)
+    return ""
+
+
+def lookup(iccid: str, port: Optional[str] = None) -> Optional[Dict[str, str]]:
+    """identity ของ ICCID นี้ {'iccid', 'imsi', 'phone'} หรือ None (ไม่มี / เก่าเกิน MAX_AGE_DAYS)"""
+    if not iccid:
+        return None
+    with _lock:
+        if port:
+            _port_iccid[port] = iccid
+        row = _identities.get(iccid)
+    if row is None:
+        row = _load(iccid)
+        if row is None:
+            return None
+        with _lock:
+            _identities[iccid] = row
+    imsi, phone, updated_ts = row
+    if time.time() - updated_ts > MAX_AGE_DAYS * 86400:
+        return None
+    return {"iccid": iccid, "imsi": imsi, "phone": phone}
+
+
+def store(iccid: str, imsi: str, phone: str = "", port: Optional[str] = None) -> None:
+    """จำ identity ที่อ่านมาเต็ม ๆ (IMSI ต้องครบ 15 หลัก ไม่งั้นไม่เก็บ)"""
+    if not iccid or not imsi or len(imsi) != 15:
+        return
+    row = (imsi, phone or "", int(time.time()))
+    with _lock:
+        _identities[iccid] = row
+        if port:
+            _port_iccid[port] = iccid
+    try:
+        from .db import get_conn     # lazy import (db สร้างไฟล์ตอน import)
+        with get_conn() as conn:
+            conn.execute(
+                "INSERT INTO sim_identity (iccid, imsi, phone, updated_ts) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(iccid) DO UPDATE SET imsi = excluded.imsi, phone = excluded.phone, "
+                "updated_ts = excluded.updated_ts",
+                (iccid, *row),
+            )
+    except Exception as e:
+        print(f"Error saving SIM identity: {e}")
+
+
+def note_carrier(port: str, carrier: str) -> None:
+    """จำผู้ให้บริการของซิมในพอร์ต (ใช้เมื่อรู้ IMSI แต่ยังเก็บ identity เต็มไม่ได้ เช่น headless)"""
+    if port:
+        with _lock:
+            _port_carrier[port] = carrier or ""
+
+
+def sim_for_port(port: Optional[str]) -> Tuple[str, str]:
+    """(ICCID, ผู้ให้บริการ) ของซิมที่เห็นล่าสุดในพอร์ตนี้ — ไม่ทราบ → ''"""
+    if not port:
+        return "", ""
+    with _lock:
+        iccid = _port_iccid.get(port, "")
+        carrier = _port_carrier.get(port, "")
+        row = _identities.get(iccid) if iccid else None
+    if row is not None:
+        carrier = carrier_from_imsi(row[0])
+    return iccid, ("" if carrier == "Unknown" else carrier)
+
+
+def invalidate(port: Optional[str] = None, iccid: Optional[str] = None) -> None:
+    """ลืม identity ของซิมในพอร์ตนี้ (และ/หรือ ICCID นี้) ทั้งในหน่วยความจำและใน DB"""
+    with _lock:
+        if port:
+            _port_carrier.pop(port, None)
+            iccid = _port_iccid.pop(port, None) or iccid
+        if not iccid:
+            return
+        _identities.pop(iccid, None)
+    try:
+        from .db import get_conn
+        with get_conn() as conn:
+            conn.execute("DELETE FROM sim_identity WHERE iccid = ?", (iccid,))
+    except Exception as e:
+        print(f"Error clearing SIM identity: {e}")
+
+
+def note_cpin(port: Optional[str], response: str) -> bool:
+    """
+    บันทึกสถานะ +CPIN ล่าสุดของพอร์ต → True (และลบ identity) ถ้าเปลี่ยนจากที่เคยเห็น
+    ครั้งแรกที่เห็นไม่ถือว่าเปลี่ยน: ซิมที่ถูกเปลี่ยนระหว่างปิดโปรแกรมจะถูกจับได้จาก ICCID อยู่แล้ว
+    """
+    state = cpin_state(response)
+    if not port or not state:
+        return False
+    with _lock:
+        prev = _port_cpin.get(port)
+        _port_cpin[port] = state
+    if prev is None or prev == state:
+        return False
+    invalidate(port)
+    # ผลวิเคราะห์ทุก stage / คำตอบที่ cache ไว้ของพอร์ตนี้เป็นของซิมเดิม
+    from .analysis_scheduler import default_cache
+    from . import query_cache
+    default_cache().invalidate(port)
+    query_cache.invalidate(port)
+    return True
+
+
+def cpin_state(response: str) -> str:
+    """'+CPIN: READY' → 'READY', 'SIM NOT INSERTED' → 'NOT INSERTED', อื่น ๆ → ''"""
+    up = (response or "").upper()
+    if "NOT INSERTED" in up or "NO SIM" in up or "SIM FAILURE" in up:
+        return "NOT INSERTED"
+    m = re.search(r'\+CPIN:\s*([A-Z0-9 -]+)', up)
+    return m.group(1).strip() if m else ""
+
+
+def _load(iccid: str) -> Optional[Tuple[str, str, int]]:
+    try:
+        from .db import get_conn
+        with get_conn() as conn:
+            r = conn.execute(
+                "SELECT imsi, phone, updated_ts FROM sim_identity WHERE iccid = ?", (iccid,)
+            ).fetchone()
+        return (r["imsi"], r["phone"] or "", int(r["updated_ts"])) if r else None
+    except Exception as e:
+        print(f"Error reading SIM identity: {e}")
+        return None
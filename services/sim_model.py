@@ -2,6 +2,10 @@
 import serial
 import time
 import re
+from . import sim_identity_cache
+from . import query_cache
+from .at_transport import read_until_final, transaction_for, MonitorTransaction
+from .signal_urc import creg_registered
 
 class Sim:
     def __init__(self, phone, imsi, iccid, carrier ):
@@ -11,6 +15,40 @@ class Sim:
         self.carrier = carrier
         self.signal = None
 
+class PortQueries:
+    """
+    ถามคำสั่งอ่านอย่างเดียวผ่าน query_cache — เปิดพอร์ตจริงเฉพาะเมื่อมีคำถามที่ cache ตอบไม่ได้
+    (AT+CPIN? / AT+CREG? / AT+CSQ ที่เพิ่งถามจากที่อื่นไม่ต้องเปิดพอร์ตซ้ำเลย)
+    """
+    
+    def __init__(self, port, baudrate=115200):
+        self.port = port
+        self.baudrate = baudrate
+        self.ser = None
+    
+    def ask(self, command, timeout=1.0):
+        return query_cache.query(self.port, command, lambda: self._fetch(command, timeout))
+    
+    def _fetch(self, command, timeout):
+        if self.ser is None:
+            self.ser = serial.Serial(self.port, self.baudrate, timeout=0.05)
+            time.sleep(0.1)
+        self.ser.reset_input_buffer()
+        self.ser.write(f"{command}\r\n".encode())
+        return read_until_final(self.ser, timeout)
+    
+    def close(self):
+        if self.ser is not None:
+            self.ser.close()
+            self.ser = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
 def read_sim_info(port, baudrate=115200):
     """อ่านข้อมูลซิมพร้อมตรวจสอบสถานะ"""
     try:
@@ -22,6 +60,9 @@ def read_sim_info(port, baudrate=115200):
         time.sleep(0.5)
         cpin_response = ser.read(200).decode(errors="ignore")
         
+        sim_identity_cache.note_cpin(port, cpin_response)
+        query_cache.record(port, "AT+CPIN?", cpin_response)
+        
         # ถ้า SIM ไม่พร้อมให้คืนค่าว่าง
         if "CPIN: READY" not in cpin_response:
             ser.close()
@@ -33,6 +74,24 @@ def read_sim_info(port, baudrate=115200):
                 "cpin_status": cpin_response.strip()
             }
         
+        # อ่าน ICCID ก่อน → ถ้าเคยอ่านซิมใบนี้แล้วไม่ต้องถาม CNUM / CIMI ซ้ำ
+        iccid_clean = ""
+        for cmd in sim_identity_cache.ICCID_COMMANDS:
+            ser.write(f"{cmd}\r".encode())
+            time.sleep(0.3)
+            iccid_clean = sim_identity_cache.parse_iccid(ser.read_all().decode(errors="ignore"))
+            if iccid_clean:
+                break
+        
+        cached = sim_identity_cache.lookup(iccid_clean, port)
+        if cached:
+            ser.close()
+            return {
+                "phone": cached["phone"] or "-",
+                "imsi": cached["imsi"],
+                "iccid": iccid_clean
+            }
+        
         # อ่านเบอร์โทร
         ser.write(b'AT+CNUM\r')
         time.sleep(0.3)
@@ -43,11 +102,6 @@ def read_sim_info(port, baudrate=115200):
         time.sleep(0.3)
         imsi = ser.read_all().decode(errors="ignore")
         
-        # อ่าน ICCID
-        ser.write(b'AT+CCID\r')
-        time.sleep(0.3)
-        iccid = ser.read_all().decode(errors="ignore")
-        
         ser.close()
 
         # ประมวลผลเบอร์โทร
@@ -62,9 +116,6 @@ def read_sim_info(port, baudrate=115200):
         # ประมวลผล IMSI
         imsi_clean = ''.join([c for c in imsi if c.isdigit()])
         
-        # ประมวลผล ICCID
-        iccid_clean = ''.join([c for c in iccid if c.isdigit()])
-
         # ตรวจสอบความถูกต้องของ IMSI
         if len(imsi_clean) < 15:
             return {
@@ -74,6 +125,7 @@ def read_sim_info(port, baudrate=115200):
                 "error": "Invalid IMSI length"
             }
 
+        sim_identity_cache.store(iccid_clean, imsi_clean, phone, port)
         return {
             "phone": phone if phone else "-",
             "imsi": imsi_clean if imsi_clean else "-",
@@ -91,11 +143,8 @@ def read_sim_info(port, baudrate=115200):
 def read_signal_strength(port, baudrate=115200):
     """ส่ง AT+CSQ แล้วคืนค่าเป็น '-81 dBm' หรือ 'Unknown'"""
     try:
-        ser = serial.Serial(port, baudrate, timeout=1)
-        ser.write(b'AT+CSQ\r\n')
-        time.sleep(0.2)
-        raw = ser.read_all().decode(errors='ignore')
-        ser.close()
+        with PortQueries(port, baudrate) as q:
+            raw = q.ask("AT+CSQ")
         m = re.search(r'\+CSQ: (\d+),', raw)
         if not m:
             return 'N/A'
@@ -107,98 +156,270 @@ def read_signal_strength(port, baudrate=115200):
     except:
         return 'Error'
 
-def load_sim_data(port="COM3", baudrate=115200):
-    """โหลดข้อมูล SIM พร้อมตรวจสอบสถานะ"""
-    info = read_sim_info(port, baudrate)
+def load_sim_data(port="COM3", baudrate=115200, serial_thread=None):
+    """
+    โหลดข้อมูล SIM พร้อมตรวจสอบสถานะ — ทุกค่าใน session เดียว (read_sim_session)
+    serial_thread ที่ถือพอร์ตนี้อยู่ → ใช้การเชื่อมต่อนั้น ไม่ต้องหยุด monitor
+    """
+    info = read_sim_session(port, baudrate, serial_thread)
     
     # ตรวจสอบว่ามีซิมหรือไม่
     if info.get("imsi", "-") == "-" or info.get("imsi", "-") == "":
         # ไม่มีซิมหรือซิมไม่พร้อม
         sim = Sim("-", "-", "-", "No SIM")
-        sim.signal = "▁▁▁▁ No SIM"
+        sim.signal = info.get("sim_status") or "▁▁▁▁ No SIM"
         return [sim]
     
     # ตรวจสอบและตั้งค่าค่ายตาม IMSI 
-    carrier = "Unknown"
-    if info["imsi"].startswith("52001"):
-        carrier = "AIS"
-    elif info["imsi"].startswith("52005"):
-        carrier = "DTAC"
-    elif info["imsi"].startswith("52003"):
-        carrier = "TRUE"
+    carrier = sim_identity_cache.carrier_from_imsi(info["imsi"])
 
     # เอา ICCID มาเป็นสถานะ (ถ้าไม่มีให้ "Unknown")
     iccid = info.get("iccid", "-")
 
     sim = Sim(info["phone"], info["imsi"], iccid, carrier)
-    
-    # อ่านสัญญาณเฉพาะเมื่อมีซิม
-    if info["imsi"] != "-":
-        sim.signal = read_signal_strength_with_sim_check(port, baudrate)
-    else:
-        sim.signal = "▁▁▁▁ No SIM"
+    sim.signal = info.get("signal") or "▁▁▁▁ No Signal"
     
     return [sim]
 
+
+# ==================== โหลดข้อมูลซิมใน session เดียว ====================
+# +CME ERROR ที่บอกสถานะซิม (ใช้แทนการถาม AT+CPIN? — บน monitor, +CPIN: READY จะไปกระตุ้น init SMS ซ้ำ)
+_CME_SIM_STATUS = {
+    "10": "▁▁▁▁ No SIM Card",
+    "11": "▁▁▁▁ PIN Required",
+    "12": "▁▁▁▁ PUK Required",
+    "13": "▁▁▁▁ SIM Failure",
+    "14": "▁▁▁▁ SIM Busy",
+}
+# AT+CMEE=2 ตอบเป็นข้อความแทนรหัส
+_CME_SIM_TEXT = {
+    "SIM NOT INSERTED": "10",
+    "SIM PIN REQUIRED": "11",
+    "SIM PUK REQUIRED": "12",
+    "SIM FAILURE": "13",
+    "SIM BUSY": "14",
+}
+_CME_RE = re.compile(r'\+CME ERROR:\s*(.+)', re.I)
+_IMSI_RE = re.compile(r'^(?:\+CIMI:\s*)?(\d{15})$')
+
+
+class SimSession:
+    """
+    การเชื่อมต่อเดียวสำหรับอ่านข้อมูลซิมทั้งหมด
+    - serial_thread ถือพอร์ตนี้อยู่ → ส่งผ่าน MonitorTransaction (ไม่ต้องหยุด/เปิดพอร์ตใหม่)
+    - ไม่งั้นเปิดพอร์ตเองครั้งเดียว อ่านจนเจอ final result code (ไม่มี sleep ตายตัว)
+    ask_chain รวมหลายคำสั่งเป็นบรรทัดเดียว (AT+CCID;+CREG?;+CSQ) → โมเด็มตอบรวดเดียวจบด้วย OK
+    ถ้าโมเด็มไม่รับแบบรวม (ERROR) จะถามทีละคำสั่งแทน
+    """
+    
+    def __init__(self, port, baudrate=115200, serial_thread=None, timeout=2.0):
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.ser = None
+        self.transaction = None
+        if transaction_for(serial_thread, port) is not None:
+            # BACKGROUND → serial thread ไม่โชว์ ERROR ของคำสั่งชุดนี้ในหน้าหลัก
+            self.transaction = MonitorTransaction(serial_thread, source="BACKGROUND")
+    
+    @property
+    def live(self):
+        return self.transaction is not None
+    
+    def send(self, command, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        if self.transaction is not None:
+            return self.transaction.send(command, timeout)
+        if self.ser is None:
+            self.ser = serial.Serial(self.port, self.baudrate, timeout=0.05)
+            time.sleep(0.1)
+        self.ser.reset_input_buffer()
+        self.ser.write(f"{command}\r\n".encode())
+        return read_until_final(self.ser, timeout)
+    
+    def ask(self, command):
+        """คำถามอ่านอย่างเดียว (AT+CSQ / AT+CREG? ...) ผ่าน query_cache"""
+        return query_cache.query(self.port, command, lambda: self.send(command))
+    
+    def ask_chain(self, commands):
+        """ถามหลายคำสั่งในบรรทัดเดียว → ข้อความคำตอบรวม; ไม่ได้ → ถามทีละคำสั่งแล้วต่อกัน"""
+        cached = [query_cache.default_coalescer().get(self.port, c) for c in commands]
+        todo = [c for c, hit in zip(commands, cached) if hit is None]
+        parts = [hit for hit in cached if hit is not None]
+        if len(todo) > 1:
+            response = self.send("AT" + ";".join(c[2:] for c in todo), self.timeout * len(todo))
+            if _last_line(response) == "OK":
+                _record_chain(self.port, todo, response)
+                return "\n".join(parts + [response])
+        return "\n".join(parts + [self.ask(c) for c in todo])
+    
+    def close(self):
+        if self.ser is not None:
+            self.ser.close()
+            self.ser = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _lines(response):
+    return [l.strip() for l in (response or "").replace("\r", "\n").split("\n") if l.strip()]
+
+
+def _last_line(response):
+    lines = _lines(response)
+    return lines[-1].upper() if lines else ""
+
+
+def _record_chain(port, commands, response):
+    """แยกคำตอบแบบรวมกลับเป็นของแต่ละคำสั่ง (ที่มี prefix ของตัวเอง) → เก็บลง query_cache"""
+    lines = _lines(response)
+    for command in commands:
+        if not query_cache.default_coalescer().coalescable(command):
+            continue
+        prefix = "+" + command[3:].rstrip("?").upper() + ":"
+        mine = [l for l in lines if l.upper().startswith(prefix)]
+        if mine:
+            query_cache.record(port, command, "\n".join(mine + ["OK"]))
+
+
+def _phone_from(lines):
+    for line in lines:
+        if "+CNUM:" in line:
+            try:
+                return line.split(",")[1].replace('"', '').strip()
+            except Exception:
+                return ""
+    return ""
+
+
+def _sim_status_from(response):
+    """+CME ERROR ที่เกี่ยวกับซิม → ข้อความสถานะ หรือ '' ถ้าไม่ใช่"""
+    for m in _CME_RE.finditer(response or ""):
+        code = m.group(1).strip().upper()
+        code = _CME_SIM_TEXT.get(code, code)
+        if code in _CME_SIM_STATUS:
+            return _CME_SIM_STATUS[code]
+    return ""
+
+
+def _imsi_from(lines):
+    for line in lines:
+        m = _IMSI_RE.match(line)
+        if m:
+            return m.group(1)
+    return ""
+
+
+def read_sim_session(port, baudrate=115200, serial_thread=None):
+    """
+    อ่าน phone / IMSI / ICCID / สัญญาณ ในการเชื่อมต่อเดียว
+    รอบที่ 1: AT+CCID;+CREG?;+CSQ → ICCID อยู่ใน sim_identity_cache แล้ว = จบ (round trip เดียว)
+    รอบที่ 2 (ซิมใหม่): AT+CIMI;+CNUM
+    """
+    result = {"phone": "-", "imsi": "-", "iccid": "-", "signal": "▁▁▁▁ No SIM"}
+    try:
+        with SimSession(port, baudrate, serial_thread) as session:
+            first = session.ask_chain(["AT+CCID", "AT+CREG?", "AT+CSQ"])
+            lines = _lines(first)
+            iccid = sim_identity_cache.parse_iccid(lines)
+            if not iccid:
+                # Quectel ใช้ AT+QCCID / ซิมไม่พร้อมทำให้คำสั่งรวมล้มทั้งบรรทัด
+                iccid = sim_identity_cache.parse_iccid(session.send("AT+QCCID"))
+            
+            sim_status = _sim_status_from(first)
+            if not iccid and sim_status:
+                result["signal"] = result["sim_status"] = sim_status
+                result["error"] = "SIM not ready or not inserted"
+                sim_identity_cache.invalidate(port)
+                return result
+            result["iccid"] = iccid or "-"
+            
+            creg = "\n".join(l for l in lines if l.upper().startswith("+CREG:"))
+            if not creg_registered(creg):
+                result["signal"] = "▁▁▁▁ No Network"
+            else:
+                result["signal"] = csq_label(first)
+            
+            cached = sim_identity_cache.lookup(iccid, port)
+            if cached:
+                result["phone"] = cached["phone"] or "-"
+                result["imsi"] = cached["imsi"]
+                return result
+            
+            second = _lines(session.ask_chain(["AT+CIMI", "AT+CNUM"]))
+            imsi = _imsi_from(second)
+            phone = _phone_from(second)
+            result["phone"] = phone or "-"
+            if not imsi:
+                result["error"] = "Invalid IMSI length"
+                return result
+            result["imsi"] = imsi
+            if iccid:
+                sim_identity_cache.store(iccid, imsi, phone, port)
+            return result
+    
+    except Exception as e:
+        result["signal"] = "▁▁▁▁ Error"
+        result["error"] = str(e)
+        return result
+
 def read_signal_strength_with_sim_check(port, baudrate=115200):
     """อ่านสัญญาณพร้อมตรวจสอบสถานะซิม"""
     try:
-        ser = serial.Serial(port, baudrate, timeout=3)
-        time.sleep(0.1)
-        
-        # ตรวจสอบสถานะ SIM ก่อน
-        ser.write(b'AT+CPIN?\r\n')
-        time.sleep(0.3)
-        cpin_response = ser.read(200).decode(errors='ignore')
-        
-        if "CPIN: READY" not in cpin_response:
-            ser.close()
-            if "SIM NOT INSERTED" in cpin_response:
-                return '▁▁▁▁ No SIM Card'
-            elif "SIM PIN" in cpin_response:
-                return '▁▁▁▁ PIN Required'
-            else:
-                return '▁▁▁▁ SIM Not Ready'
-        
-        # ตรวจสอบการลงทะเบียนเครือข่าย
-        ser.write(b'AT+CREG?\r\n')
-        time.sleep(0.3)
-        creg_response = ser.read(200).decode(errors='ignore')
-        
-        if "+CREG: 0,1" not in creg_response and "+CREG: 0,5" not in creg_response:
-            ser.close()
-            return '▁▁▁▁ No Network'
-        
-        # อ่านค่าสัญญาณ
-        ser.write(b'AT+CSQ\r\n')
-        time.sleep(0.2)
-        raw = ser.read(200).decode(errors='ignore')
-        ser.close()
-        
-        m = re.search(r'\+CSQ:\s*(\d+),', raw)
-        if not m:
-            return '▁▁▁▁ No Signal'
-        
-        rssi = int(m.group(1))
-        
-        if rssi == 99:
-            return '▁▁▁▁ Unknown'
-        elif rssi == 0:
-            return '▁▁▁▁ No Signal'
-        
-        dbm = -113 + 2*rssi
+        with PortQueries(port, baudrate) as q:
+            # ตรวจสอบสถานะ SIM ก่อน
+            cpin_response = q.ask("AT+CPIN?")
+            
+            if "CPIN: READY" not in cpin_response:
+                if "SIM NOT INSERTED" in cpin_response:
+                    return '▁▁▁▁ No SIM Card'
+                elif "SIM PIN" in cpin_response:
+                    return '▁▁▁▁ PIN Required'
+                else:
+                    return '▁▁▁▁ SIM Not Ready'
+            
+            # ตรวจสอบการลงทะเบียนเครือข่าย
+            creg_response = q.ask("AT+CREG?")
+            
+            if not creg_registered(creg_response):
+                return '▁▁▁▁ No Network'
+            
+            # อ่านค่าสัญญาณ
+            raw = q.ask("AT+CSQ")
         
-        # กำหนด Unicode Signal Bars ตามระดับสัญญาณ
-        if dbm >= -70:
-            return f'▁▃▅█ {dbm} dBm (Excellent)'
-        elif dbm >= -85:
-            return f'▁▃▅▇ {dbm} dBm (Good)'
-        elif dbm >= -100:
-            return f'▁▃▁▁ {dbm} dBm (Fair)'
-        elif dbm >= -110:
-            return f'▁▁▁▁ {dbm} dBm (Poor)'
-        else:
-            return f'▁▁▁▁ {dbm} dBm (Very Poor)'
+        return csq_label(raw)
             
     except Exception as e:
-        return '▁▁▁▁ Error'
\ No newline at end of file
+        return '▁▁▁▁ Error'
+
+
+def csq_label(raw):
+    """คำตอบ AT+CSQ → ข้อความพร้อม Unicode Signal Bars"""
+    m = re.search(r'\+CSQ:\s*(\d+),', raw)
+    if not m:
+        return '▁▁▁▁ No Signal'
+
+    rssi = int(m.group(1))
+
+    if rssi == 99:
+        return '▁▁▁▁ Unknown'
+    elif rssi == 0:
+        return '▁▁▁▁ No Signal'
+
+    dbm = -113 + 2*rssi
+
+    # กำหนด Unicode Signal Bars ตามระดับสัญญาณ
+    if dbm >= -70:
+        return f'▁▃▅█ {dbm} dBm (Excellent)'
+    elif dbm >= -85:
+        return f'▁▃▅▇ {dbm} dBm (Good)'
+    elif dbm >= -100:
+        return f'▁▃▁▁ {dbm} dBm (Fair)'
+    elif dbm >= -110:
+        return f'▁▁▁▁ {dbm} dBm (Poor)'
+    else:
+        return f'▁▁▁▁ {dbm} dBm (Very Poor)'
@@ -7,7 +7,13 @@ from .sms_log_store import (
     count_inbox as _count_inbox,
     delete_by_ids as _delete_by_ids,
     delete_all as _delete_all,
-    vacuum_db as _vacuum_db
+    vacuum_db as _vacuum_db,
+    open_log_cursor as _open_log_cursor,
+    log_signature as _log_signature,
+    list_conversations as _list_conversations,
+    get_conversation as _get_conversation,
+    mark_conversation_read as _mark_conversation_read,
+    rebuild_conversations as _rebuild_conversations,
 )
 from .utility_functions import dedupe_event
 
@@ -20,19 +26,19 @@ def delete_all(direction: str | None = None, only_failed: bool = False):
 def vacuum_db():
     _vacuum_db()
     
-# API ที่เคยมีอยู่
-def log_sms_sent(phone, message, status="ส่งสำเร็จ", dt=None):
-    _log_sent(phone, message, status, dt); return True
+# API ที่เคยมีอยู่ (port = พอร์ตโมเด็ม → ผูกแถวกับ ICCID/ผู้ให้บริการของซิมในพอร์ตนั้น)
+def log_sms_sent(phone, message, status="ส่งสำเร็จ", dt=None, port=None, iccid=None, carrier=None):
+    _log_sent(phone, message, status, dt, port, iccid, carrier); return True
 
-def log_sms_inbox(phone, message, status="รับเข้า", dt=None):
-    _log_inbox(phone, message, status, dt); return True
+def log_sms_inbox(phone, message, status="รับเข้า", dt=None, port=None, iccid=None, carrier=None):
+    _log_inbox(phone, message, status, dt, port, iccid, carrier); return True
 
-def log_sms_failed(phone, message, error_msg, dt=None):
+def log_sms_failed(phone, message, error_msg, dt=None, port=None):
     # กันซ้ำ 5 วินาทีต่อ (เบอร์ + เนื้อความ) เดียวกัน
     key = f"send_fail:{phone}:{hash(message)}"
     if not dedupe_event(key, window_seconds=5):
         return False  # บอก caller ว่าข้ามการบันทึก (ซ้ำ)
-    _log_failed(phone, message, error_msg, dt)
+    _log_failed(phone, message, error_msg, dt, port=port)
     return True
 
 # ฟังก์ชันอ่าน/นับที่ UI เคยใช้ (ถ้ามี)
@@ -43,6 +49,26 @@ def list_logs(direction=None, phone=None, keyword=None, since=None, until=None,
 def count_inbox():
     return _count_inbox()
 
+def open_log_cursor(direction=None, order="DESC", only_failed=False, phone=None, keyword=None,
+                    search=None, thread_phone=None):
+    return _open_log_cursor(direction, order, only_failed, phone, keyword, search, thread_phone)
+
+def log_signature(direction=None):
+    return _log_signature(direction)
+
+# conversation (สรุปต่อเบอร์)
+def list_conversations(limit=200, after=None, search=None):
+    return _list_conversations(limit, after, search)
+
+def get_conversation(phone):
+    return _get_conversation(phone)
+
+def mark_conversation_read(phone):
+    _mark_conversation_read(phone)
+
+def rebuild_conversations():
+    _rebuild_conversations()
+
 # ถ้าโค้ดเดิมมี helper ชื่อ append_sms_log/get_log_file_path ฯลฯ
 # ให้คงไว้ แต่เปลี่ยนให้ชี้ไป DB หรือไม่ทำงาน (ลบการพึ่งพา CSV)
 def append_sms_log(*args, **kwargs):
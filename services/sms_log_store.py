@@ -1,17 +1,21 @@
 # services/sms_log_store.py
 # ------------------------------------------------------------
 from __future__ import annotations
-from typing import Optional, List, Dict, Any, Union, Iterable
+from typing import Optional, List, Dict, Any, Tuple, Union, Iterable
 from datetime import datetime, timedelta
 from pathlib import Path
 import sys
+import threading
 
 # SQLite connection ใช้ตามเดิม
-from .db import get_conn
+from .db import get_conn, rebuild_conversations as _rebuild_conversations
+from .phone_index import phone_key, phone_search_keys, prefix_upper, PhoneIndex
+from .traffic_stats import hour_bucket, status_class
+from .metrics import STORAGE_WRITE, clock
 
 # ---------- โหมด/พาธ CSV ----------
 USE_CSV_ONLY  = False   # True = เขียนเฉพาะ CSV (ไม่แตะ SQLite)
-READ_FROM_CSV = True    # True = list_logs อ่านจาก CSV
+READ_FROM_CSV = True    # True = list_logs อ่านจาก CSV (LogCursor ต้องอ่านทั้งไฟล์ → log ใหญ่ควรตั้ง False)
 MIRROR_TO_CSV = True    # True = เวลาเขียน จะ append CSV ด้วย
 
 ISO_FMT = "%Y-%m-%d %H:%M:%S"
@@ -38,6 +42,19 @@ def _fmt_dt(dt: Optional[Union[datetime, str]]) -> str:
         return dt
     return (dt or _now()).strftime(ISO_FMT)
 
+def _sim_tag(port: Optional[str] = None, iccid: Optional[str] = None,
+             carrier: Optional[str] = None) -> Tuple[str, str]:
+    """
+    (ICCID, ผู้ให้บริการ) ของแถวนี้ → สถิติต่อ SIM
+    ระบุ iccid/carrier ตรง ๆ ได้ ไม่งั้นหาจากซิมที่อยู่ในพอร์ตตอนนี้ (sim_identity_cache) — ค่า '-' หรือว่าง = ไม่ทราบ
+    """
+    if iccid is None and carrier is None and port:
+        from .sim_identity_cache import sim_for_port
+        iccid, carrier = sim_for_port(port)
+    iccid = "" if iccid in (None, "-") else str(iccid).strip()
+    carrier = "" if carrier in (None, "-", "Unknown") else str(carrier).strip()
+    return iccid, carrier
+
 def _split_to_date_time(when: str):
     """แยก 'YYYY-MM-DD HH:MM:SS' → ('YYYY-MM-DD','HH:MM:SS')"""
     s = str(when or "").strip().replace("T", " ")
@@ -63,8 +80,10 @@ def _insert_sent(
     dt: Optional[Union[datetime, str]] = None,
     is_failed: bool = False,
     error_code: Optional[str] = None,
+    sim: Tuple[str, str] = ("", ""),
 ) -> None:
     """บันทึกลง 'sms_sent' และ (ตามสวิตช์) เขียน CSV"""
+    started = clock()
     when = _fmt_dt(dt)
 
     # CSV only
@@ -75,9 +94,12 @@ def _insert_sent(
 
     # SQLite ปกติ
     sql = """
-        INSERT INTO sms_sent (phone, message, status, is_failed, error_code, dt)
-        VALUES (?,?,?,?,?,?)
+        INSERT INTO sms_sent (phone, message, status, is_failed, error_code, dt, phone_norm, phone_rev,
+                              sim_iccid, carrier)
+        VALUES (?,?,?,?,?,?,?,?,?,?)
     """
+    key = phone_key(phone or "Unknown")
+    iccid, carrier = sim
     args = [
         phone or "Unknown",
         message or "",
@@ -85,22 +107,31 @@ def _insert_sent(
         1 if is_failed else 0,
         error_code,
         when,
+        key,
+        key[::-1],
+        iccid,
+        carrier,
     ]
     with get_conn() as conn:
         conn.execute(sql, args)
+        _bump_conversation(conn, key, args[0], "sent", args[1], when, failed=bool(is_failed))
+        _bump_traffic(conn, when, iccid, carrier, "sent", status_class("sent", args[2], args[3]))
         conn.commit()
 
     # mirror CSV
     if MIRROR_TO_CSV:
         _mirror_csv("sent", args[0], args[1], args[2], when)
+    STORAGE_WRITE.observe_since(started, "sms_sent")
 
 def _insert_inbox(
     phone: str,
     message: str,
     status: str,
     dt: Optional[Union[datetime, str]] = None,
+    sim: Tuple[str, str] = ("", ""),
 ) -> None:
     """บันทึกลง 'sms_inbox' และ (ตามสวิตช์) เขียน CSV"""
+    started = clock()
     when = _fmt_dt(dt)
 
     # CSV only
@@ -110,28 +141,66 @@ def _insert_inbox(
 
     # SQLite ปกติ
     sql = """
-        INSERT INTO sms_inbox (phone, message, status, dt)
-        VALUES (?,?,?,?)
+        INSERT INTO sms_inbox (phone, message, status, dt, phone_norm, phone_rev, sim_iccid, carrier)
+        VALUES (?,?,?,?,?,?,?,?)
     """
-    args = [phone or "Unknown", message or "", status or "รับเข้า", when]
+    key = phone_key(phone or "Unknown")
+    iccid, carrier = sim
+    args = [phone or "Unknown", message or "", status or "รับเข้า", when, key, key[::-1], iccid, carrier]
     with get_conn() as conn:
         conn.execute(sql, args)
+        _bump_conversation(conn, key, args[0], "inbox", args[1], when)
+        _bump_traffic(conn, when, iccid, carrier, "inbox", status_class("inbox", args[2]))
         conn.commit()
 
     # mirror CSV
     if MIRROR_TO_CSV:
         _mirror_csv("inbox", args[0], args[1], args[2], when)
+    STORAGE_WRITE.observe_since(started, "sms_inbox")
+
+def _bump_conversation(conn, key: str, phone: str, direction: str, message: str,
+                       when: str, failed: bool = False) -> None:
+    """อัปเดตสรุปต่อเบอร์แบบ incremental (ใน transaction เดียวกับการ insert)"""
+    sent, fail, recv = (0, 0, 1) if direction == "inbox" else ((0, 1, 0) if failed else (1, 0, 0))
+    conn.execute("""
+        INSERT INTO sms_conversations (phone_norm, phone, last_dt, last_message, last_direction,
+                                       unread, sent_count, failed_count, received_count)
+        VALUES (?,?,?,?,?,?,?,?,?)
+        ON CONFLICT(phone_norm) DO UPDATE SET
+            phone          = CASE WHEN excluded.last_dt >= last_dt THEN excluded.phone ELSE phone END,
+            last_message   = CASE WHEN excluded.last_dt >= last_dt THEN excluded.last_message ELSE last_message END,
+            last_direction = CASE WHEN excluded.last_dt >= last_dt THEN excluded.last_direction ELSE last_direction END,
+            last_dt        = MAX(last_dt, excluded.last_dt),
+            unread         = unread + excluded.unread,
+            sent_count     = sent_count + excluded.sent_count,
+            failed_count   = failed_count + excluded.failed_count,
+            received_count = received_count + excluded.received_count
+    """, [key, phone, when, message, direction, recv, sent, fail, recv])
+
+def _bump_traffic(conn, when: str, iccid: str, carrier: str, direction: str, cls: str) -> None:
+    """+1 ในตารางสรุปรายชั่วโมง (ใน transaction เดียวกับการ insert)"""
+    hour = hour_bucket(when)
+    if hour is None:
+        return
+    conn.execute("""
+        INSERT INTO sms_traffic_hourly (hour, sim_iccid, carrier, direction, status_class, count)
+        VALUES (?,?,?,?,?,1)
+        ON CONFLICT(hour, sim_iccid, carrier, direction, status_class) DO UPDATE SET
+            count = count + 1
+    """, [hour, iccid, carrier, direction, cls])
 
 # ============================================================
 # Public write APIs
 # ============================================================
-def log_sms_sent(phone, message, status="ส่งสำเร็จ", dt=None):
-    _insert_sent(phone, message, status, dt, is_failed=False)
+# port = พอร์ตโมเด็มที่ส่ง/รับ (หา ICCID/ผู้ให้บริการจาก sim_identity_cache) หรือระบุ iccid/carrier เอง
+def log_sms_sent(phone, message, status="ส่งสำเร็จ", dt=None, port=None, iccid=None, carrier=None):
+    _insert_sent(phone, message, status, dt, is_failed=False, sim=_sim_tag(port, iccid, carrier))
 
-def log_sms_inbox(phone, message, status="รับเข้า", dt=None):
-    _insert_inbox(phone, message, status, dt)
+def log_sms_inbox(phone, message, status="รับเข้า", dt=None, port=None, iccid=None, carrier=None):
+    _insert_inbox(phone, message, status, dt, sim=_sim_tag(port, iccid, carrier))
 
-def log_sms_failed(phone, message, error_msg, dt=None, error_code=None, dedupe_seconds=10):
+def log_sms_failed(phone, message, error_msg, dt=None, error_code=None, dedupe_seconds=10,
+                   port=None, iccid=None, carrier=None):
     """กันซ้ำเคสล้มเหลวระยะสั้น แล้วบันทึกเป็น 'ล้มเหลว: ...'"""
     when = _fmt_dt(dt)
 
@@ -165,7 +234,8 @@ def log_sms_failed(phone, message, error_msg, dt=None, error_code=None, dedupe_s
         if found:
             return False
 
-    _insert_sent(phone, message, f"ล้มเหลว: {error_msg}", when, is_failed=True, error_code=error_code)
+    _insert_sent(phone, message, f"ล้มเหลว: {error_msg}", when, is_failed=True, error_code=error_code,
+                 sim=_sim_tag(port, iccid, carrier))
     return True
 
 # ============================================================
@@ -251,6 +321,284 @@ def list_logs(
             out.append(dict(zip(cols, r)))
     return out
 
+# ---------- cache ของโหมด CSV (parse ไฟล์ครั้งเดียวต่อการเปลี่ยนแปลง) ----------
+_csv_lock = threading.Lock()
+_csv_cache: Dict[str, Any] = {"sig": None, "rows": {}, "index": {}}
+
+def _csv_snapshot(direction: Optional[str]) -> List[Dict[str, Any]]:
+    """แถวจาก CSV (ใหม่ → เก่า) ของ direction นี้ จาก cache"""
+    sig = log_signature()
+    with _csv_lock:
+        if _csv_cache["sig"] != sig:
+            _csv_cache.update(sig=sig, rows={}, index={})
+        rows = _csv_cache["rows"].get(direction)
+        if rows is None:
+            rows = list_logs(direction, limit=None, order="DESC")
+            _csv_cache["rows"][direction] = rows
+        return rows
+
+def _csv_phone_index(direction: Optional[str], rows: List[Dict[str, Any]]) -> PhoneIndex:
+    """PhoneIndex ของ snapshot เดียวกับ _csv_snapshot (สร้างครั้งเดียวต่อ snapshot)"""
+    with _csv_lock:
+        if _csv_cache["rows"].get(direction) is not rows:
+            return PhoneIndex(r.get("phone") for r in rows)   # snapshot เปลี่ยนไปแล้ว
+        idx = _csv_cache["index"].get(direction)
+        if idx is None:
+            idx = _csv_cache["index"][direction] = PhoneIndex(r.get("phone") for r in rows)
+        return idx
+
+
+def _failed_sql() -> Tuple[str, List[Any]]:
+    """เงื่อนไข 'เป็น Fail' แบบเดียวกับ _is_fail_row ของหน้าต่าง log: is_failed = 1 หรือ status มีคำใน FAIL_KEYWORDS"""
+    from .csv_store import FAIL_KEYWORDS
+    conds = ["is_failed = 1"] + ["status LIKE ?"] * len(FAIL_KEYWORDS)
+    return "(" + " OR ".join(conds) + ")", [f"%{k}%" for k in FAIL_KEYWORDS]
+
+
+class LogCursor:
+    """
+    cursor สำหรับอ่าน log ทีละหน้า (ใช้กับ model ของตาราง)
+    - SQLite: keyset pagination ตาม (dt, id) → ไม่ต้อง OFFSET ไกล ๆ
+              ทุกทิศทาง (UNION sent + inbox) id ชนกันได้ → ใช้ (dt, direction, id)
+    - CSV   : ใช้ snapshot ที่ cache ไว้ แล้วแบ่งหน้าจากหน่วยความจำ
+              (parse ทั้งไฟล์ครั้งแรก / ทุกครั้งที่ไฟล์เปลี่ยน — ไฟล์เขียนเก่า → ใหม่ แต่หน้าแรกคือแถวใหม่สุด
+              จึงหยุดอ่านกลางไฟล์ไม่ได้) → การดึงทีละหน้าประหยัดเวลา/หน่วยความจำจริงเฉพาะ READ_FROM_CSV = False
+    - search: คำค้นแบบเบอร์ → ใช้ index phone_norm/phone_rev (prefix/suffix)
+              คำค้นอื่น ๆ → contains ใน message/phone
+    """
+
+    def __init__(
+        self,
+        direction: Optional[str] = None,   # 'sent' | 'inbox' | None
+        order: str = "DESC",
+        only_failed: bool = False,
+        phone: Optional[str] = None,
+        keyword: Optional[str] = None,
+        search: Optional[str] = None,
+        thread_phone: Optional[str] = None,
+    ):
+        self.direction = direction
+        self.order = "DESC" if str(order).upper() == "DESC" else "ASC"
+        self.only_failed = bool(only_failed)
+        self.phone = phone
+        self.keyword = keyword
+        self.search = (search or "").strip()
+        self._phone_keys = phone_search_keys(self.search) if self.search else None
+        # thread view: ทุกทิศทางของเบอร์เดียว (ตรงตัวตาม phone_key)
+        self.thread_key = phone_key(thread_phone) if thread_phone else None
+        self.exhausted = False
+        self._last_key = None          # (dt, [direction,] id) ของแถวสุดท้ายที่ส่งออกไป
+        self._csv_rows = None          # ผลลัพธ์ของโหมด CSV
+        self._csv_pos = 0
+
+    @property
+    def is_phone_search(self) -> bool:
+        return self._phone_keys is not None
+
+    # ---------- public ----------
+    def fetch(self, n: int = 500) -> List[Dict[str, Any]]:
+        """คืนแถวถัดไปไม่เกิน n แถว (คืน [] เมื่อหมดแล้ว)"""
+        if self.exhausted or n <= 0:
+            return []
+        rows = self._fetch_csv(n) if READ_FROM_CSV else self._fetch_sqlite(n)
+        if len(rows) < n:
+            self.exhausted = True
+        return rows
+
+    def count(self) -> int:
+        """จำนวนแถวทั้งหมดที่ cursor นี้จะให้ได้"""
+        if READ_FROM_CSV:
+            self._load_csv()
+            return len(self._csv_rows)
+        where_sql, args = self._where()
+        with get_conn() as conn:
+            row = conn.execute(f"SELECT COUNT(*) FROM {self._source()} {where_sql}", args).fetchone()
+        return int(row[0] if row else 0)
+
+    # ---------- CSV ----------
+    def _load_csv(self) -> None:
+        if self._csv_rows is not None:
+            return
+        if self.phone or self.keyword:
+            # ตัวกรองแบบเดิม (contains) → อ่านตรงจากไฟล์ ไม่ผ่าน cache
+            rows = list_logs(self.direction, self.phone, self.keyword, limit=None, order="DESC")
+            index = PhoneIndex(r.get("phone") for r in rows) if self._phone_keys else None
+        else:
+            rows = _csv_snapshot(self.direction)
+            index = _csv_phone_index(self.direction, rows) if self._phone_keys else None
+
+        if index is not None:
+            rows = [rows[i] for i in index.lookup(*self._phone_keys)]
+        elif self.search:
+            q = self.search.lower()
+            rows = [r for r in rows
+                    if q in (r.get("message") or "").lower() or q in (r.get("phone") or "").lower()]
+        if self.thread_key is not None:
+            rows = [r for r in rows if phone_key(r.get("phone") or "Unknown") == self.thread_key]
+        if self.only_failed:
+            # is_failed ของโหมด CSV มาจาก looks_failed(status) อยู่แล้ว
+            rows = [r for r in rows if r.get("is_failed")]
+        self._csv_rows = rows if self.order == "DESC" else rows[::-1]
+
+    def _fetch_csv(self, n: int) -> List[Dict[str, Any]]:
+        self._load_csv()
+        page = self._csv_rows[self._csv_pos:self._csv_pos + n]
+        self._csv_pos += len(page)
+        return page
+
+    # ---------- SQLite ----------
+    def _source(self) -> str:
+        # อ่านจากตารางจริงเมื่อระบุทิศทาง เพื่อให้ใช้ index (dt, id) / phone ได้
+        if self.direction == "inbox":
+            return ("(SELECT id, dt, 'inbox' AS direction, phone, message, status, "
+                    "0 AS is_failed, phone_norm, phone_rev FROM sms_inbox)")
+        if self.direction == "sent":
+            return ("(SELECT id, dt, 'sent' AS direction, phone, message, status, "
+                    "is_failed, phone_norm, phone_rev FROM sms_sent)")
+        return "sms_logs"
+
+    def _where(self, extra: Optional[List[str]] = None, extra_args: Optional[List[Any]] = None):
+        conds: List[str] = []
+        args: List[Any] = []
+        if self.only_failed:
+            cond, cond_args = _failed_sql()
+            conds.append(cond); args.extend(cond_args)
+        if self.thread_key is not None:
+            conds.append("phone_norm = ?"); args.append(self.thread_key)
+        if self.phone:
+            conds.append("phone LIKE ?"); args.append(f"%{self.phone}%")
+        if self.keyword:
+            conds.append("(message LIKE ? OR phone LIKE ?)")
+            args.extend([f"%{self.keyword}%", f"%{self.keyword}%"])
+        if self._phone_keys is not None:
+            prefixes, suffixes = self._phone_keys
+            ranges: List[str] = []
+            for col, keys in (("phone_norm", prefixes), ("phone_rev", [x[::-1] for x in suffixes])):
+                for k in keys:
+                    ranges.append(f"({col} >= ? AND {col} < ?)")
+                    args.extend([k, prefix_upper(k)])
+            conds.append("(" + " OR ".join(ranges) + ")")
+        elif self.search:
+            conds.append("(message LIKE ? OR phone LIKE ?)")
+            args.extend([f"%{self.search}%", f"%{self.search}%"])
+        conds.extend(extra or [])
+        args.extend(extra_args or [])
+        return (("WHERE " + " AND ".join(conds)) if conds else ""), args
+
+    def _key_cols(self) -> Tuple[str, ...]:
+        # ตารางเดียว: (dt, id) ไม่ซ้ำและตรงกับ index; UNION: id ของ sent/inbox ซ้ำกันได้
+        return ("dt", "id") if self.direction else ("dt", "direction", "id")
+
+    def _fetch_sqlite(self, n: int) -> List[Dict[str, Any]]:
+        cols = self._key_cols()
+        extra, extra_args = [], []
+        if self._last_key is not None:
+            op = "<" if self.order == "DESC" else ">"
+            # row-value compare → SQLite seek ใน index (dt, id) ได้ตรง ๆ
+            extra.append(f"({', '.join(cols)}) {op} ({', '.join('?' * len(cols))})")
+            extra_args.extend(self._last_key)
+        where_sql, args = self._where(extra, extra_args)
+        sql = f"""
+            SELECT id, dt, direction, phone, message, status, is_failed
+              FROM {self._source()} AS src
+              {where_sql}
+             ORDER BY {', '.join(f'{c} {self.order}' for c in cols)}
+             LIMIT ?
+        """
+        with get_conn() as conn:
+            rows = conn.execute(sql, args + [int(n)]).fetchall()
+
+        out = [{k: r[k] for k in r.keys()} for r in rows or []]
+        if out:
+            self._last_key = tuple(out[-1][c] for c in cols)
+        return out
+
+
+def open_log_cursor(direction=None, order="DESC", only_failed=False,
+                    phone=None, keyword=None, search=None, thread_phone=None) -> LogCursor:
+    return LogCursor(direction, order, only_failed, phone, keyword, search, thread_phone)
+
+# ============================================================
+# Conversations (สรุปต่อเบอร์)
+# ============================================================
+_CONV_COLS = ("phone_norm", "phone", "last_dt", "last_message", "last_direction",
+              "unread", "sent_count", "failed_count", "received_count")
+
+def list_conversations(
+    limit: int = 200,
+    after: Optional[tuple] = None,      # (last_dt, phone_norm) ของแถวสุดท้ายในหน้าก่อน
+    search: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """รายการ conversation ใหม่ → เก่า แบบ keyset (ใช้ index last_dt)"""
+    conds: List[str] = []
+    args: List[Any] = []
+    if after is not None:
+        conds.append("(last_dt, phone_norm) < (?, ?)"); args.extend(after)
+    keys = phone_search_keys(search) if search else None
+    if keys is not None:
+        # ค้นหาเบอร์: prefix ของ phone_norm (ตารางนี้เล็ก ไม่ต้องใช้ suffix index)
+        prefixes, suffixes = keys
+        ors = []
+        for k in prefixes:
+            ors.append("(phone_norm >= ? AND phone_norm < ?)"); args.extend([k, prefix_upper(k)])
+        for k in suffixes:
+            ors.append("phone_norm LIKE ?"); args.append(f"%{k}")
+        conds.append("(" + " OR ".join(ors) + ")")
+    elif search:
+        conds.append("(phone LIKE ? OR last_message LIKE ?)")
+        args.extend([f"%{search}%", f"%{search}%"])
+    where_sql = ("WHERE " + " AND ".join(conds)) if conds else ""
+    sql = f"""
+        SELECT {", ".join(_CONV_COLS)}
+          FROM sms_conversations
+          {where_sql}
+         ORDER BY last_dt DESC, phone_norm DESC
+         LIMIT ?
+    """
+    with get_conn() as conn:
+        rows = conn.execute(sql, args + [int(limit)]).fetchall()
+    return [{k: r[k] for k in r.keys()} for r in rows or []]
+
+def get_conversation(phone: str) -> Optional[Dict[str, Any]]:
+    with get_conn() as conn:
+        r = conn.execute(
+            f"SELECT {', '.join(_CONV_COLS)} FROM sms_conversations WHERE phone_norm = ?",
+            [phone_key(phone)],
+        ).fetchone()
+    return {k: r[k] for k in r.keys()} if r else None
+
+def mark_conversation_read(phone: str) -> None:
+    with get_conn() as conn:
+        conn.execute("UPDATE sms_conversations SET unread = 0 WHERE phone_norm = ?", [phone_key(phone)])
+        conn.commit()
+
+def rebuild_conversations() -> None:
+    """คำนวณสรุปต่อเบอร์ใหม่ทั้งหมดจากตาราง log"""
+    with get_conn() as conn:
+        _rebuild_conversations(conn)
+        conn.commit()
+
+
+def log_signature(direction: Optional[str] = None):
+    """
+    ค่าสั้น ๆ ที่เปลี่ยนเมื่อข้อมูลเปลี่ยน (ใช้ตัดสินใจว่าต้องโหลดตารางใหม่หรือไม่)
+    - CSV   : (mtime, size) ของไฟล์
+    - SQLite: (COUNT, MAX(id)) ของตาราง
+    """
+    if READ_FROM_CSV:
+        try:
+            st = _CSV_PATH.stat()
+            return (st.st_mtime, st.st_size)
+        except OSError:
+            return None
+    tables = {"inbox": ["sms_inbox"], "sent": ["sms_sent"]}.get(direction, ["sms_sent", "sms_inbox"])
+    sig = []
+    with get_conn() as conn:
+        for t in tables:
+            row = conn.execute(f"SELECT COUNT(*), MAX(id) FROM {t}").fetchone()
+            sig.append((row[0], row[1]))
+    return tuple(sig)
+
 def count_inbox() -> int:
     if READ_FROM_CSV:
         from .csv_store import list_logs_csv
@@ -273,7 +621,10 @@ def delete_by_ids(direction, ids: Iterable[int]):
     table = "sms_inbox" if direction == "inbox" else "sms_sent"
     placeholders = ",".join("?" for _ in ids)
     with get_conn() as conn:
+        keys = [r[0] for r in conn.execute(
+            f"SELECT DISTINCT phone_norm FROM {table} WHERE id IN ({placeholders})", ids)]
         conn.execute(f"DELETE FROM {table} WHERE id IN ({placeholders})", ids)
+        _rebuild_conversations(conn, keys)
         conn.commit()
     return len(ids)
 
@@ -282,20 +633,22 @@ def delete_all(direction=None, only_failed: bool = False):
         from .csv_store import delete_all_csv
         return delete_all_csv(_CSV_PATH, direction=direction, only_failed=only_failed)
 
+    failed_cond, failed_args = _failed_sql()
     with get_conn() as conn:
         if direction == "inbox":
             conn.execute("DELETE FROM sms_inbox")
         elif direction == "sent":
             if only_failed:
-                conn.execute("DELETE FROM sms_sent WHERE is_failed=1")
+                conn.execute(f"DELETE FROM sms_sent WHERE {failed_cond}", failed_args)
             else:
                 conn.execute("DELETE FROM sms_sent")
         else:
             conn.execute("DELETE FROM sms_inbox")
             if only_failed:
-                conn.execute("DELETE FROM sms_sent WHERE is_failed=1")
+                conn.execute(f"DELETE FROM sms_sent WHERE {failed_cond}", failed_args)
             else:
                 conn.execute("DELETE FROM sms_sent")
+        _rebuild_conversations(conn)
         conn.commit()
 
 def vacuum_db() -> None:
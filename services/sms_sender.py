@@ -0,0 +1,185 @@
+# services/sms_sender.py
+"""
+ส่ง SMS ผ่านโมเด็มแบบรอผลจริง (ไม่ใช่ sleep แล้วเดา) — ไม่มี Qt
+- ใช้ MonitorTransaction ของพอร์ตที่ SerialMonitorThread ถืออยู่ (ไม่เปิดพอร์ตซ้ำ)
+- ลำดับเดียวกับ SMSHandler._send_sms_process: CMGF=1 → CSCS="UCS2" → CSMP → CMGS (UCS2) + Ctrl-Z
+- ได้ +CMGS: <ref> + OK = สำเร็จ / +CMS ERROR, ERROR, หมดเวลา = ไม่สำเร็จ → บันทึกลง sms_log ทั้งสองกรณี
+- SmsBatcher: คิวส่งต่อพอร์ต — ข้อความที่รออยู่พร้อมกันถูกส่งต่อเนื่องเป็นชุด ตั้งค่า text mode ครั้งเดียวต่อชุด
+ใช้กับ headless daemon (ScheduledSend) และ API ภายในเครื่อง (services/local_api.py)
+"""
+from __future__ import annotations
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+import queue
+import re
+import threading
+import time
+import weakref
+
+from core.utility_functions import encode_text_to_ucs2
+from .at_transport import is_final_result
+from .metrics import SMS_BATCH, SMS_OUTBOX, SMS_SEND
+
+SMS_SETUP_COMMANDS = ('AT+CMGF=1', 'AT+CSCS="UCS2"', 'AT+CSMP=17,167,0,8')
+CTRL_Z = bytes([26])
+
+_CMGS_REF_RE = re.compile(r'\+CMGS:\s*(\d+)')
+
+
+@dataclass
+class SendResult:
+    ok: bool
+    phone: str
+    message: str
+    detail: str = ""                 # ข้อความผิดพลาด / คำตอบสุดท้ายของโมเด็ม
+    reference: Optional[int] = None  # เลขอ้างอิงจาก +CMGS:
+    elapsed: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {'ok': self.ok, 'phone': self.phone, 'message': self.message, 'detail': self.detail,
+                'reference': self.reference, 'elapsed_ms': round(self.elapsed * 1000, 1)}
+
+
+def final_line(response: str) -> str:
+    """บรรทัด final result ตัวสุดท้ายของคำตอบ ('' ถ้ายังไม่จบ / หมดเวลา)"""
+    for line in reversed((response or "").replace("\r", "\n").split("\n")):
+        if is_final_result(line):
+            return line.strip()
+    return ""
+
+
+def setup_text_mode(transport) -> str:
+    """ตั้ง CMGF/CSCS/CSMP → '' ถ้าสำเร็จ ไม่งั้นข้อความผิดพลาด"""
+    for command in SMS_SETUP_COMMANDS:
+        result = final_line(transport.send(command))
+        if result.upper() != "OK":
+            return f"{command} → {result or 'no response'}"
+    return ""
+
+
+def send_sms(transport, phone: str, message: str, setup: bool = True, log: bool = True) -> SendResult:
+    """
+    ส่ง SMS 1 ข้อความ (บล็อกจนโมเด็มตอบ หรือหมดเวลาของ AT+CMGS)
+    setup=False → ข้ามการตั้งค่า text mode (ส่งเป็นชุดต่อจากข้อความก่อนหน้าบนพอร์ตเดียวกัน)
+    """
+    started = time.monotonic()
+    phone = (phone or "").strip()
+    result = SendResult(False, phone, message or "")
+    try:
+        if not phone or not message:
+            result.detail = "ข้อมูลไม่ครบถ้วน"
+        elif transport is None or not transport.available:
+            result.detail = "ไม่มีการเชื่อมต่อ Serial"
+        else:
+            error = setup_text_mode(transport) if setup else ""
+            if error:
+                result.detail = error
+            else:
+                response = transport.send_with_prompt(
+                    f'AT+CMGS="{encode_text_to_ucs2(phone)}"',
+                    encode_text_to_ucs2(message).encode() + CTRL_Z)
+                last = final_line(response)
+                m = _CMGS_REF_RE.search(response or "")
+                result.reference = int(m.group(1)) if m else None
+                result.ok = last.upper() == "OK"
+                result.detail = last or "หมดเวลารอผลการส่ง"
+    except Exception as e:
+        result.detail = f"ข้อผิดพลาดในระบบ: {e}"
+    result.elapsed = time.monotonic() - started
+    SMS_SEND.observe(result.elapsed, "ok" if result.ok else "failed")
+
+    if log:
+        try:
+            from .sms_log import log_sms_sent     # lazy import (db สร้างไฟล์ตอน import)
+            status = "ส่งสำเร็จ" if result.ok else f"ส่งไม่สำเร็จ: {result.detail}"
+            port = getattr(getattr(transport, "serial_thread", None), "port", None)
+            log_sms_sent(phone, message, status, port=port)
+        except Exception as e:
+            print(f"Error saving SMS log: {e}")
+    return result
+
+
+SendFn = Callable[[str, str, str, bool], SendResult]    # (port, phone, message, setup) → ผล
+
+DEFAULT_BATCH_MAX = 20
+
+# SmsBatcher ที่ยังมีชีวิต → SMS_OUTBOX คำนวณจากคิวจริงตอน export (เปิด metrics กลางคันก็ไม่เพี้ยน)
+_batchers: "weakref.WeakSet[SmsBatcher]" = weakref.WeakSet()
+SMS_OUTBOX.fn = lambda: sum(b.pending() for b in list(_batchers))
+
+
+class SmsBatcher:
+    """
+    คิวส่ง SMS ต่อพอร์ต (1 thread ต่อพอร์ต สร้างเมื่อมีงานครั้งแรก)
+    ข้อความที่ค้างอยู่ตอนเริ่มชุด (ไม่เกิน batch_max) ส่งต่อกันโดยตั้งค่า CMGF/CSCS/CSMP แค่ข้อความแรก
+    (ข้อความไหนล้มเหลว ข้อความถัดไปตั้งค่าใหม่)
+    """
+
+    def __init__(self, send: SendFn, batch_max: int = DEFAULT_BATCH_MAX):
+        self.send = send
+        self.batch_max = max(1, batch_max)
+        self._lock = threading.Lock()
+        self._queues: Dict[str, "queue.Queue"] = {}
+        self._threads: Dict[str, threading.Thread] = {}
+        self.batches = 0
+        self.messages = 0
+        _batchers.add(self)
+
+    def submit(self, port: str, phone: str, message: str) -> Future:
+        """เข้าคิวของพอร์ต → Future ของ SendResult"""
+        fut: Future = Future()
+        with self._lock:
+            q = self._queues.get(port)
+            if q is None:
+                q = self._queues[port] = queue.Queue()
+                t = self._threads[port] = threading.Thread(
+                    target=self._drain, args=(port, q), name=f"sms-out-{port}", daemon=True)
+                t.start()
+        q.put((phone, message, fut))
+        return fut
+
+    def pending(self, port: Optional[str] = None) -> int:
+        with self._lock:
+            queues = [self._queues[port]] if port in self._queues else \
+                ([] if port else list(self._queues.values()))
+        return sum(q.qsize() for q in queues)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            queues, self._queues, self._threads = list(self._queues.values()), {}, {}
+        for q in queues:
+            q.put(None)
+
+    def _drain(self, port: str, q: "queue.Queue") -> None:
+        while True:
+            job = q.get()
+            if job is None:
+                return
+            batch = [job]
+            while len(batch) < self.batch_max:
+                try:
+                    nxt = q.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    q.put(None)         # ส่งชุดนี้ให้จบก่อนแล้วค่อยหยุด
+                    break
+                batch.append(nxt)
+            self.batches += 1
+            SMS_BATCH.observe(len(batch))
+            setup = True
+            for phone, message, fut in batch:
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                try:
+                    result = self.send(port, phone, message, setup)
+                except Exception as e:
+                    result = SendResult(False, phone, message, f"ข้อผิดพลาดในระบบ: {e}")
+                self.messages += 1
+                setup = not result.ok
+                fut.set_result(result)
+
+    def stats(self) -> Dict[str, float]:
+        return {'batches': self.batches, 'messages': self.messages, 'pending': self.pending(),
+                'avg_batch': round(self.messages / self.batches, 2) if self.batches else 0.0}
@@ -0,0 +1,146 @@
+# services/traffic_stats.py
+"""
+สถิติปริมาณ SMS จากตารางสรุปรายชั่วโมง (sms_traffic_hourly)
+- แต่ละแถว = ชั่วโมง × ICCID × ผู้ให้บริการ × ทิศทาง × กลุ่มสถานะ → จำนวน
+- ตารางถูกอัปเดตทุกครั้งที่บันทึก log (ดู sms_log_store) → query ไม่ต้องแตะ log ดิบ
+- ลบ log แล้วสถิติไม่ลดตาม (เป็นประวัติปริมาณการใช้งาน) → ต้องการให้ตรงกับ log ที่เหลือให้ rebuild
+- rebuild_traffic_rollups(): เติมข้อมูลย้อนหลังจาก log ที่มีอยู่
+  รัน: python -m services.traffic_stats --rebuild
+"""
+from __future__ import annotations
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from .csv_store import looks_failed
+
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+STATUS_RECEIVED = "received"
+
+# คอลัมน์ที่ใช้ group ได้ (กัน SQL injection จากชื่อคอลัมน์)
+_GROUP_COLS = {
+    "hour": "hour",
+    "day": "substr(hour, 1, 10)",
+    "month": "substr(hour, 1, 7)",
+    "sim_iccid": "sim_iccid",
+    "carrier": "carrier",
+    "direction": "direction",
+    "status_class": "status_class",
+}
+
+
+def hour_bucket(dt) -> Optional[str]:
+    """วันเวลา → 'YYYY-MM-DD HH:00' (รองรับ datetime, ISO และรูปแบบ GSM 'DD/MM/YY,HH:MM:SS+zz')"""
+    if hasattr(dt, "strftime"):
+        return dt.strftime("%Y-%m-%d %H:00")
+    s = str(dt or "").strip().replace("T", " ")
+    if len(s) >= 13 and s[4:5] == "-" and s[10:11] == " ":
+        return s[:13] + ":00"
+    if "," in s:
+        try:
+            dpart, tpart = s.split(",", 1)
+            dd, mm, yy = (int(x) for x in dpart.split("/"))
+            if yy < 100:
+                yy += 2000
+            return f"{yy:04d}-{mm:02d}-{dd:02d} {int(tpart[:2]):02d}:00"
+        except Exception:
+            return None
+    return None
+
+
+def status_class(direction: str, status: str, is_failed=0) -> str:
+    """กลุ่มสถานะของแถว log: ok / failed / received"""
+    if direction == "inbox":
+        return STATUS_RECEIVED
+    if int(is_failed or 0) or looks_failed(status or ""):
+        return STATUS_FAILED
+    return STATUS_OK
+
+
+def _bound(value: Optional[Union[datetime, str]]) -> Optional[str]:
+    if value is None:
+        return None
+    if hasattr(value, "strftime"):
+        return value.strftime("%Y-%m-%d %H:00")
+    return str(value)
+
+
+def traffic_summary(
+    since: Optional[Union[datetime, str]] = None,
+    until: Optional[Union[datetime, str]] = None,       # ไม่รวมชั่วโมงนี้
+    group_by: Iterable[str] = ("sim_iccid",),
+    direction: Optional[str] = None,
+    status: Optional[str] = None,
+    sim_iccid: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    รวมจำนวนตามคอลัมน์ที่ระบุ เช่น
+      traffic_summary(since=เมื่อวาน, until=วันนี้, group_by=("sim_iccid",), status="failed")
+      → [{'sim_iccid': '8966...', 'count': 12}, ...]
+    """
+    from .db import get_conn   # import ตรงนี้กัน circular import (db ใช้ helper ของโมดูลนี้)
+
+    keys = [g for g in group_by if g in _GROUP_COLS]
+    conds: List[str] = []
+    args: List[Any] = []
+    if since is not None:
+        conds.append("hour >= ?"); args.append(_bound(since))
+    if until is not None:
+        conds.append("hour < ?"); args.append(_bound(until))
+    if direction:
+        conds.append("direction = ?"); args.append(direction)
+    if status:
+        conds.append("status_class = ?"); args.append(status)
+    if sim_iccid is not None:
+        conds.append("sim_iccid = ?"); args.append(sim_iccid)
+    where_sql = ("WHERE " + " AND ".join(conds)) if conds else ""
+    select = [f"{_GROUP_COLS[k]} AS {k}" for k in keys]
+    group_sql = ("GROUP BY " + ", ".join(keys) + " ORDER BY " + ", ".join(keys)) if keys else ""
+
+    sql = f"""
+        SELECT {", ".join(select + ["SUM(count) AS count"])}
+          FROM sms_traffic_hourly
+          {where_sql}
+          {group_sql}
+    """
+    with get_conn() as conn:
+        rows = conn.execute(sql, args).fetchall()
+    return [{k: r[k] for k in r.keys()} for r in rows or [] if r["count"] is not None]
+
+
+def hourly_series(since=None, until=None, sim_iccid=None, direction=None) -> List[Dict[str, Any]]:
+    """จำนวนรายชั่วโมงแยกกลุ่มสถานะ → [{'hour', 'status_class', 'count'}, ...]"""
+    return traffic_summary(since, until, ("hour", "status_class"), direction=direction, sim_iccid=sim_iccid)
+
+
+def failed_sends_by_sim(day: Optional[Union[datetime, str]] = None) -> List[Dict[str, Any]]:
+    """จำนวนส่งไม่สำเร็จต่อ SIM ของวันที่ระบุ (ค่าเริ่มต้น = เมื่อวาน)"""
+    if day is None:
+        day = datetime.now() - timedelta(days=1)
+    if isinstance(day, str):
+        day = datetime.strptime(day[:10], "%Y-%m-%d")
+    start = day.replace(hour=0, minute=0, second=0, microsecond=0)
+    return traffic_summary(start, start + timedelta(days=1), ("sim_iccid", "carrier"),
+                           direction="sent", status=STATUS_FAILED)
+
+
+def rebuild_traffic_rollups() -> None:
+    """คำนวณตารางสรุปรายชั่วโมงใหม่ทั้งหมดจาก sms_sent/sms_inbox"""
+    from .db import get_conn, rebuild_traffic
+    with get_conn() as conn:
+        rebuild_traffic(conn)
+        conn.commit()
+
+
+if __name__ == "__main__":
+    import argparse, time
+
+    parser = argparse.ArgumentParser(description="SMS traffic rollups")
+    parser.add_argument("--rebuild", action="store_true", help="สร้างตารางสรุปใหม่จาก log ทั้งหมด")
+    opts = parser.parse_args()
+    if opts.rebuild:
+        t0 = time.perf_counter()
+        rebuild_traffic_rollups()
+        print(f"✅ rebuilt sms_traffic_hourly in {time.perf_counter() - t0:.2f} s")
+    for row in failed_sends_by_sim():
+        print(row)
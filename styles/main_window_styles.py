@@ -180,7 +180,7 @@ class MainWindowStyles:
     def get_command_display_style():
         """Command Display Style - แสดงคำสั่งที่ส่ง"""
         return """
-            QTextEdit {
+            QTextEdit, QPlainTextEdit {
                 font-size: 14px;
                 font-family: 'Courier New', monospace;
                 border-radius: 6px;
@@ -189,7 +189,7 @@ class MainWindowStyles:
                 background-color: #fff;
                 color: #6c757d;
             }
-            QTextEdit:focus {
+            QTextEdit:focus, QPlainTextEdit:focus {
                 border: 2px solid #a71e2a;
                 outline: none;
             }
@@ -199,7 +199,7 @@ class MainWindowStyles:
     def get_result_display_style():
         """Result Display Style - แสดงผลลัพธ์คำสั่ง"""
         return """
-            QTextEdit {
+            QTextEdit, QPlainTextEdit {
                 font-size: 14px;
                 font-family: 'Courier New', monospace;
                 border-radius: 6px;
@@ -208,7 +208,7 @@ class MainWindowStyles:
                 background-color: #fff;
                 color: #d63384;
             }
-            QTextEdit:focus {
+            QTextEdit:focus, QPlainTextEdit:focus {
                 border: 2px solid #a71e2a;
                 outline: none;
             }
@@ -7,11 +7,25 @@ UI Widgets สำหรับ SIM Management System
 from .loading_widget import LoadingWidget
 from .sim_table_widget import SimTableWidget
 from .sms_log_dialog import SmsLogDialog
+from .sms_log_model import SmsLogTableModel
+from .signal_measurement_model import SignalMeasurementsModel
+from .sms_thread_dialog import SmsThreadDialog
 from .sms_realtime_monitor import SmsRealtimeMonitor
+from .traffic_dashboard import TrafficDashboardDialog
+from .modem_dashboard import ModemDashboardDialog
+from .console_widget import ConsoleWidget
+from .metrics_panel import MetricsPanelDialog
 
 __all__ = [
     'LoadingWidget',
     'SimTableWidget', 
     'SmsLogDialog',
-    'SmsRealtimeMonitor'
+    'SmsLogTableModel',
+    'SignalMeasurementsModel',
+    'SmsThreadDialog',
+    'SmsRealtimeMonitor',
+    'TrafficDashboardDialog',
+    'ModemDashboardDialog',
+    'ConsoleWidget',
+    'MetricsPanelDialog',
 ]
\ No newline at end of file
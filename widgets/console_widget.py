@@ -0,0 +1,153 @@
+# widgets/console_widget.py
+"""
+ช่องแสดงผล AT แบบต่อท้ายอย่างเดียว (แทน QTextEdit + toPlainText() + setPlainText() ทุกบรรทัด)
+- append_line ไม่แตะเอกสารทันที: รวมบรรทัดที่มาในเฟรมเดียวกันแล้วต่อท้ายครั้งเดียว (appendPlainText)
+- จำกัด scrollback ด้วย setMaximumBlockCount → บรรทัดเก่าสุดถูกตัดทิ้ง ไม่ต้องจัดหน้าใหม่ทั้งเอกสาร
+- เลื่อนลงล่างอัตโนมัติเฉพาะตอนผู้ใช้ดูบรรทัดล่าสุดอยู่ (เลื่อนขึ้นไปอ่านแล้วไม่ถูกดึงกลับ)
+- spill_path (ไม่บังคับ): เขียนทุกบรรทัดต่อท้ายไฟล์ → ประวัติเต็มแม้หน้าจอเก็บแค่ max_lines
+benchmark 100k บรรทัด: python -m widgets.console_widget
+"""
+from PyQt5.QtWidgets import QPlainTextEdit
+from PyQt5.QtCore import QTimer
+
+from services.metrics import UI_REFRESH, clock
+
+DEFAULT_MAX_LINES = 5000
+FLUSH_INTERVAL_MS = 16      # ~1 เฟรมที่ 60 Hz
+
+
+class ConsoleWidget(QPlainTextEdit):
+    """QPlainTextEdit แบบอ่านอย่างเดียวสำหรับ log ที่ต่อท้ายเรื่อย ๆ"""
+
+    def __init__(self, parent=None, max_lines=DEFAULT_MAX_LINES, spill_path=None):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setUndoRedoEnabled(False)
+        self.setMaximumBlockCount(max(0, int(max_lines or 0)))   # 0 = ไม่จำกัด
+        self._pending = []
+        self._spill = None
+        self.spill_path = None
+        self.lines_total = 0
+
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(FLUSH_INTERVAL_MS)
+        self._flush_timer.timeout.connect(self.flush)
+
+        if spill_path:
+            self.enable_spill(spill_path)
+
+    # ---------- ต่อท้าย ----------
+    def append_line(self, text):
+        """เพิ่มบรรทัด (แสดงในเฟรมถัดไป)"""
+        self._pending.append("" if text is None else str(text))
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def flush(self):
+        """ต่อท้ายบรรทัดที่ค้างทั้งหมดในครั้งเดียว"""
+        if not self._pending:
+            return
+        started = clock()
+        lines, self._pending = self._pending, []
+        self.lines_total += len(lines)
+        text = "\n".join(lines)
+        if self._spill is not None:
+            try:
+                self._spill.write(text + "\n")
+                self._spill.flush()
+            except Exception as e:
+                print(f"Console spill error: {e}")
+                self.disable_spill()
+
+        bar = self.verticalScrollBar()
+        at_bottom = bar.value() >= bar.maximum() - 2
+        self.appendPlainText(text)
+        if at_bottom:
+            bar.setValue(bar.maximum())
+        UI_REFRESH.observe_since(started, "console")
+
+    def clear(self):
+        self._pending = []
+        self._flush_timer.stop()
+        super().clear()
+
+    # ---------- ประวัติเต็มบนดิสก์ ----------
+    def enable_spill(self, path):
+        self.disable_spill()
+        try:
+            self._spill = open(path, "a", encoding="utf-8")
+            self.spill_path = path
+        except Exception as e:
+            print(f"Cannot open console spill file {path}: {e}")
+            self._spill = None
+            self.spill_path = None
+
+    def disable_spill(self):
+        if self._spill is not None:
+            try:
+                self._spill.close()
+            except Exception:
+                pass
+        self._spill = None
+
+    def full_history(self):
+        """ข้อความทั้งหมด: จากไฟล์ spill ถ้าเปิดไว้ ไม่งั้นเท่าที่หน้าจอเก็บอยู่"""
+        self.flush()
+        if self.spill_path:
+            try:
+                with open(self.spill_path, "r", encoding="utf-8") as f:
+                    return f.read()
+            except Exception as e:
+                print(f"Cannot read console spill file: {e}")
+        return self.toPlainText()
+
+    def closeEvent(self, event):
+        self.flush()
+        self.disable_spill()
+        super().closeEvent(event)
+
+
+# ==================== BENCHMARK ====================
+def benchmark(lines=100_000, legacy_lines=5_000):
+    """
+    เวลาเพิ่มบรรทัดต่อ 10k บรรทัด (ควรคงที่ ไม่โตตามจำนวนที่มีอยู่แล้ว)
+    เทียบกับวิธีเดิม toPlainText()+setPlainText() ที่จำนวนน้อยกว่ามาก
+    """
+    import sys
+    import time
+    from PyQt5.QtWidgets import QApplication, QTextEdit
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    console = ConsoleWidget(max_lines=DEFAULT_MAX_LINES)
+    console.resize(800, 400)
+    console.show()
+
+    chunk = 10_000
+    t_total = time.perf_counter()
+    for start in range(0, lines, chunk):
+        t = time.perf_counter()
+        for i in range(start, start + chunk):
+            console.append_line(f"+CSQ: {i % 32},99")
+            if i % 50 == 0:         # รอบ event loop ~ ทุก 50 บรรทัด (ข้อมูลจาก serial เป็นช่วง ๆ)
+                console.flush()
+                app.processEvents()
+        console.flush()
+        app.processEvents()
+        print(f"  lines {start + chunk:>7,}: {(time.perf_counter() - t) * 1000:8.1f} ms / {chunk:,}")
+    print(f"ConsoleWidget {lines:,} lines: {time.perf_counter() - t_total:.2f} s "
+          f"(kept {console.blockCount():,} blocks)")
+
+    legacy = QTextEdit()
+    legacy.setReadOnly(True)
+    t = time.perf_counter()
+    for i in range(legacy_lines):
+        current = legacy.toPlainText()
+        legacy.setPlainText(current + "\n" + f"+CSQ: {i % 32},99" if current else "+CSQ: 0,99")
+        if i % 50 == 0:
+            app.processEvents()
+    print(f"legacy setPlainText {legacy_lines:,} lines: {time.perf_counter() - t:.2f} s")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,136 @@
+# widgets/metrics_panel.py
+"""
+debug panel ของ services/metrics: ตาราง counter / gauge / histogram (count, avg, p50, p95) รีเฟรชทุก 1 วินาที
+- เปิด/ปิดการเก็บได้จากที่นี่ (จำไว้ใน settings 'metrics_enabled')
+- Export เป็นไฟล์ Prometheus text (.prom) / Reset ค่าทั้งหมด
+"""
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QCheckBox, QLineEdit,
+    QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView, QFileDialog
+)
+from PyQt5.QtCore import Qt, QTimer
+
+from styles import SmsLogDialogStyles
+from services import metrics
+
+REFRESH_MS = 1000
+HEADERS = ['📈 METRIC', '🏷 LABELS', 'TYPE', 'VALUE / COUNT', 'AVG', 'P50', 'P95']
+
+
+def _fmt_seconds(name, value):
+    """histogram เวลา → ms, อย่างอื่นแสดงตามจริง"""
+    if name.endswith("_seconds"):
+        return f"{value * 1000:.1f} ms"
+    return f"{value:.1f}"
+
+
+class MetricsPanelDialog(QDialog):
+    """หน้าต่างดู metrics ขณะโปรแกรมทำงาน"""
+
+    def __init__(self, settings_manager=None, parent=None):
+        super().__init__(parent)
+        self.settings_manager = settings_manager
+        self.setWindowTitle("📈 Metrics | latency / คิว / ปริมาณงาน")
+        self.resize(980, 560)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(15, 15, 15, 15)
+        layout.setSpacing(8)
+
+        top = QHBoxLayout()
+        self.chk_enabled = QCheckBox("เก็บ metrics")
+        self.chk_enabled.setChecked(metrics.enabled())
+        self.chk_enabled.toggled.connect(self.set_enabled)
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("🔍 กรองชื่อ metric / label")
+        self.filter_edit.textChanged.connect(self.refresh)
+        self.btn_export = QPushButton("💾 Export")
+        self.btn_export.clicked.connect(self.export)
+        self.btn_reset = QPushButton("🗑 Reset")
+        self.btn_reset.clicked.connect(self.reset)
+        top.addWidget(self.chk_enabled)
+        top.addWidget(self.filter_edit, stretch=1)
+        top.addWidget(self.btn_export)
+        top.addWidget(self.btn_reset)
+        layout.addLayout(top)
+
+        self.table = QTableWidget(0, len(HEADERS))
+        self.table.setHorizontalHeaderLabels(HEADERS)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        layout.addWidget(self.table, stretch=1)
+
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+        self.setStyleSheet(SmsLogDialogStyles.get_dialog_style())
+        self.chk_enabled.setStyleSheet(SmsLogDialogStyles.get_checkbox_style())
+        self.filter_edit.setStyleSheet(SmsLogDialogStyles.get_search_input_style())
+        self.btn_export.setStyleSheet(SmsLogDialogStyles.get_info_button_style())
+        self.btn_reset.setStyleSheet(SmsLogDialogStyles.get_danger_button_style())
+        self.table.setStyleSheet(SmsLogDialogStyles.get_table_style())
+        self.table.horizontalHeader().setStyleSheet(SmsLogDialogStyles.get_table_header_style())
+        self.status_label.setStyleSheet(SmsLogDialogStyles.get_status_label_style())
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(REFRESH_MS)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start()
+        self.refresh()
+
+    def set_enabled(self, on):
+        metrics.enable(on)
+        if self.settings_manager is not None:
+            self.settings_manager.set_setting('metrics_enabled', bool(on))
+        self.refresh()
+
+    def refresh(self):
+        try:
+            needle = self.filter_edit.text().strip().lower()
+            rows = [r for r in metrics.snapshot()
+                    if not needle or needle in r['name'].lower() or needle in r['labels'].lower()]
+            self.table.setRowCount(len(rows))
+            for row, r in enumerate(rows):
+                if r['kind'] == "histogram":
+                    values = [r['name'], r['labels'], r['kind'], f"{r['count']:,}",
+                              _fmt_seconds(r['name'], r['avg']), _fmt_seconds(r['name'], r['p50']),
+                              _fmt_seconds(r['name'], r['p95'])]
+                else:
+                    value = r['value']
+                    values = [r['name'], r['labels'], r['kind'],
+                              f"{value:,}" if isinstance(value, int) else f"{value:,.2f}", "", "", ""]
+                self._set_row(row, values)
+            state = "🟢 กำลังเก็บ" if metrics.enabled() else "⏸ ปิดอยู่ (ไม่มีค่าใช้จ่ายตอนทำงาน)"
+            self.status_label.setText(f"{state} | {len(rows)} series")
+        except Exception as e:
+            print(f"Error loading metrics: {e}")
+            self.status_label.setText(f"❌ โหลด metrics ไม่สำเร็จ: {e}")
+
+    def _set_row(self, row, values):
+        for col, value in enumerate(values):
+            item = QTableWidgetItem(str(value))
+            item.setTextAlignment(Qt.AlignLeft | Qt.AlignVCenter if col < 2 else Qt.AlignCenter)
+            self.table.setItem(row, col, item)
+
+    def export(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export metrics", "simbox_metrics.prom",
+                                              "Prometheus text (*.prom *.txt)")
+        if not path:
+            return
+        try:
+            metrics.write_textfile(path)
+            self.status_label.setText(f"💾 บันทึกแล้ว: {path}")
+        except Exception as e:
+            print(f"Error exporting metrics: {e}")
+            self.status_label.setText(f"❌ Export ไม่สำเร็จ: {e}")
+
+    def reset(self):
+        metrics.reset()
+        self.refresh()
+
+    def done(self, result):
+        self.refresh_timer.stop()
+        super().done(result)
@@ -0,0 +1,356 @@
+# widgets/modem_dashboard.py
+"""
+แดชบอร์ดสัญญาณหลายโมเด็ม (ทั้ง rack ในหน้าต่างเดียว)
+- วัด AT+CSQ ทุกพอร์ตพร้อมกันผ่าน services/modem_sampler.py (เลื่อนเวลากระจายโหลด + งบ commands/sec รวม)
+- แต่ละพอร์ตเป็น sparkline เล็ก ๆ อ่านจาก ring buffer ที่ใช้ร่วมกัน
+- GUI ไม่รับ signal ต่อ sample: QTimer ดู version ของแต่ละพอร์ตแล้ววาดเฉพาะ tile ที่เปลี่ยน
+  → 64 โมเด็ม × 1 วินาที ยังลื่น
+"""
+import math
+
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QDoubleSpinBox, QSpinBox,
+    QScrollArea, QWidget, QGridLayout, QSizePolicy
+)
+from PyQt5.QtCore import Qt, QThread, QTimer, QPointF, QRectF
+from PyQt5.QtGui import QPainter, QPen, QColor, QPolygonF, QFont
+
+from styles import SmsLogDialogStyles
+from core.utility_functions import list_serial_ports
+from services.modem_sampler import (
+    ModemSampler, SerialPortChannel, ThreadChannel, shared_buffer, probe_channels,
+    DEFAULT_INTERVAL, DEFAULT_BUDGET, STATUS_OK, STATUS_TIMEOUT, STATUS_ERROR
+)
+from services.signal_buffer import minmax_decimate
+from services.metrics import UI_REFRESH, clock
+
+TILE_WIDTH = 230
+TILE_HEIGHT = 74
+REFRESH_MS = 250            # GUI ดึงสถานะทุก 250 ms (ไม่ผูกกับจำนวนโมเด็ม)
+RSSI_MIN, RSSI_MAX = -113, -51
+
+STATE_COLORS = {
+    STATUS_OK: QColor("#ffffff"),
+    STATUS_TIMEOUT: QColor("#fff4e0"),
+    STATUS_ERROR: QColor("#fde2e1"),
+}
+IDLE_BG = QColor("#f4f6f7")
+
+
+def _rssi_color(rssi):
+    if rssi >= -70:
+        return QColor("#27ae60")
+    if rssi >= -85:
+        return QColor("#2ecc71")
+    if rssi >= -100:
+        return QColor("#f39c12")
+    return QColor("#e74c3c")
+
+
+class SamplerThread(QThread):
+    """รัน ModemSampler.run() นอก GUI thread"""
+
+    def __init__(self, sampler, parent=None):
+        super().__init__(parent)
+        self.sampler = sampler
+
+    def run(self):
+        try:
+            self.sampler.run()
+        except Exception as e:
+            print(f"Error in modem sampler: {e}")
+
+
+class SparklineTile(QWidget):
+    """ช่องของโมเด็ม 1 ตัว: ชื่อพอร์ต + ค่าล่าสุด + เส้นสัญญาณย้อนหลัง"""
+
+    def __init__(self, port, parent=None):
+        super().__init__(parent)
+        self.port = port
+        self.buffer = shared_buffer(port)
+        self.status = None
+        self.setFixedSize(TILE_WIDTH, TILE_HEIGHT)
+        self.setToolTip(port)
+
+    def set_status(self, status):
+        self.status = status
+        if status and status.last_error:
+            self.setToolTip(f"{self.port}\n{status.last_error}")
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing, True)
+        state = self.status.state if self.status else None
+        painter.setPen(QPen(QColor("#d5dbdb"), 1))
+        painter.setBrush(STATE_COLORS.get(state, IDLE_BG))
+        painter.drawRoundedRect(QRectF(0.5, 0.5, self.width() - 1, self.height() - 1), 6, 6)
+
+        last = self.buffer[-1] if self.buffer else None
+        painter.setFont(QFont("Arial", 9, QFont.Bold))
+        painter.setPen(QColor("#2c3e50"))
+        painter.drawText(QRectF(8, 4, self.width() - 16, 16), Qt.AlignLeft | Qt.AlignVCenter, self.port)
+        if state == STATUS_ERROR:
+            text, color = "❌ error", QColor("#c0392b")
+        elif state == STATUS_TIMEOUT:
+            text, color = "⏳ no reply", QColor("#d35400")
+        elif last is not None and last.rssi != -999:
+            text, color = f"{last.rssi} dBm", _rssi_color(last.rssi)
+        else:
+            text, color = "-", QColor("#7f8c8d")
+        painter.setPen(color)
+        painter.drawText(QRectF(8, 4, self.width() - 16, 16), Qt.AlignRight | Qt.AlignVCenter, text)
+
+        self._draw_sparkline(painter, QRectF(8, 24, self.width() - 16, self.height() - 30))
+        painter.end()
+
+    def _draw_sparkline(self, painter, rect):
+        columns = int(rect.width())
+        values = self.buffer.values("rssi", last=columns * 4)
+        if len(values) < 2:
+            return
+        lo, hi, _ = minmax_decimate(values, columns)
+        n = len(lo)
+        step = rect.width() / max(1, n - 1)
+        scale = rect.height() / (RSSI_MAX - RSSI_MIN)
+
+        def y(v):
+            return rect.bottom() - (min(max(v, RSSI_MIN), RSSI_MAX) - RSSI_MIN) * scale
+
+        # ช่องที่อ่านไม่ได้ (NaN) ตัดเส้นเป็นท่อน ๆ
+        poly = QPolygonF()
+        painter.setPen(QPen(QColor("#2980b9"), 1.2))
+        for i in range(n):
+            if math.isnan(lo[i]):
+                if poly.size() > 1:
+                    painter.drawPolyline(poly)
+                poly = QPolygonF()
+                continue
+            x = rect.left() + i * step
+            poly.append(QPointF(x, y(hi[i])))
+            if lo[i] != hi[i]:
+                poly.append(QPointF(x, y(lo[i])))
+        if poly.size() > 1:
+            painter.drawPolyline(poly)
+
+
+class ModemDashboardDialog(QDialog):
+    """หน้าต่างแดชบอร์ดทุกโมเด็ม"""
+
+    def __init__(self, serial_thread=None, baudrate=115200, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("🗄 Modem Dashboard | สัญญาณทุกโมเด็ม")
+        self.resize(1000, 640)
+        self.serial_thread = serial_thread
+        self.baudrate = baudrate
+        self.sampler = ModemSampler(DEFAULT_INTERVAL, DEFAULT_BUDGET)
+        self.sampler_thread = None
+        self.tiles = {}
+        self._versions = {}
+        self._thread_channel = None
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(15, 15, 15, 15)
+        layout.setSpacing(8)
+
+        top = QHBoxLayout()
+        self.interval_label = QLabel("⏱ Interval (s):")
+        self.interval_spin = QDoubleSpinBox()
+        self.interval_spin.setRange(0.2, 600.0)
+        self.interval_spin.setSingleStep(0.5)
+        self.interval_spin.setValue(DEFAULT_INTERVAL)
+        self.budget_label = QLabel("📨 Budget (cmd/s):")
+        self.budget_spin = QSpinBox()
+        self.budget_spin.setRange(1, 1000)
+        self.budget_spin.setValue(int(DEFAULT_BUDGET))
+        self.interval_spin.valueChanged.connect(self._apply_rate)
+        self.budget_spin.valueChanged.connect(self._apply_rate)
+        self.btn_ports = QPushButton("🔄 Rescan Ports")
+        self.btn_ports.clicked.connect(self.rescan_ports)
+        self.btn_toggle = QPushButton("⏸ Stop")
+        self.btn_toggle.clicked.connect(self.toggle_sampling)
+        top.addWidget(self.interval_label)
+        top.addWidget(self.interval_spin)
+        top.addSpacing(12)
+        top.addWidget(self.budget_label)
+        top.addWidget(self.budget_spin)
+        top.addStretch()
+        top.addWidget(self.btn_ports)
+        top.addWidget(self.btn_toggle)
+        layout.addLayout(top)
+
+        self.grid_host = QWidget()
+        self.grid = QGridLayout(self.grid_host)
+        self.grid.setSpacing(8)
+        self.grid.setAlignment(Qt.AlignTop | Qt.AlignLeft)
+        self.scroll = QScrollArea()
+        self.scroll.setWidgetResizable(True)
+        self.scroll.setWidget(self.grid_host)
+        self.scroll.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        layout.addWidget(self.scroll, stretch=1)
+
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+        self.setStyleSheet(SmsLogDialogStyles.get_dialog_style())
+        for label in (self.interval_label, self.budget_label):
+            label.setStyleSheet(SmsLogDialogStyles.get_control_label_style())
+        self.btn_ports.setStyleSheet(SmsLogDialogStyles.get_info_button_style())
+        self.btn_toggle.setStyleSheet(SmsLogDialogStyles.get_info_button_style())
+        self.status_label.setStyleSheet(SmsLogDialogStyles.get_status_label_style())
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self._refresh)
+        self.refresh_timer.start(REFRESH_MS)
+
+        self.rescan_ports()
+        self.start_sampling()
+
+    # ---------- พอร์ต ----------
+    def _main_port(self):
+        t = self.serial_thread
+        if t is not None and t.isRunning():
+            return getattr(t, "port", None)
+        return None
+
+    def _send_via_main(self, command):
+        t = self.serial_thread
+        if t is None or not t.isRunning():
+            return False
+        if hasattr(t, "set_command_source"):
+            t.set_command_source("BACKGROUND")
+        return t.send_command(command)
+
+    def _detach_thread_channel(self):
+        if self._thread_channel is not None:
+            try:
+                self.serial_thread.at_response_signal.disconnect(self._thread_channel.feed_line)
+            except Exception:
+                pass
+            self._thread_channel = None
+
+    def rescan_ports(self):
+        """
+        หาพอร์ตทั้งหมดใหม่ → พอร์ตของหน้าหลักใช้ serial thread เดิม
+        พอร์ตใหม่ที่เหลือ probe ด้วย AT ก่อน: ไม่ตอบ OK (diag / NMEA / BT) → ปล่อยคืน ไม่แสดง
+        """
+        try:
+            ports = [device for device, _ in list_serial_ports()]
+        except Exception as e:
+            print(f"Error listing serial ports: {e}")
+            ports = []
+        main_port = self._main_port()
+        fresh = [p for p in ports
+                 if p != main_port and not isinstance(self.sampler.channels.get(p), SerialPortChannel)]
+        probed = probe_channels(fresh, self.baudrate)
+        channels = {}
+        for port in ports:
+            old = self.sampler.channels.get(port)
+            if port == main_port:
+                if self._thread_channel is None:
+                    self._thread_channel = ThreadChannel(port, self._send_via_main)
+                    # DirectConnection: feed_line ถูกเรียกใน serial thread (ใช้ Event ภายใน → ปลอดภัย)
+                    self.serial_thread.at_response_signal.connect(
+                        self._thread_channel.feed_line, Qt.DirectConnection)
+                channels[port] = self._thread_channel
+            elif isinstance(old, SerialPortChannel):
+                channels[port] = old
+            elif port in probed:
+                channels[port] = probed[port]
+        if main_port not in channels:
+            self._detach_thread_channel()
+        self.sampler.set_channels(channels)
+        self._rebuild_grid(list(channels))
+
+    def _rebuild_grid(self, ports):
+        for port in list(self.tiles):
+            if port not in ports:
+                tile = self.tiles.pop(port)
+                self.grid.removeWidget(tile)
+                tile.deleteLater()
+                self._versions.pop(port, None)
+        for port in ports:
+            if port not in self.tiles:
+                self.tiles[port] = SparklineTile(port, self.grid_host)
+        self._relayout()
+
+    def _relayout(self):
+        cols = max(1, (self.scroll.viewport().width() - 8) // (TILE_WIDTH + self.grid.spacing()))
+        for i, port in enumerate(sorted(self.tiles, key=_port_sort_key)):
+            self.grid.addWidget(self.tiles[port], i // cols, i % cols)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._relayout()
+
+    # ---------- การวัด ----------
+    def _apply_rate(self, *_):
+        self.sampler.set_rate(self.interval_spin.value(), self.budget_spin.value())
+
+    def start_sampling(self):
+        if self.sampler_thread is not None and self.sampler_thread.isRunning():
+            return
+        self._apply_rate()
+        self.sampler_thread = SamplerThread(self.sampler, self)
+        self.sampler_thread.start()
+        self.btn_toggle.setText("⏸ Stop")
+
+    def stop_sampling(self):
+        if self.sampler_thread is None:
+            return
+        self.sampler.stop()
+        # รอจน run() จบจริง (executor shutdown + ปิดพอร์ต) — นานสุด ≈ COMMAND_TIMEOUT ของงานที่ค้าง
+        self.sampler_thread.wait()
+        self.sampler_thread = None
+        self.btn_toggle.setText("▶ Start")
+
+    def toggle_sampling(self):
+        if self.sampler_thread is not None and self.sampler_thread.isRunning():
+            self.stop_sampling()
+        else:
+            # พอร์ตที่ถูกปิดตอนหยุดจะเปิดใหม่เองตอนวัด — rescan เผื่อเสียบโมเด็มเพิ่มระหว่างหยุด
+            self.rescan_ports()
+            self.start_sampling()
+
+    def _refresh(self):
+        """วาดเฉพาะ tile ที่มีผลใหม่ตั้งแต่รอบก่อน"""
+        started = clock()
+        snapshot = self.sampler.snapshot()
+        ok = failed = 0
+        for port, st in snapshot.items():
+            if st.state == STATUS_OK:
+                ok += 1
+            elif st.state in (STATUS_ERROR, STATUS_TIMEOUT):
+                failed += 1
+            tile = self.tiles.get(port)
+            if tile is not None and self._versions.get(port) != st.version:
+                self._versions[port] = st.version
+                tile.set_status(st)
+        running = self.sampler_thread is not None and self.sampler_thread.isRunning()
+        sched = self.sampler.schedule
+        stretched = " (ยืดตามงบ)" if sched.effective_interval > sched.interval + 1e-9 else ""
+        self.status_label.setText(
+            f"{'🟢' if running else '⏸'} 📡 {len(self.tiles)} ports | ✅ {ok} | ❌ {failed} | "
+            f"⏱ ทุก {sched.effective_interval:.1f} s{stretched} | 📨 ส่งแล้ว {self.sampler.sent:,} | "
+            f"⏭ ข้าม {self.sampler.skipped:,}"
+        )
+        UI_REFRESH.observe_since(started, "modem_dashboard")
+
+    def done(self, result):
+        self.refresh_timer.stop()
+        self.stop_sampling()
+        self._detach_thread_channel()
+        super().done(result)
+
+    def closeEvent(self, event):
+        self.refresh_timer.stop()
+        self.stop_sampling()
+        self._detach_thread_channel()
+        super().closeEvent(event)
+
+
+def _port_sort_key(port):
+    """COM2 ก่อน COM10, /dev/ttyUSB2 ก่อน /dev/ttyUSB10"""
+    head = port.rstrip("0123456789")
+    tail = port[len(head):]
+    return head, int(tail) if tail else -1
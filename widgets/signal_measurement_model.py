@@ -0,0 +1,166 @@
+# widgets/signal_measurement_model.py
+"""
+Table model สำหรับตาราง Measurements ของหน้าต่าง Signal Quality
+- อ่านตรงจาก SignalRingBuffer (ไม่สร้าง QTableWidgetItem ต่อ cell)
+- เพิ่มแถว = beginInsertRows ท้ายตาราง, buffer เต็ม = beginRemoveRows หัวตารางครั้งเดียว
+- เลขแถว (#) คำนวณจากลำดับตั้งแต่เริ่มวัด → ไม่ต้องเขียนเลขใหม่ทุกแถวเมื่อแถวเก่าหลุดออก
+"""
+from typing import Callable, Iterable, Optional
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant
+from PyQt5.QtGui import QColor
+
+HEADERS = ["#", "Time", "RSSI (dBm)", "Quality (%)", "Bars", "RSRP (dBm)",
+           "RSRQ (dB)", "BER (%)", "Carrier", "MCC", "MNC"]
+COLUMN_WIDTHS = [40, 70, 85, 80, 50, 85, 80, 70, 120, 60, 60]
+
+COL_NO, COL_QUALITY, COL_BER = 0, 3, 7
+
+MUTED_FG = QColor("#6c757d")
+UNKNOWN_BG = QColor("#f1f3f5")
+
+
+def _default_ber_text(ber):
+    if ber >= 99:
+        return ("--", "BER not available (reported as 99)", True)
+    return (f"{ber:.1f}%", None, False)
+
+
+class SignalMeasurementsModel(QAbstractTableModel):
+    """model ครอบ SignalRingBuffer (ต้องเพิ่ม measurement ผ่าน append() ของ model เท่านั้น)"""
+
+    def __init__(self, buffer, quality_color: Optional[Callable[[float], str]] = None,
+                 ber_text: Optional[Callable[[float], tuple]] = None, parent=None):
+        super().__init__(parent)
+        self._buffer = buffer
+        self._quality_color = quality_color or (lambda q: "#000000")
+        self._ber_text = ber_text or _default_ber_text
+        self._colors = {}              # hex → QColor (สร้างครั้งเดียว)
+
+    # ==================== data source ====================
+    @property
+    def buffer(self):
+        return self._buffer
+
+    def append(self, measurement) -> None:
+        self.append_many([measurement])
+
+    def append_many(self, measurements: Iterable) -> None:
+        items = list(measurements)
+        if not items:
+            return
+        buf = self._buffer
+        if len(items) >= buf.capacity:
+            # มาทีเดียวเกินความจุ → แถวเดิมหายหมด reset ถูกกว่า
+            self.beginResetModel()
+            for m in items:
+                buf.append(m)
+            self.endResetModel()
+            return
+
+        overflow = len(buf) + len(items) - buf.capacity
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            buf.drop_oldest(overflow)
+            self.endRemoveRows()
+
+        start = len(buf)
+        self.beginInsertRows(QModelIndex(), start, start + len(items) - 1)
+        for m in items:
+            buf.append(m)
+        self.endInsertRows()
+
+    def clear(self) -> None:
+        self.beginResetModel()
+        self._buffer.clear()
+        self.endResetModel()
+
+    # ==================== lookup ====================
+    def first_number(self) -> int:
+        """ลำดับ (นับจาก 0 ตั้งแต่เริ่มวัด) ของแถวบนสุด"""
+        return self._buffer.total - len(self._buffer)
+
+    def row_for_global_index(self, global_index: int) -> int:
+        """ลำดับตั้งแต่เริ่มวัด → แถวในตาราง (-1 = หลุดออกจาก buffer แล้ว)"""
+        row = int(global_index) - self.first_number()
+        return row if 0 <= row < len(self._buffer) else -1
+
+    def measurement(self, row: int):
+        if 0 <= row < len(self._buffer):
+            return self._buffer[row]
+        return None
+
+    def _color(self, hex_value: str) -> QColor:
+        color = self._colors.get(hex_value)
+        if color is None:
+            color = self._colors[hex_value] = QColor(hex_value)
+        return color
+
+    # ==================== Qt model API ====================
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._buffer)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal and 0 <= section < len(HEADERS):
+            return HEADERS[section]
+        return QVariant()
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._buffer):
+            return QVariant()
+        row, col = index.row(), index.column()
+        m = self._buffer[row]
+
+        if role == Qt.DisplayRole:
+            return self._display(row, col, m)
+        if role == Qt.ForegroundRole:
+            if col == COL_NO:
+                return MUTED_FG
+            if col == COL_QUALITY:
+                return self._color(self._quality_color(m.quality_score))
+            if col == COL_BER and m.ber >= 99:
+                return MUTED_FG
+        elif role == Qt.BackgroundRole:
+            if col == COL_BER and m.ber >= 99:
+                return UNKNOWN_BG
+        elif role == Qt.ToolTipRole:
+            if col == COL_BER:
+                return self._ber_text(m.ber)[1] or QVariant()
+        elif role == Qt.TextAlignmentRole:
+            if col == COL_NO:
+                return Qt.AlignCenter
+        return QVariant()
+
+    def _display(self, row, col, m):
+        if col == COL_NO:
+            return str(self.first_number() + row + 1)
+        if col == 1:
+            return m.timestamp
+        if col == 2:
+            return str(m.rssi)
+        if col == COL_QUALITY:
+            return f"{m.quality_score:.1f}"
+        if col == 4:
+            return str(m.signal_bars)
+        if col == 5:
+            return str(m.rsrp) if m.rsrp > -999 else "--"
+        if col == 6:
+            return str(m.rsrq) if m.rsrq > -999 else "--"
+        if col == COL_BER:
+            return self._ber_text(m.ber)[0].replace("%", "")
+        if col == 8:
+            return m.carrier
+        info = m.sim_info
+        if col == 9:
+            return info.mcc if info else "--"
+        if col == 10:
+            return info.mnc if info else "--"
+        return ""
@@ -1,11 +1,12 @@
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QWidget, QHBoxLayout, QLineEdit,
     QPushButton, QLabel, QComboBox, QGroupBox, QSizePolicy, QMessageBox,
-    QTableWidget, QTableWidgetItem, QHeaderView, QDialog, QTextEdit, QFileDialog,
-    QDateEdit, QCheckBox, QFrame, QSpacerItem, QShortcut, QFileDialog, QAbstractItemView
+    QHeaderView, QDialog, QTextEdit, QFileDialog,
+    QDateEdit, QCheckBox, QFrame, QSpacerItem, QShortcut, QFileDialog, QAbstractItemView,
+    QTableView
 )
-from PyQt5.QtCore import Qt, QEvent, QDate, pyqtSignal, QTimer
-from PyQt5.QtGui import QFont, QPalette, QColor, QKeySequence, QBrush
+from PyQt5.QtCore import QEvent, QDate, pyqtSignal, QTimer, QItemSelectionModel
+from PyQt5.QtGui import QFont, QPalette, QColor, QKeySequence
 import sys, os, csv, time, re
 from datetime import datetime, timedelta
 from styles import SmsLogDialogStyles
@@ -13,24 +14,22 @@ import json
 from pathlib import Path
 import portalocker
 from core.utility_functions import normalize_phone_number
-from services.sms_log import list_logs
+from services.sms_log import log_signature
+from services.phone_index import is_phone_query
+from services.csv_store import looks_failed
+from widgets.sms_log_model import SmsLogTableModel, SmsLogLoader
 import sip
 
-# --- helper สำหรับตรวจว่าเป็น Fail หรือไม่ ---
-FAIL_KEYWORDS = [
-    "ล้มเหลว", "ไม่สำเร็จ", "ส่งไม่สำเร็จ", "ผิดพลาด", "ขัดข้อง",
-    "fail", "failed", "error", "timeout", "time out", "not sent",
-    "denied", "reject", "rejected", "cancel", "cancelled", "no route", "no service",
-    "no sim", "pin required", "no signal", "no network", "connection"
-]
+SEARCH_DEBOUNCE_MS = 250
+
+# --- helper สำหรับตรวจว่าเป็น Fail หรือไม่ (คำใน status ใช้ชุดเดียวกับ services.csv_store) ---
 def _is_fail_row(row: dict) -> bool:
     try:
         if int(row.get("is_failed", 0) or 0) == 1:
             return True
     except Exception:
         pass
-    st = (row.get("status") or "").lower()
-    return any(k in st for k in FAIL_KEYWORDS)
+    return looks_failed(row.get("status") or "")
 
 
 def get_log_directory_from_settings():
@@ -58,7 +57,18 @@ class SmsLogDialog(QDialog):
         
         # ==================== 1. INITIALIZATION ====================
         self.filter_phone = filter_phone
-        self.all_data = []
+        self._total_rows = 0
+        self._pending_selected_ids = set()   # id ที่ต้องเลือกคืนเมื่อหน้าถัดไปถูกโหลด
+        self._last_signature = None
+        self._loader = None                  # SmsLogLoader ที่กำลังทำงาน
+        self._load_generation = 0
+        self._loading = False
+
+        # ค้นหาตอนพิมพ์หยุด SEARCH_DEBOUNCE_MS (ไม่โหลดใหม่ทุกตัวอักษร)
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self._search_timer.timeout.connect(self.apply_search_filter)
         
         # ตั้งค่าหน้าต่าง
         self.setWindowTitle("📱 SMS History Manager | ประวัติข้อความ")
@@ -77,44 +87,39 @@ class SmsLogDialog(QDialog):
         # โหลดข้อมูลเริ่มต้น
         QTimer.singleShot(100, self.load_log)
         
-        # เชื่อมต่อ double click event
-        self.table.cellDoubleClicked.connect(self.handle_row_double_clicked)
-
         self._poll = QTimer(self)
         self._poll.setInterval(2000)
-        self._poll.timeout.connect(self.load_log)
+        self._poll.timeout.connect(self._poll_changes)
         self._poll.start()
 
-        self._init_csv_watch()
+        self._migrate_csv_header()
     
-    def _init_csv_watch(self):
+    def _migrate_csv_header(self):
+        """การเปลี่ยนแปลงของไฟล์ CSV ดูจาก log_signature ใน _poll_changes แล้ว — ที่นี่แค่แปลงหัวตารางเก่า"""
         try:
             from services.sms_log_store import READ_FROM_CSV, get_csv_file_path
         except Exception:
             return
         if not READ_FROM_CSV:
             return
-        import os
         self._csv_path = get_csv_file_path()
         # ✨ แปลงหัวตาราง dt → date,time อัตโนมัติ (ทำครั้งเดียวถ้ายังเป็นแบบเก่า)
         try:
             self._migrate_sim_csv_dt_to_date_time(self._csv_path)
         except Exception:
             pass
-        
-        self._csv_mtime = os.path.getmtime(self._csv_path) if os.path.exists(self._csv_path) else None
-        self._csv_timer = QTimer(self)
-        self._csv_timer.setInterval(3000)  # 3 วิ
-        def _tick():
-            if not os.path.exists(self._csv_path): return
-            m = os.path.getmtime(self._csv_path)
-            if self._csv_mtime is None:
-                self._csv_mtime = m; return
-            if m != self._csv_mtime:
-                self._csv_mtime = m
-                self.load_log()
-        self._csv_timer.timeout.connect(_tick)
-        self._csv_timer.start()
+
+    def _poll_changes(self):
+        """โหลดใหม่เฉพาะเมื่อข้อมูลใน store เปลี่ยน (ไม่ rebuild ตารางทุก 2 วินาที)"""
+        try:
+            sig = log_signature(self._current_direction())
+        except Exception:
+            sig = None
+        if sig is not None and sig == self._last_signature:
+            return
+        if self._loading:
+            return      # มีงานโหลดค้างอยู่แล้ว → รอผลก่อน
+        self.load_log()
 
     # ==================== 2. UI SETUP ====================
     def setup_simplified_ui(self):
@@ -166,7 +171,7 @@ class SmsLogDialog(QDialog):
         self.search_input.setPlaceholderText("ค้นหาจากเบอร์โทรศัพท์หรือข้อความ...")
         self.search_input.setMinimumHeight(40)
         self.search_input.setMaximumHeight(45)
-        self.search_input.textChanged.connect(self.apply_search_filter)
+        self.search_input.textChanged.connect(self._search_timer.start)
         layout.addWidget(self.search_input)
 
         # Search button
@@ -192,87 +197,15 @@ class SmsLogDialog(QDialog):
         return search_widget
 
     def apply_search_filter(self):
-        """กรองตารางตามข้อความในช่องค้นหา - Enhanced phone number search"""
-        query = self.search_input.text().strip().lower()
-        visible_count = 0
-        
-        # ถ้าไม่มีคำค้นหา แสดงทั้งหมด
-        if not query:
-            for row in range(self.table.rowCount()):
-                self.table.setRowHidden(row, False)
-                visible_count += 1
-            self.update_status_label(visible_count)
-            return
-        
-        # ตรวจสอบว่าเป็นการค้นหาเบอร์โทรหรือไม่
-        is_phone_search = self._is_phone_number_query(query)
-        
-        if is_phone_search:
-            # ปรับเบอร์ค้นหาให้เป็นรูปแบบต่างๆ
-            normalized_phones = self._generate_phone_variations(query)
-            print(f"🔍 Phone search variations: {normalized_phones}")
-        
-        for row in range(self.table.rowCount()):
-            # ดึงข้อมูลจากแต่ละคอลัมน์
-            phone_item = self.table.item(row, 2)
-            msg_item = self.table.item(row, 3)
-            
-            if phone_item and msg_item:
-                phone = phone_item.text().lower()
-                msg = msg_item.text().lower()
-                
-                show = False
-                
-                if is_phone_search:
-                    # ค้นหาเบอร์โทรแบบ flexible
-                    show = self._match_phone_numbers(phone, normalized_phones)
-                else:
-                    # ค้นหาข้อความปกติ
-                    show = (query in phone) or (query in msg)
-                
-                self.table.setRowHidden(row, not show)
-                
-                if show:
-                    visible_count += 1
-            else:
-                # ถ้าไม่มีข้อมูลให้ซ่อนแถว
-                self.table.setRowHidden(row, True)
-        
-        # อัพเดทสถิติ
-        self.update_status_label(visible_count)
-        
-        # แสดงข้อความค้นหา
-        if query:
-            search_type = "เบอร์โทร" if is_phone_search else "ข้อความ"
-            print(f"🔍 Search for {search_type} '{query}': Found {visible_count} results")
+        """ค้นหาเบอร์/ข้อความผ่าน index ใน log store → model แสดงเฉพาะผลลัพธ์"""
+        # เบอร์ (+66 / 66 / 0 / ท้ายเบอร์) ใช้ index phone_norm/phone_rev ใน store
+        # ข้อความอื่น ๆ ค้นแบบ contains ใน message/phone
+        self._search_timer.stop()
+        self.load_log()
 
     def quick_filter(self):
-        """กรองจากกล่องค้นหา: PHONE(คอลัมน์ 2) และ MESSAGE(คอลัมน์ 3)"""
-        # รองรับทั้งชื่อ txt_search และ search_input
-        search_box = getattr(self, "txt_search", None) or getattr(self, "search_input", None)
-        q = (search_box.text() if search_box else "").strip().lower()
-
-        visible = 0
-        for r in range(self.table.rowCount()):
-            # ข้ามแถว placeholder "ไม่มีข้อมูล" ให้ซ่อนเมื่อมีคำค้น
-            it0 = self.table.item(r, 0)
-            if it0 and "ไม่มีข้อมูล" in (it0.text() or ""):
-                self.table.setRowHidden(r, bool(q))
-                continue
-
-            phone = (self.table.item(r, 2).text() if self.table.item(r, 2) else "").lower()
-            msg   = (self.table.item(r, 3).text() if self.table.item(r, 3) else "").lower()
-
-            show = (q == "") or (q in phone) or (q in msg)
-            self.table.setRowHidden(r, not show)
-            if show:
-                visible += 1
-
-        # อัปเดตตัวเลขผลลัพธ์ (ถ้ามีเมธอดนี้อยู่)
-        try:
-            self.update_status_label(visible)
-        except Exception:
-            pass
+        """กรองจากกล่องค้นหา (คงชื่อเดิมไว้ให้ caller เก่า)"""
+        self.apply_search_filter()
 
     def on_search_clicked(self):
         self.quick_filter()
@@ -282,255 +215,29 @@ class SmsLogDialog(QDialog):
             self.txt_search.clear()
         self.quick_filter()
 
-    def _is_phone_number_query(self, query):
-        """ตรวจสอบว่าคำค้นหาเป็นเบอร์โทรหรือไม่ - Enhanced Version"""
-        if not query:
-            return False
-        
-        # ลบอักขระพิเศษออก
-        clean_query = ''.join(filter(str.isdigit, query))
-        
-        # กรณีที่ชัดเจนว่าเป็นเบอร์โทร
-        obvious_phone_patterns = [
-            query.startswith('+66'),
-            query.startswith('66') and len(clean_query) >= 11,
-            query.startswith('0') and len(clean_query) >= 9,
-            len(clean_query) == 9 or len(clean_query) == 10,
-            len(clean_query) == 11 and clean_query.startswith('66'),
-            len(clean_query) == 12 and clean_query.startswith('66')
-        ]
-        
-        if any(obvious_phone_patterns):
-            print(f"🔍 Obvious phone pattern detected for: '{query}'")
-            return True
-        
-        if len(clean_query) >= 3:
-            digit_ratio = len(clean_query) / len(query) if len(query) > 0 else 0
-            
-            if digit_ratio >= 0.7:
-                print(f"🔍 High digit ratio detected for: '{query}' ({digit_ratio:.2f})")
-                return True
-        
-        # ตรวจสอบรูปแบบเบอร์โทรที่มีขีด/วรรค
-        phone_pattern_regex = r'^[\d\s\-\+\(\)]{7,}$'
-        import re
-        if re.match(phone_pattern_regex, query) and len(clean_query) >= 7:
-            print(f"🔍 Phone pattern regex match for: '{query}'")
-            return True
-        
-        return False
-
-    def _generate_phone_variations(self, query):
-        variations = set()
-        clean_digits = ''.join(filter(str.isdigit, query))
-        
-        if not clean_digits:
-            return [query]  # ถ้าไม่มีตัวเลขเลย ใช้ query เดิม
-        
-        print(f"📱 DEBUG: Processing phone query '{query}' -> digits '{clean_digits}'")
-        
-        # === กรณีพิเศษ: เบอร์ 10 หลักที่ขึ้นต้นด้วย 0 ===
-        if clean_digits.startswith('0') and len(clean_digits) == 10:
-            # 0653988461 -> สร้างทุกรูปแบบ
-            phone_without_zero = clean_digits[1:]  # 653988461
-            
-            variations.add(clean_digits)  # 0653988461
-            variations.add(phone_without_zero)  # 653988461
-            variations.add(f'+66{phone_without_zero}')  # +66653988461
-            variations.add(f'66{phone_without_zero}')  # 66653988461
-            
-            # เพิ่มรูปแบบที่มีขีด/วรรค
-            variations.add(f'0{phone_without_zero[:2]}-{phone_without_zero[2:5]}-{phone_without_zero[5:]}')  # 065-398-8461
-            variations.add(f'0{phone_without_zero[:2]} {phone_without_zero[2:5]} {phone_without_zero[5:]}')  # 065 398 8461
-            
-            print(f"📱 Generated variations for 10-digit: {variations}")
-        
-        # === กรณี 1: ถ้าขึ้นต้นด้วย +66 ===
-        elif query.startswith('+66'):
-            # +66653988461 -> 0653988461, 653988461, +66653988461
-            if len(clean_digits) >= 11 and clean_digits.startswith('66'):
-                national_number = '0' + clean_digits[2:]  # 0653988461
-                phone_only = clean_digits[2:]  # 653988461
-                
-                variations.add(national_number)
-                variations.add(phone_only)
-                variations.add(f'+66{phone_only}')
-                variations.add(f'66{phone_only}')
-                variations.add(query)  # เก็บ original ด้วย
-        
-        # === กรณี 2: ถ้าขึ้นต้นด้วย 66 (ไม่มี +) ===
-        elif clean_digits.startswith('66') and len(clean_digits) >= 11:
-            # 66653988461 -> 0653988461, 653988461, +66653988461
-            phone_only = clean_digits[2:]  # 653988461
-            national_number = '0' + phone_only  # 0653988461
-            
-            variations.add(national_number)
-            variations.add(phone_only)
-            variations.add(f'+{clean_digits}')  # +66653988461
-            variations.add(f'+66{phone_only}')
-            variations.add(clean_digits)  # 66653988461
-        
-        # === กรณี 3: เลข 9 หลัก (ไม่มี 0 ข้างหน้า) ===
-        elif len(clean_digits) == 9 and not clean_digits.startswith('0'):
-            # 653988461 -> 0653988461, +66653988461, 66653988461
-            variations.add(f'0{clean_digits}')  # 0653988461
-            variations.add(clean_digits)  # 653988461
-            variations.add(f'+66{clean_digits}')  # +66653988461
-            variations.add(f'66{clean_digits}')  # 66653988461
-        
-        # === กรณี 4: เลขบางส่วน (สำหรับค้นหาบางส่วน) ===
-        elif len(clean_digits) >= 3:
-            variations.add(clean_digits)
-            variations.add(query.lower())  # เก็บ query เดิม
-            
-            # ถ้าขึ้นต้นด้วย 0 และมี 4+ หลัก
-            if clean_digits.startswith('0') and len(clean_digits) >= 4:
-                without_zero = clean_digits[1:]
-                variations.add(without_zero)
-                variations.add(f'+66{without_zero}')
-                variations.add(f'66{without_zero}')
-            
-            # ถ้าไม่ขึ้นต้นด้วย 0 และมี 3+ หลัก
-            elif not clean_digits.startswith('0') and len(clean_digits) >= 3:
-                variations.add(f'0{clean_digits}')
-                variations.add(f'+66{clean_digits}')
-                variations.add(f'66{clean_digits}')
-        
-        # === เพิ่มรูปแบบพิเศษ ===
-        # เพิ่ม query เดิมด้วย (สำหรับกรณีพิเศษ)
-        variations.add(query.lower())
-        variations.add(query.upper())
-        variations.add(clean_digits)
-        
-        # เพิ่มรูปแบบที่มีขีด/วรรค (ถ้ามีอยู่ใน query เดิม)
-        if '-' in query or ' ' in query:
-            variations.add(query)
-            variations.add(query.replace('-', '').replace(' ', ''))
-        
-        # เพิ่มรูปแบบ normalized
-        try:
-            from core.utility_functions import normalize_phone_number
-            normalized = normalize_phone_number(query)
-            if normalized:
-                variations.add(normalized)
-                # สร้างรูปแบบอื่นจาก normalized
-                if normalized.startswith('0') and len(normalized) == 10:
-                    without_zero = normalized[1:]
-                    variations.add(without_zero)
-                    variations.add(f'+66{without_zero}')
-                    variations.add(f'66{without_zero}')
-        except Exception as e:
-            print(f"Warning: normalize_phone_number error: {e}")
-        
-        result = list(variations)
-        print(f"📱 Final phone variations for '{query}': {result}")
-        return result
+    def _search_query(self):
+        search_box = getattr(self, "txt_search", None) or getattr(self, "search_input", None)
+        return (search_box.text() if search_box else "").strip()
 
-    def _match_phone_numbers(self, phone_in_table, search_variations):
-        if not phone_in_table or not search_variations:
-            return False
-        
-        # ทำให้เป็น lowercase และเตรียมข้อมูล
-        phone_lower = phone_in_table.lower().strip()
-        phone_clean = phone_in_table.replace('-', '').replace(' ', '').replace('(', '').replace(')', '').strip()
-        
-        print(f"🔍 Matching '{phone_in_table}' against {len(search_variations)} variations")
-        
-        # ตรวจสอบการตรงกันแบบเต็ม
-        for variation in search_variations:
-            variation_str = str(variation).lower().strip()
-            variation_clean = variation_str.replace('-', '').replace(' ', '').replace('(', '').replace(')', '')
-            
-            # 1. ตรงกันทุกตัวอักษร (exact match)
-            if phone_lower == variation_str or phone_clean.lower() == variation_clean:
-                print(f"✅ Exact match: '{phone_in_table}' == '{variation}'")
-                return True
-            
-            # 2. ตรงกันแบบ contains (สำหรับการค้นหาบางส่วน)
-            if len(variation_clean) >= 3:
-                if variation_clean in phone_clean.lower() or phone_clean.lower() in variation_clean:
-                    print(f"✅ Contains match: '{phone_in_table}' contains '{variation}'")
-                    return True
-        
-        # 3. ตรวจสอบแบบ normalize ทั้งสองฝั่ง
-        phone_digits = ''.join(filter(str.isdigit, phone_in_table))
-        
-        for variation in search_variations:
-            variation_digits = ''.join(filter(str.isdigit, str(variation)))
-            
-            if variation_digits and len(variation_digits) >= 3:
-                # ตรงกันแบบ exact digits
-                if phone_digits == variation_digits:
-                    print(f"✅ Digits exact match: '{phone_digits}' == '{variation_digits}'")
-                    return True
-                
-                # ตรงกันแบบ contains digits (สำหรับค้นหาบางส่วน)
-                if len(variation_digits) >= 7:  # เฉพาะเบอร์ยาวๆ
-                    if variation_digits in phone_digits or phone_digits in variation_digits:
-                        print(f"✅ Digits contains match: '{phone_digits}' ~ '{variation_digits}'")
-                        return True
-        
-        # 4. ตรวจสอบแบบ fuzzy match สำหรับรูปแบบพิเศษ
-        try:
-            from core.utility_functions import normalize_phone_number
-            
-            normalized_table = normalize_phone_number(phone_in_table)
-            
-            for variation in search_variations:
-                normalized_variation = normalize_phone_number(str(variation))
-                
-                if normalized_table and normalized_variation:
-                    if normalized_table == normalized_variation:
-                        print(f"✅ Normalized match: '{normalized_table}' == '{normalized_variation}'")
-                        return True
-                    
-                    # ตรวจสอบแบบบางส่วน
-                    if len(normalized_variation) >= 7:
-                        if normalized_variation in normalized_table or normalized_table in normalized_variation:
-                            print(f"✅ Normalized contains: '{normalized_table}' ~ '{normalized_variation}'")
-                            return True
-        except Exception as e:
-            print(f"Warning: normalize check error: {e}")
-        
-        return False
+    def _is_phone_number_query(self, query):
+        """ตรวจสอบว่าคำค้นหาเป็นเบอร์โทรหรือไม่"""
+        return is_phone_query(query)
 
     def clear_search(self):
-        """ล้างการค้นหาและแสดงข้อมูลทั้งหมด - Enhanced version"""
+        """ล้างการค้นหาและแสดงข้อมูลทั้งหมด"""
+        self.search_input.blockSignals(True)
         self.search_input.clear()
-        
-        # แสดงแถวทั้งหมด
-        visible_count = 0
-        for row in range(self.table.rowCount()):
-            self.table.setRowHidden(row, False)
-            
-            # นับเฉพาะแถวที่มีข้อมูลจริง (ไม่ใช่ "ไม่มีข้อมูล")
-            first_item = self.table.item(row, 0)
-            if first_item and not ("ไม่มี" in first_item.text() or "🔍" in first_item.text()):
-                visible_count += 1
-        
-        # อัพเดทสถิติ
-        self.update_status_label(visible_count)
-        
-        print("🗑️ Search cleared - showing all data")
+        self.search_input.blockSignals(False)
+        self.apply_search_filter()
 
     def get_search_stats(self):
         """ดึงสถิติการค้นหา"""
         query = self.search_input.text().strip()
-        total_rows = self.table.rowCount()
-        visible_rows = 0
-        hidden_rows = 0
-        
-        for row in range(total_rows):
-            if self.table.isRowHidden(row):
-                hidden_rows += 1
-            else:
-                visible_rows += 1
-        
         return {
             'query': query,
-            'total': total_rows,
-            'visible': visible_rows,
-            'hidden': hidden_rows,
+            'total': self._total_rows,
+            'visible': self._total_rows,
+            'hidden': 0,
             'is_phone_search': self._is_phone_number_query(query) if query else False
         }
 
@@ -619,12 +326,15 @@ class SmsLogDialog(QDialog):
 
     def create_maximized_table_section(self):
         """สร้าง table section ที่ใหญ่ที่สุด - ปรับขนาดคอลัมน์"""
-        self.table = QTableWidget(0, 4)
+        # model ดึงข้อมูลทีละหน้าจาก log store (ไม่สร้าง item ต่อ cell)
+        self.model = SmsLogTableModel(row_builder=self._build_record, parent=self)
+        self.model.rowsInserted.connect(self._on_rows_fetched)
+
+        self.table = QTableView()
+        self.table.setModel(self.model)
         self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.table.setSelectionMode(QAbstractItemView.MultiSelection)   # คลิก = toggle, ไม่ล้างตัวเดิม
         self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)    # กันเข้าโหมดแก้ไขแล้วสีหาย
-
-        self.table.setHorizontalHeaderLabels(['📅 DATE', '🕐 TIME', '📱 PHONE', '💬 MESSAGE'])
         
         header = self.table.horizontalHeader()
         header.setSectionResizeMode(0, QHeaderView.ResizeToContents)  # วันที่
@@ -638,7 +348,9 @@ class SmsLogDialog(QDialog):
 
         self.table.setMinimumHeight(500)
         self.table.verticalHeader().setDefaultSectionSize(45)
-        self.table.cellDoubleClicked.connect(self.handle_row_double_clicked)
+        self.table.doubleClicked.connect(
+            lambda mi: self.handle_row_double_clicked(mi.row(), mi.column())
+        )
 
         return self.table
 
@@ -727,8 +439,9 @@ class SmsLogDialog(QDialog):
 
     def setup_connections(self):
         """เชื่อมต่อ signals แบบง่าย"""
-        # เชื่อมต่อ ComboBox เรียงลำดับกับฟังก์ชันเรียงลำดับ
-        self.sort_combo.currentIndexChanged.connect(self.apply_sort_filter)
+        # sort_combo ต่อกับ apply_sort_filter ไว้แล้วใน create_simple_control_section
+        # (ไม่ต่อซ้ำ เพราะการเรียงใหม่ = เปิด cursor ใหม่ทั้งชุด)
+        pass
 
     # ==================== 3. UTILITY FUNCTIONS ====================
     def darken_color(self, color, factor=0.2):
@@ -773,25 +486,21 @@ class SmsLogDialog(QDialog):
             if custom_count is not None:
                 # ใช้จำนวนที่กำหนด (สำหรับการค้นหา)
                 total_items = custom_count
-            else:
-                # นับจำนวนแถวที่แสดงอยู่
+            elif self.model.is_placeholder():
                 total_items = 0
-                for row in range(self.table.rowCount()):
-                    if not self.table.isRowHidden(row):
-                        total_items += 1
-                
-                # ตรวจสอบว่าเป็นข้อความ "ไม่มีข้อมูล" หรือไม่
-                if total_items == 1:
-                    first_item = self.table.item(0, 0)
-                    if first_item and ("ไม่มี" in first_item.text() or "🔍" in first_item.text()):
-                        total_items = 0
+            else:
+                # จำนวนทั้งหมดจาก store (รวมแถวที่ยังไม่ถูกโหลดมาแสดง)
+                total_items = self._total_rows
             
             # อัพเดทข้อความ
             search_query = self.search_input.text().strip()
             if search_query:
-                self.status_label.setText(f"📊 ผลการค้นหา '{search_query}': {total_items} รายการ")
+                text = f"📊 ผลการค้นหา '{search_query}': {total_items} รายการ"
             else:
-                self.status_label.setText(f"📊 รายการทั้งหมด: {total_items}")
+                text = f"📊 รายการทั้งหมด: {total_items}"
+            if getattr(self, "_loading", False):
+                text += "  ⏳ กำลังโหลด..."
+            self.status_label.setText(text)
                 
         except Exception as e:
             print(f"Error updating status label: {e}")
@@ -799,66 +508,40 @@ class SmsLogDialog(QDialog):
             
     # ==================== 4. DATA LOADING ====================
     def clear_table(self):
-        """ล้างข้อมูลตาราง + เคลียร์ buffer/ตัวนับ"""
+        """ล้างข้อมูลตาราง + เคลียร์ตัวนับ"""
         try:
-            self.table.setRowCount(0)
+            self.model.clear()
         except Exception:
             pass
-        self.all_data = []
+        self._total_rows = 0
         if hasattr(self, "total_label") and self.total_label is not None:
             self.total_label.setText("รายการทั้งหมด: 0")
 
-    def _render_rows(self, rows, direction):
-        self.table.setRowCount(len(rows))
-        self.all_data = []
-
-        for i, r in enumerate(rows):
-            raw_dt = r.get('dt')
-            if hasattr(raw_dt, 'strftime'):
-                dt_obj = raw_dt
-                date = dt_obj.strftime("%d/%m/%Y")
-                time_str = dt_obj.strftime("%H:%M:%S")
+    def _build_record(self, r):
+        """แปลงแถวดิบจาก store → เรคอร์ดสำหรับแสดงผล (เรียกเฉพาะแถวที่ถูก fetch)"""
+        raw_dt = r.get("dt")
+        if hasattr(raw_dt, "strftime"):
+            dt_obj = raw_dt
+            date = dt_obj.strftime("%d/%m/%Y")
+            time_str = dt_obj.strftime("%H:%M:%S")
+        else:
+            s = str(raw_dt or "")
+            if r.get("direction") == "inbox":
+                # ใช้ parser inbox (รองรับ 'YYYY-MM-DD HH:MM:SS' และรูปแบบ GSM)
+                date, time_str, dt_obj = self.parse_inbox_datetime(s)
             else:
-                if direction == 'sent':
-                    date, time_str, dt_obj = self.parse_sent_datetime(str(raw_dt or ""))
-                else:
-                    date, time_str, dt_obj = self.parse_inbox_datetime(str(raw_dt or ""))
-
-            phone = r.get("phone") or ""
-            msg   = r.get("message") or ""
-
-            # ✅ สร้าง items แยกตัวแปรให้ถูกต้อง
-            it_date  = QTableWidgetItem(date)
-            it_time  = QTableWidgetItem(time_str)
-            it_phone = QTableWidgetItem(phone)
-            it_msg   = QTableWidgetItem(msg)
-
-            if getattr(self, "combo", None) and self.combo.currentIndex() == 2:
-                red_fg   = QBrush(QColor(220, 53, 69))
-                light_bg = QBrush(QColor(255, 235, 238))
-                for it in (it_date, it_time, it_phone, it_msg):
-                    it.setForeground(red_fg)
-                    it.setBackground(light_bg)
-
-            # ใส่ลงตาราง
-            self.table.setItem(i, 0, it_date)
-            self.table.setItem(i, 1, it_time)
-            self.table.setItem(i, 2, it_phone)
-            self.table.setItem(i, 3, it_msg)
-
-            # ✅ อย่าลืมคอมม่าหลัง "message": msg
-            self.all_data.append({
-                "date": date,
-                "time": time_str,
-                "phone": phone,
-                "message": msg,
-                "datetime": dt_obj,
-                "status": r.get("status") or "",
-                "is_failed": int(r.get("is_failed", 0) or 0),
-            })
+                date, time_str, dt_obj = self.parse_sent_datetime(s)
 
-        if hasattr(self, "total_label") and self.total_label is not None:
-            self.total_label.setText(f"รายการทั้งหมด: {len(rows)}")
+        return {
+            "row_id": r.get("id"),
+            "date": date,
+            "time": time_str,
+            "phone": r.get("phone") or "",
+            "message": r.get("message") or "",
+            "datetime": dt_obj,
+            "status": r.get("status") or "",
+            "is_failed": 1 if _is_fail_row(r) else 0,
+        }
 
     def _inbox_has_data(self) -> bool:
         """คืน True ถ้าในฐานข้อมูลมีรายการ SMS inbox อย่างน้อย 1 แถว"""
@@ -868,11 +551,15 @@ class SmsLogDialog(QDialog):
         except Exception:
             return False
     
-    def load_log(self):
+    def _current_category(self):
         # ประเภทจากคอมโบ (0:send, 1:inbox, 2:fail)
         idx = self.combo.currentIndex()
-        cat = {0: "send", 1: "inbox", 2: "fail"}.get(idx, "inbox")
+        return {0: "send", 1: "inbox", 2: "fail"}.get(idx, "inbox")
+
+    def _current_direction(self):
+        return "inbox" if self._current_category() == "inbox" else "sent"
 
+    def _current_order(self):
         # ดึง order จากคอมโบเรียง (รองรับชื่อทั้ง sort_combo / order_combo)
         order = "DESC"
         try:
@@ -882,73 +569,101 @@ class SmsLogDialog(QDialog):
                 order = "ASC" if ("เก่า" in txt or txt == "ASC") else "DESC"
         except Exception:
             pass
+        return order
 
-        # ดึงข้อมูลตามทิศทาง
-        direction = "inbox" if cat == "inbox" else "sent"
+    def _selected_row_ids(self):
+        ids = set()
         try:
-            rows = list_logs(direction=direction, limit=5000, order=order) or []
-        except Exception as e:
-            print(f"DB error: {e}")
-            self.show_error_message(e)
-            return
-
-        self.all_data = []
-        for r in rows:
-            raw_dt = r.get("dt")
+            sm = self.table.selectionModel()
+            if sm is not None:
+                for mi in sm.selectedRows():
+                    rid = self.model.row_id(mi.row())
+                    if rid is not None:
+                        ids.add(rid)
+        except Exception:
+            pass
+        return ids
 
-            # --- แปลงวันเวลาให้เป็นฟอร์แมตเดียวกับหน้า Send ---
-            if hasattr(raw_dt, "strftime"):
-                dt_obj = raw_dt
-                date = dt_obj.strftime("%d/%m/%Y")
-                time_str = dt_obj.strftime("%H:%M:%S")
-            else:
-                s = str(raw_dt or "")
-                if direction == "inbox":
-                    # ใช้ parser inbox (รองรับ 'YYYY-MM-DD HH:MM:SS' และรูปแบบ GSM)
-                    date, time_str, dt_obj = self.parse_inbox_datetime(s)
-                else:
-                    date, time_str, dt_obj = self.parse_sent_datetime(s)
-
-            # ธง fail
-            try:
-                is_failed = 1 if _is_fail_row(r) else 0
-            except NameError:
-                # fallback ถ้ายังไม่มี helper
-                is_failed = int(r.get("is_failed", 0) or 0)
-
-            # เก็บเรคอร์ด
-            rec = {
-                "row_id": r.get("id"), 
-                "date": date,
-                "time": time_str,
-                "phone": r.get("phone") or "",
-                "message": r.get("message") or "",
-                "datetime": dt_obj,             # ใช้สำหรับ sort/filter
-                "status": r.get("status") or "",
-                "is_failed": is_failed,
-            }
+    def _on_rows_fetched(self, parent, first, last):
+        """หน้าใหม่ถูกโหลด → คืน selection ตาม row_id"""
+        self._restore_selection(first, last)
 
-            if cat == "fail":
-                if rec["is_failed"] == 1:
-                    self.all_data.append(rec)
-            else:
-                # send / inbox
-                self.all_data.append(rec)
+    def _restore_selection(self, first, last):
+        if self._pending_selected_ids and last >= first:
+            sm = self.table.selectionModel()
+            for row in range(first, last + 1):
+                rid = self.model.row_id(row)
+                if rid in self._pending_selected_ids:
+                    sm.select(self.model.index(row, 0),
+                              QItemSelectionModel.Select | QItemSelectionModel.Rows)
+                    self._pending_selected_ids.discard(rid)
 
-        # --- กฎพิเศษ: ถ้า Inbox มีข้อมูล แต่ Send/Fail ไม่มี → หน้า Send/Fail ว่างเปล่า ---
-        if cat in ("send", "fail") and not self.all_data and self._inbox_has_data():
-            self.clear_table()           # ว่างจริง ไม่แสดงแถว "ไม่มีข้อมูล"
+    def load_log(self):
+        """เริ่มโหลดใหม่ใน thread แยก (ข้อมูลเดิมยังแสดงอยู่จนกว่าผลใหม่จะมา)"""
+        cat = self._current_category()
+
+        # ยกเลิกงานที่ยังค้าง → ผลของมันจะถูกทิ้ง
+        if self._loader is not None:
+            self._loader.cancel()
+
+        self._load_generation += 1
+        loader = SmsLogLoader(
+            self._load_generation,
+            dict(direction=self._current_direction(), order=self._current_order(),
+                 only_failed=(cat == "fail"), phone=self.filter_phone,
+                 search=self._search_query()),
+            row_builder=self._build_record,
+            check_inbox=(cat in ("send", "fail")),
+        )
+        loader.loaded.connect(self._on_log_loaded)
+        loader.failed.connect(self._on_log_failed)
+        self._loader = loader
+        self._set_loading(True)
+        loader.start()
+
+    def _on_log_loaded(self, snapshot):
+        # ผลของงานเก่า (ถูกแทนที่ด้วยการโหลดใหม่แล้ว) → ทิ้ง
+        if snapshot.generation != self._load_generation:
+            return
+        self._loader = None
+        self._set_loading(False)
+        self._last_signature = snapshot.signature
+
+        # เก็บ row_id ที่ถูกเลือกก่อนเปลี่ยนข้อมูล (จะถูกเลือกคืนตอนหน้านั้นถูกโหลด)
+        self._pending_selected_ids = self._selected_row_ids()
+        self.model.set_snapshot(snapshot)
+        self._total_rows = snapshot.total
+        self._restore_selection(0, self.model.loaded_count() - 1)
+
+        query = self._search_query()
+        if not snapshot.records and query:
+            self.model.set_placeholder("🔍 ไม่พบข้อมูล", f"ไม่พบผลการค้นหา '{query}'")
             self.update_status_label(0)
             return
 
-        # Inbox ไม่มีข้อมูล → ให้โชว์หน้าว่างแบบข้อความ
-        if cat == "inbox" and not self.all_data:
-            self.display_filtered_data([])    # จะขึ้น "ยังไม่มีประวัติ SMS เข้า"
+        if not snapshot.records:
+            # --- กฎพิเศษ: ถ้า Inbox มีข้อมูล แต่ Send/Fail ไม่มี → หน้า Send/Fail ว่างเปล่า ---
+            if snapshot.inbox_has_data:
+                self.clear_table()           # ว่างจริง ไม่แสดงแถว "ไม่มีข้อมูล"
+            else:
+                self.display_filtered_data([])
             self.update_status_label(0)
             return
 
-        # ใช้การเรียงลำดับ/ฟิลเตอร์/วาดตารางตามเดิม
-        self.apply_sort_filter()
+        self.update_status_label()
+
+    def _on_log_failed(self, generation, message):
+        if generation != self._load_generation:
+            return
+        self._loader = None
+        self._set_loading(False)
+        print(f"DB error: {message}")
+        self.show_error_message(message)
+
+    def _set_loading(self, loading):
+        """สถานะ 'ข้อมูลเดิม + กำลังโหลด' → ตารางยังใช้งานได้ตามปกติ"""
+        self._loading = bool(loading)
+        self.update_status_label()
 
     def _is_failed_sms(self, status):
         """ตรวจสอบว่า SMS ส่งไม่สำเร็จหรือไม่"""
@@ -968,16 +683,7 @@ class SmsLogDialog(QDialog):
 
     def show_error_message(self, message):
         """แสดงข้อความ error"""
-        self.table.setRowCount(1)
-        self.table.setItem(0, 0, QTableWidgetItem("❌ เกิดข้อผิดพลาด"))
-        self.table.setItem(0, 1, QTableWidgetItem(""))
-        self.table.setItem(0, 2, QTableWidgetItem(""))
-        self.table.setItem(0, 3, QTableWidgetItem(str(message)))
-        for col in range(4):
-            it = self.table.item(0, col)
-            if it:
-                it.setTextAlignment(Qt.AlignCenter)
-                it.setForeground(QColor(231, 76, 60))
+        self.model.set_placeholder("❌ เกิดข้อผิดพลาด", str(message), QColor(231, 76, 60))
         self.update_status_label()
 
     def parse_sent_datetime(self, dt_str):
@@ -1068,33 +774,9 @@ class SmsLogDialog(QDialog):
 
     # ==================== 5. DATA FILTERING & SORTING ====================
     def apply_sort_filter(self):
-        """ใช้ฟิลเตอร์การเรียงลำดับ"""
+        """ใช้ฟิลเตอร์การเรียงลำดับ (เรียงที่ store ผ่าน cursor → โหลดใหม่)"""
         try:
-            if not self.all_data:
-                print("No data to sort")
-                return
-                
-            print(f"Sorting data, count: {len(self.all_data)}, sort index: {self.sort_combo.currentIndex()}")
-            
-            # กรองข้อมูล
-            filtered_data = self.all_data.copy()
-            idx = self.combo.currentIndex()
-            
-            # ถ้าเป็น SMS Fail ให้เอาเฉพาะเรคอร์ดที่ติดธง is_failed = 1
-            if idx == 2:
-                filtered_data = [d for d in filtered_data if int(d.get('is_failed', 0) or 0) == 1]
-
-            # เรียงลำดับตามที่เลือก
-            if self.sort_combo.currentIndex() == 0:  # รายการล่าสุด (ใหม่ → เก่า)
-                filtered_data.sort(key=lambda x: x['datetime'] if x['datetime'] else datetime.min, reverse=True)
-                print("Sorted: latest first")
-            else:  # รายการเก่ากว่า (เก่า → ใหม่)
-                filtered_data.sort(key=lambda x: x['datetime'] if x['datetime'] else datetime.min, reverse=False)
-                print("Sorted: oldest first")
-            
-            self.display_filtered_data(filtered_data)
-            self.update_status_label()
-            
+            self.load_log()
         except Exception as e:
             print(f"Error applying sort filter: {e}")
             import traceback
@@ -1102,123 +784,36 @@ class SmsLogDialog(QDialog):
 
     # ==================== 6. TABLE DISPLAY ====================
     def display_filtered_data(self, data):
-        # เก็บ row_id ที่ถูกเลือกก่อนรีเฟรช
-        selected_ids = set()
-        try:
-            sm = self.table.selectionModel()
-            if sm is not None:
-                for mi in sm.selectedRows():
-                    it0 = self.table.item(mi.row(), 0)
-                    if it0 is not None:
-                        rid = it0.data(Qt.UserRole)
-                        if rid is not None:
-                            selected_ids.add(int(rid))
-        except Exception:
-            pass
-
-        self.table.setRowCount(0)
-        idx = self.combo.currentIndex()
-
-        # ───────────────────── ไม่มีข้อมูล ─────────────────────
-        if not data:
-            self.table.setRowCount(1)
-            if idx == 2:      # SMS Fail
-                no_data_msg, icon = "ยังไม่มี SMS ที่ส่งไม่สำเร็จ", "✅"
-            elif idx == 1:    # SMS Inbox
-                no_data_msg, icon = "ยังไม่มีประวัติ SMS เข้า", "📥"
-            else:             # SMS Send
-                no_data_msg, icon = "ยังไม่มีประวัติ SMS ส่งออก", "📤"
-
-            self.table.setItem(0, 0, QTableWidgetItem(f"{icon} ไม่มีข้อมูล"))
-            self.table.setItem(0, 1, QTableWidgetItem(""))
-            self.table.setItem(0, 2, QTableWidgetItem(""))
-            self.table.setItem(0, 3, QTableWidgetItem(no_data_msg))
-
-            for col in range(4):
-                it = self.table.item(0, col)
-                if it:
-                    it.setTextAlignment(Qt.AlignCenter)
-                    it.setForeground(QColor(46, 204, 113) if idx == 2 else QColor(127, 140, 141))
+        """แสดงแถว 'ไม่มีข้อมูล' เมื่อไม่มีรายการ (ข้อมูลจริงมาจาก model/cursor)"""
+        if data:
             return
+        idx = self.combo.currentIndex()
+        if idx == 2:      # SMS Fail
+            no_data_msg, icon = "ยังไม่มี SMS ที่ส่งไม่สำเร็จ", "✅"
+        elif idx == 1:    # SMS Inbox
+            no_data_msg, icon = "ยังไม่มีประวัติ SMS เข้า", "📥"
+        else:             # SMS Send
+            no_data_msg, icon = "ยังไม่มีประวัติ SMS ส่งออก", "📤"
 
-        # ───────────────────── มีข้อมูล ─────────────────────
-        make_fail_red = (idx == 2)
-
-        for row_idx, item in enumerate(data):
-            self.table.insertRow(row_idx)
-
-            # DATE
-            date_item = QTableWidgetItem(item.get("date", ""))
-            date_item.setTextAlignment(Qt.AlignCenter)
-            self.table.setItem(row_idx, 0, date_item)
-
-            # TIME
-            time_item = QTableWidgetItem(item.get("time", ""))
-            time_item.setTextAlignment(Qt.AlignCenter)
-            self.table.setItem(row_idx, 1, time_item)
-
-            # PHONE
-            phone_display = item.get("phone") or "Unknown"
-            phone_item = QTableWidgetItem(phone_display)
-            phone_item.setTextAlignment(Qt.AlignCenter)
-            phone_item.setToolTip(phone_display)
-            self.table.setItem(row_idx, 2, phone_item)
-
-            # MESSAGE
-            message_item = QTableWidgetItem(item.get("message", ""))
-            message_item.setTextAlignment(Qt.AlignLeft | Qt.AlignVCenter)
-            self.table.setItem(row_idx, 3, message_item)
-
-            # ---- ทำสีสำหรับแถว Fail (ให้ครบทั้ง 4 คอลัมน์) ----
-            if make_fail_red:
-                red_fg   = QColor(231, 76, 60)
-                light_bg = QColor(253, 237, 238)
-                for it in (date_item, time_item, phone_item, message_item):
-                    it.setForeground(red_fg)
-                    it.setBackground(light_bg)
-
-            # ฝัง row_id (ไว้ใช้คืน selection และคำสั่งลบ)
-            row_id = item.get("row_id")
-            if row_id is not None:
-                for col in range(4):
-                    cell_item = self.table.item(row_idx, col)
-                    if cell_item:
-                        cell_item.setData(Qt.UserRole, int(row_id))
-
-            # คืน selection ถ้า row นี้เคยถูกเลือกไว้
-            if row_id is not None and int(row_id) in selected_ids:
-                self.table.selectRow(row_idx)
-
-            # สลับสีพื้นหลังแถวปกติ (ถ้าไม่ใช่ Fail)
-            if not make_fail_red and (row_idx % 2 == 0):
-                bg = QColor(248, 249, 250)
-                for col in range(4):
-                    cell_item = self.table.item(row_idx, col)
-                    if cell_item:
-                        cell_item.setBackground(bg)
-            
-            # ----- ท้ายฟังก์ชันแสดงตาราง -----
-            # ถ้ายังมีคำค้นอยู่ ให้กรองซ้ำอัตโนมัติ (กันอาการเด้งโชว์ทั้งหมด)
-            search_box = getattr(self, "txt_search", None) or getattr(self, "search_input", None)
-            if search_box and search_box.text().strip():
-                self.quick_filter()
+        color = QColor(46, 204, 113) if idx == 2 else QColor(127, 140, 141)
+        self.model.set_placeholder(f"{icon} ไม่มีข้อมูล", no_data_msg, color)
 
     # ==================== 7. EVENT HANDLERS ====================
     def handle_row_double_clicked(self, row, col):
         """จัดการเมื่อมีการ double click บนแถว"""
-        phone_item = self.table.item(row, 2)
-        msg_item = self.table.item(row, 3)
-        if phone_item and msg_item:
-            phone = phone_item.text()
-            message = msg_item.text()
+        rec = self.model.record(row)
+        if rec is not None:
+            phone = rec.get("phone") or "Unknown"
+            message = rec.get("message") or ""
             self.send_sms_requested.emit(phone, message)
         self.accept()
 
     def on_row_double_clicked(self, row, col):
         """จัดการเมื่อมีการ double click บนแถว (อีกวิธี)"""
-        # ดึงค่าเบอร์กับข้อความจากตาราง
-        phone = self.table.item(row, 2).text()
-        message = self.table.item(row, 3).text()
+        # ดึงค่าเบอร์กับข้อความจาก model
+        rec = self.model.record(row) or {}
+        phone = rec.get("phone") or ""
+        message = rec.get("message") or ""
         # ส่งสัญญาณกลับไปหน้า main
         self.send_sms_requested.emit(phone, message)
         # ปิด dialog
@@ -1241,11 +836,9 @@ class SmsLogDialog(QDialog):
         sel_rows = sorted({mi.row() for mi in sel.selectedRows()}) if sel else []
         chosen_ids = []
         for r in sel_rows:
-            it0 = self.table.item(r, 0)
-            if it0:
-                rid = it0.data(Qt.UserRole)
-                if rid is not None:
-                    chosen_ids.append(int(rid))
+            rid = self.model.row_id(r)
+            if rid is not None:
+                chosen_ids.append(rid)
 
         # กรณีไม่ได้เลือกอะไร → ลบทั้งแท็บ
         if not chosen_ids:
@@ -1318,8 +911,10 @@ class SmsLogDialog(QDialog):
             )
             return
         
-        row_count = self.table.rowCount()
-        if row_count == 0 or (row_count == 1 and not self.table.item(0, 0)):
+        # Export All → ดึงหน้าที่เหลือทั้งหมดจาก cursor ก่อน
+        self.model.fetch_all()
+        row_count = self.model.rowCount()
+        if row_count == 0 or self.model.is_placeholder():
             QMessageBox.information(
                 self, 
                 "📊 Export", 
@@ -1330,21 +925,13 @@ class SmsLogDialog(QDialog):
         data = []
         headers = ['วันที่', 'เวลา', 'เบอร์โทร', 'ข้อความ']
         
+        # model มีเฉพาะผลการค้นหาอยู่แล้ว (ไม่มีแถวซ่อน)
         for row in range(row_count):
-            # ข้ามแถวที่ถูกซ่อน (จากการค้นหา)
-            if self.table.isRowHidden(row):
+            rec = self.model.record(row)
+            if rec is None:
                 continue
-                
-            row_data = []
-            empty_row = True
-            for col in range(4):
-                item = self.table.item(row, col)
-                txt = item.text() if item else ''
-                if txt and "ไม่มี" not in txt and "🔍" not in txt and "❌" not in txt and "✅" not in txt:
-                    empty_row = False
-                row_data.append(txt)
-            if not empty_row:
-                data.append(row_data)
+            data.append([rec.get("date", ""), rec.get("time", ""),
+                         rec.get("phone") or "Unknown", rec.get("message", "")])
         
         if not data:
             QMessageBox.information(
@@ -1422,6 +1009,9 @@ class SmsLogDialog(QDialog):
     # ==================== 9. WINDOW EVENT HANDLERS ====================
     def closeEvent(self, event):
         """จัดการเมื่อปิดหน้าต่าง SMS Log"""
+        if self._loader is not None:
+            self._loader.cancel()
+            self._loader = None
         event.accept()
         self.deleteLater()
 
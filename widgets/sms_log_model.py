@@ -0,0 +1,336 @@
+# widgets/sms_log_model.py
+"""
+Table model สำหรับหน้าประวัติ SMS
+- ดึงข้อมูลจาก cursor ของ log store ทีละหน้า (canFetchMore / fetchMore)
+- ไม่สร้าง item object ต่อ cell → แถวที่ยังไม่ถูกเลื่อนไปถึงจะยังไม่ถูกโหลด
+- SmsLogLoader: โหลด/parse/เรียงใน thread แยก แล้วส่ง snapshot กลับมาให้ model
+"""
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Tuple
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant, QThread, pyqtSignal
+from PyQt5.QtGui import QColor
+
+HEADERS = ['📅 DATE', '🕐 TIME', '📱 PHONE', '💬 MESSAGE']
+_KEYS = ("date", "time", "phone", "message")
+COLUMNS = tuple(zip(HEADERS, _KEYS))
+
+FAIL_FG = QColor(231, 76, 60)
+FAIL_BG = QColor(253, 237, 238)
+ALT_BG = QColor(248, 249, 250)
+PLACEHOLDER_FG = QColor(127, 140, 141)
+
+
+@dataclass(frozen=True)
+class SmsLogSnapshot:
+    """ผลการโหลดหนึ่งครั้ง (ส่งข้าม thread → ห้ามแก้ไขหลังสร้าง)"""
+    generation: int
+    records: Tuple[dict, ...]          # หน้าแรกที่ build แล้ว
+    cursor: Any                        # cursor สำหรับหน้าถัดไป (ใช้ต่อใน GUI thread)
+    total: int
+    signature: Any                     # log_signature ตอนเริ่มโหลด
+    fail_view: bool = False
+    inbox_has_data: bool = False
+
+
+class SmsLogTableModel(QAbstractTableModel):
+    """model แบบ fetch-on-demand ครอบ cursor จาก services.sms_log.open_log_cursor"""
+
+    def __init__(self, row_builder=None, page_size=500, parent=None,
+                 columns=COLUMNS, mark_failed=False):
+        super().__init__(parent)
+        # row_builder(raw_row) -> dict(row_id, date, time, phone, message, status, is_failed, ...)
+        self._row_builder = row_builder or (lambda r: r)
+        self._page_size = int(page_size)
+        # columns: [(header, key)] → คอลัมน์ 'message' ชิดซ้าย, 'phone' มี tooltip
+        self._headers = [h for h, _ in columns]
+        self._keys = [k for _, k in columns]
+        self._message_col = self._keys.index("message") if "message" in self._keys else -1
+        # mark_failed: ระบายสีเฉพาะแถวที่ส่งไม่สำเร็จ (ใช้ในมุมมองที่ปนกันหลายสถานะ)
+        self._mark_failed = bool(mark_failed)
+        self._cursor = None
+        self._rows = []
+        self._row_of_id = {}
+        self._fail_view = False
+        self._placeholder = None       # (text_col0, text_col3, QColor) เมื่อไม่มีข้อมูล
+
+    # ==================== data source ====================
+    def set_cursor(self, cursor, fail_view=False):
+        """เปลี่ยนแหล่งข้อมูล แล้วโหลดหน้าแรก"""
+        self.beginResetModel()
+        self._cursor = cursor
+        self._rows = []
+        self._row_of_id = {}
+        self._fail_view = bool(fail_view)
+        self._placeholder = None
+        self.endResetModel()
+        if self.canFetchMore():
+            self.fetchMore()
+
+    def set_snapshot(self, snapshot):
+        """ใช้ snapshot ที่ SmsLogLoader เตรียมไว้ (หน้าแรก build แล้ว)"""
+        self.beginResetModel()
+        self._cursor = snapshot.cursor
+        self._rows = list(snapshot.records)
+        self._row_of_id = {
+            int(rec["row_id"]): i for i, rec in enumerate(self._rows)
+            if rec.get("row_id") is not None
+        }
+        self._fail_view = bool(snapshot.fail_view)
+        self._placeholder = None
+        self.endResetModel()
+
+    def clear(self):
+        self.beginResetModel()
+        self._cursor = None
+        self._rows = []
+        self._row_of_id = {}
+        self._placeholder = None
+        self.endResetModel()
+
+    def set_placeholder(self, first_text, message, color=None):
+        """แสดงแถวข้อความแทนข้อมูล (เช่น 'ไม่มีข้อมูล' / error)"""
+        self.beginResetModel()
+        self._cursor = None
+        self._rows = []
+        self._row_of_id = {}
+        self._placeholder = (first_text, message, color or PLACEHOLDER_FG)
+        self.endResetModel()
+
+    def is_placeholder(self):
+        return self._placeholder is not None
+
+    def fetch_all(self):
+        """ดึงทุกหน้าที่เหลือ (ใช้ตอน export)"""
+        while self.canFetchMore():
+            self.fetchMore()
+
+    # ==================== lookup ====================
+    def record(self, row):
+        if 0 <= row < len(self._rows):
+            return self._rows[row]
+        return None
+
+    def row_id(self, row):
+        rec = self.record(row)
+        if rec is None:
+            return None
+        rid = rec.get("row_id")
+        return int(rid) if rid is not None else None
+
+    def row_for_id(self, row_id):
+        return self._row_of_id.get(row_id, -1)
+
+    def loaded_count(self):
+        return len(self._rows)
+
+    # ==================== Qt model API ====================
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        if self._placeholder is not None:
+            return 1
+        return len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._headers)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._cursor is None:
+            return False
+        return not self._cursor.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._cursor is None:
+            return
+        try:
+            page = self._cursor.fetch(self._page_size)
+        except Exception as e:
+            print(f"Error fetching SMS log page: {e}")
+            self._cursor.exhausted = True
+            return
+        if not page:
+            return
+        built = [self._row_builder(r) for r in page]
+        start = len(self._rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(built) - 1)
+        for i, rec in enumerate(built, start):
+            rid = rec.get("row_id")
+            if rid is not None:
+                self._row_of_id[int(rid)] = i
+        self._rows.extend(built)
+        self.endInsertRows()
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal and 0 <= section < len(self._headers):
+            return self._headers[section]
+        return QVariant()
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return QVariant()
+        row, col = index.row(), index.column()
+
+        if self._placeholder is not None:
+            first_text, message, color = self._placeholder
+            if role == Qt.DisplayRole:
+                return {0: first_text, self._message_col: message}.get(col, "")
+            if role == Qt.TextAlignmentRole:
+                return Qt.AlignCenter
+            if role == Qt.ForegroundRole:
+                return color
+            return QVariant()
+
+        if row >= len(self._rows):
+            return QVariant()
+        rec = self._rows[row]
+        key = self._keys[col]
+        failed = self._fail_view or (self._mark_failed and rec.get("is_failed"))
+
+        if role == Qt.DisplayRole:
+            value = rec.get(key, "")
+            if key == "phone":
+                return value or "Unknown"
+            return value
+        if role == Qt.UserRole:
+            return rec.get("row_id")
+        if role == Qt.TextAlignmentRole:
+            return (Qt.AlignLeft | Qt.AlignVCenter) if col == self._message_col else Qt.AlignCenter
+        if role == Qt.ToolTipRole and key == "phone":
+            return rec.get("phone") or "Unknown"
+        if role == Qt.ForegroundRole and failed:
+            return FAIL_FG
+        if role == Qt.BackgroundRole:
+            if failed:
+                return FAIL_BG
+            if row % 2 == 0:
+                return ALT_BG
+        return QVariant()
+
+
+class SmsLogLoader(QThread):
+    """
+    โหลดหน้าแรกของ log ใน thread แยก (อ่านไฟล์/parse วันที่/เรียงลำดับ)
+    - ยกเลิกได้ด้วย cancel(): ผลของงานที่ถูกยกเลิกจะไม่ถูกส่งออก
+    """
+    loaded = pyqtSignal(object)        # SmsLogSnapshot
+    failed = pyqtSignal(int, str)      # (generation, error)
+
+    # เก็บ reference ไว้จนกว่า thread จะจบ (กัน QThread ถูกทำลายระหว่างทำงาน)
+    _alive = set()
+
+    def __init__(self, generation: int, cursor_kwargs: dict,
+                 row_builder: Optional[Callable[[dict], dict]] = None,
+                 page_size: int = 500, check_inbox: bool = False):
+        super().__init__()
+        self.generation = generation
+        self.cursor_kwargs = dict(cursor_kwargs)
+        self.row_builder = row_builder or (lambda r: r)
+        self.page_size = int(page_size)
+        self.check_inbox = check_inbox
+        self._cancelled = False
+        SmsLogLoader._alive.add(self)
+        self.finished.connect(lambda: SmsLogLoader._alive.discard(self))
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def run(self):
+        from services.sms_log import open_log_cursor, log_signature
+        try:
+            signature = log_signature(self.cursor_kwargs.get("direction"))
+            cursor = open_log_cursor(**self.cursor_kwargs)
+            page = cursor.fetch(self.page_size)
+            if self._cancelled:
+                return
+            records = tuple(self.row_builder(r) for r in page)
+            if self._cancelled:
+                return
+            total = cursor.count()
+
+            inbox_has_data = False
+            if not records and self.check_inbox:
+                inbox_has_data = bool(open_log_cursor(direction="inbox").fetch(1))
+            if self._cancelled:
+                return
+
+            self.loaded.emit(SmsLogSnapshot(
+                generation=self.generation,
+                records=records,
+                cursor=cursor,
+                total=total,
+                signature=signature,
+                fail_view=bool(self.cursor_kwargs.get("only_failed")),
+                inbox_has_data=inbox_has_data,
+            ))
+        except Exception as e:
+            if not self._cancelled:
+                self.failed.emit(self.generation, str(e))
+
+
+# ==================== BENCHMARK ====================
+def benchmark_open(rows=1_000_000, page_size=500):
+    """
+    วัดเวลาเปิด + หน่วยความจำของ model บนฐานข้อมูลจำลอง N แถว
+    (โหมด SQLite: READ_FROM_CSV = False — โหมด CSV ยัง parse ทั้งไฟล์ ตัวเลขนี้ใช้ไม่ได้)
+    รัน: python -m widgets.sms_log_model
+    """
+    import os, sqlite3, tempfile, time, tracemalloc
+    from services import db as _db
+    from services import sms_log_store as _store
+    from services.phone_index import phone_key
+
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, "bench_logs.db")
+    old_path, old_csv = _db.DB_PATH, _store.READ_FROM_CSV
+    _db.DB_PATH, _store.READ_FROM_CSV = path, False
+    try:
+        _db.init_db()
+        with sqlite3.connect(path) as conn:
+            phones = (f"08{i * 7919 % 100000000:08d}" for i in range(rows))
+            conn.executemany(
+                "INSERT INTO sms_sent (phone, message, status, is_failed, dt, phone_norm, phone_rev) "
+                "VALUES (?,?,?,?,?,?,?)",
+                ((p, f"message {i}", "ส่งสำเร็จ", 0,
+                  f"2024-01-01 {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}",
+                  phone_key(p), phone_key(p)[::-1])
+                 for i, p in enumerate(phones)),
+            )
+            conn.commit()
+
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        model = SmsLogTableModel(page_size=page_size)
+        model.set_cursor(_store.open_log_cursor(direction="sent"))
+        t_open = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        model.fetchMore()
+        t_page = time.perf_counter() - t0
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(f"rows={rows:,} open={t_open * 1000:.1f} ms "
+              f"next_page={t_page * 1000:.1f} ms loaded={model.loaded_count()} "
+              f"peak_mem={peak / 1024:.0f} KiB")
+
+        # ค้นหาเบอร์ผ่าน index (เวลาตั้งแต่เปิด cursor → หน้าแรก + จำนวนผลลัพธ์)
+        for q in ("0800079190", "+66800079190", "9190", "0812", "message 12"):
+            t0 = time.perf_counter()
+            cursor = _store.open_log_cursor(direction="sent", search=q)
+            model.set_cursor(cursor)
+            n = cursor.count()
+            print(f"search {q!r}: {n} rows in {(time.perf_counter() - t0) * 1000:.1f} ms")
+    finally:
+        _db.DB_PATH, _store.READ_FROM_CSV = old_path, old_csv
+
+
+if __name__ == "__main__":
+    benchmark_open()
@@ -461,7 +461,7 @@ class SmsRealtimeMonitor(QDialog):
             
             # บันทึกลง CSV ด้วยวันที่ปัจจุบัน
             from services.sms_log import log_sms_inbox
-            if log_sms_inbox(sender, message, status="รับเข้า (real-time)"):
+            if log_sms_inbox(sender, message, status="รับเข้า (real-time)", port=self.port):
                 self.saved_count += 1
                 self.log_updated.emit()
             
@@ -672,7 +672,7 @@ class SmsRealtimeMonitor(QDialog):
         """บันทึก SMS ลง CSV file - ใช้ sms_log module ที่ปรับปรุงแล้ว"""
         try:
             from services.sms_log import log_sms_inbox
-            success = log_sms_inbox(sender, message, status='รับเข้า (real-time)')
+            success = log_sms_inbox(sender, message, status='รับเข้า (real-time)', port=self.port)
             
             if success:
                 self.append_to_display(f"[LOG] SMS saved to network share successfully")
@@ -0,0 +1,346 @@
+# widgets/sms_thread_dialog.py
+"""
+หน้าต่างสนทนา SMS ต่อเบอร์
+- ซ้าย : รายการ conversation จากตารางสรุป sms_conversations (โหลดทีละหน้าแบบ keyset)
+- ขวา  : ประวัติของเบอร์ที่เลือก (ส่ง/รับปนกัน เรียงตามเวลา) ผ่าน SmsLogLoader
+"""
+from datetime import datetime
+
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton, QLabel,
+    QTableView, QHeaderView, QAbstractItemView, QSplitter, QWidget
+)
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant, QTimer, pyqtSignal
+from PyQt5.QtGui import QColor, QFont
+
+from styles import SmsLogDialogStyles
+from services.sms_log import list_conversations, mark_conversation_read
+from services.phone_index import phone_key
+from widgets.sms_log_model import SmsLogTableModel, SmsLogLoader, ALT_BG
+
+CONVERSATION_COLUMNS = [
+    ('📱 PHONE', "phone"),
+    ('💬 LAST MESSAGE', "last_message"),
+    ('🕐 LAST', "last_dt"),
+    ('🔔 UNREAD', "unread"),
+    ('📤 SENT', "sent_count"),
+    ('❌ FAILED', "failed_count"),
+    ('📥 RECEIVED', "received_count"),
+]
+
+THREAD_COLUMNS = [
+    ('📅 DATE', "date"),
+    ('🕐 TIME', "time"),
+    ('↔️', "arrow"),
+    ('💬 MESSAGE', "message"),
+    ('📌 STATUS', "status"),
+]
+
+UNREAD_FG = QColor(192, 57, 43)
+
+
+def _thread_record(r):
+    """แถวดิบจาก store → เรคอร์ดของตาราง thread"""
+    s = str(r.get("dt") or "").strip()
+    try:
+        dt = datetime.strptime(s[:19], "%Y-%m-%d %H:%M:%S")
+        date, time_str = dt.strftime("%d/%m/%Y"), dt.strftime("%H:%M:%S")
+    except Exception:
+        dt, date, time_str = None, s, ""
+    inbox = r.get("direction") == "inbox"
+    return {
+        "row_id": r.get("id"),
+        "date": date,
+        "time": time_str,
+        "datetime": dt,
+        "arrow": "📥" if inbox else "📤",
+        "direction": r.get("direction"),
+        "phone": r.get("phone") or "",
+        "message": r.get("message") or "",
+        "status": r.get("status") or "",
+        "is_failed": int(r.get("is_failed") or 0),
+    }
+
+
+class ConversationListModel(QAbstractTableModel):
+    """รายการ conversation แบบ fetch-on-demand (ใหม่ → เก่า ตาม last_dt)"""
+
+    def __init__(self, page_size=200, parent=None):
+        super().__init__(parent)
+        self._page_size = int(page_size)
+        self._rows = []
+        self._search = None
+        self._exhausted = True
+
+    def reload(self, search=None):
+        self.beginResetModel()
+        self._rows = []
+        self._search = (search or "").strip() or None
+        self._exhausted = False
+        self.endResetModel()
+        if self.canFetchMore():
+            self.fetchMore()
+
+    def conversation(self, row):
+        if 0 <= row < len(self._rows):
+            return self._rows[row]
+        return None
+
+    def row_for_key(self, key):
+        for i, c in enumerate(self._rows):
+            if c["phone_norm"] == key:
+                return i
+        return -1
+
+    def mark_read(self, row):
+        conv = self.conversation(row)
+        if conv and conv.get("unread"):
+            conv["unread"] = 0
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(CONVERSATION_COLUMNS) - 1))
+
+    # ==================== Qt model API ====================
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(CONVERSATION_COLUMNS)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+        after = None
+        if self._rows:
+            last = self._rows[-1]
+            after = (last["last_dt"], last["phone_norm"])
+        try:
+            page = list_conversations(self._page_size, after, self._search)
+        except Exception as e:
+            print(f"Error loading conversations: {e}")
+            page = []
+        if len(page) < self._page_size:
+            self._exhausted = True
+        if not page:
+            return
+        start = len(self._rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(page) - 1)
+        self._rows.extend(page)
+        self.endInsertRows()
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal and 0 <= section < len(CONVERSATION_COLUMNS):
+            return CONVERSATION_COLUMNS[section][0]
+        return QVariant()
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._rows):
+            return QVariant()
+        conv = self._rows[index.row()]
+        key = CONVERSATION_COLUMNS[index.column()][1]
+
+        if role == Qt.DisplayRole:
+            value = conv.get(key)
+            if key == "unread":
+                return str(value) if value else ""
+            if key == "last_message":
+                text = (value or "").replace("\n", " ")
+                arrow = "📥 " if conv.get("last_direction") == "inbox" else "📤 "
+                return arrow + (text[:60] + "…" if len(text) > 60 else text)
+            return "" if value is None else str(value)
+        if role == Qt.ToolTipRole and key in ("phone", "last_message"):
+            return conv.get(key) or ""
+        if role == Qt.TextAlignmentRole:
+            return (Qt.AlignLeft | Qt.AlignVCenter) if key == "last_message" else Qt.AlignCenter
+        if role == Qt.FontRole and conv.get("unread"):
+            font = QFont()
+            font.setBold(True)
+            return font
+        if role == Qt.ForegroundRole and key == "unread" and conv.get("unread"):
+            return UNREAD_FG
+        if role == Qt.BackgroundRole and index.row() % 2 == 0:
+            return ALT_BG
+        return QVariant()
+
+
+class SmsThreadDialog(QDialog):
+    """หน้าต่างสนทนาต่อเบอร์ (รายการ conversation + ประวัติของเบอร์ที่เลือก)"""
+    send_sms_requested = pyqtSignal(str, str)
+
+    def __init__(self, phone=None, parent=None):
+        super().__init__(parent)
+        self._phone = phone
+        self._current_key = None
+        self._loader = None
+        self._load_generation = 0
+
+        self.setWindowTitle("💬 SMS Conversations | สนทนาตามเบอร์")
+        self.resize(1100, 700)
+
+        self.main_layout = QVBoxLayout(self)
+        self.main_layout.setSpacing(8)
+        self.main_layout.setContentsMargins(15, 15, 15, 15)
+
+        self.setup_ui()
+        self.apply_styles()
+
+        # debounce ช่องค้นหา (พิมพ์ต่อเนื่องไม่ต้อง query ทุกตัวอักษร)
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(250)
+        self._search_timer.timeout.connect(self.reload_conversations)
+        self.search_input.textChanged.connect(lambda _: self._search_timer.start())
+
+        self.reload_conversations()
+        if phone:
+            QTimer.singleShot(0, lambda: self.open_thread(phone))
+
+    # ==================== UI ====================
+    def setup_ui(self):
+        search_row = QHBoxLayout()
+        search_label = QLabel("🔍 ค้นหา:")
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("ค้นหาเบอร์หรือชื่อผู้ส่ง...")
+        self.search_input.setMinimumHeight(36)
+        self.btn_refresh = QPushButton("🔄 Refresh")
+        self.btn_refresh.clicked.connect(self.reload_conversations)
+        search_row.addWidget(search_label)
+        search_row.addWidget(self.search_input, stretch=1)
+        search_row.addWidget(self.btn_refresh)
+        self.main_layout.addLayout(search_row)
+
+        splitter = QSplitter(Qt.Horizontal)
+
+        self.conv_model = ConversationListModel(parent=self)
+        self.conv_table = self._make_table(self.conv_model)
+        self.conv_table.selectionModel().currentRowChanged.connect(self._on_conversation_changed)
+        splitter.addWidget(self.conv_table)
+
+        right = QWidget()
+        right_layout = QVBoxLayout(right)
+        right_layout.setContentsMargins(0, 0, 0, 0)
+        self.thread_label = QLabel("เลือกเบอร์จากรายการด้านซ้าย")
+        right_layout.addWidget(self.thread_label)
+        self.thread_model = SmsLogTableModel(row_builder=_thread_record, columns=THREAD_COLUMNS,
+                                             mark_failed=True, parent=self)
+        self.thread_table = self._make_table(self.thread_model)
+        self.thread_table.doubleClicked.connect(lambda idx: self.on_thread_double_clicked(idx.row()))
+        right_layout.addWidget(self.thread_table)
+        splitter.addWidget(right)
+
+        splitter.setStretchFactor(0, 2)
+        splitter.setStretchFactor(1, 3)
+        self.main_layout.addWidget(splitter, stretch=1)
+
+        footer = QHBoxLayout()
+        self.status_label = QLabel("")
+        self.btn_close = QPushButton("❌ Close")
+        self.btn_close.clicked.connect(self.close)
+        footer.addWidget(self.status_label, stretch=1)
+        footer.addWidget(self.btn_close)
+        self.main_layout.addLayout(footer)
+
+    def _make_table(self, model):
+        table = QTableView()
+        table.setModel(model)
+        table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        table.setSelectionMode(QAbstractItemView.SingleSelection)
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        table.setWordWrap(False)
+        table.verticalHeader().setVisible(False)
+        table.verticalHeader().setDefaultSectionSize(28)
+        header = table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeToContents)
+        header.setStretchLastSection(True)
+        return table
+
+    def apply_styles(self):
+        self.setStyleSheet(SmsLogDialogStyles.get_dialog_style())
+        for table in (self.conv_table, self.thread_table):
+            table.setStyleSheet(SmsLogDialogStyles.get_table_style())
+            table.horizontalHeader().setStyleSheet(SmsLogDialogStyles.get_table_header_style())
+        self.search_input.setStyleSheet(SmsLogDialogStyles.get_search_input_style())
+        self.btn_refresh.setStyleSheet(SmsLogDialogStyles.get_info_button_style())
+        self.btn_close.setStyleSheet(SmsLogDialogStyles.get_danger_button_style())
+        self.thread_label.setStyleSheet(SmsLogDialogStyles.get_control_label_style())
+        self.status_label.setStyleSheet(SmsLogDialogStyles.get_status_label_style())
+
+    # ==================== conversations ====================
+    def reload_conversations(self):
+        self.conv_model.reload(self.search_input.text())
+        self.status_label.setText(f"💬 {self.conv_model.rowCount()} conversations"
+                                  + (" +" if self.conv_model.canFetchMore() else ""))
+        # เลือกเบอร์เดิมคืน (ถ้ายังอยู่ในผลลัพธ์)
+        if self._current_key is not None:
+            row = self.conv_model.row_for_key(self._current_key)
+            if row >= 0:
+                self.conv_table.selectRow(row)
+
+    def _on_conversation_changed(self, current, _previous):
+        conv = self.conv_model.conversation(current.row())
+        if conv is None or conv["phone_norm"] == self._current_key:
+            return
+        self.open_thread(conv["phone"] or conv["phone_norm"], row=current.row())
+
+    # ==================== thread ====================
+    def open_thread(self, phone, row=None):
+        """โหลดประวัติของเบอร์นี้ (ใหม่ → เก่า) ใน thread แยก"""
+        key = phone_key(phone)
+        self._current_key = key
+        if row is None:
+            row = self.conv_model.row_for_key(key)
+            if row >= 0:
+                self.conv_table.selectRow(row)
+        self.thread_label.setText(f"📱 {phone}  ⏳ กำลังโหลด...")
+
+        if self._loader is not None:
+            self._loader.cancel()
+        self._load_generation += 1
+        self._loader = SmsLogLoader(
+            self._load_generation,
+            dict(order="DESC", thread_phone=phone),
+            row_builder=_thread_record,
+        )
+        self._loader.loaded.connect(self._on_thread_loaded)
+        self._loader.failed.connect(self._on_thread_failed)
+        self._loader.start()
+
+        try:
+            mark_conversation_read(phone)
+            if row is not None and row >= 0:
+                self.conv_model.mark_read(row)
+        except Exception as e:
+            print(f"Error marking conversation read: {e}")
+
+    def _on_thread_loaded(self, snapshot):
+        if snapshot.generation != self._load_generation:
+            return
+        self._loader = None
+        self.thread_model.set_snapshot(snapshot)
+        conv = self.conv_model.conversation(self.conv_model.row_for_key(self._current_key))
+        title = (conv or {}).get("phone") or self._current_key
+        self.thread_label.setText(f"📱 {title}  •  {snapshot.total} ข้อความ")
+
+    def _on_thread_failed(self, generation, message):
+        if generation != self._load_generation:
+            return
+        self._loader = None
+        self.thread_model.set_placeholder("❌ Error", f"Error loading thread: {message}")
+        self.thread_label.setText("❌ โหลดประวัติไม่สำเร็จ")
+
+    def on_thread_double_clicked(self, row):
+        rec = self.thread_model.record(row)
+        if rec:
+            self.send_sms_requested.emit(rec.get("phone") or "", rec.get("message") or "")
+
+    def closeEvent(self, event):
+        if self._loader is not None:
+            self._loader.cancel()
+            self._loader = None
+        super().closeEvent(event)
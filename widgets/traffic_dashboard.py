@@ -0,0 +1,148 @@
+# widgets/traffic_dashboard.py
+"""
+แดชบอร์ดสถิติ SMS (อ่านจากตารางสรุปรายชั่วโมง → เปิดได้ทันทีแม้ log เป็นปี)
+- แท็บ 'ต่อ SIM'  : ส่งสำเร็จ / ล้มเหลว / รับเข้า ต่อ ICCID + ผู้ให้บริการ
+- แท็บ 'ช่วงเวลา' : รายชั่วโมง (ช่วงสั้น) หรือรายวัน (ช่วงยาว)
+"""
+from datetime import datetime, timedelta
+
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QPushButton,
+    QTabWidget, QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView
+)
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QColor
+
+from styles import SmsLogDialogStyles
+from services.traffic_stats import traffic_summary, STATUS_OK, STATUS_FAILED, STATUS_RECEIVED
+from services.metrics import UI_REFRESH, clock
+
+# (ชื่อช่วง, ฟังก์ชันคืน (since, until))
+RANGES = [
+    ("วันนี้", lambda today: (today, None)),
+    ("เมื่อวาน", lambda today: (today - timedelta(days=1), today)),
+    ("7 วันล่าสุด", lambda today: (today - timedelta(days=6), None)),
+    ("30 วันล่าสุด", lambda today: (today - timedelta(days=29), None)),
+    ("1 ปีล่าสุด", lambda today: (today - timedelta(days=364), None)),
+]
+
+FAIL_FG = QColor(231, 76, 60)
+
+
+def _pivot(rows, key):
+    """[{key, status_class, count}] → {key: {ok, failed, received}} (คงลำดับตามที่ query ส่งมา)"""
+    out = {}
+    for r in rows:
+        bucket = out.setdefault(r[key], {STATUS_OK: 0, STATUS_FAILED: 0, STATUS_RECEIVED: 0})
+        bucket[r["status_class"]] = bucket.get(r["status_class"], 0) + int(r["count"] or 0)
+    return out
+
+
+class TrafficDashboardDialog(QDialog):
+    """หน้าต่างสถิติการส่ง/รับ SMS"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("📊 SMS Analytics | สถิติการส่ง/รับ")
+        self.resize(900, 600)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(15, 15, 15, 15)
+        layout.setSpacing(8)
+
+        top = QHBoxLayout()
+        self.range_label = QLabel("📅 ช่วงเวลา:")
+        self.range_combo = QComboBox()
+        self.range_combo.addItems([name for name, _ in RANGES])
+        self.range_combo.setCurrentIndex(1)
+        self.range_combo.currentIndexChanged.connect(self.refresh)
+        self.btn_refresh = QPushButton("🔄 Refresh")
+        self.btn_refresh.clicked.connect(self.refresh)
+        top.addWidget(self.range_label)
+        top.addWidget(self.range_combo)
+        top.addStretch()
+        top.addWidget(self.btn_refresh)
+        layout.addLayout(top)
+
+        self.tabs = QTabWidget()
+        self.sim_table = self._make_table(
+            ['📱 SIM (ICCID)', '📡 CARRIER', '✅ SENT', '❌ FAILED', '📥 RECEIVED', '⚠️ FAIL %'])
+        self.time_table = self._make_table(['🕐 TIME', '✅ SENT', '❌ FAILED', '📥 RECEIVED'])
+        self.tabs.addTab(self.sim_table, "📱 ต่อ SIM")
+        self.tabs.addTab(self.time_table, "⏱ ช่วงเวลา")
+        layout.addWidget(self.tabs, stretch=1)
+
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+        self.setStyleSheet(SmsLogDialogStyles.get_dialog_style())
+        self.range_label.setStyleSheet(SmsLogDialogStyles.get_control_label_style())
+        self.range_combo.setStyleSheet(SmsLogDialogStyles.get_combo_box_style())
+        self.btn_refresh.setStyleSheet(SmsLogDialogStyles.get_info_button_style())
+        self.status_label.setStyleSheet(SmsLogDialogStyles.get_status_label_style())
+
+        self.refresh()
+
+    def _make_table(self, headers):
+        table = QTableWidget(0, len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        table.verticalHeader().setVisible(False)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        table.setStyleSheet(SmsLogDialogStyles.get_table_style())
+        table.horizontalHeader().setStyleSheet(SmsLogDialogStyles.get_table_header_style())
+        return table
+
+    def _range(self):
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        _, fn = RANGES[self.range_combo.currentIndex()]
+        return fn(today)
+
+    def refresh(self):
+        try:
+            started = clock()
+            since, until = self._range()
+            self._fill_sim_table(since, until)
+            self._fill_time_table(since, until)
+            UI_REFRESH.observe_since(started, "traffic_dashboard")
+        except Exception as e:
+            print(f"Error loading traffic analytics: {e}")
+            self.status_label.setText(f"❌ โหลดสถิติไม่สำเร็จ: {e}")
+
+    def _fill_sim_table(self, since, until):
+        rows = traffic_summary(since, until, ("sim_iccid", "carrier", "status_class"))
+        data = _pivot([dict(r, sim=(r["sim_iccid"], r["carrier"])) for r in rows], "sim")
+
+        self.sim_table.setRowCount(len(data))
+        totals = {STATUS_OK: 0, STATUS_FAILED: 0, STATUS_RECEIVED: 0}
+        for row, ((iccid, carrier), c) in enumerate(sorted(data.items())):
+            sent = c[STATUS_OK] + c[STATUS_FAILED]
+            rate = f"{c[STATUS_FAILED] * 100.0 / sent:.1f}%" if sent else "-"
+            values = [iccid or "ไม่ทราบ", carrier or "-", c[STATUS_OK], c[STATUS_FAILED],
+                      c[STATUS_RECEIVED], rate]
+            self._set_row(self.sim_table, row, values, failed_col=3 if c[STATUS_FAILED] else None)
+            for k in totals:
+                totals[k] += c[k]
+        self.status_label.setText(
+            f"✅ ส่งสำเร็จ {totals[STATUS_OK]:,} | ❌ ล้มเหลว {totals[STATUS_FAILED]:,} | "
+            f"📥 รับเข้า {totals[STATUS_RECEIVED]:,} | 📱 {len(data)} SIM"
+        )
+
+    def _fill_time_table(self, since, until):
+        # ช่วงไม่เกิน 2 วัน → รายชั่วโมง, ยาวกว่านั้น → รายวัน
+        span = ((until or datetime.now()) - since).days
+        key = "hour" if span <= 2 else "day"
+        data = _pivot(traffic_summary(since, until, (key, "status_class")), key)
+        self.time_table.setRowCount(len(data))
+        for row, (bucket, c) in enumerate(data.items()):
+            values = [bucket, c[STATUS_OK], c[STATUS_FAILED], c[STATUS_RECEIVED]]
+            self._set_row(self.time_table, row, values, failed_col=2 if c[STATUS_FAILED] else None)
+
+    def _set_row(self, table, row, values, failed_col=None):
+        for col, value in enumerate(values):
+            item = QTableWidgetItem(f"{value:,}" if isinstance(value, int) else str(value))
+            item.setTextAlignment(Qt.AlignCenter)
+            if col == failed_col:
+                item.setForeground(FAIL_FG)
+            table.setItem(row, col, item)
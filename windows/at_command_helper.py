@@ -5,6 +5,7 @@ AT Command Helper สำหรับการตรวจสอบคุณภ
 """
 
 import serial
+import threading
 import time
 import re
 import json
@@ -12,6 +13,16 @@ from datetime import datetime
 from dataclasses import dataclass
 from typing import Dict, List, Optional, Tuple, Any
 
+import numpy as np
+
+from services.cell_info import parse_cell_report
+from services import sim_identity_cache
+from services import signal_analytics
+from services.at_transport import read_until_final, command_timeout, transaction_for
+from services.analysis_scheduler import (
+    AnalysisScheduler, CancelToken, Stage, STATE_CACHED, STATE_DONE, STATE_FAILED, STATE_RUNNING
+)
+
 
 @dataclass
 class SignalData:
@@ -58,12 +69,17 @@ class SIMIdentity:
 class ATCommandHelper:
     """Helper สำหรับจัดการคำสั่ง AT แบบละเอียด"""
     
-    def __init__(self, port: str, baudrate: int = 115200, timeout: int = 5):
+    def __init__(self, port: str, baudrate: int = 115200, timeout: int = 5, serial_thread=None):
         self.port = port
         self.baudrate = baudrate
         self.timeout = timeout
         self.connection = None
         self.is_connected = False
+        # serial_thread ที่ถือพอร์ตนี้อยู่ → ส่งผ่าน thread นั้น (transaction mode) แทนการเปิดพอร์ตซ้ำ
+        self.serial_thread = serial_thread
+        self.transaction = None
+        # stage ของ AnalysisScheduler ใช้ helper ตัวเดียวกันพร้อมกันได้ → ส่ง/รับทีละคำสั่ง
+        self._io_lock = threading.Lock()
         
         # Network databases
         self.mcc_database = {
@@ -105,57 +121,67 @@ class ATCommandHelper:
         }
         
     def connect(self) -> bool:
-        """เชื่อมต่อกับโมเด็ม"""
+        """เชื่อมต่อกับโมเด็ม (ใช้การเชื่อมต่อของหน้าหลักถ้าเปิดพอร์ตนี้อยู่แล้ว)"""
         try:
-            self.connection = serial.Serial(
-                port=self.port,
-                baudrate=self.baudrate,
-                timeout=self.timeout,
-                bytesize=serial.EIGHTBITS,
-                parity=serial.PARITY_NONE,
-                stopbits=serial.STOPBITS_ONE
-            )
+            self.transaction = transaction_for(self.serial_thread, self.port)
+            if self.transaction is None:
+                self.connection = serial.Serial(
+                    port=self.port,
+                    baudrate=self.baudrate,
+                    timeout=0.05,       # อ่านทีละช่วงสั้น ๆ → ตรวจ deadline / final result ได้ถี่
+                    bytesize=serial.EIGHTBITS,
+                    parity=serial.PARITY_NONE,
+                    stopbits=serial.STOPBITS_ONE
+                )
             
             # ทดสอบการเชื่อมต่อ
-            response = self.send_command("AT")
+            response = self._exchange("AT", 2.0)
             if "OK" in response:
                 self.is_connected = True
                 return True
             
+            self.disconnect()
             return False
             
         except Exception as e:
             print(f"Connection error: {e}")
             return False
     
+    @property
+    def mode(self) -> str:
+        return "transaction" if self.transaction is not None else "direct"
+    
     def disconnect(self):
-        """ตัดการเชื่อมต่อ"""
+        """ตัดการเชื่อมต่อ (transaction mode ไม่ปิดพอร์ตของหน้าหลัก)"""
         if self.connection and self.connection.is_open:
             self.connection.close()
+        self.connection = None
+        self.transaction = None
         self.is_connected = False
     
-    def send_command(self, command: str, wait_time: float = 1.0) -> str:
-        """ส่งคำสั่ง AT และรับผลลัพธ์"""
+    def send_command(self, command: str, wait_time: Optional[float] = None) -> str:
+        """
+        ส่งคำสั่ง AT และรับผลลัพธ์ — กลับทันทีที่เจอ OK / ERROR / +CME ERROR
+        wait_time = เวลารอสูงสุด (ไม่ระบุ → self.timeout หรือนานกว่าสำหรับคำสั่งช้า เช่น AT+COPS=?)
+        """
         if not self.is_connected:
             return "ERROR: Not connected"
-        
+        return self._exchange(command, wait_time)
+    
+    def _exchange(self, command: str, wait_time: Optional[float] = None) -> str:
+        timeout = command_timeout(command, self.timeout) if wait_time is None else wait_time
         try:
-            # ล้าง buffer
-            self.connection.reset_input_buffer()
-            self.connection.reset_output_buffer()
-            
-            # ส่งคำสั่ง
-            self.connection.write(f"{command}\r\n".encode())
-            time.sleep(wait_time)
-            
-            # อ่านผลลัพธ์
-            response = ""
-            while self.connection.in_waiting:
-                chunk = self.connection.read(self.connection.in_waiting).decode('utf-8', errors='ignore')
-                response += chunk
-                time.sleep(0.1)
-            
-            return response.strip()
+            with self._io_lock:
+                if self.transaction is not None:
+                    return self.transaction.send(command, timeout).strip()
+                
+                # ล้าง buffer
+                self.connection.reset_input_buffer()
+                self.connection.reset_output_buffer()
+                
+                # ส่งคำสั่ง แล้วอ่านจนจบคำตอบ
+                self.connection.write(f"{command}\r\n".encode())
+                return read_until_final(self.connection, timeout).strip()
             
         except Exception as e:
             return f"ERROR: {e}"
@@ -434,25 +460,35 @@ class SIMCardValidator:
         sim_identity = SIMIdentity()
         
         try:
-            # ดึง IMSI
-            response = self.at_helper.send_command("AT+CIMI")
-            imsi_match = re.search(r'(\d{15})', response)
-            if imsi_match:
-                sim_identity.imsi = imsi_match.group(1)
+            port = self.at_helper.port
+            
+            # ดึง ICCID ก่อน → ซิมที่เคยอ่านแล้วใช้ IMSI / เบอร์จาก cache
+            for cmd in sim_identity_cache.ICCID_COMMANDS:
+                sim_identity.iccid = sim_identity_cache.parse_iccid(self.at_helper.send_command(cmd))
+                if sim_identity.iccid:
+                    self._parse_iccid(sim_identity)
+                    break
+            
+            cached = sim_identity_cache.lookup(sim_identity.iccid, port)
+            if cached:
+                sim_identity.imsi = cached["imsi"]
+                sim_identity.phone_number = cached["phone"]
                 self._parse_imsi(sim_identity)
-            
-            # ดึง ICCID
-            response = self.at_helper.send_command("AT+CCID")
-            iccid_match = re.search(r'(\d{18,22})', response)
-            if iccid_match:
-                sim_identity.iccid = iccid_match.group(1)
-                self._parse_iccid(sim_identity)
-            
-            # ดึงเบอร์โทร
-            response = self.at_helper.send_command("AT+CNUM")
-            phone_match = re.search(r'"([+\d]+)"', response)
-            if phone_match:
-                sim_identity.phone_number = phone_match.group(1)
+            else:
+                # ดึง IMSI
+                response = self.at_helper.send_command("AT+CIMI")
+                imsi_match = re.search(r'(\d{15})', response)
+                if imsi_match:
+                    sim_identity.imsi = imsi_match.group(1)
+                    self._parse_imsi(sim_identity)
+                
+                # ดึงเบอร์โทร
+                response = self.at_helper.send_command("AT+CNUM")
+                phone_match = re.search(r'"([+\d]+)"', response)
+                if phone_match:
+                    sim_identity.phone_number = phone_match.group(1)
+                
+                sim_identity_cache.store(sim_identity.iccid, sim_identity.imsi, sim_identity.phone_number, port)
             
             # ตรวจสอบความถูกต้องโดยรวม
             self._validate_sim_card(sim_identity)
@@ -587,35 +623,44 @@ class NetworkPerformanceTester:
     def __init__(self, at_helper: ATCommandHelper):
         self.at_helper = at_helper
         
-    def test_signal_stability(self, duration_seconds: int = 30) -> Dict[str, Any]:
-        """ทดสอบเสถียรภาพสัญญาณ"""
+    def test_signal_stability(self, duration_seconds: int = 30,
+                              token: Optional[CancelToken] = None) -> Dict[str, Any]:
+        """ทดสอบเสถียรภาพสัญญาณ (token ถูกยกเลิก → หยุดวัดทันที)"""
         measurements = []
         start_time = time.time()
+        token = token or CancelToken()
         
         try:
             analyzer = SignalQualityAnalyzer(self.at_helper)
             
-            while time.time() - start_time < duration_seconds:
+            while time.time() - start_time < duration_seconds and not token.cancelled:
                 signal_data = analyzer.get_basic_signal_info()
                 measurements.append({
                     'timestamp': time.time(),
                     'rssi': signal_data.rssi,
                     'ber': signal_data.ber
                 })
-                time.sleep(2)  # วัดทุก 2 วินาที
+                token.sleep(2)  # วัดทุก 2 วินาที (ระหว่างรอ stage อื่นใช้พอร์ตได้)
             
-            # คำนวณสถิติ
-            rssi_values = [m['rssi'] for m in measurements if m['rssi'] > -999]
+            # คำนวณสถิติ (vectorized — ค่า -999 ไม่นับ)
+            rssi = [m['rssi'] for m in measurements]
+            summary = signal_analytics.summarize(rssi)
             
-            if rssi_values:
+            if summary.valid:
+                gaps = signal_analytics.outages(rssi, [m['timestamp'] for m in measurements], step=2)
                 stability_result = {
                     'total_measurements': len(measurements),
-                    'valid_measurements': len(rssi_values),
-                    'avg_rssi': sum(rssi_values) / len(rssi_values),
-                    'min_rssi': min(rssi_values),
-                    'max_rssi': max(rssi_values),
-                    'rssi_variance': self._calculate_variance(rssi_values),
-                    'stability_score': self._calculate_stability_score(rssi_values),
+                    'valid_measurements': summary.valid,
+                    'avg_rssi': summary.mean,
+                    'min_rssi': summary.min,
+                    'max_rssi': summary.max,
+                    'p5_rssi': summary.percentile(5),
+                    'median_rssi': summary.percentile(50),
+                    'p95_rssi': summary.percentile(95),
+                    'rssi_variance': summary.variance,
+                    'stability_score': self._calculate_stability_score(rssi),
+                    'outage_count': len(gaps),
+                    'longest_outage_s': max((g.duration for g in gaps), default=0.0),
                     'measurements': measurements
                 }
                 
@@ -670,18 +715,20 @@ class NetworkPerformanceTester:
                 'handover_score': 0
             }
             
-            # ดึงข้อมูล Serving Cell
-            response = self.at_helper.send_command("AT+CENG?")
-            if "+CENG:" in response:
-                # Parse serving cell info
-                lines = response.split('\n')
-                for line in lines:
-                    if "+CENG:" in line:
-                        cell_info = self._parse_cell_info(line)
-                        if cell_info.get('serving', False):
-                            results['serving_cell'] = cell_info
-                        else:
-                            results['neighbor_cells'].append(cell_info)
+            # ดึงข้อมูล Serving/Neighbour Cell (SIMCom: AT+CENG?, Quectel: AT+QENG)
+            lines = self.at_helper.send_command("AT+CENG?").split('\n')
+            if not any("+CENG:" in line for line in lines):
+                lines = (self.at_helper.send_command('AT+QENG="servingcell"') + '\n' +
+                         self.at_helper.send_command('AT+QENG="neighbourcell"')).split('\n')
+            for line in lines:
+                if "+CENG:" in line or "+QENG:" in line:
+                    cell_info = self._parse_cell_info(line)
+                    if not cell_info.get('rat'):
+                        continue
+                    if cell_info.get('serving', False):
+                        results['serving_cell'] = cell_info
+                    else:
+                        results['neighbor_cells'].append(cell_info)
             
             # ประเมินความสามารถ Handover
             if len(results['neighbor_cells']) > 0:
@@ -694,35 +741,15 @@ class NetworkPerformanceTester:
             return {'error': f'Handover test failed: {e}'}
     
     def _calculate_variance(self, values: List[float]) -> float:
-        """คำนวณ variance"""
-        if len(values) < 2:
-            return 0.0
-        
-        mean = sum(values) / len(values)
-        variance = sum((x - mean) ** 2 for x in values) / (len(values) - 1)
-        return variance
+        """คำนวณ variance (หาร n-1)"""
+        return signal_analytics.variance(values)
     
     def _calculate_stability_score(self, rssi_values: List[float]) -> float:
-        """คำนวณคะแนนเสถียรภาพ (0-100)"""
-        if not rssi_values:
-            return 0.0
-        
-        variance = self._calculate_variance(rssi_values)
-        
-        # คะแนนเสถียรภาพ: variance ต่ำ = คะแนนสูง
-        if variance <= 1.0:
-            return 100.0
-        elif variance <= 4.0:
-            return 80.0
-        elif variance <= 9.0:
-            return 60.0
-        elif variance <= 16.0:
-            return 40.0
-        else:
-            return 20.0
+        """คำนวณคะแนนเสถียรภาพ (0-100): variance ต่ำ = คะแนนสูง"""
+        return signal_analytics.stability_score(rssi_values)
     
     def _parse_cell_info(self, cell_line: str) -> Dict[str, Any]:
-        """แยกวิเคราะห์ข้อมูล Cell"""
+        """แยกวิเคราะห์ข้อมูล Cell (+CENG / +QENG) → dict ของ CellInfo + key เดิม (lac, rssi=-999)"""
         cell_info = {
             'cell_id': '',
             'lac': '',
@@ -731,21 +758,84 @@ class NetworkPerformanceTester:
         }
         
         try:
-            # Parse different cell info formats
-            if "CENG:" in cell_line:
-                parts = cell_line.split(',')
-                if len(parts) >= 4:
-                    cell_info['serving'] = parts[0].strip().endswith('0')
-                    cell_info['rssi'] = int(parts[1].strip()) if parts[1].strip().isdigit() else -999
-                    cell_info['cell_id'] = parts[2].strip().replace('"', '')
-                    cell_info['lac'] = parts[3].strip().replace('"', '')
-                    
+            cells = parse_cell_report([cell_line])
+            if cells:
+                cell = cells[0].to_dict()
+                cell['lac'] = cell['tac']
+                if cell['rssi'] is None:
+                    cell['rssi'] = -999
+                cell_info.update(cell)
         except Exception:
             pass
         
         return cell_info
 
 
+def get_additional_info(at_helper: ATCommandHelper) -> Dict[str, Any]:
+    """ดึงข้อมูลเพิ่มเติม (ข้อมูลโมเด็ม / เครือข่ายที่รองรับ)"""
+    additional_info = {}
+
+    try:
+        # ข้อมูลโมเด็ม
+        manufacturer = at_helper.send_command("AT+CGMI").replace("OK", "").strip()
+        model = at_helper.send_command("AT+CGMM").replace("OK", "").strip()
+        firmware = at_helper.send_command("AT+CGMR").replace("OK", "").strip()
+        imei = at_helper.send_command("AT+CGSN").replace("OK", "").strip()
+
+        additional_info['modem'] = {
+            'manufacturer': manufacturer,
+            'model': model,
+            'firmware': firmware,
+            'imei': imei
+        }
+
+        # ข้อมูลการสนับสนุนเครือข่าย
+        bands_response = at_helper.send_command("AT+QNWINFO")
+        additional_info['network_support'] = {
+            'current_bands': bands_response,
+            'supports_lte': "LTE" in bands_response.upper(),
+            'supports_5g': "5G" in bands_response.upper() or "NR" in bands_response.upper()
+        }
+
+    except Exception as e:
+        additional_info['error'] = f"Failed to get additional info: {e}"
+
+    return additional_info
+
+
+# ==================== ANALYSIS STAGES ====================
+# ชื่อ stage = key ใน analysis_results; TTL = อายุผลที่ใช้ซ้ำได้ตอนกด Refresh / เปิดหน้าต่างใหม่
+# stage ของพอร์ตเดียวกันรันพร้อมกันได้ (คำสั่ง AT สลับกันผ่าน _io_lock) — ช่วงที่ stability test
+# รอระหว่างรอบ คำสั่งของ stage อื่นจะได้ใช้พอร์ต แทนที่จะรอทั้ง 15 วินาที
+STABILITY_TEST_SECONDS = 15
+
+ANALYSIS_STAGES = (
+    Stage("sim_identity", lambda h, r, t: SIMCardValidator(h).get_sim_identity(),
+          ttl=300, label="🆔 SIM identity"),
+    Stage("signal_analysis", lambda h, r, t: SignalQualityAnalyzer(h).get_comprehensive_signal_info(),
+          ttl=30, label="📶 Signal quality"),
+    Stage("stability_test",
+          lambda h, r, t: NetworkPerformanceTester(h).test_signal_stability(STABILITY_TEST_SECONDS, t),
+          ttl=120, label="📊 Signal stability"),
+    Stage("connectivity_test", lambda h, r, t: NetworkPerformanceTester(h).test_data_connectivity(),
+          ttl=60, label="🌐 Data connectivity"),
+    Stage("handover_test", lambda h, r, t: NetworkPerformanceTester(h).test_handover_capability(),
+          ttl=60, label="📡 Handover capability"),
+    Stage("additional_info", lambda h, r, t: get_additional_info(h),
+          ttl=24 * 3600, label="🔍 Detailed scan"),
+)
+
+# analysis_options → stage ที่เปิด
+OPTION_STAGES = {
+    'analyze_sim': ("sim_identity",),
+    'analyze_signal': ("signal_analysis",),
+    'test_performance': ("stability_test", "connectivity_test", "handover_test"),
+    'detailed_scan': ("additional_info",),
+}
+
+_STAGE_LABELS = {s.name: s.label for s in ANALYSIS_STAGES}
+
+
 # ==================== SIM INFO WINDOW ====================
 
 from PyQt5.QtWidgets import (
@@ -758,17 +848,32 @@ from PyQt5.QtGui import QFont, QTextCursor
 
 
 class SIMAnalysisThread(QThread):
-    """Thread สำหรับการวิเคราะห์ SIM แบบ Background"""
+    """
+    Thread สำหรับการวิเคราะห์ SIM แบบ Background
+    - stage ที่ไม่พึ่งกันรันพร้อมกันผ่าน AnalysisScheduler, ผลที่ยังไม่หมดอายุ (TTL) ใช้ซ้ำ
+    - ports หลายพอร์ต → วิเคราะห์พร้อมกันใน worker pool (port_completed ต่อพอร์ต)
+    - stop_analysis ยกเลิกทันที: stage ที่ยังไม่เริ่มถูกข้าม, stability test หยุดรอ
+    """
     
     progress_updated = pyqtSignal(int, str)
     analysis_completed = pyqtSignal(dict)
     error_occurred = pyqtSignal(str)
+    port_completed = pyqtSignal(str, dict)
     
-    def __init__(self, port: str, baudrate: int = 115200):
+    def __init__(self, port: str, baudrate: int = 115200, serial_thread=None,
+                 ports: Optional[List[str]] = None, force_refresh: bool = False):
         super().__init__()
         self.port = port
         self.baudrate = baudrate
+        self.serial_thread = serial_thread
+        self.ports = list(ports) if ports else [port]
+        if port not in self.ports:
+            self.ports.insert(0, port)
+        self.force_refresh = force_refresh
         self.should_stop = False
+        self._stage_done: Dict[str, float] = {}
+        self.cancel_token = CancelToken()
+        self.scheduler = AnalysisScheduler(ANALYSIS_STAGES)
         self.analysis_options = {
             'analyze_signal': True,
             'analyze_sim': True,
@@ -776,121 +881,125 @@ class SIMAnalysisThread(QThread):
             'detailed_scan': True
         }
     
+    def _enabled_stages(self) -> List[str]:
+        return [name for option, names in OPTION_STAGES.items()
+                if self.analysis_options.get(option, True) for name in names]
+    
+    def _open_helper(self, port: str) -> Optional[ATCommandHelper]:
+        at_helper = ATCommandHelper(port, self.baudrate, serial_thread=self.serial_thread)
+        if not at_helper.connect():
+            return None
+        if at_helper.mode == "transaction" and port == self.port:
+            self.progress_updated.emit(5, "🔗 Using main window connection...")
+        return at_helper
+    
+    def _on_stage(self, port: str, stage: str, state: str, done: int, total: int):
+        """progress ของ stage → progress bar (หลายพอร์ต = เฉลี่ยรวม)"""
+        label = _STAGE_LABELS.get(stage, stage)
+        if state == STATE_RUNNING:
+            text = f"{label}..."
+        elif state == STATE_CACHED:
+            text = f"♻️ {label} (cached)"
+        elif state == STATE_DONE:
+            text = f"✅ {label}"
+        elif state == STATE_FAILED:
+            text = f"⚠️ {label} failed"
+        else:
+            text = f"⏭ {label} skipped"
+        if len(self.ports) > 1:
+            text = f"[{port}] {text}"
+        self._stage_done[port] = done / max(1, total)
+        overall = sum(self._stage_done.values()) / len(self.ports)
+        self.progress_updated.emit(10 + int(85 * overall), text)
+    
+    def _build_results(self, port: str, stage_results: Dict[str, Any], mode: str) -> Dict[str, Any]:
+        """ผลจาก scheduler → analysis_results รูปแบบเดิม (+ stage_status)"""
+        states = stage_results.pop('_stages', {})
+        analysis_results = {
+            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'connection_info': {
+                'port': port,
+                'baudrate': self.baudrate,
+                'connected': True,
+                'mode': mode
+            }
+        }
+        analysis_results.update(stage_results)
+        analysis_results['stage_status'] = {
+            name: {'state': state, 'seconds': round(seconds, 1)} for name, (state, seconds) in states.items()
+        }
+        return analysis_results
+    
     def run(self):
         """การทำงานหลักของ Thread"""
         try:
             self.progress_updated.emit(0, "🔌 Connecting to modem...")
-            
-            # สร้างการเชื่อมต่อ
-            at_helper = ATCommandHelper(self.port, self.baudrate)
-            if not at_helper.connect():
-                self.error_occurred.emit("❌ Failed to connect to modem")
-                return
-            
-            analysis_results = {
-                'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                'connection_info': {
-                    'port': self.port,
-                    'baudrate': self.baudrate,
-                    'connected': True
-                }
-            }
-            
-            try:
-                # วิเคราะห์ SIM Identity
-                if self.analysis_options.get('analyze_sim', True) and not self.should_stop:
-                    self.progress_updated.emit(10, "🆔 Analyzing SIM identity...")
-                    sim_validator = SIMCardValidator(at_helper)
-                    sim_identity = sim_validator.get_sim_identity()
-                    analysis_results['sim_identity'] = sim_identity
-                    
-                # วิเคราะห์สัญญาณ
-                if self.analysis_options.get('analyze_signal', True) and not self.should_stop:
-                    self.progress_updated.emit(25, "📶 Analyzing signal quality...")
-                    signal_analyzer = SignalQualityAnalyzer(at_helper)
-                    signal_info = signal_analyzer.get_comprehensive_signal_info()
-                    analysis_results['signal_analysis'] = signal_info
-                    
-                # ทดสอบประสิทธิภาพ
-                if self.analysis_options.get('test_performance', True) and not self.should_stop:
-                    self.progress_updated.emit(50, "🚀 Testing network performance...")
-                    performance_tester = NetworkPerformanceTester(at_helper)
-                    
-                    # ทดสอบเสถียرภาพสัญญาณ (15 วินาที)
-                    self.progress_updated.emit(55, "📊 Testing signal stability...")
-                    stability_result = performance_tester.test_signal_stability(15)
-                    analysis_results['stability_test'] = stability_result
-                    
-                    # ทดสอบการเชื่อมต่อข้อมูล
-                    if not self.should_stop:
-                        self.progress_updated.emit(70, "🌐 Testing data connectivity...")
-                        connectivity_result = performance_tester.test_data_connectivity()
-                        analysis_results['connectivity_test'] = connectivity_result
-                    
-                    # ทดสอบ Handover
-                    if not self.should_stop:
-                        self.progress_updated.emit(85, "📡 Testing handover capability...")
-                        handover_result = performance_tester.test_handover_capability()
-                        analysis_results['handover_test'] = handover_result
+            enabled = self._enabled_stages()
+            
+            if len(self.ports) == 1:
+                at_helper = self._open_helper(self.port)
+                if at_helper is None:
+                    self.error_occurred.emit("❌ Failed to connect to modem")
+                    return
+                try:
+                    stage_results = self.scheduler.run_port(
+                        self.port, at_helper, self.cancel_token, enabled, self._on_stage, self.force_refresh)
+                    results = {self.port: self._build_results(self.port, stage_results, at_helper.mode)}
+                finally:
+                    at_helper.disconnect()
+            else:
+                modes = {}
                 
-                # สแกนข้อมูลเพิ่มเติม
-                if self.analysis_options.get('detailed_scan', True) and not self.should_stop:
-                    self.progress_updated.emit(90, "🔍 Performing detailed scan...")
-                    additional_info = self._get_additional_info(at_helper)
-                    analysis_results['additional_info'] = additional_info
+                def open_helper(port):
+                    helper = self._open_helper(port)
+                    if helper is not None:
+                        modes[port] = helper.mode
+                    return helper
                 
-                self.progress_updated.emit(100, "✅ Analysis completed successfully!")
-                self.analysis_completed.emit(analysis_results)
+                def port_done(port, stage_results):
+                    if 'error' in stage_results and '_stages' not in stage_results:
+                        result = stage_results
+                    else:
+                        result = self._build_results(port, stage_results, modes.get(port, "direct"))
+                    results[port] = result
+                    self.port_completed.emit(port, result)
                 
-            finally:
-                at_helper.disconnect()
+                results = {}
+                self.scheduler.run_many(self.ports, open_helper, lambda h: h.disconnect(), self.cancel_token,
+                                        enabled, self._on_stage, port_done, self.force_refresh)
+            
+            if self.should_stop:
+                self.progress_updated.emit(100, "⏹ Analysis cancelled")
+                return
+            
+            main = results.get(self.port, {})
+            if 'connection_info' not in main:
+                self.error_occurred.emit(f"❌ {main.get('error', 'Failed to connect to modem')}")
+                return
+            self.progress_updated.emit(100, "✅ Analysis completed successfully!")
+            self.analysis_completed.emit(main)
                 
         except Exception as e:
             self.error_occurred.emit(f"Analysis failed: {e}")
     
     def stop_analysis(self):
-        """หยุดการวิเคราะห์"""
+        """หยุดการวิเคราะห์ (ยกเลิก stage ที่ค้างอยู่ทันที)"""
         self.should_stop = True
+        self.cancel_token.cancel()
         
     def _get_additional_info(self, at_helper: ATCommandHelper) -> Dict[str, Any]:
         """ดึงข้อมูลเพิ่มเติม"""
-        additional_info = {}
-        
-        try:
-            # ข้อมูลโมเด็ม
-            manufacturer = at_helper.send_command("AT+CGMI").replace("OK", "").strip()
-            model = at_helper.send_command("AT+CGMM").replace("OK", "").strip()
-            firmware = at_helper.send_command("AT+CGMR").replace("OK", "").strip()
-            imei = at_helper.send_command("AT+CGSN").replace("OK", "").strip()
-            
-            additional_info['modem'] = {
-                'manufacturer': manufacturer,
-                'model': model,
-                'firmware': firmware,
-                'imei': imei
-            }
-            
-            # ข้อมูลการสนับสนุนเครือข่าย
-            bands_response = at_helper.send_command("AT+QNWINFO")
-            additional_info['network_support'] = {
-                'current_bands': bands_response,
-                'supports_lte': "LTE" in bands_response.upper(),
-                'supports_5g': "5G" in bands_response.upper() or "NR" in bands_response.upper()
-            }
-            
-        except Exception as e:
-            additional_info['error'] = f"Failed to get additional info: {e}"
-        
-        return additional_info
+        return get_additional_info(at_helper)
 
 
 class SIMInfoWindow(QDialog):
     """หน้าต่างแสดงข้อมูล SIM แบบละเอียด"""
     
-    def __init__(self, port: str, baudrate: int = 115200, parent=None):
+    def __init__(self, port: str, baudrate: int = 115200, parent=None, serial_thread=None):
         super().__init__(parent)
         self.port = port
         self.baudrate = baudrate
+        self.serial_thread = serial_thread
         self.analysis_thread = None
         self.analysis_results = {}
         
@@ -1201,7 +1310,7 @@ class SIMInfoWindow(QDialog):
             self.progress_label.setVisible(True)
             self.progress_bar.setValue(0)
             
-            self.analysis_thread = SIMAnalysisThread(self.port, self.baudrate)
+            self.analysis_thread = SIMAnalysisThread(self.port, self.baudrate, self.serial_thread)
             self.analysis_thread.progress_updated.connect(self.update_progress)
             self.analysis_thread.analysis_completed.connect(self.analysis_finished)
             self.analysis_thread.error_occurred.connect(self.analysis_error)
@@ -1224,7 +1333,8 @@ class SIMInfoWindow(QDialog):
             # ซ่อน progress bar
             self.progress_bar.setVisible(False)
             self.progress_label.setVisible(False)
-            self.status_label.setText("✅ Analysis Complete")
+            cached = sum(1 for st in results.get('stage_status', {}).values() if st.get('state') == STATE_CACHED)
+            self.status_label.setText(f"✅ Analysis Complete ({cached} cached)" if cached else "✅ Analysis Complete")
             
             # อัพเดทข้อมูลใน UI
             self.update_signal_display_enhanced(results)
@@ -1347,9 +1457,11 @@ class SIMInfoWindow(QDialog):
    • Minimum RSSI: {stability_test.get('min_rssi', 0):.1f} dBm  
    • Maximum RSSI: {stability_test.get('max_rssi', 0):.1f} dBm
    • Signal Range: {stability_test.get('max_rssi', 0) - stability_test.get('min_rssi', 0):.1f} dB
+   • Median RSSI: {stability_test.get('median_rssi', 0):.1f} dBm (P5 {stability_test.get('p5_rssi', 0):.1f} / P95 {stability_test.get('p95_rssi', 0):.1f})
 
 📊 Stability Metrics:
    • Variance: {stability_test.get('rssi_variance', 0):.2f}
+   • Signal Outages: {stability_test.get('outage_count', 0)} (longest {stability_test.get('longest_outage_s', 0):.0f} s)
    • Stability Score: {stability_test.get('stability_score', 0):.1f}/100
    • Signal Quality: {"🟢 Stable" if stability_test.get('stability_score', 0) > 80 else "🟡 Moderate" if stability_test.get('stability_score', 0) > 60 else "🔴 Unstable"}
 
@@ -1395,6 +1507,11 @@ class SIMInfoWindow(QDialog):
                 perf_text += f"   • Cell ID: {serving_cell.get('cell_id', 'Unknown')}\n"
                 perf_text += f"   • LAC: {serving_cell.get('lac', 'Unknown')}\n"
                 perf_text += f"   • RSSI: {serving_cell.get('rssi', 'Unknown')} dBm\n"
+                if serving_cell.get('rat'):
+                    perf_text += f"   • RAT: {serving_cell['rat']} | PCI: {serving_cell.get('pci')} | EARFCN: {serving_cell.get('earfcn')}\n"
+                if serving_cell.get('rsrp') is not None:
+                    perf_text += (f"   • RSRP: {serving_cell['rsrp']} dBm | RSRQ: {serving_cell.get('rsrq')} dB"
+                                  f" | SINR: {serving_cell.get('sinr')} dB\n")
             else:
                 perf_text += "   • No serving cell information available\n"
             
@@ -1403,7 +1520,9 @@ class SIMInfoWindow(QDialog):
             if neighbor_cells:
                 perf_text += f"\n📱 Neighbor Cells ({len(neighbor_cells)}):\n"
                 for i, cell in enumerate(neighbor_cells[:5]):  # Show max 5
-                    perf_text += f"   {i+1}. Cell ID: {cell.get('cell_id', 'Unknown')} | RSSI: {cell.get('rssi', 'Unknown')} dBm\n"
+                    cell_label = cell.get('cell_id') or f"PCI {cell.get('pci')} @ {cell.get('earfcn')}"
+                    level = f"RSRP: {cell['rsrp']} dBm" if cell.get('rsrp') is not None else f"RSSI: {cell.get('rssi', 'Unknown')} dBm"
+                    perf_text += f"   {i+1}. Cell ID: {cell_label} | {level}\n"
                 if len(neighbor_cells) > 5:
                     perf_text += f"   ... and {len(neighbor_cells) - 5} more cells\n"
             
@@ -1427,54 +1546,26 @@ class SIMInfoWindow(QDialog):
             if not values or len(values) < 2:
                 return "   📊 Insufficient data for graph\n"
             
-            # Normalize values for display (0-20 range)
-            min_val = min(values)
-            max_val = max(values)
-            
-            if max_val == min_val:
+            # Normalize values for display (1-15 ตาม min..max ของทั้งชุด)
+            normalized = signal_analytics.ascii_levels(values, 15)
+            if normalized is None:
                 return "   📊 Signal remained constant\n"
+            min_val, max_val = min(values), max(values)
             
-            normalized = []
-            for val in values:
-                norm = int(((val - min_val) / (max_val - min_val)) * 15) + 1
-                normalized.append(max(1, min(15, norm)))
-            
-            # Create ASCII graph
-            graph_lines = []
-            
-            # Top border
-            graph_lines.append("   ┌" + "─" * min(len(normalized), 50) + "┐")
-            
-            # Graph data (from top to bottom)
-            for level in range(15, 0, -1):
-                line = "   │"
-                for i, val in enumerate(normalized[:50]):  # Limit width
-                    if val >= level:
-                        line += "█"
-                    elif val >= level - 0.5:
-                        line += "▄"
-                    else:
-                        line += " "
-                line += "│"
-                
-                # Add scale on the right
-                if level == 15:
-                    line += f"  {max_val:.1f} dBm (Max)"
-                elif level == 8:
-                    line += f"  {(max_val + min_val)/2:.1f} dBm (Avg)"
-                elif level == 1:
-                    line += f"  {min_val:.1f} dBm (Min)"
-                
-                graph_lines.append(line)
+            # แสดงแค่ 50 จุดแรก → 1 แถวต่อระดับ สร้างจาก mask ทีเดียว
+            shown = normalized[:50]
+            filled = shown[None, :] >= np.arange(15, 0, -1)[:, None]
+            width = len(shown)
             
-            # Bottom border
-            graph_lines.append("   └" + "─" * min(len(normalized), 50) + "┘")
+            graph_lines = ["   ┌" + "─" * width + "┐"]
+            scale = {15: f"  {max_val:.1f} dBm (Max)", 8: f"  {(max_val + min_val)/2:.1f} dBm (Avg)",
+                     1: f"  {min_val:.1f} dBm (Min)"}
+            for row, level in zip(filled, range(15, 0, -1)):
+                graph_lines.append("   │" + "".join(np.where(row, "█", " ")) + "│" + scale.get(level, ""))
+            graph_lines.append("   └" + "─" * width + "┘")
             
             # Time axis
-            time_line = "   "
-            for i in range(0, min(len(normalized), 50), 10):
-                time_line += f"{i*2:>10}s"
-            graph_lines.append(time_line)
+            graph_lines.append("   " + "".join(f"{i*2:>10}s" for i in range(0, width, 10)))
             
             return "\n".join(graph_lines) + "\n\n"
             
@@ -1622,6 +1713,9 @@ class SIMInfoWindow(QDialog):
    • Total Measurements: {stability_test.get('total_measurements', 0)}
    • Average RSSI: {stability_test.get('avg_rssi', 0):.1f} dBm
    • Signal Range: {stability_test.get('max_rssi', 0) - stability_test.get('min_rssi', 0):.1f} dB
+   • RSSI P5 / Median / P95: {stability_test.get('p5_rssi', 0):.1f} / {stability_test.get('median_rssi', 0):.1f} / {stability_test.get('p95_rssi', 0):.1f} dBm
+   • Variance: {stability_test.get('rssi_variance', 0):.2f}
+   • Signal Outages: {stability_test.get('outage_count', 0)} (longest {stability_test.get('longest_outage_s', 0):.0f} s)
    • Stability Score: {stability_test.get('stability_score', 0):.1f}/100
    • Assessment: {"Excellent" if stability_test.get('stability_score', 0) > 90 else "Good" if stability_test.get('stability_score', 0) > 70 else "Fair" if stability_test.get('stability_score', 0) > 50 else "Poor"}
 
@@ -1855,10 +1949,10 @@ Report generated by SIM Information Analysis System
 
 # ==================== INTEGRATION FUNCTIONS ====================
 
-def show_sim_analysis_window(port: str, baudrate: int = 115200, parent=None):
-    """แสดงหน้าต่าง SIM Analysis"""
+def show_sim_analysis_window(port: str, baudrate: int = 115200, parent=None, serial_thread=None):
+    """แสดงหน้าต่าง SIM Analysis (serial_thread ของพอร์ตเดียวกัน → ใช้การเชื่อมต่อนั้นแทนการเปิดพอร์ตซ้ำ)"""
     try:
-        window = SIMInfoWindow(port, baudrate, parent)
+        window = SIMInfoWindow(port, baudrate, parent, serial_thread)
         window.setModal(False)
         window.show()
         return window
@@ -1870,9 +1964,9 @@ def show_sim_analysis_window(port: str, baudrate: int = 115200, parent=None):
         return None
 
 
-def create_at_command_helper(port: str, baudrate: int = 115200) -> ATCommandHelper:
+def create_at_command_helper(port: str, baudrate: int = 115200, serial_thread=None) -> ATCommandHelper:
     """สร้าง AT Command Helper"""
-    return ATCommandHelper(port, baudrate)
+    return ATCommandHelper(port, baudrate, serial_thread=serial_thread)
 
 
 # ==================== EXAMPLE USAGE ====================
@@ -2,20 +2,39 @@
 
 import re
 import json
+import threading
+import time
+from collections import deque
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 from typing import Dict, List, Optional, Tuple, Any
 
+import numpy as np
+
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QTextEdit, QPushButton,
     QTabWidget, QWidget, QProgressBar, QGroupBox, QGridLayout,
     QScrollArea, QFrame, QMessageBox, QApplication, QComboBox,
-    QCheckBox, QSpinBox, QSlider, QTableWidget, QTableWidgetItem,
-    QHeaderView, QSplitter, QSizePolicy
+    QCheckBox, QSpinBox, QSlider,
+    QHeaderView, QSplitter, QSizePolicy, QTableView, QAbstractItemView
 )
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer, QPropertyAnimation, QRect
-from PyQt5.QtGui import QFont, QTextCursor, QPalette, QColor, QPixmap, QPainter
+from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer, QPropertyAnimation, QRect, QPointF
+from PyQt5.QtGui import QFont, QTextCursor, QPalette, QColor, QPixmap, QPainter, QPolygonF
 from widgets.signal_strength_widget import SignalStrengthWidget
+from widgets.signal_measurement_model import SignalMeasurementsModel, COLUMN_WIDTHS
+from services.signal_store import append_measurement, append_cell_report, append_alerts, series_key
+from services.signal_anomaly import default_monitor
+from services.cell_info import parse_cell_report, serving_cell
+from services import sim_identity_cache
+from services import signal_analytics
+from services import query_cache
+from services import metrics
+from services.at_transport import QUEUE_GRACE
+from services.signal_buffer import SignalRingBuffer, minmax_decimate
+from services.signal_urc import (
+    PUSH_NONE, PUSH_QIND, PUSH_CIEV, ENABLE_COMMANDS, DISABLE_COMMANDS, CREG_ENABLE, CREG_DISABLE,
+    SignalUrc, RegistrationUrc, csq_to_dbm, parse_cind_support, parse_urc, signal_indicator
+)
 from styles.signal_quality_window_styles import get_stylesheet
 
 ENABLE_GRAPH_SCROLLING = True
@@ -24,6 +43,15 @@ ENABLE_GRAPH_SCROLLING = True
 SHOW_Y_TICKS = True    
 Y_TICK_STEP  = 2       
 
+# --- Push mode (URC) ---
+PUSH_FALLBACK_FACTOR = 12     # push ใช้ได้ → poll สำรองทุก interval × 12
+PUSH_FALLBACK_MIN = 60        # แต่ไม่ถี่กว่า 60 วินาที
+PUSH_MIN_GAP = 1.0            # URC ถี่กว่านี้ → รวมเหลือค่าล่าสุด (วินาที)
+
+# --- Graph ---
+GRAPH_MARGIN = 40
+GRAPH_HISTORY_CAPACITY = 60_000   # ≈ 3.5 วันที่วัดทุก 5 วินาที
+
 @dataclass
 class SIMIdentityInfo:
     imsi: str = ""
@@ -67,14 +95,35 @@ class EnhancedSignalQualityThread(QThread):
     error_occurred = pyqtSignal(str)
     sim_info_updated = pyqtSignal(SIMIdentityInfo)
     command_response_signal = pyqtSignal(str)
+    anomaly_detected = pyqtSignal(object)         # AnomalyAlert
     
-    def __init__(self, serial_thread, interval: int = 5, include_sim_info: bool = True):
+    def __init__(self, serial_thread, interval: int = 5, include_sim_info: bool = True,
+                 persist: bool = True, push_mode: bool = True, anomaly_monitor=None):
         super().__init__()
         self.serial_thread = serial_thread
         self.interval = interval
         self.monitoring = False
         self.include_sim_info = include_sim_info
         self.sim_identity = None
+        self.persist = persist      # บันทึกทุก measurement ลง signal_store
+        # ตรวจสัญญาณผิดปกติใน thread นี้ (ไม่กิน GUI thread) → ส่งเฉพาะ alert ออกไป
+        self.anomaly_monitor = anomaly_monitor if anomaly_monitor is not None else default_monitor()
+        
+        # push mode: ให้โมเด็มส่ง URC เองเมื่อสัญญาณเปลี่ยน แล้ว poll แค่สำรอง
+        self.push_mode = push_mode
+        self.push_kind = PUSH_NONE
+        self.creg_push = False
+        self.registration = None          # RegistrationUrc ล่าสุด (LAC/CI)
+        self._ciev = None                 # (ลำดับ indicator, ค่าสูงสุด)
+        self._urc_queue = deque()         # เติมจาก GUI thread, อ่านใน run()
+        self._pending_signal = None
+        self._poll_requested = False
+        self._last_emit = 0.0
+        self._last_carrier = "Unknown"
+        
+        # serving cell จาก AT+QENG (None = ยังไม่รู้ว่ารองรับ, False = ไม่รองรับ)
+        self.cell_report_supported = None
+        self.serving_cell = None
         
         # เก็บ responses ชั่วคราว
         self.temp_responses = {}
@@ -113,12 +162,23 @@ class EnhancedSignalQualityThread(QThread):
     def handle_serial_response(self, response):
         """รับ response จาก serial thread"""
         try:
-            if not self.monitoring or not self.current_command:
+            if not self.monitoring:
                 return
             response = response.strip()
             if not response:
                 return
             
+            # URC สัญญาณ/การลงทะเบียน → เข้าคิวให้ run() จัดการ (ไม่ปนกับคำตอบของคำสั่ง)
+            if (self.push_kind or self.creg_push) and self.current_command != "AT+CREG?":
+                urc = self._match_urc(response)
+                if urc is not None:
+                    self._urc_queue.append(urc)
+                    self.command_response_signal.emit(f"URC: {response}")
+                    return
+            
+            if not self.current_command:
+                return
+            
             # แสดงใน Signal Quality window
             self.command_response_signal.emit(f"RECV: {response}")
             
@@ -135,11 +195,27 @@ class EnhancedSignalQualityThread(QThread):
         except Exception as e:
             print(f"Error handling response: {e}")
     
-    def _send_command_and_wait_direct(self, command: str, timeout: float = 5.0) -> List[str]:
-        """ส่งคำสั่งและรอ response โดยตรง"""
+    def _send_command_and_wait_direct(self, command: str, timeout: float = 5.0,
+                                      fresh: bool = False) -> List[str]:
+        """
+        ส่งคำสั่งและรอ response — คำถามอ่านอย่างเดียวที่เพิ่งถาม/กำลังถามจากส่วนอื่นใช้คำตอบร่วมกัน
+        fresh=True: ถามโมเด็มจริงเสมอ (การวัดตามรอบของ thread นี้ — interval ตั้งได้ต่ำกว่า TTL)
+        แต่ยังเก็บคำตอบลง cache ให้ส่วนอื่นใช้ต่อ
+        """
         if not self.serial_thread or not self.serial_thread.isRunning():
             return ["ERROR: No connection"]
         
+        port = getattr(self.serial_thread, 'port', '') or ''
+        if fresh:
+            response = "\n".join(self._exchange_direct(command, timeout))
+            query_cache.record(port, command, response)
+        else:
+            response = query_cache.query(port, command,
+                                         lambda: "\n".join(self._exchange_direct(command, timeout)))
+        return response.split("\n")
+    
+    def _exchange_direct(self, command: str, timeout: float) -> List[str]:
+        """ส่งคำสั่งผ่าน serial thread จริง แล้วเก็บ response จนได้ OK / ERROR"""
         try:
             # บอก serial thread ว่าเป็น Signal Quality command
             if hasattr(self.serial_thread, 'set_command_source'):
@@ -153,6 +229,9 @@ class EnhancedSignalQualityThread(QThread):
             self.command_response_signal.emit(f"[SIGNAL] {command}")
             
             # ส่งคำสั่ง
+            started = metrics.clock()
+            if getattr(self.serial_thread, 'scheduler', None) is not None:
+                return self._exchange_queued(command, timeout, started)
             success = self.serial_thread.send_command(command)
             if not success:
                 self.current_command = None
@@ -163,6 +242,8 @@ class EnhancedSignalQualityThread(QThread):
             while self.current_command and wait_time < timeout:
                 self.msleep(100)
                 wait_time += 0.1
+            if started:
+                metrics.AT_LATENCY.observe_since(started, "signal_thread", metrics.command_name(command))
             
             # ดึง responses
             responses = self.temp_responses.get(command, [])
@@ -174,6 +255,26 @@ class EnhancedSignalQualityThread(QThread):
             self.current_command = None
             return [f"ERROR: {e}"]
     
+    def _exchange_queued(self, command: str, timeout: float, started) -> List[str]:
+        """เข้าคิว scheduler ของ serial thread → ได้เฉพาะคำตอบของคำสั่งนี้ (ไม่ปนกับคำสั่งจากหน้าอื่น)"""
+        finished = []
+        done = threading.Event()
+        
+        def on_done(item):
+            finished.append(item)
+            done.set()
+        
+        try:
+            if not self.serial_thread.send_command(command, on_done=on_done, timeout=timeout):
+                return ["ERROR: Failed to send command"]
+            done.wait(timeout + QUEUE_GRACE)
+        finally:
+            self.current_command = None
+        if started:
+            metrics.AT_LATENCY.observe_since(started, "signal_thread", metrics.command_name(command))
+        lines = finished[0].lines if finished else []
+        return lines if lines else ["ERROR: No response"]
+    
     def _measure_signal(self) -> Optional[SignalMeasurement]:
         """วัดสัญญาณ - ปรับปรุงให้แม่นยำขึ้น"""
         try:
@@ -182,7 +283,7 @@ class EnhancedSignalQualityThread(QThread):
             )
             
             # ส่ง AT+CSQ
-            csq_responses = self._send_command_and_wait_direct("AT+CSQ")
+            csq_responses = self._send_command_and_wait_direct("AT+CSQ", fresh=True)
             print(f"CSQ Responses: {csq_responses}")
             
             for response in csq_responses:
@@ -245,7 +346,7 @@ class EnhancedSignalQualityThread(QThread):
                                 break
             
             # ส่ง AT+CESQ สำหรับ LTE measurements (ถ้าต้องการ)
-            cesq_responses = self._send_command_and_wait_direct("AT+CESQ")
+            cesq_responses = self._send_command_and_wait_direct("AT+CESQ", fresh=True)
             for response in cesq_responses:
                 if '+CESQ:' in response:
                     match = re.search(r'\+CESQ:\s*(\d+),(\d+),(\d+),(\d+),(\d+),(\d+)', response)
@@ -259,6 +360,8 @@ class EnhancedSignalQualityThread(QThread):
                             measurement.rsrp = -141 + rsrp
                         break
             
+            self._update_serving_cell(measurement)
+            
             # ดึงข้อมูล carrier
             if not measurement.carrier or measurement.carrier == "Unknown":
                 cops_responses = self._send_command_and_wait_direct("AT+COPS?")
@@ -280,6 +383,40 @@ class EnhancedSignalQualityThread(QThread):
             self.error_occurred.emit(f"Error measuring signal: {e}")
             return None
     
+    def _update_serving_cell(self, measurement: SignalMeasurement):
+        """อ่าน serving cell (AT+QENG) → เติม RSRP/RSRQ/SINR, เก็บประวัติต่อเซลล์ และแจ้งเมื่อเปลี่ยนเซลล์"""
+        if self.cell_report_supported is False:
+            return
+        cells = parse_cell_report(self._send_command_and_wait_direct('AT+QENG="servingcell"', timeout=2.0))
+        cell = serving_cell(cells)
+        if self.cell_report_supported is None:
+            # ถามครั้งแรกแล้วไม่ได้ +QENG → โมเด็มไม่รองรับ ไม่ต้องส่งอีก
+            self.cell_report_supported = bool(cells)
+        if cell is None:
+            return
+        self.serving_cell = cell
+        if measurement.rsrp <= -999 and cell.rsrp is not None:
+            measurement.rsrp = cell.rsrp
+        if measurement.rsrq <= -999 and cell.rsrq is not None:
+            measurement.rsrq = cell.rsrq
+        if cell.sinr is not None:
+            measurement.sinr = int(round(cell.sinr))
+        if cell.rat:
+            measurement.network_type = cell.rat
+        
+        if not self.persist:
+            return
+        try:
+            event = append_cell_report(self._series(), cells)
+            if event:
+                self.status_updated.emit(f"📡 Cell reselection: {event['from_key']} → {event['to_key']}")
+        except Exception as e:
+            print(f"Error saving cell report: {e}")
+    
+    def _series(self) -> str:
+        iccid = self.sim_identity.iccid if self.sim_identity else None
+        return series_key(iccid, getattr(self.serial_thread, "port", None))
+    
     def _calculate_bars(self, rssi: int) -> int:
         """คำนวณจำนวนแท่งสัญญาณ"""
         if rssi >= -70:
@@ -316,30 +453,38 @@ class EnhancedSignalQualityThread(QThread):
                     self.sim_info_updated.emit(self.sim_identity)
                     self.status_updated.emit(f"📱 SIM Info loaded - {self.sim_identity.carrier}")
             
-            self.status_updated.emit("🟢 Connected - Monitoring signal...")
+            if self.push_mode:
+                self.push_kind = self._enable_push_mode()
+            
+            if self.push_kind:
+                self.status_updated.emit(f"🟢 Connected - Monitoring signal (push: {self.push_kind})...")
+            else:
+                self.status_updated.emit("🟢 Connected - Monitoring signal...")
             
+            next_poll = 0.0
             while self.monitoring:
                 try:
-                    measurement = self._measure_signal()
-                    if measurement:
-                        measurement.sim_info = self.sim_identity
-                        self.signal_measured.emit(measurement)
+                    now = time.monotonic()
+                    if now >= next_poll or self._poll_requested:
+                        self._poll_requested = False
+                        started = metrics.clock()
+                        measurement = self._measure_signal()
+                        metrics.SIGNAL_MEASURE.observe_since(started)
+                        if not measurement:
+                            measurement = SignalMeasurement(
+                                timestamp=datetime.now().strftime("%H:%M:%S"),
+                                rssi=-999,
+                                quality_score=0.0,
+                                signal_bars=0,
+                                carrier="Unknown",
+                                network_type="Unknown"
+                            )
+                        self._emit_measurement(measurement)
+                        next_poll = time.monotonic() + self._poll_interval()
                     else:
-                        default_measurement = SignalMeasurement(
-                            timestamp=datetime.now().strftime("%H:%M:%S"),
-                            rssi=-999,
-                            quality_score=0.0,
-                            signal_bars=0,
-                            carrier="Unknown",
-                            network_type="Unknown"
-                        )
-                        default_measurement.sim_info = self.sim_identity
-                        self.signal_measured.emit(default_measurement)
+                        self._process_urcs()
                     
-                    for _ in range(self.interval * 10):
-                        if not self.monitoring:
-                            break
-                        self.msleep(100)
+                    self.msleep(100)
                         
                 except Exception as e:
                     self.error_occurred.emit(f"Measurement error: {e}")
@@ -348,11 +493,158 @@ class EnhancedSignalQualityThread(QThread):
         except Exception as e:
             self.error_occurred.emit(f"Monitoring error: {e}")
         finally:
+            self._disable_push_mode()
             self.status_updated.emit("🔴 Monitoring stopped")
     
+    def _emit_measurement(self, measurement: SignalMeasurement):
+        measurement.sim_info = self.sim_identity
+        if measurement.carrier and measurement.carrier != "Unknown":
+            self._last_carrier = measurement.carrier
+        self._last_emit = time.monotonic()
+        self.signal_measured.emit(measurement)
+        self._persist(measurement)
+        self._check_anomalies(measurement)
+    
+    def _check_anomalies(self, measurement: SignalMeasurement):
+        try:
+            registered = self.registration.registered if self.registration else None
+            alerts = self.anomaly_monitor.feed(self._series(), measurement, registered=registered)
+            if not alerts:
+                return
+            for alert in alerts:
+                self.anomaly_detected.emit(alert)
+            if self.persist:
+                append_alerts(alerts)
+        except Exception as e:
+            print(f"Error checking signal anomalies: {e}")
+    
+    def _poll_interval(self) -> float:
+        """push ใช้ได้ → poll ห่าง ๆ แค่กัน URC หาย / อัปเดต RSRP-RSRQ, ไม่งั้น poll ตาม interval"""
+        if self.push_kind:
+            return max(self.interval * PUSH_FALLBACK_FACTOR, PUSH_FALLBACK_MIN)
+        return self.interval
+    
+    # ==================== PUSH MODE (URC) ====================
+    def _command_ok(self, command: str) -> bool:
+        return any(r.strip() == "OK" for r in self._send_command_and_wait_direct(command, timeout=2.0))
+    
+    def _enable_push_mode(self) -> str:
+        """ตรวจว่าโมเด็มส่ง URC สัญญาณได้แบบไหน แล้วเปิดใช้ (คืน PUSH_NONE ถ้าต้อง poll อย่างเดียว)"""
+        kind = PUSH_NONE
+        try:
+            if self._command_ok(ENABLE_COMMANDS[PUSH_QIND]):
+                kind = PUSH_QIND
+            else:
+                ind = signal_indicator(parse_cind_support(self._send_command_and_wait_direct("AT+CIND=?", timeout=2.0)))
+                if ind and self._command_ok(ENABLE_COMMANDS[PUSH_CIEV]):
+                    self._ciev = ind
+                    kind = PUSH_CIEV
+            self.creg_push = self._command_ok(CREG_ENABLE)
+        except Exception as e:
+            print(f"Error enabling signal URCs: {e}")
+        return kind
+    
+    def _disable_push_mode(self):
+        """ปิด URC ที่เปิดไว้ (ไม่รอคำตอบ เพราะ monitoring หยุดแล้ว)"""
+        commands = []
+        if self.push_kind:
+            commands.append(DISABLE_COMMANDS[self.push_kind])
+        if self.creg_push:
+            commands.append(CREG_DISABLE)
+        self.push_kind = PUSH_NONE
+        self.creg_push = False
+        self._urc_queue.clear()
+        if not commands or not self.serial_thread or not self.serial_thread.isRunning():
+            return
+        try:
+            if hasattr(self.serial_thread, 'set_command_source'):
+                self.serial_thread.set_command_source('SIGNAL_QUALITY')
+            for cmd in commands:
+                self.serial_thread.send_command(cmd)
+                self.msleep(200)
+        except Exception as e:
+            print(f"Error disabling signal URCs: {e}")
+    
+    def _match_urc(self, line: str):
+        urc = parse_urc(line, *self._ciev) if self._ciev else parse_urc(line)
+        if isinstance(urc, RegistrationUrc) and not self.creg_push:
+            return None
+        return urc
+    
+    def _process_urcs(self):
+        """จัดการ URC ที่ค้างในคิว: สัญญาณรวมเหลือค่าล่าสุด และ emit ไม่ถี่กว่า PUSH_MIN_GAP"""
+        while self._urc_queue:
+            urc = self._urc_queue.popleft()
+            if isinstance(urc, RegistrationUrc):
+                self._on_registration(urc)
+            elif isinstance(urc, SignalUrc):
+                self._pending_signal = urc
+        
+        urc = self._pending_signal
+        if urc is None or time.monotonic() - self._last_emit < PUSH_MIN_GAP:
+            return
+        self._pending_signal = None
+        if urc.rssi_raw is None:
+            # +CIEV บอกแค่ระดับหยาบ → อ่าน +CSQ จริงหนึ่งครั้ง
+            self._poll_requested = True
+            return
+        self._emit_measurement(self._measurement_from_csq(urc.rssi_raw, urc.ber_raw))
+    
+    def _measurement_from_csq(self, rssi_raw: int, ber_raw: int) -> SignalMeasurement:
+        """สร้าง measurement จากค่า CSQ ที่ได้ทาง URC (ไม่ส่งคำสั่งเพิ่ม; RSRP/RSRQ รอ poll รอบถัดไป)"""
+        measurement = SignalMeasurement(timestamp=datetime.now().strftime("%H:%M:%S"))
+        measurement.rssi = csq_to_dbm(rssi_raw)
+        measurement.ber = 99.0 if ber_raw is None or ber_raw == 99 else ber_raw
+        measurement.signal_bars = self._calculate_bars(measurement.rssi)
+        measurement.quality_score = self._calculate_quality(measurement.rssi, measurement.ber)
+        measurement.carrier = self._last_carrier
+        if self.sim_identity and self.sim_identity.carrier:
+            measurement.carrier = self.sim_identity.carrier
+        return measurement
+    
+    def _on_registration(self, reg: RegistrationUrc):
+        prev = self.registration
+        self.registration = reg
+        if prev is None or prev.registered != reg.registered:
+            if reg.registered:
+                self.status_updated.emit(f"🟢 Registered - LAC {reg.lac or '-'} CI {reg.ci or '-'}")
+            else:
+                self.status_updated.emit(f"🔴 Network registration lost (stat {reg.stat})")
+            self._poll_requested = True
+        elif (prev.lac, prev.ci) != (reg.lac, reg.ci):
+            self.status_updated.emit(f"📡 Cell changed - LAC {reg.lac or '-'} CI {reg.ci or '-'}")
+    
+    def _persist(self, measurement: SignalMeasurement):
+        """เก็บลง time-series store (เขียนจาก thread นี้ → ไม่หน่วง GUI)"""
+        if not self.persist:
+            return
+        try:
+            append_measurement(self._series(), measurement)
+        except Exception as e:
+            print(f"Error saving signal measurement: {e}")
+
     def _get_sim_identity(self) -> Optional[SIMIdentityInfo]:
         try:
             sim_info = SIMIdentityInfo()
+            port = getattr(self.serial_thread, "port", None)
+            
+            # ดึง ICCID ก่อน → ถ้าเคยอ่านซิมใบนี้แล้วใช้ identity จาก cache (ไม่ต้องถาม CIMI / CNUM)
+            for cmd in sim_identity_cache.ICCID_COMMANDS:
+                iccid_responses = self._send_command_and_wait_direct(cmd)
+                sim_info.iccid = sim_identity_cache.parse_iccid(
+                    r for r in iccid_responses if '+CCID:' in r or '+QCCID:' in r or r.isdigit()
+                )
+                if sim_info.iccid:
+                    self._parse_iccid(sim_info)
+                    break
+            
+            cached = sim_identity_cache.lookup(sim_info.iccid, port)
+            if cached:
+                sim_info.imsi = cached["imsi"]
+                sim_info.phone_number = cached["phone"]
+                self._parse_imsi(sim_info)
+                self._validate_sim_info(sim_info)
+                return sim_info
             
             # ดึง IMSI
             imsi_responses = self._send_command_and_wait_direct("AT+CIMI")
@@ -369,19 +661,6 @@ class EnhancedSignalQualityThread(QThread):
                         self._parse_imsi(sim_info)
                         break
             
-            # ดึง ICCID
-            iccid_responses = self._send_command_and_wait_direct("AT+CCID")
-            if not any('+CCID:' in r for r in iccid_responses):
-                iccid_responses = self._send_command_and_wait_direct("AT+QCCID")
-            
-            for response in iccid_responses:
-                if '+CCID:' in response or '+QCCID:' in response:
-                    iccid_match = re.search(r'(\d{18,22})', response)
-                    if iccid_match:
-                        sim_info.iccid = iccid_match.group(1)
-                        self._parse_iccid(sim_info)
-                        break
-            
             # ดึงเบอร์โทรศัพท์
             cnum_responses = self._send_command_and_wait_direct("AT+CNUM")
             for response in cnum_responses:
@@ -392,6 +671,7 @@ class EnhancedSignalQualityThread(QThread):
                         break
             
             self._validate_sim_info(sim_info)
+            sim_identity_cache.store(sim_info.iccid, sim_info.imsi, sim_info.phone_number, port)
             return sim_info if sim_info.imsi else None
             
         except Exception as e:
@@ -505,7 +785,7 @@ class EnhancedSIMSignalQualityWindow(QDialog):
         self.parent_window = parent
         self.shared_serial_thread = serial_thread
         self.monitoring_thread = None
-        self.measurements_history = []
+        self.measurements_history = SignalRingBuffer()   # ขนาดคงที่ + สถิติ O(1) ต่อ sample
         self.auto_scroll = True
         self.sim_identity = None  # Store SIM info
         self.setup_signal_response_display()
@@ -838,19 +1118,11 @@ class EnhancedSIMSignalQualityWindow(QDialog):
             self.signal_slider.setValue(int(m.quality_score))
             self.quality_label.setText(f"Quality: {m.quality_score:.1f}%")
 
-            # คำนวดแถวในตารางจากดัชนีใน history
-            total_rows = self.measurements_table.rowCount()
-            total_hist = len(self.measurements_history)
-            # ตารางจะลบหัวเมื่อเกิน 1000 แถว (ดู add_measurement_to_table) → หา offset ให้ตรง
-            # (เมื่อ removeRow(0) คอลัมน์ # จะเลื่อนลงหนึ่ง)
-            offset = max(0, total_hist - total_rows)
-            row = max(0, min(global_index - offset, total_rows - 1))
-
-            if total_rows > 0:
+            # global_index นับตั้งแต่เริ่มวัด → แถวในตาราง (model รู้ว่าแถวบนสุดคือลำดับไหน)
+            row = self.measurements_model.row_for_global_index(global_index)
+            if row >= 0:
                 self.measurements_table.selectRow(row)
-                item = self.measurements_table.item(row, 0) or self.measurements_table.item(row, 1)
-                if item:
-                    self.measurements_table.scrollToItem(item)
+                self.measurements_table.scrollTo(self.measurements_model.index(row, 0))
             # แถบสถานะด้านบน
             self.status_label.setText(
                 f"📍 #{global_index+1} at {m.timestamp} | RSSI {m.rssi} dBm | Q {m.quality_score:.1f}%"
@@ -989,32 +1261,27 @@ class EnhancedSIMSignalQualityWindow(QDialog):
         tab = QWidget()
         layout = QVBoxLayout()
         
-        self.measurements_table = QTableWidget(0, 11) 
-        self.measurements_table.setHorizontalHeaderLabels([
-            "#",           
-            "Time", 
-            "RSSI (dBm)", 
-            "Quality (%)", 
-            "Bars", 
-            "RSRP (dBm)", 
-            "RSRQ (dB)", 
-            "BER (%)", 
-            "Carrier",
-            "MCC", 
-            "MNC"
-        ])
+        # model อ่านตรงจาก measurements_history → ไม่มี item ต่อ cell
+        self.measurements_model = SignalMeasurementsModel(
+            self.measurements_history, self.get_quality_color, self._format_ber_text, self
+        )
+        self.measurements_table = QTableView()
+        self.measurements_table.setModel(self.measurements_model)
+        self.measurements_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.measurements_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         
+        # ResizeToContents ต้องวัดทุกแถวใหม่ทุกครั้งที่เพิ่ม → ใช้ความกว้างคงที่
         header = self.measurements_table.horizontalHeader()
-        header.setSectionResizeMode(QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(QHeaderView.Interactive)
         
+        self.measurements_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         self.measurements_table.verticalHeader().setDefaultSectionSize(25)
         self.measurements_table.verticalHeader().setVisible(False)
         
         table_font = QFont("Arial", 10)
         self.measurements_table.setFont(table_font)
         
-        column_widths = [40, 70, 85, 80, 50, 85, 80, 70, 120, 60, 60]  
-        for i, width in enumerate(column_widths):
+        for i, width in enumerate(COLUMN_WIDTHS):
             self.measurements_table.setColumnWidth(i, width)
         
         layout.addWidget(self.measurements_table)
@@ -1135,6 +1402,7 @@ class EnhancedSIMSignalQualityWindow(QDialog):
             self.monitoring_thread.status_updated.connect(self.update_connection_status)
             self.monitoring_thread.error_occurred.connect(self.handle_error)
             self.monitoring_thread.sim_info_updated.connect(self.update_sim_info_display)
+            self.monitoring_thread.anomaly_detected.connect(self.handle_anomaly)
             
             # เพิ่มบรรทัดนี้
             if hasattr(self.monitoring_thread, 'command_response_signal'):
@@ -1273,7 +1541,8 @@ class EnhancedSIMSignalQualityWindow(QDialog):
     
     def update_signal_display(self, measurement: SignalMeasurement):
         try:
-            self.measurements_history.append(measurement)
+            # เพิ่มผ่าน model → ตารางได้ beginInsertRows / beginRemoveRows ตรงกับ buffer
+            self.measurements_model.append(measurement)
             
             self.current_labels['rssi'].setText(f"{measurement.rssi} dBm")
             self.current_labels['quality'].setText(f"{measurement.quality_score:.1f}%")
@@ -1328,58 +1597,10 @@ class EnhancedSIMSignalQualityWindow(QDialog):
             print(f"Error updating signal display: {e}")
     
     def add_measurement_to_table(self, measurement: SignalMeasurement):
+        # แถวถูกเพิ่มแล้วใน update_signal_display (measurements_model.append) → เหลือแค่เลื่อนลงล่าง
         try:
-            row = self.measurements_table.rowCount()
-            self.measurements_table.insertRow(row)
-
-            if row >= 1000:
-                self.measurements_table.removeRow(0)
-                row = 999
-                self._update_row_numbers()
-
-            mcc = measurement.sim_info.mcc if measurement.sim_info else "--"
-            mnc = measurement.sim_info.mnc if measurement.sim_info else "--"
-
-            row_number = row + 1
-
-            ber_text, ber_tip, ber_unknown = self._format_ber_text(measurement.ber)
-
-            items = [
-                str(row_number),
-                measurement.timestamp,
-                str(measurement.rssi),
-                f"{measurement.quality_score:.1f}",
-                str(measurement.signal_bars),
-                str(measurement.rsrp) if measurement.rsrp > -999 else "--",
-                str(measurement.rsrq) if measurement.rsrq > -999 else "--",
-                ber_text.replace("%",""),  
-                measurement.carrier,
-                mcc,
-                mnc
-            ]
-
-            for col, text in enumerate(items):
-                table_item = QTableWidgetItem(text)
-
-                if col == 3:
-                    color = QColor(self.get_quality_color(measurement.quality_score))
-                    table_item.setForeground(color)
-
-                elif col == 0:
-                    table_item.setForeground(QColor("#6c757d"))
-                    table_item.setTextAlignment(Qt.AlignCenter)
-
-                elif col == 7 and ber_unknown:
-                    table_item.setForeground(QColor("#6c757d"))      
-                    table_item.setBackground(QColor("#f1f3f5"))      
-                    if ber_tip:
-                        table_item.setToolTip(ber_tip)
-
-                self.measurements_table.setItem(row, col, table_item)
-
             if self.auto_scroll:
                 self.measurements_table.scrollToBottom()
-
         except Exception as e:
             print(f"Error adding measurement to table: {e}")
 
@@ -1394,6 +1615,14 @@ class EnhancedSIMSignalQualityWindow(QDialog):
         elif "SIM Info loaded" in status:
             self.status_label.setText("📱 SIM information loaded successfully")
     
+    def handle_anomaly(self, alert):
+        """alert จาก detector (มาไม่บ่อย เพราะมี hysteresis + rate limit แล้ว)"""
+        stamp = datetime.fromtimestamp(alert.ts).strftime('%H:%M:%S')
+        detail = f" ({alert.value:.0f} vs baseline {alert.baseline:.0f})" if alert.value is not None and alert.baseline is not None else ""
+        text = f"{alert.message}{detail} @ {stamp}"
+        self.status_label.setText(text)
+        self.update_signal_response_display(f"[ALERT] {text}")
+    
     def handle_error(self, error: str):
         self.status_label.setText(f"❌ Error: {error}")
         print(f"Monitoring error: {error}")
@@ -1406,50 +1635,44 @@ class EnhancedSIMSignalQualityWindow(QDialog):
             if not self.measurements_history:
                 return
             
-            rssi_values = [m.rssi for m in self.measurements_history if m.rssi > -999]
-            quality_values = [m.quality_score for m in self.measurements_history]
+            # สถิติสะสมของทั้ง session (อัปเดตทีละ sample ใน SignalRingBuffer)
+            rssi = self.measurements_history.stats['rssi']
+            quality = self.measurements_history.stats['quality']
             
-            if rssi_values and quality_values:
-                self.stats_labels['avg_rssi'].setText(f"{sum(rssi_values)/len(rssi_values):.1f} dBm")
-                self.stats_labels['min_rssi'].setText(f"{min(rssi_values)} dBm")
-                self.stats_labels['max_rssi'].setText(f"{max(rssi_values)} dBm")
-                self.stats_labels['range_rssi'].setText(f"{max(rssi_values) - min(rssi_values)} dB")
+            if rssi.count and quality.count:
+                self.stats_labels['avg_rssi'].setText(f"{rssi.mean:.1f} dBm")
+                self.stats_labels['min_rssi'].setText(f"{rssi.min:.0f} dBm")
+                self.stats_labels['max_rssi'].setText(f"{rssi.max:.0f} dBm")
+                self.stats_labels['range_rssi'].setText(f"{rssi.max - rssi.min:.0f} dB")
                 
-                self.stats_labels['avg_quality'].setText(f"{sum(quality_values)/len(quality_values):.1f}%")
-                self.stats_labels['max_quality'].setText(f"{max(quality_values):.1f}%")
-                self.stats_labels['min_quality'].setText(f"{min(quality_values):.1f}%")
+                self.stats_labels['avg_quality'].setText(f"{quality.mean:.1f}%")
+                self.stats_labels['max_quality'].setText(f"{quality.max:.1f}%")
+                self.stats_labels['min_quality'].setText(f"{quality.min:.1f}%")
                 
-                if len(rssi_values) > 1:
-                    variance = sum((x - sum(rssi_values)/len(rssi_values))**2 for x in rssi_values) / (len(rssi_values) - 1)
-                    stability = max(0, min(100, 100 - (variance * 2)))
+                if rssi.count > 1:
+                    stability = max(0, min(100, 100 - (rssi.variance * 2)))
                     self.stats_labels['stability'].setText(f"{stability:.1f}%")
             
-            self.total_measurements_label.setText(f"Total: {len(self.measurements_history)} measurements")
+            self.total_measurements_label.setText(f"Total: {self.measurements_history.total} measurements")
             
-            if quality_values:
-                self.avg_quality_label.setText(f"Avg Quality: {sum(quality_values)/len(quality_values):.1f}%")
+            if quality.count:
+                self.avg_quality_label.setText(f"Avg Quality: {quality.mean:.1f}%")
             
             self.create_quality_distribution()
             
         except Exception as e:
             print(f"Error updating statistics: {e}")
 
-    @staticmethod
-    def _calc_quality_from_rssi_ber(rssi: int, ber: float) -> float:
-        if rssi is None or rssi <= -999: return 0.0
-        rssi_score = max(0, min(100, (rssi + 113) * 100.0 / 62.0))
-        ber_score  = 50.0 if ber is None or ber >= 99 else max(0, min(100, 100.0 - (ber * 10.0)))
-        return (rssi_score * 0.7) + (ber_score * 0.3)
-
-    def _quality_samples(self):
-        samples = []
-        for m in getattr(self, "measurements_history", []):
-            if not m or m.rssi is None or m.rssi <= -999: 
-                continue
-            q = (m.quality_score if getattr(m, "quality_score", None) not in (None, 0)
-                else self._calc_quality_from_rssi_ber(m.rssi, getattr(m, "ber", 99)))
-            if q > 0: samples.append(q)
-        return samples
+    def _quality_samples(self) -> np.ndarray:
+        """คะแนนคุณภาพของทุก sample ที่อ่าน RSSI ได้ (quality_score = 0 → คำนวณจาก RSSI/BER ใหม่)"""
+        history = getattr(self, "measurements_history", None)
+        if not history:
+            return np.empty(0)
+        rssi = history.values("rssi")
+        quality = history.values("quality")
+        fallback = signal_analytics.quality_scores(rssi, history.values("ber"))
+        q = np.where(np.isnan(quality) | (quality == 0), fallback, quality)
+        return q[~np.isnan(rssi) & (q > 0)]
     
     def _build_quality_distribution_text(self) -> str:
         qualities = self._quality_samples()
@@ -1461,12 +1684,10 @@ class EnhancedSIMSignalQualityWindow(QDialog):
                 (70,80,"Good","📶"), (60,70,"Fair","🟠"), (0,60,"Poor","🔴")]
         BAR_WIDTH = 42
         lines = header + [""]
-        for lo, hi, label, icon in bins:
-            c = sum(1 for q in qualities if lo <= q < hi)
-            pct = (c/total)*100.0
+        for label, icon, c, pct in signal_analytics.quality_distribution(qualities, bins):
             bar = "█"*round(pct/100*BAR_WIDTH) + "░"*(BAR_WIDTH-round(pct/100*BAR_WIDTH))
             lines.append(f"{icon} {label:<11} [{bar}] {c:>3} ({pct:>5.1f}%)")
-        lines += ["", f"Total Measurements: {total}", f"Avg Quality: {sum(qualities)/total:.1f}%"]
+        lines += ["", f"Total Measurements: {total}", f"Avg Quality: {qualities.mean():.1f}%"]
         if getattr(self, "sim_identity", None):
             si = self.sim_identity
             lines.append(f"SIM: {si.carrier} (MCC: {si.mcc}, MNC: {si.mnc})")
@@ -1478,25 +1699,14 @@ class EnhancedSIMSignalQualityWindow(QDialog):
             if not self.measurements_history:
                 return
             
-            ranges = [
-                (90, 100, "Excellent", "🟢"),   # Office building = Excellent
-                (80, 90, "Good", "✅"),         # Satellite antenna = Good
-                (70, 80, "Fair", "📶"),         # Antenna bars = Fair
-                (60, 70, "Poor", "🟠"),         # Red circle = Poor
-                (0, 60, "Very Poor", "🔴")      # Warning sign = Very Poor
-            ]
-
             distribution_text = "📊 QUALITY DISTRIBUTION\n"
             distribution_text += "=" * 40 + "\n\n"
 
             
-            total = len(self.measurements_history)
+            total = self.measurements_history.total
             
-            for min_q, max_q, label, icon in ranges:
-                count = sum(1 for m in self.measurements_history 
-                          if min_q <= m.quality_score <= max_q)
-                percentage = (count / total * 100) if total > 0 else 0
-                
+            # ช่วงคุณภาพ: services.signal_buffer.QUALITY_BINS (นับสะสมตอน append)
+            for label, icon, count, percentage in self.measurements_history.distribution():
                 BAR_WIDTH = 40
                 bar_length = round(percentage * BAR_WIDTH / 100)
                 bar = "█" * bar_length + "░" * (BAR_WIDTH - bar_length)
@@ -1593,6 +1803,8 @@ class EnhancedSIMSignalQualityWindow(QDialog):
             # แก้ไข: ปรับปรุงส่วน Connection Info
             connection_status = "✅ Active" if self.shared_serial_thread and self.shared_serial_thread.isRunning() else "❌ Inactive"
             sim_info_included = "✅ Yes" if self.include_sim_check.isChecked() else "❌ No"
+            rssi_stats = self.measurements_history.stats['rssi']
+            quality_stats = self.measurements_history.stats['quality']
             
             recommendations_text += f"""
 🔗 Connection Info:
@@ -1603,10 +1815,10 @@ class EnhancedSIMSignalQualityWindow(QDialog):
 • SIM Info included: {sim_info_included}
 
 📊 Monitoring Statistics:
-• Total measurements: {len(self.measurements_history)}
-• Average quality: {sum(m.quality_score for m in self.measurements_history) / len(self.measurements_history):.1f}%
-• Best signal: {max(m.rssi for m in self.measurements_history if m.rssi > -999)} dBm
-• Worst signal: {min(m.rssi for m in self.measurements_history if m.rssi > -999)} dBm
+• Total measurements: {self.measurements_history.total}
+• Average quality: {quality_stats.mean:.1f}%
+• Best signal: {f"{rssi_stats.max:.0f} dBm" if rssi_stats.count else "--"}
+• Worst signal: {f"{rssi_stats.min:.0f} dBm" if rssi_stats.count else "--"}
 
 ℹ️ Note: This Signal Quality Checker uses the same serial connection as the main window.
 If you see connection issues, please check the main window's serial connection.
@@ -1709,9 +1921,17 @@ Debug Info:
                     recommendations.append("📡 TrueMove H network - extensive rural coverage")
         
         if len(self.measurements_history) >= 10:
-            recent_rssi = [m.rssi for m in self.measurements_history[-10:] if m.rssi > -999]
-            if recent_rssi and (max(recent_rssi) - min(recent_rssi)) > 20:
+            recent = signal_analytics.summarize(self.measurements_history.values("rssi", last=10), percentiles=())
+            if recent.valid and recent.range > 20:
                 recommendations.append("⚡ Signal is unstable - check for interference")
+            
+            # สัญญาณหายเป็นช่วง ๆ (อ่าน RSSI ไม่ได้) ใน 60 ครั้งล่าสุด
+            gaps = signal_analytics.outages(self.measurements_history.values("rssi", last=60))
+            if len(gaps) >= 2 or any(g.samples >= 3 for g in gaps):
+                longest = max(g.samples for g in gaps)
+                recommendations.append(
+                    f"⛔ Signal dropped out {len(gaps)} time(s) in the last 60 readings "
+                    f"(longest {longest} readings) - check antenna / coverage")
         
         if not self.shared_serial_thread or not self.shared_serial_thread.isRunning():
             recommendations.append("🔒 Check main window serial connection for consistent monitoring")
@@ -1730,17 +1950,6 @@ Debug Info:
     def toggle_auto_scroll(self, enabled: bool):
         self.auto_scroll = enabled
     
-    def _update_row_numbers(self):
-        try:
-            for row in range(self.measurements_table.rowCount()):
-                row_number = row + 1
-                item = QTableWidgetItem(str(row_number))
-                item.setForeground(QColor("#6c757d"))
-                item.setTextAlignment(Qt.AlignCenter)
-                self.measurements_table.setItem(row, 0, item)
-        except Exception as e:
-            print(f"Error updating row numbers: {e}")
-    
     def clear_data(self):
         reply = QMessageBox.question(self, "Clear Data", 
                                 "Are you sure you want to clear all measurement data?",
@@ -1748,8 +1957,7 @@ Debug Info:
                                 QMessageBox.No)
         
         if reply == QMessageBox.Yes:
-            self.measurements_history.clear()
-            self.measurements_table.setRowCount(0)
+            self.measurements_model.clear()
             self.signal_graph.clear_measurements()
             
             for label in self.current_labels.values():
@@ -1852,11 +2060,18 @@ Debug Info:
         event.accept()
 
 class SignalVisualizationWidget(QWidget):
-    
+    """
+    กราฟ RSSI แบบ level-of-detail
+    - จุดน้อยกว่าความกว้าง → วาดทุกจุด (เส้นเดียวด้วย drawPolyline)
+    - จุดมากกว่าความกว้าง → ย่อเหลือ min/max ต่อ pixel (minmax_decimate) แล้ววาดเส้นเดียว
+    - กรอบ / grid / label แกน Y วาดลง QPixmap ครั้งเดียว ใช้ซ้ำจนกว่าขนาดหรือช่วงแกนจะเปลี่ยน
+    """
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.measurements = []
         self.max_points = 50
+        self._bg_cache = None       # (key, QPixmap)
         self.setMinimumHeight(200)
         self.setStyleSheet("background-color: white; border: 1px solid #dc3545;")
         
@@ -1869,127 +2084,183 @@ class SignalVisualizationWidget(QWidget):
     def clear_measurements(self):
         self.measurements.clear()
         self.update()
-        
+
+    # ---------- ข้อมูลที่จะวาด (subclass override) ----------
+    def _view_rssi(self) -> np.ndarray:
+        """RSSI ของช่วงที่แสดง (NaN = ไม่มีสัญญาณ)"""
+        return np.array([m.rssi if m.rssi > -999 else np.nan for m in self.measurements], dtype=np.float64)
+
+    def _graph_rect(self) -> QRect:
+        rect = self.rect()
+        return QRect(GRAPH_MARGIN, GRAPH_MARGIN,
+                     rect.width() - 2*GRAPH_MARGIN,
+                     rect.height() - 2*GRAPH_MARGIN)
+
+    def resizeEvent(self, event):
+        self._bg_cache = None
+        super().resizeEvent(event)
+
     def paintEvent(self, event):
         """Enhanced paintEvent with gray zones for no signal"""
-        if not self.measurements:
+        values = self._view_rssi()
+        if not len(values):
             return
-        
+
+        graph_rect = self._graph_rect()
+        if graph_rect.width() <= 0 or graph_rect.height() <= 0:
+            return
+
         painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
-        
-        rect = self.rect()
-        margin = 40
-        graph_rect = QRect(margin, margin, 
-                          rect.width() - 2*margin, 
-                          rect.height() - 2*margin)
-        
-        # Get valid RSSI values
-        valid_rssi_values = [m.rssi for m in self.measurements if m.rssi > -999]
-        
-        if not valid_rssi_values:
+        valid = values[~np.isnan(values)]
+        if not valid.size:
             # No valid data - show gray background
             painter.setPen(QColor("#bdc3c7"))
             painter.setBrush(QColor("#ecf0f1"))
             painter.drawRect(graph_rect)
-            
+
             painter.setPen(QColor("#7f8c8d"))
-            font = QFont("Arial", 12, QFont.Bold)
-            painter.setFont(font)
+            painter.setFont(QFont("Arial", 12, QFont.Bold))
             painter.drawText(graph_rect, Qt.AlignCenter, "No Signal Data")
             return
-        
-        # Calculate range from valid values
-        min_rssi = min(valid_rssi_values)
-        max_rssi = max(valid_rssi_values)
-        
-        if max_rssi == min_rssi:
-            max_rssi = min_rssi + 10
-        
-        # Draw border
+
+        min_rssi, max_rssi = self._y_range(float(valid.min()), float(valid.max()))
+        painter.drawPixmap(0, 0, self._background(graph_rect, min_rssi, max_rssi))
+
+        painter.setRenderHint(QPainter.Antialiasing)
+        scale_y = graph_rect.height() / (max_rssi - min_rssi)
+        if len(values) > graph_rect.width():
+            self._draw_decimated(painter, graph_rect, values, min_rssi, scale_y)
+        else:
+            self._draw_points(painter, graph_rect, values, min_rssi, scale_y)
+
+    @staticmethod
+    def _y_range(lo: float, hi: float) -> Tuple[float, float]:
+        """ปัดขอบแกน Y เป็นช่วงละ Y_TICK_STEP → พื้นหลังที่ cache ไว้ไม่ต้องวาดใหม่ทุกจุด"""
+        step = max(1, Y_TICK_STEP)
+        lo = float(np.floor(lo / step) * step)
+        hi = float(np.ceil(hi / step) * step)
+        if hi == lo:
+            hi = lo + 10
+        return lo, hi
+
+    def _background(self, graph_rect: QRect, min_rssi: float, max_rssi: float) -> QPixmap:
+        """กรอบ + grid + label แกน Y (cache ตามขนาด widget และช่วงแกน)"""
+        dpr = self.devicePixelRatioF()
+        key = (self.width(), self.height(), min_rssi, max_rssi, dpr)
+        if self._bg_cache and self._bg_cache[0] == key:
+            return self._bg_cache[1]
+
+        pix = QPixmap(int(self.width() * dpr), int(self.height() * dpr))
+        pix.setDevicePixelRatio(dpr)
+        pix.fill(Qt.transparent)
+        painter = QPainter(pix)
+
+        if SHOW_Y_TICKS:
+            scale_y = graph_rect.height() / (max_rssi - min_rssi)
+            step = max(1, Y_TICK_STEP)
+            while step * scale_y < 12:          # grid ห่างกันอย่างน้อย 12 px
+                step *= 2
+            painter.setPen(QColor("#f5d5d8"))
+            value = (min_rssi // step + 1) * step
+            while value < max_rssi:
+                y = int(round(graph_rect.bottom() - (value - min_rssi) * scale_y))
+                painter.drawLine(graph_rect.left(), y, graph_rect.right(), y)
+                value += step
+
+        # Draw graph border
         painter.setPen(QColor("#dc3545"))
         painter.drawRect(graph_rect)
-        
+
         # Draw Y-axis labels
         painter.setPen(QColor("#000000"))
-        font = QFont("Arial", 8)
-        painter.setFont(font)
-        
-        painter.drawText(5, margin, f"{max_rssi:.0f}")
-        painter.drawText(5, margin + graph_rect.height()//2, f"{(max_rssi+min_rssi)/2:.0f}")
-        painter.drawText(5, margin + graph_rect.height() - 5, f"{min_rssi:.0f}")
-        
+        painter.setFont(QFont("Arial", 8))
+        painter.drawText(5, GRAPH_MARGIN, f"{max_rssi:.0f}")
+        painter.drawText(5, GRAPH_MARGIN + graph_rect.height()//2, f"{(max_rssi+min_rssi)/2:.0f}")
+        painter.drawText(5, GRAPH_MARGIN + graph_rect.height() - 5, f"{min_rssi:.0f}")
+        painter.end()
+
+        self._bg_cache = (key, pix)
+        return pix
+
+    def _draw_points(self, painter, graph_rect, values, min_rssi, scale_y):
+        """จุดไม่เกิน 1 ต่อ pixel → วาดทุกจุด"""
+        n = len(values)
+        xs = graph_rect.left() + np.arange(n) * (graph_rect.width() / max(1, n - 1))
+        ys = graph_rect.bottom() - (values - min_rssi) * scale_y
+        invalid = np.isnan(values)
+
         # Draw gray zones for no-signal periods
-        self._draw_no_signal_background(painter, graph_rect, min_rssi, max_rssi)
-        
-        # Draw signal lines and points
-        self._draw_signal_data(painter, graph_rect, min_rssi, max_rssi)
-    
-    def _draw_no_signal_background(self, painter, graph_rect, min_rssi, max_rssi):
-        """Draw gray background for no-signal periods"""
-        painter.setPen(Qt.NoPen)
-        painter.setBrush(QColor(200, 200, 200, 100))
-        
-        for i, measurement in enumerate(self.measurements):
-            if measurement.rssi <= -999:
-                # Calculate X position for this no-signal point
-                x = graph_rect.left() + (i * graph_rect.width() / max(1, len(self.measurements) - 1))
-                
-                # Draw a narrow gray rectangle
-                gray_rect = QRect(
-                    int(x - 5), 
-                    graph_rect.top(),
-                    10,
-                    graph_rect.height()
-                )
-                painter.drawRect(gray_rect)
-    
-    def _draw_signal_data(self, painter, graph_rect, min_rssi, max_rssi):
-        """Draw signal lines and points"""
-        # Collect valid points
-        valid_points = []
-        for i, measurement in enumerate(self.measurements):
-            if measurement.rssi > -999:
-                x = graph_rect.left() + (i * graph_rect.width() / max(1, len(self.measurements) - 1))
-                y = graph_rect.bottom() - ((measurement.rssi - min_rssi) * graph_rect.height() / (max_rssi - min_rssi))
-                valid_points.append((int(x), int(y), i))
-        
-        # Draw lines between valid points
-        if len(valid_points) > 1:
-            painter.setPen(QColor("#dc3545"))
-            painter.setBrush(Qt.NoBrush)
-            
-            for i in range(1, len(valid_points)):
-                prev_x, prev_y, _ = valid_points[i-1]
-                curr_x, curr_y, _ = valid_points[i]
-                painter.drawLine(prev_x, prev_y, curr_x, curr_y)
-        
-        # Draw valid signal points
+        self._draw_no_signal_zones(painter, graph_rect, xs, invalid, pad=5)
+
+        # Draw signal line (only valid points) in one call
+        points = [QPointF(x, y) for x, y in zip(xs[~invalid].tolist(), ys[~invalid].tolist())]
         painter.setPen(QColor("#dc3545"))
+        painter.setBrush(Qt.NoBrush)
+        if len(points) > 1:
+            painter.drawPolyline(QPolygonF(points))
+
+        # จุด / เครื่องหมาย X วาดเฉพาะตอนที่ห่างกันพอจะมองเห็น
+        if n > 1 and graph_rect.width() / (n - 1) < 6:
+            return
         painter.setBrush(QColor("#dc3545"))
-        
-        for x, y, _ in valid_points:
-            painter.drawEllipse(x-2, y-2, 4, 4)
-        
-        # Draw no-signal markers
+        for p in points:
+            painter.drawEllipse(p, 3, 3)
+
         painter.setPen(QColor("#95a5a6"))
         painter.setBrush(Qt.NoBrush)
-        
-        for i, measurement in enumerate(self.measurements):
-            if measurement.rssi <= -999:
-                x = graph_rect.left() + (i * graph_rect.width() / max(1, len(self.measurements) - 1))
-                y = graph_rect.bottom() - 10
-                
-                # Draw X marker
-                painter.drawLine(int(x-3), int(y-3), int(x+3), int(y+3))
-                painter.drawLine(int(x-3), int(y+3), int(x+3), int(y-3))
+        y = graph_rect.bottom() - 10
+        for x in xs[invalid].tolist():
+            x = int(x)
+            painter.drawLine(x - 4, y - 4, x + 4, y + 4)
+            painter.drawLine(x - 4, y + 4, x + 4, y - 4)
+
+    def _draw_decimated(self, painter, graph_rect, values, min_rssi, scale_y):
+        """จุดมากกว่าความกว้าง → min/max ต่อ pixel แล้ววาดเป็น polyline เส้นเดียว"""
+        lo, hi, gaps = minmax_decimate(values, graph_rect.width())
+        cols = len(lo)
+        xs = graph_rect.left() + np.arange(cols) * (graph_rect.width() / max(1, cols - 1))
+
+        self._draw_no_signal_zones(painter, graph_rect, xs, gaps, pad=0)
+
+        ok = ~np.isnan(lo)
+        if not ok.any():
+            return
+        y_lo = graph_rect.bottom() - (lo[ok] - min_rssi) * scale_y
+        y_hi = graph_rect.bottom() - (hi[ok] - min_rssi) * scale_y
+        # สลับทิศ min→max / max→min ทีละ pixel → ไม่มีเส้นทแยงย้อนกลับ
+        odd = np.arange(y_lo.size) % 2 == 1
+        first = np.where(odd, y_hi, y_lo)
+        second = np.where(odd, y_lo, y_hi)
+        px = np.repeat(xs[ok], 2).tolist()
+        py = np.column_stack((first, second)).ravel().tolist()
+
+        painter.setPen(QColor("#dc3545"))
+        painter.setBrush(Qt.NoBrush)
+        painter.drawPolyline(QPolygonF([QPointF(x, y) for x, y in zip(px, py)]))
+
+    @staticmethod
+    def _draw_no_signal_zones(painter, graph_rect, xs, invalid, pad):
+        """Draw gray background zones for consecutive no-signal points"""
+        if not invalid.any():
+            return
+        edges = np.diff(np.concatenate(([0], invalid.astype(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1) - 1
+
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor(200, 200, 200, 100))  # Light gray with transparency
+        for s, e in zip(starts.tolist(), ends.tolist()):
+            left_x, right_x = xs[s], xs[e]
+            width = max(2*pad, right_x - left_x, 1) + 2*pad
+            painter.drawRect(QRect(int(left_x - pad), graph_rect.top(), int(width), graph_rect.height()))
+
 
 class ScrollableSignalGraph(SignalVisualizationWidget):
     pointSelected = pyqtSignal(int, SignalMeasurement)  # ส่ง (global_index, measurement)
     
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, capacity: int = GRAPH_HISTORY_CAPACITY):
         super().__init__(parent)
-        self._history = []          
+        self._history = SignalRingBuffer(capacity)   # ขนาดคงที่ ตัวเก่าสุดถูกทับ
         self._view_start = 0        
         self._window_size = 50      
         self._follow_live = True    
@@ -1998,12 +2269,16 @@ class ScrollableSignalGraph(SignalVisualizationWidget):
         self._click_moved = False  # ใหม่: แยก "ลาก" กับ "คลิก"
 
     def add_measurement(self, measurement):
-        self._history.append(measurement) 
+        evicted = len(self._history) == self._history.capacity
+        self._history.append(measurement)
+        if evicted and not self._follow_live:
+            # ตัวเก่าสุดหลุดออกไป → เลื่อน view ตามเพื่อให้ยังเห็นช่วงเดิม
+            self._view_start = max(0, self._view_start - 1)
         self._on_new_point()
 
     def clear_measurements(self):
         self._history.clear()
-        self._refresh_view_slice()
+        self._view_start = 0
         self.update()
 
     # ---------- public controls ----------
@@ -2018,13 +2293,14 @@ class ScrollableSignalGraph(SignalVisualizationWidget):
             return
         max_start = max(0, len(self._history) - self._window_size)
         self._view_start = max(0, min(int(idx), max_start))
-        self._refresh_view_slice()
         self.update()
 
     def set_window_size(self, n: int):
-        self._window_size = max(5, int(n))
-        self._snap_to_tail()
-        self._refresh_view_slice()
+        self._window_size = max(5, min(int(n), self._history.capacity))
+        if self._follow_live:
+            self._snap_to_tail()
+        else:
+            self.set_view_start(self._view_start)
         self.update()
 
     def mousePressEvent(self, e):
@@ -2037,29 +2313,32 @@ class ScrollableSignalGraph(SignalVisualizationWidget):
     def mouseMoveEvent(self, e):
         if self._dragging and self._history:
             dx = e.x() - self._last_x
-            self._last_x = e.x()
-            step = int(dx / 8)   
+            # ลาก 1 pixel = เลื่อนอย่างน้อย 1/8 จุด หรือเท่ากับจำนวนจุดต่อ pixel เมื่อซูมออกมาก
+            per_px = max(1 / 8, self._window_size / max(1, self._graph_rect().width()))
+            step = int(dx * per_px)
             if step:
+                self._last_x = e.x()
                 self.set_view_start(self._view_start - step)
                 self._click_moved = True  # มีการลาก
 
     def mouseReleaseEvent(self, e):
         # ถ้าไม่ได้ลาก ให้ถือว่าเป็นการ "คลิกเลือกจุด"
-        if e.button() == Qt.LeftButton and not self._click_moved and self.measurements:
-            margin = 40
-            rect = self.rect()
-            graph_rect = QRect(margin, margin, rect.width() - 2*margin, rect.height() - 2*margin)
+        start, end = self._view_range()
+        count = end - start
+        if e.button() == Qt.LeftButton and not self._click_moved and count:
+            graph_rect = self._graph_rect()
 
             x = max(graph_rect.left(), min(e.x(), graph_rect.right()))
-            if len(self.measurements) == 1:
+            if count == 1:
                 local_idx = 0
             else:
                 ratio = (x - graph_rect.left()) / max(1, graph_rect.width())
-                local_idx = int(round(ratio * (len(self.measurements) - 1)))
-            local_idx = max(0, min(local_idx, len(self.measurements) - 1))
+                local_idx = int(round(ratio * (count - 1)))
+            local_idx = max(0, min(local_idx, count - 1))
 
-            global_idx = self._view_start + local_idx
-            m = self.measurements[local_idx]
+            # index นับตั้งแต่เริ่มวัด (รวมจุดที่ถูกทับไปแล้ว) → ตรงกับ measurements_history.total
+            global_idx = self._history.total - len(self._history) + start + local_idx
+            m = self._history[start + local_idx]
             self.pointSelected.emit(global_idx, m)
 
         self._dragging = False
@@ -2067,180 +2346,53 @@ class ScrollableSignalGraph(SignalVisualizationWidget):
     def wheelEvent(self, e):
         dy = e.angleDelta().y()
         if dy:
-            self.set_window_size(self._window_size + (-5 if dy > 0 else 5))
+            # ซูมแบบคูณ → เลื่อน wheel ไม่กี่ครั้งก็ดูได้ทั้งหลายวัน
+            n = self._window_size
+            self.set_window_size(min(n - 5, int(n / 1.25)) if dy > 0 else max(n + 5, int(n * 1.25)))
 
     # ---------- helpers ----------
     def _snap_to_tail(self):
         if self._history:
             self._view_start = max(0, len(self._history) - self._window_size)
 
-    def _refresh_view_slice(self):
+    def _view_range(self) -> Tuple[int, int]:
         start = self._view_start
-        end = min(len(self._history), start + self._window_size)
-        self.measurements = self._history[start:end]
+        return start, min(len(self._history), start + self._window_size)
+
+    def _view_rssi(self) -> np.ndarray:
+        # อ่านตรงจาก ring buffer เฉพาะช่วงที่แสดง (ไม่ copy list ของ measurement)
+        return self._history.window("rssi", *self._view_range())
 
     def _on_new_point(self):
         if self._follow_live:
             self._snap_to_tail()
-        self._refresh_view_slice()
         self.update()
 
-    def paintEvent(self, event):
-        """Enhanced paintEvent with gray zones for no signal periods"""
-        if not self.measurements:
-            return
-        
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
-        
-        rect = self.rect()
-        margin = 40
-        graph_rect = QRect(margin, margin, 
-                          rect.width() - 2*margin, 
-                          rect.height() - 2*margin)
-        
-        # Get valid RSSI values for scaling
-        valid_rssi_values = [m.rssi for m in self.measurements if m.rssi > -999]
-        
-        if not valid_rssi_values:
-            # If no valid values, just show gray background
-            painter.setPen(QColor("#bdc3c7"))
-            painter.setBrush(QColor("#ecf0f1"))
-            painter.drawRect(graph_rect)
-            
-            # Draw "No Signal" text
-            painter.setPen(QColor("#7f8c8d"))
-            font = QFont("Arial", 12, QFont.Bold)
-            painter.setFont(font)
-            painter.drawText(graph_rect, Qt.AlignCenter, "No Signal Data")
-            return
-        
-        # Calculate Y-axis range from valid values only
-        min_rssi = min(valid_rssi_values)
-        max_rssi = max(valid_rssi_values)
-        
-        if max_rssi == min_rssi:
-            max_rssi = min_rssi + 10
-        
-        # Draw graph border
-        painter.setPen(QColor("#dc3545"))
-        painter.drawRect(graph_rect)
-        
-        # Draw Y-axis labels
-        painter.setPen(QColor("#000000"))
-        font = QFont("Arial", 8)
-        painter.setFont(font)
-        
-        painter.drawText(5, margin, f"{max_rssi:.0f}")
-        painter.drawText(5, margin + graph_rect.height()//2, f"{(max_rssi+min_rssi)/2:.0f}")
-        painter.drawText(5, margin + graph_rect.height() - 5, f"{min_rssi:.0f}")
-        
-        # Calculate X positions and Y positions for all points
-        points_data = []
-        for i, measurement in enumerate(self.measurements):
-            x = graph_rect.left() + (i * graph_rect.width() / max(1, len(self.measurements) - 1))
-            
-            if measurement.rssi > -999:
-                # Valid signal - calculate Y position
-                y = graph_rect.bottom() - ((measurement.rssi - min_rssi) * graph_rect.height() / (max_rssi - min_rssi))
-                points_data.append({
-                    'x': x, 'y': y, 'valid': True, 
-                    'rssi': measurement.rssi, 'measurement': measurement
-                })
-            else:
-                # No signal - use special marker
-                points_data.append({
-                    'x': x, 'y': None, 'valid': False, 
-                    'rssi': measurement.rssi, 'measurement': measurement
-                })
-        
-        # Draw gray zones for no-signal periods
-        self._draw_no_signal_zones(painter, graph_rect, points_data)
-        
-        # Draw signal line segments (only for valid points)
-        self._draw_signal_lines(painter, points_data)
-        
-        # Draw points
-        self._draw_signal_points(painter, graph_rect, points_data)
-    
-    def _draw_no_signal_zones(self, painter, graph_rect, points_data):
-        """Draw gray background zones for periods with no signal"""
-        painter.setPen(Qt.NoPen)
-        painter.setBrush(QColor(200, 200, 200, 100))  # Light gray with transparency
-        
-        # Find consecutive no-signal periods
-        no_signal_zones = []
-        start_idx = None
-        
-        for i, point in enumerate(points_data):
-            if not point['valid']:
-                if start_idx is None:
-                    start_idx = i
-            else:
-                if start_idx is not None:
-                    # End of no-signal zone
-                    no_signal_zones.append((start_idx, i - 1))
-                    start_idx = None
-        
-        # Handle case where no-signal zone extends to the end
-        if start_idx is not None:
-            no_signal_zones.append((start_idx, len(points_data) - 1))
-        
-        # Draw gray rectangles for each no-signal zone
-        for start_idx, end_idx in no_signal_zones:
-            if start_idx < len(points_data) and end_idx < len(points_data):
-                left_x = points_data[start_idx]['x']
-                right_x = points_data[end_idx]['x']
-                
-                # Extend the zone slightly for better visual coverage
-                zone_width = max(10, right_x - left_x)
-                
-                gray_rect = QRect(
-                    int(left_x - 5), 
-                    graph_rect.top(),
-                    int(zone_width + 10),
-                    graph_rect.height()
-                )
-                painter.drawRect(gray_rect)
 
-    def _draw_signal_lines(self, painter, points_data):
-        """Draw lines connecting valid signal points"""
-        painter.setPen(QColor("#dc3545"))
-        painter.setBrush(Qt.NoBrush)
-        
-        valid_points = [p for p in points_data if p['valid']]
-        
-        if len(valid_points) > 1:
-            for i in range(1, len(valid_points)):
-                prev_point = valid_points[i-1]
-                curr_point = valid_points[i]
-                
-                painter.drawLine(
-                    int(prev_point['x']), int(prev_point['y']),
-                    int(curr_point['x']), int(curr_point['y'])
-                )
-    
-    def _draw_signal_points(self, painter, graph_rect, points_data):
-        """Draw points for signal measurements"""
-        for point in points_data:
-            if point['valid']:
-                # Valid signal point - red circle
-                painter.setPen(QColor("#dc3545"))
-                painter.setBrush(QColor("#dc3545"))
-                painter.drawEllipse(
-                    int(point['x'] - 3), int(point['y'] - 3), 6, 6
-                )
-            else:
-                # No signal point - gray X marker at bottom
-                painter.setPen(QColor("#95a5a6"))
-                painter.setBrush(Qt.NoBrush)
-                
-                x = int(point['x'])
-                y = graph_rect.bottom() - 10
-                
-                # Draw X marker
-                painter.drawLine(x - 4, y - 4, x + 4, y + 4)
-                painter.drawLine(x - 4, y + 4, x + 4, y - 4)
+def benchmark_graph_paint(points: int = 3 * 17_280, width: int = 900, height: int = 300, rounds: int = 20) -> None:
+    """
+    เวลา paint ของกราฟเมื่อซูมออกทั้งช่วง (ค่าเริ่มต้น ≈ 3 วันที่วัดทุก 5 วินาที)
+    รันจากโฟลเดอร์โปรเจกต์: python -m windows.enhanced_sim_signal_quality_window --bench-graph
+    """
+    import random, time
+
+    app = QApplication.instance() or QApplication(["bench", "-platform", "offscreen"])
+    graph = ScrollableSignalGraph(capacity=max(points, 5))
+    graph.resize(width, height)
+    rnd = random.Random(1)
+    for i in range(points):
+        rssi = -999 if rnd.random() < 0.01 else -80 + int(15 * np.sin(i / 500)) + rnd.randint(-5, 5)
+        graph.add_measurement(SignalMeasurement(timestamp="", rssi=rssi))
+    graph.set_window_size(points)
+    app.processEvents()             # ให้ resize / update ที่ค้างอยู่ทำงานก่อนจับเวลา
+
+    target = QPixmap(width, height)
+    graph.render(target)            # ครั้งแรก: สร้าง cache พื้นหลัง
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        graph.render(target)
+    per = (time.perf_counter() - t0) / rounds * 1000
+    print(f"{points:,} points → {width}px: {per:.2f} ms/paint")
 
 # ==================== INTEGRATION FUNCTIONS ====================
 
@@ -2262,6 +2414,9 @@ def show_enhanced_sim_signal_quality_window(port: str = "", baudrate: int = 1152
 
 if __name__ == "__main__":
     import sys
+    if "--bench-graph" in sys.argv:
+        benchmark_graph_paint()
+        sys.exit(0)
     app = QApplication(sys.argv)
     window = show_enhanced_sim_signal_quality_window("COM9", 115200)
     if window:
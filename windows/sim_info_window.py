@@ -15,10 +15,12 @@ from managers import (
     SMSHandler, SMSInboxManager, DialogManager
 )
 from services import load_sim_data, SerialMonitorThread
-from widgets import SimTableWidget
+from widgets import SimTableWidget, ConsoleWidget
 from styles import MainWindowStyles
-from windows.at_command_helper import ATCommandHelper
+from windows.at_command_helper import show_sim_analysis_window
 from services.sms_log import log_sms_sent
+from services import response_classifier
+from services import metrics
 from widgets.sms_log_dialog import SmsLogDialog
 from windows.enhanced_sim_signal_quality_window import show_enhanced_sim_signal_quality_window
 from managers.smart_command_manager import SmartCommandManager
@@ -155,6 +157,8 @@ class SimInfoWindow(QMainWindow):
         try:
             settings = self.settings_manager.load_settings()
             self.auto_sms_monitor = settings.get('auto_sms_monitor', True)
+            if settings.get('metrics_enabled', False):
+                metrics.enable(True)
             
         except Exception as e:
             print(f"Error loading application settings: {e}")
@@ -339,6 +343,21 @@ class SimInfoWindow(QMainWindow):
         self.btn_smslog.setFixedWidth(button_width)
         layout.addWidget(self.btn_smslog)
         
+        # ปุ่ม สถิติ SMS
+        self.btn_analytics = QPushButton("📊 Analytics")
+        self.btn_analytics.setFixedWidth(button_width)
+        layout.addWidget(self.btn_analytics)
+        
+        # ปุ่ม แดชบอร์ดทุกโมเด็ม
+        self.btn_modem_dashboard = QPushButton("🗄 All Modems")
+        self.btn_modem_dashboard.setFixedWidth(button_width)
+        layout.addWidget(self.btn_modem_dashboard)
+        
+        # ปุ่ม metrics (debug panel)
+        self.btn_metrics = QPushButton("📈 Metrics")
+        self.btn_metrics.setFixedWidth(button_width)
+        layout.addWidget(self.btn_metrics)
+        
         # ปุ่ม SMS Monitor
         self.btn_realtime_monitor = QPushButton("SMS Monitor")
         self.btn_realtime_monitor.setFixedWidth(button_width)
@@ -711,9 +730,8 @@ class SimInfoWindow(QMainWindow):
         left_layout.addSpacing(10)
 
         left_layout.addWidget(QLabel("AT Command:"))
-        self.at_command_display = QTextEdit()
+        self.at_command_display = ConsoleWidget(max_lines=500)
         self.at_command_display.setFixedHeight(80)
-        self.at_command_display.setReadOnly(True)
         self.at_command_display.setPlaceholderText("The AT commands sent will be displayed here...")
         left_layout.addWidget(self.at_command_display)
         middle_layout.addLayout(left_layout, stretch=1)
@@ -745,9 +763,12 @@ class SimInfoWindow(QMainWindow):
         result_layout.addLayout(header_layout)
 
         # Response Display Area
-        self.at_result_display = QTextEdit()
+        # ต่อท้ายทีละเฟรม + จำกัด scrollback (console_spill_file → เก็บประวัติเต็มลงไฟล์)
+        self.at_result_display = ConsoleWidget(
+            max_lines=self.settings_manager.get_setting('console_max_lines', 5000),
+            spill_path=self.settings_manager.get_setting('console_spill_file', '') or None
+        )
         self.at_result_display.setMinimumHeight(250)
-        self.at_result_display.setReadOnly(True)
         self.at_result_display.setPlaceholderText("The results from the modem will be displayed here...")
         result_layout.addWidget(self.at_result_display)
 
@@ -768,8 +789,15 @@ class SimInfoWindow(QMainWindow):
     def show_at_command_helper(self):
         """แสดงหน้าต่าง AT Command Helper"""
         try:
-            helper_dialog = ATCommandHelper(self)
-            helper_dialog.exec_()
+            port = self.port_combo.currentData()
+            if not port or port == "Device not found":
+                QMessageBox.warning(self, "No Port Selected", "⚠ Please select a valid COM port first!")
+                return
+            baudrate = int(self.baud_combo.currentText())
+            # พอร์ตที่เชื่อมต่ออยู่ → ส่งคำสั่งผ่าน serial thread เดิม (ไม่เปิดพอร์ตซ้ำ)
+            window = show_sim_analysis_window(port, baudrate, self, self.serial_thread)
+            if window and hasattr(self, 'dialog_manager'):
+                self.dialog_manager.open_dialogs.append(window)
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Cannot open AT Command Helper: {e}")
 
@@ -812,6 +840,9 @@ class SimInfoWindow(QMainWindow):
         self.btn_clear_response.setStyleSheet(MainWindowStyles.get_clear_response_button_style())
         self.btn_refresh.setStyleSheet(MainWindowStyles.get_refresh_button_style())
         self.btn_smslog.setStyleSheet(MainWindowStyles.get_smslog_button_style())
+        self.btn_analytics.setStyleSheet(MainWindowStyles.get_smslog_button_style())
+        self.btn_modem_dashboard.setStyleSheet(MainWindowStyles.get_smslog_button_style())
+        self.btn_metrics.setStyleSheet(MainWindowStyles.get_smslog_button_style())
         self.btn_realtime_monitor.setStyleSheet(MainWindowStyles.get_realtime_monitor_style())
         self.btn_toggle_response.setStyleSheet(MainWindowStyles.get_toggle_button_style())
         
@@ -827,6 +858,9 @@ class SimInfoWindow(QMainWindow):
         
         # Dialog management
         self.btn_smslog.clicked.connect(self.dialog_manager.show_sms_log_dialog)
+        self.btn_analytics.clicked.connect(self.dialog_manager.show_traffic_dashboard)
+        self.btn_modem_dashboard.clicked.connect(self.show_modem_dashboard)
+        self.btn_metrics.clicked.connect(self.dialog_manager.show_metrics_panel)
         self.btn_realtime_monitor.clicked.connect(self.open_realtime_monitor)
         
         # Signal Quality - ต้องเชื่อมต่อ
@@ -1039,7 +1073,9 @@ class SimInfoWindow(QMainWindow):
             self.table.update_sms_button_enable(port_ok)
 
         if port_ok:
-            self.setup_serial_monitor()
+            # monitor ยังเปิดพอร์ตนี้อยู่ (โหลดผ่านการเชื่อมต่อเดิม) → ไม่ต้องเริ่มใหม่
+            if self.port_manager.live_serial_thread(port) is None:
+                self.setup_serial_monitor()
             self.update_at_result_display("[REFRESH] ✅ Refresh completed successfully!")
         else:
             self.update_at_result_display("[REFRESH] ❌ Refresh failed - no valid port")
@@ -1472,8 +1508,8 @@ class SimInfoWindow(QMainWindow):
         self.sms_monitor_dialog.activateWindow()
 
     def show_sms_log_for_phone(self, phone):
-        """แสดงประวัติ SMS สำหรับเบอร์ที่ระบุ"""
-        self.dialog_manager.show_sms_log_dialog(filter_phone=phone)
+        """แสดงประวัติ SMS สำหรับเบอร์ที่ระบุ (มุมมองสนทนา)"""
+        self.dialog_manager.show_sms_log_for_phone(phone)
 
     def on_sms_monitor_closed(self):
         """จัดการเมื่อ SMS Monitor ถูกปิด"""
@@ -1497,28 +1533,11 @@ class SimInfoWindow(QMainWindow):
     # ==================== 9. DISPLAY MANAGEMENT ====================
     def update_at_command_display(self, command):
         """อัพเดทการแสดงคำสั่ง AT"""
-        current_text = self.at_command_display.toPlainText()
-        if current_text:
-            self.at_command_display.setPlainText(current_text + "\n" + command)
-        else:
-            self.at_command_display.setPlainText(command)
-        
-        cursor = self.at_command_display.textCursor()
-        cursor.movePosition(cursor.End)
-        self.at_command_display.setTextCursor(cursor)
+        self.at_command_display.append_line(command)
     
     def update_at_result_display(self, result):
-        """อัพเดทการแสดงผลลัพธ์ AT"""
-        
-        current_text = self.at_result_display.toPlainText()
-        if current_text:
-            self.at_result_display.setPlainText(current_text + "\n" + result)
-        else:
-            self.at_result_display.setPlainText(result)
-        
-        cursor = self.at_result_display.textCursor()
-        cursor.movePosition(cursor.End)
-        self.at_result_display.setTextCursor(cursor)
+        """อัพเดทการแสดงผลลัพธ์ AT (ต่อท้ายในเฟรมถัดไป ไม่จัดหน้าใหม่ทั้งเอกสาร)"""
+        self.at_result_display.append_line(result)
 
     def clear_at_displays(self):
         """ล้างการแสดง AT Command และผลลัพธ์"""
@@ -1610,6 +1629,14 @@ class SimInfoWindow(QMainWindow):
         except Exception as e:
             self.update_at_result_display(f"[SIGNAL QUALITY] ❌ Error: {e}")
 
+    def show_modem_dashboard(self):
+        """เปิดแดชบอร์ดสัญญาณทุกโมเด็ม (พอร์ตที่เชื่อมต่ออยู่ใช้ serial thread เดิม)"""
+        try:
+            baudrate = int(self.baud_combo.currentText())
+        except (TypeError, ValueError):
+            baudrate = 115200
+        self.dialog_manager.show_modem_dashboard(serial_thread=self.serial_thread, baudrate=baudrate)
+
     def _on_signal_quality_window_closed(self):
         """เมื่อ Signal Quality window ปิด"""
         if hasattr(self, 'display_manager'):
@@ -1781,13 +1808,6 @@ class EnhancedDisplayFilterManager:
             'BACKGROUND': 'nowhere'        # ไม่แสดงเลย
         }
         
-        # Response patterns  
-        self.response_patterns = {
-            'SIGNAL_QUALITY': ['+CSQ:', '+CESQ:', '+COPS:', '+CREG:'],
-            'SMS': ['+CMTI:', '+CMT:', '+CMGR:', '+CMGL:', '+CMGS:', '+CMS ERROR:'],
-            'SIM_INFO': ['+CIMI:', '+CCID:', '+CNUM:']
-        }
-        
         self.active_modes = {
             'signal_monitoring': False,
             'sms_monitoring': True,
@@ -1821,29 +1841,13 @@ class EnhancedDisplayFilterManager:
     
     def _classify_response(self, data, source_hint=None):
         """จำแนกประเภท response"""
-        data_upper = data.upper()
-        
         # ใช้ source hint ถ้ามี
         if source_hint:
             return source_hint
         
-        # ตรวจสอบ SMS responses
-        if any(pattern in data_upper for pattern in self.response_patterns['SMS']):
-            return 'SMS'
-        
-        # ตรวจสอบ Signal Quality responses
-        if any(pattern in data_upper for pattern in self.response_patterns['SIGNAL_QUALITY']):
-            if self.active_modes['signal_monitoring']:
-                return 'SIGNAL_QUALITY'
-            else:
-                return 'MANUAL'  # ถ้าไม่ได้เปิด signal monitoring ให้แสดงในหน้าหลัก
-        
-        # ตรวจสอบ OK/ERROR ที่ตามหลัง Signal Quality commands
-        if data_upper in ['OK', 'ERROR'] and self.active_modes['signal_monitoring']:
-            return 'SIGNAL_QUALITY'
-        
-        # Default เป็น Manual
-        return 'MANUAL'
+        # SMS → SMS Monitor / สัญญาณ + OK/ERROR ระหว่าง signal monitoring → Signal Quality / อื่น ๆ หน้าหลัก
+        return response_classifier.route(response_classifier.classify(data),
+                                         self.active_modes['signal_monitoring'])
     
     def _send_to_main_display(self, data):
         """ส่งไปแสดงในหน้าหลัก"""
@@ -1883,29 +1887,19 @@ class DisplayFilterManager:
         }
 
         # ติดตาม responses ที่ไม่ต้องการแสดง (prefix ของบรรทัดผลลัพธ์)
-        self.background_responses = {
-            '+CSQ:', '+CESQ:', '+COPS:', '+CREG:', '+CIMI:',
-            '+CCID:', '+CNUM:', '+CPIN:', '+CGMI:', '+CGMM:',
-            '+CGMR:', '+CGSN:',
-        }
+        # ชุดมาตรฐานจับด้วย response_classifier; ที่เพิ่มภายหลัง (add_custom_filter_commands) ค่อยสแกนเอง
+        self.background_responses = set(response_classifier.BACKGROUND_PREFIXES)
 
         self.background_command_echos = {
-            'AT+CSQ', 'AT+CESQ', 'AT+COPS?', 'AT+CREG?'
+            p for p, c in response_classifier.WHOLE_LINES.items() if c == response_classifier.ECHO
         }
 
         # ใช้จำว่าเพิ่งซ่อนบรรทัดจาก monitor → เพื่อซ่อน OK/ERROR ถัดมา
         self._suppress_next_ok = False
 
         # อนุญาตให้ส่งไปแสดงที่ SMS Monitor เฉพาะ “เหตุการณ์ SMS” เท่านั้น
-        self.sms_only_prefixes = {
-            '+CMTI:',   # มี SMS ใหม่
-            '+CMT:',    # ข้อความส่งถึงเครื่อง (deliver)
-            '+CMGR:',   # อ่านจากกล่อง
-            '+CMGL:',   # list กล่อง
-            '+CMGS:',   # ส่งสำเร็จ
-            '+CMSS:',   # ส่งจาก storage
-            '+CMS ERROR:',
-        }
+        # (+CMTI: มี SMS ใหม่, +CMT: deliver, +CMGR:/+CMGL: อ่านกล่อง, +CMGS:/+CMSS: ส่งสำเร็จ, +CMS ERROR:)
+        self.sms_only_prefixes = response_classifier.SMS_PREFIXES
 
         # ติดตามสถานะ Signal Quality monitoring
         self.signal_monitoring_active = False
@@ -1928,29 +1922,28 @@ class DisplayFilterManager:
             print("[DISPLAY FILTER] Signal monitoring mode: OFF")
     
     def should_show_in_manual_display(self, data):
-        data_clean = (data or "").strip()
-        upper = data_clean.upper()
+        tag = response_classifier.classify(data)
 
         # 1) ถ้าเป็นคำสั่งที่ผู้ใช้กดเอง → แสดงทุกบรรทัดจนจบ (OK/ERROR)
         if self.manual_at_pending:
-            if self._is_end_response(data_clean):
+            if tag.is_final:
                 self.manual_at_pending = False
             return True
 
         # 2) ระหว่าง monitoring สัญญาณ → ซ่อนทุกอย่างของฝั่ง monitor
         if self.signal_monitoring_active:
             # 2.1 ซ่อน echo ของคำสั่ง monitoring
-            if upper in self.background_command_echos:
+            if tag.upper in self.background_command_echos:
                 self._suppress_next_ok = True
                 return False
 
             # 2.2 ซ่อน response กลุ่มสัญญาณ/เครือข่าย
-            if any(resp in data_clean for resp in self.background_responses):
+            if self._is_background_response(tag.text, tag):
                 self._suppress_next_ok = True
                 return False
 
             # 2.3 ซ่อน OK/ERROR ต่อจากสิ่งที่ซ่อน
-            if upper in ['OK', 'ERROR'] and self._suppress_next_ok:
+            if tag.is_ok_or_error and self._suppress_next_ok:
                 self._suppress_next_ok = False
                 return False
 
@@ -1958,27 +1951,25 @@ class DisplayFilterManager:
         return False
 
     def should_show_in_monitor(self, data):
-        data_clean = (data or "").strip()
-
         # ไม่ส่งซ้ำสิ่งที่ผู้ใช้กดเอง (manual) ไป SMS Monitor
         if self.manual_at_pending:
             return False
 
         # ให้ผ่านเฉพาะข้อความบ่งชี้เหตุการณ์ SMS เท่านั้น
-        if any(data_clean.startswith(p) for p in self.sms_only_prefixes):
-            return True
-
-        # นอกนั้น (รวมทั้ง CSQ/CESQ/COPS/CREG, echo, OK/ERROR) ไม่ต้องส่งเข้า SMS Monitor
-        return False
+        # (รวมทั้ง CSQ/CESQ/COPS/CREG, echo, OK/ERROR ไม่ต้องส่งเข้า SMS Monitor)
+        return response_classifier.classify(data).sms_event
     
     def _is_end_response(self, data):
         """ตรวจสอบว่าเป็น response ท้ายสุด"""
-        end_indicators = ['OK', 'ERROR', '+CME ERROR:', '+CMS ERROR:']
-        return any(data.startswith(indicator) for indicator in end_indicators)
+        return response_classifier.classify(data).is_final
     
-    def _is_background_response(self, data):
+    def _is_background_response(self, data, tag=None):
         """ตรวจสอบว่าเป็น response จาก background monitoring"""
-        return any(resp in data for resp in self.background_responses)
+        tag = tag or response_classifier.classify(data)
+        if tag.background:
+            return True
+        extra = self.background_responses - response_classifier.BACKGROUND_PREFIXES
+        return bool(extra) and any(resp in tag.text for resp in extra)
     
     def _is_manual_response(self, data):
         """ตรวจสอบ response ที่เป็น Manual แน่นอน"""
@@ -2031,6 +2022,9 @@ class EnhancedResponseDisplayManager:
             # ตัดสินใจการแสดงผล
             show_in_manual  = self.filter_manager.should_show_in_manual_display(data)
             show_in_monitor = self.filter_manager.should_show_in_monitor(data)
+            if metrics.enabled():
+                metrics.DISPLAY_LINES.inc("manual", "yes" if show_in_manual else "no")
+                metrics.DISPLAY_LINES.inc("monitor", "yes" if show_in_monitor else "no")
 
             if show_in_manual:
                 self._display_in_manual(data)